@@ -0,0 +1,176 @@
+""" Benchmark of cleaning the position and experience columns column-wise compared to row by row """
+from typing import Callable, Dict, List
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_series_equal
+
+from preprocessing.clean_features import KaggleFeatureCleaner
+from utils import log
+from utils.data_io import write_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+SENIORITY_LEVELS = ["Senior", "Middle", "Junior", "Lead", "Head", "Principal", None]
+POSITIONS = [
+    "Senior Backend Developer",
+    "Backend Developer",
+    "Lead QA Engineer",
+    "Data Scientist",
+    "Head of Data",
+    "Middle Frontend Developer",
+    "Junior ML Engineer",
+    "CTO",
+    None,
+]
+EXPERIENCES = ["1", "2", "3", "5", "10", "1,5", "2,5", "0,5", "less than year", None]
+
+
+def synthetic_survey(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Draws survey answers of the position, seniority, experience and age.
+    Args:
+        n_rows (int): Number of rows.
+        seed (int): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        Dataframe with the columns `"Position"`, `"Seniority"`, `"Years_of_Experience"` and `"Age"`.
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Position": rng.choice(np.array(POSITIONS, dtype=object), n_rows),
+            "Seniority": rng.choice(np.array(SENIORITY_LEVELS, dtype=object), n_rows),
+            "Years_of_Experience": rng.choice(
+                np.array(EXPERIENCES, dtype=object), n_rows
+            ),
+            "Age": rng.integers(18, 65, n_rows).astype(float),
+        }
+    )
+
+
+def replace_seniority_in_position_name(row: pd.Series):
+    """Removes the seniority of the position of a row like before vectorizing"""
+    if pd.isna(row["Seniority"]):
+        return row["Position"]
+    if not pd.isna(row["Position"]):
+        return row["Position"].replace(row["Seniority"], "").strip()
+    return np.NAN
+
+
+def row_wise_position(position: pd.Series, seniority: pd.Series) -> pd.Series:
+    """Cleans the position row by row like before vectorizing"""
+    cleaned = pd.DataFrame(data=[position, seniority]).T.apply(
+        replace_seniority_in_position_name,
+        axis=1,
+    )
+    return cleaned.astype("object").rename("Position")
+
+
+def row_wise_years_of_experience(
+    years_of_experience: pd.Series, age: pd.Series
+) -> pd.Series:
+    """Cleans the years of experience row by row like before vectorizing"""
+    cleaned = years_of_experience.str.replace(",", ".", regex=False)
+    cleaned = cleaned.apply(
+        KaggleFeatureCleaner._transform_to_float  # pylint: disable=protected-access
+    )
+    cleaned[(age - cleaned) < 18] = age - 18
+    return cleaned
+
+
+def _fastest(
+    function: Callable[..., pd.Series], arguments: List[pd.Series], repeats: int
+) -> float:
+    """Returns the fastest duration of calling the function with the arguments in seconds"""
+    durations = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function(*arguments)
+        durations.append(time.perf_counter() - started_at)
+    return min(durations)
+
+
+def main(n_rows: int, repeats: int, **kwargs) -> Dict[str, float]:
+    """
+    Measures cleaning the position and experience columns of synthetic survey data column-wise and row by row
+    and checks that both return identical results.
+    Args:
+        n_rows (int): Number of rows of the synthetic survey data.
+        repeats (int): Number of timed repeats. The fastest repeat is reported.
+        **kwargs: Additional keyword arguments:
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        Seconds per cleaning.
+    """
+    data = synthetic_survey(n_rows)
+    cleanings = {
+        "position": (
+            ("Position", "Seniority"),
+            row_wise_position,
+            KaggleFeatureCleaner.clean_position_column,
+        ),
+        "years_of_experience": (
+            ("Years_of_Experience", "Age"),
+            row_wise_years_of_experience,
+            KaggleFeatureCleaner.clean_years_of_experience_column,
+        ),
+    }
+    results = {}
+    for name, (columns, *functions) in cleanings.items():
+        arguments = [data[column] for column in columns]
+        row_wise, vectorized = [function(*arguments) for function in functions]
+        assert_series_equal(row_wise, vectorized, check_exact=True)
+        for version, function in zip(("row_wise", "vectorized"), functions):
+            results[f"{name}_{version}"] = _fastest(function, arguments, repeats)
+        logger.info(
+            "%-19s | row-wise %8.3f s | vectorized %8.3f s | %6.1fx",
+            name,
+            results[f"{name}_row_wise"],
+            results[f"{name}_vectorized"],
+            results[f"{name}_row_wise"] / results[f"{name}_vectorized"],
+        )
+    if kwargs.get("output_path"):
+        write_data(data=results, filepath=kwargs["output_path"])
+    return results
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to benchmark cleaning columns column-wise."
+    )
+    parser.add_argument(
+        "--rows",
+        "-n",
+        dest="n_rows",
+        type=int,
+        default=1000000,
+        help="Number of rows of the synthetic survey data.",
+    )
+    parser.add_argument(
+        "--repeats",
+        "-r",
+        dest="repeats",
+        type=int,
+        default=1,
+        help="Number of timed repeats of each cleaning.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the durations.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(n_rows=args.n_rows, repeats=args.repeats, output_path=args.output_path)
@@ -0,0 +1,225 @@
+""" Benchmark of parsing and serializing columnar JSON bodies compared to lists of rows """
+from typing import Any, Callable, Dict, List, Union
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.columnar import ColumnarResponse
+from utils import log
+from utils.data_io import write_data
+from utils.request_models import (
+    ColumnarPreprocessedRequestInference,
+    ColumnarRequestInputInference,
+    ColumnarRequestOutput,
+    PreprocessedRequestInference,
+    RequestInputInference,
+    RequestOutput,
+)
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+# Fields FastAPI validates the bodies and responses of the endpoints with
+INPUT_FIELD = create_response_field(
+    name="user_request",
+    type_=Union[List[RequestInputInference], ColumnarRequestInputInference],
+)
+PREPROCESSED_FIELD = create_response_field(
+    name="user_request",
+    type_=Union[
+        List[PreprocessedRequestInference], ColumnarPreprocessedRequestInference
+    ],
+)
+OUTPUT_FIELD = create_response_field(
+    name="Response", type_=Union[List[RequestOutput], ColumnarRequestOutput]
+)
+
+
+def synthetic_requests(n_rows: int, seed: int = 0) -> Dict[str, List[Any]]:
+    """
+    Draws raw and preprocessed request columns and predictions as parsed from JSON.
+    Args:
+        n_rows (int): Number of rows.
+        seed (int): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        Dictionary with the columns `"input"`, `"preprocessed"` and the list `"predictions"`.
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = datetime.datetime(2020, 1, 1) + pd.to_timedelta(
+        rng.integers(0, 10**8, n_rows), unit="s"
+    )
+    raw = {
+        "Timestamp": [timestamp.isoformat() for timestamp in timestamps],
+        "Age": rng.integers(18, 65, n_rows).tolist(),
+        "Years_of_Experience": np.round(rng.random(n_rows) * 20, 1).tolist(),
+    }
+    for column in ("Gender", "City", "Seniority", "Position"):
+        raw[column] = rng.choice(["a", "b", "c", "d"], n_rows).tolist()
+    raw["Company_Size"] = rng.choice(["1-100", "101-1000", "1000+"], n_rows).tolist()
+    raw["Company_Type"] = rng.choice(["product", "startup"], n_rows).tolist()
+    preprocessed = {
+        column: rng.integers(-1, 5, n_rows).tolist()
+        for column in PreprocessedRequestInference.__fields__
+    }
+    preprocessed["Years_of_Experience"] = raw["Years_of_Experience"]
+    return {
+        "input": raw,
+        "preprocessed": preprocessed,
+        "predictions": rng.random(n_rows) * 1e5,
+    }
+
+
+def _validate(field, body: bytes) -> Any:
+    """Parses and validates a JSON body like FastAPI"""
+    value, errors = field.validate(json.loads(body), {}, loc=("body",))
+    if errors:
+        raise ValueError(errors)
+    return value
+
+
+def _serialize_rows(predictions: np.ndarray) -> bytes:
+    """Serializes predictions as list of rows like the endpoints and FastAPI"""
+    outputs = [RequestOutput(Salary_Yearly=pred) for pred in predictions]
+    content = asyncio.run(
+        serialize_response(field=OUTPUT_FIELD, response_content=outputs)
+    )
+    return JSONResponse(content).body
+
+
+def _stages(data: Dict[str, Any]) -> Dict[str, Dict[str, Callable[[], Any]]]:
+    """Returns the function of each stage and body format for the request data"""
+    bodies = {
+        name: {
+            "columnar": json.dumps(columns).encode(),
+            "rows": json.dumps(
+                [dict(zip(columns, values)) for values in zip(*columns.values())]
+            ).encode(),
+        }
+        for name, columns in (
+            ("input", data["input"]),
+            ("preprocessed", data["preprocessed"]),
+        )
+    }
+    return {
+        "parse_input": {
+            "rows": lambda: pd.DataFrame(
+                jsonable_encoder(_validate(INPUT_FIELD, bodies["input"]["rows"]))
+            ),
+            "columnar": lambda: pd.DataFrame(
+                dict(_validate(INPUT_FIELD, bodies["input"]["columnar"]))
+            ),
+        },
+        "parse_preprocessed": {
+            "rows": lambda: pd.DataFrame(
+                jsonable_encoder(
+                    _validate(PREPROCESSED_FIELD, bodies["preprocessed"]["rows"])
+                )
+            ).to_numpy(dtype=np.float32),
+            "columnar": lambda: np.column_stack(
+                list(
+                    dict(
+                        _validate(
+                            PREPROCESSED_FIELD, bodies["preprocessed"]["columnar"]
+                        )
+                    ).values()
+                )
+            ).astype(np.float32),
+        },
+        "serialize_output": {
+            "rows": lambda: _serialize_rows(data["predictions"]),
+            "columnar": lambda: ColumnarResponse(
+                {"Salary_Yearly": data["predictions"]}
+            ).body,
+        },
+    }
+
+
+def _fastest(function: Callable[[], Any], repeats: int) -> float:
+    """Returns the fastest duration of calling the function in seconds"""
+    durations = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started_at)
+    return min(durations)
+
+
+def main(rows: List[int], repeats: int, **kwargs) -> Dict[str, Dict[str, float]]:
+    """
+    Measures parsing the request body into a dataframe, passing the preprocessed data to the prediction and
+    serializing the predictions, with lists of rows and with columnar bodies.
+    Args:
+        rows (List[int]): Numbers of rows of the requests.
+        repeats (int): Number of timed repeats. The fastest repeat is reported.
+        **kwargs: Additional keyword arguments:
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        Seconds per stage and format for each number of rows.
+    """
+    results = {}
+    for n_rows in rows:
+        stages = _stages(synthetic_requests(n_rows))
+        results[n_rows] = {}
+        for stage, formats in stages.items():
+            for body_format, function in formats.items():
+                results[n_rows][f"{stage}_{body_format}"] = _fastest(function, repeats)
+            logger.info(
+                "%7d rows | %-18s | rows %9.2f ms | columnar %8.2f ms | %6.1fx",
+                n_rows,
+                stage,
+                results[n_rows][f"{stage}_rows"] * 1e3,
+                results[n_rows][f"{stage}_columnar"] * 1e3,
+                results[n_rows][f"{stage}_rows"] / results[n_rows][f"{stage}_columnar"],
+            )
+    if kwargs.get("output_path"):
+        write_data(data=results, filepath=kwargs["output_path"])
+    return results
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to benchmark columnar request and response bodies."
+    )
+    parser.add_argument(
+        "--rows",
+        "-n",
+        dest="rows",
+        type=int,
+        nargs="+",
+        default=[1000, 100000],
+        help="Numbers of rows of the benchmarked requests.",
+    )
+    parser.add_argument(
+        "--repeats",
+        "-r",
+        dest="repeats",
+        type=int,
+        default=3,
+        help="Number of timed repeats per stage and body format.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the stage durations.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(rows=args.rows, repeats=args.repeats, output_path=args.output_path)
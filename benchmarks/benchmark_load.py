@@ -0,0 +1,537 @@
+""" Load test of the latency and throughput of the API endpoints, in-process or against a local uvicorn server """
+from typing import Any, Dict, List, NamedTuple, Optional
+import argparse
+import asyncio
+import datetime
+import importlib
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from utils import log
+from utils.data_io import read_data, write_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+# Version of the result format, increased once results of older runs can't be compared anymore
+RESULT_FORMAT_VERSION = 1
+# Metrics the comparison checks, with +1 if higher values are better and -1 if lower values are better
+COMPARED_METRICS = {
+    "latency_ms.p50": -1,
+    "latency_ms.p95": -1,
+    "latency_ms.p99": -1,
+    "requests_per_s": 1,
+    "rows_per_s": 1,
+}
+
+CATEGORIES = {
+    "Gender": ["Male", "Female", "Diverse"],
+    "City": ["Berlin", "Munich", "Hamburg", "Frankfurt", "Cologne"],
+    "Seniority": ["Junior", "Middle", "Senior", "Lead"],
+    "Position": [
+        "Backend Developer",
+        "Frontend Developer",
+        "Data Scientist",
+        "DevOps",
+        "QA Engineer",
+    ],
+    "Company_Size": ["up to 10", "10-50", "50-100", "100-1000", "1000+"],
+    "Company_Type": ["Product", "Startup", "Consulting / Agency"],
+}
+
+
+class Endpoint(NamedTuple):
+    """App serving an endpoint and the kind of rows the endpoint expects"""
+
+    module: str
+    path: str
+    preprocessed: bool
+
+
+ENDPOINTS = {
+    "get_salary": Endpoint("api.main", "/get_salary", preprocessed=False),
+    "preprocess": Endpoint(
+        "api.preprocessing_service", "/preprocess", preprocessed=False
+    ),
+    "predict": Endpoint("api.prediction_service", "/predict", preprocessed=True),
+}
+
+
+def synthetic_rows(
+    n_rows: int, preprocessed: bool = False, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Draws request rows of type ``utils.request_models.RequestInputInference`` or
+    ``utils.request_models.PreprocessedRequestInference`` as sent in JSON bodies.
+    Args:
+        n_rows (int): Number of rows.
+        preprocessed (bool): Whether to draw preprocessed rows. Defaults to False.
+        seed (int): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        List of rows.
+    """
+    rng = np.random.default_rng(seed)
+    columns: Dict[str, List[Any]] = {
+        "Age": rng.integers(20, 60, n_rows).tolist(),
+        "Years_of_Experience": np.round(rng.random(n_rows) * 20, 1).tolist(),
+    }
+    if preprocessed:
+        columns["Year"] = rng.integers(2018, 2021, n_rows).tolist()
+        for column, categories in CATEGORIES.items():
+            columns[column] = rng.integers(-1, len(categories), n_rows).tolist()
+    else:
+        columns["Timestamp"] = [
+            (
+                datetime.datetime(2018, 1, 1) + datetime.timedelta(days=int(day))
+            ).isoformat()
+            for day in rng.integers(0, 3 * 365, n_rows)
+        ]
+        for column, categories in CATEGORIES.items():
+            columns[column] = rng.choice(categories, n_rows).tolist()
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def summarize(
+    latencies_s: List[float], errors: int, duration_s: float, batch_size: int
+) -> Dict[str, Any]:
+    """
+    Summarizes the latencies of the successful requests of a scenario.
+    Args:
+        latencies_s (List[float]): Latencies of the successful requests in seconds.
+        errors (int): Number of failed requests.
+        duration_s (float): Wall time of the scenario in seconds.
+        batch_size (int): Rows per request.
+
+    Returns:
+        Dictionary with the number of requests and errors, the latency percentiles in milliseconds, the requests per
+        second and the rows per second.
+    """
+    latencies_ms = np.asarray(latencies_s) * 1e3
+    percentiles = (
+        np.percentile(latencies_ms, [50, 95, 99])
+        if len(latencies_ms)
+        else [float("nan")] * 3
+    )
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "duration_s": round(duration_s, 4),
+        "latency_ms": {
+            "p50": round(float(percentiles[0]), 3),
+            "p95": round(float(percentiles[1]), 3),
+            "p99": round(float(percentiles[2]), 3),
+            "mean": round(float(latencies_ms.mean()), 3) if len(latencies_ms) else None,
+            "max": round(float(latencies_ms.max()), 3) if len(latencies_ms) else None,
+        },
+        "requests_per_s": round(len(latencies_ms) / duration_s, 2),
+        "rows_per_s": round(len(latencies_ms) * batch_size / duration_s, 2),
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient, path: str, body: List[Dict[str, Any]], **kwargs
+) -> Dict[str, Any]:
+    """
+    Sends requests with a fixed number of concurrent clients, each sending its next request once the previous one was
+    answered, and measures their latencies.
+    Args:
+        client (``httpx.AsyncClient``): Client of the app or server.
+        path (str): Path of the endpoint.
+        body (List[Dict[str, Any]]): Rows of each request.
+        **kwargs: Additional keyword arguments:
+            - concurrency (int): Number of concurrent clients. Defaults to 1.
+            - n_requests (int): Number of timed requests. Defaults to 100.
+            - warm_up (int): Number of requests sent before timing. Defaults to 10.
+
+    Returns:
+        Summary of the timed requests, see ``summarize``.
+    """
+    concurrency = kwargs.get("concurrency", 1)
+    n_requests = kwargs.get("n_requests", 100)
+    latencies = []
+    errors = 0
+    remaining = [kwargs.get("warm_up", 10)]
+
+    async def send(timed: bool) -> None:
+        nonlocal errors
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started_at = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                failed = response.status_code != 200
+            except httpx.HTTPError:
+                failed = True
+            if not timed:
+                continue
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started_at)
+
+    await asyncio.gather(*(send(timed=False) for _ in range(concurrency)))
+    remaining[0] = n_requests
+    started_at = time.perf_counter()
+    await asyncio.gather(*(send(timed=True) for _ in range(concurrency)))
+    return summarize(
+        latencies,
+        errors=errors,
+        duration_s=time.perf_counter() - started_at,
+        batch_size=len(body),
+    )
+
+
+def free_port() -> int:
+    """Returns a port no socket is bound to."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_serving(client: httpx.AsyncClient, timeout: float) -> None:
+    """Waits until the server answers requests and, for ``api.main``, until `/ready` reports the services loaded."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            # The preprocessing and prediction services have no readiness endpoint and are loaded once serving
+            if (await client.get("/ready")).status_code in (200, 404):
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Server not ready within {timeout} s.")
+        await asyncio.sleep(0.2)
+
+
+async def run_scenarios(
+    client: httpx.AsyncClient, name: str, endpoint: Endpoint, **kwargs
+) -> List[Dict[str, Any]]:
+    """Drives the endpoint with each batch size and concurrency and returns the results"""
+    results = []
+    for batch_size in kwargs["batch_sizes"]:
+        body = synthetic_rows(batch_size, preprocessed=endpoint.preprocessed)
+        for concurrency in kwargs["concurrencies"]:
+            result = {
+                "name": f"{kwargs['target']}{endpoint.path}/batch={batch_size}/concurrency={concurrency}",
+                "target": kwargs["target"],
+                "endpoint": name,
+                "batch_size": batch_size,
+                "concurrency": concurrency,
+                **await drive(
+                    client,
+                    endpoint.path,
+                    body,
+                    concurrency=concurrency,
+                    n_requests=kwargs["n_requests"],
+                    warm_up=kwargs["warm_up"],
+                ),
+            }
+            logger.info(
+                "%-55s | p50 %8.2f ms | p95 %8.2f ms | p99 %8.2f ms | %8.1f req/s | %10.1f rows/s | %d errors",
+                result["name"],
+                result["latency_ms"]["p50"],
+                result["latency_ms"]["p95"],
+                result["latency_ms"]["p99"],
+                result["requests_per_s"],
+                result["rows_per_s"],
+                result["errors"],
+            )
+            results.append(result)
+    return results
+
+
+async def run_in_process(name: str, **kwargs) -> List[Dict[str, Any]]:
+    """Drives the app of the endpoint in this process, without network and server"""
+    endpoint = ENDPOINTS[name]
+    app = importlib.import_module(endpoint.module).app
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(
+            app=app, base_url="http://benchmark", timeout=kwargs["timeout"]
+        ) as client:
+            return await run_scenarios(
+                client, name, endpoint, target="inprocess", **kwargs
+            )
+    finally:
+        await app.router.shutdown()
+
+
+async def run_uvicorn(name: str, **kwargs) -> List[Dict[str, Any]]:
+    """Starts a uvicorn server of the app of the endpoint and drives it over HTTP"""
+    endpoint = ENDPOINTS[name]
+    port = free_port()
+    src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (src_path, env.get("PYTHONPATH"))))
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        f"{endpoint.module}:app",
+        f"--port={port}",
+        "--log-level=warning",
+        "--no-access-log",
+    ]
+    with subprocess.Popen(command, env=env) as process:
+        try:
+            limits = httpx.Limits(max_connections=max(kwargs["concurrencies"]))
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}",
+                timeout=kwargs["timeout"],
+                limits=limits,
+            ) as client:
+                await wait_until_serving(client, timeout=kwargs["timeout"])
+                return await run_scenarios(
+                    client, name, endpoint, target="uvicorn", **kwargs
+                )
+        finally:
+            process.terminate()
+
+
+def main(targets: List[str], endpoints: List[str], **kwargs) -> Dict[str, Any]:
+    """
+    Measures the latency percentiles, requests per second and rows per second of the endpoints for each batch size
+    and number of concurrent clients.
+    Args:
+        targets (List[str]): `inprocess` drives the apps in this process, `uvicorn` a local uvicorn server per app.
+        endpoints (List[str]): Endpoints to drive, of `get_salary`, `preprocess` and `predict`.
+        **kwargs: Additional keyword arguments:
+            - batch_sizes (List[int]): Rows per request.
+            - concurrencies (List[int]): Numbers of concurrent clients.
+            - n_requests (int): Number of timed requests per scenario.
+            - warm_up (int): Number of requests sent before timing each scenario.
+            - timeout (float): Time in seconds a request and the start of a server may take.
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        The results in the format written to `output_path`.
+    """
+    runners = {"inprocess": run_in_process, "uvicorn": run_uvicorn}
+    results = []
+    for target in targets:
+        for name in endpoints:
+            results.extend(asyncio.run(runners[target](name, **kwargs)))
+    report = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            key: kwargs[key]
+            for key in ("batch_sizes", "concurrencies", "n_requests", "warm_up")
+        },
+        "results": results,
+    }
+    if kwargs.get("output_path"):
+        write_data(data=report, filepath=kwargs["output_path"])
+    return report
+
+
+def _metric(result: Dict[str, Any], metric: str) -> Optional[float]:
+    """Returns a metric of a result by its dotted path"""
+    value: Any = result
+    for key in metric.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(
+    baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float = 0.1
+) -> List[Dict[str, Any]]:
+    """
+    Compares the scenarios two runs have in common and flags metrics which got worse by more than the threshold.
+    Args:
+        baseline (Dict[str, Any]): Results of the earlier run, as written by ``main``.
+        candidate (Dict[str, Any]): Results of the later run.
+        threshold (float): Relative change, which is tolerated as noise. Defaults to 0.1.
+
+    Returns:
+        List of changes with the scenario name, the metric, both values, the relative change and whether it is a
+        regression.
+
+    Raises:
+        ValueError: If the runs were written in different result formats.
+    """
+    if baseline.get("format_version") != candidate.get("format_version"):
+        raise ValueError(
+            f"Can't compare result format {baseline.get('format_version')} with {candidate.get('format_version')}."
+        )
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+    changes = []
+    for result in candidate["results"]:
+        if result["name"] not in baseline_results:
+            continue
+        for metric, direction in COMPARED_METRICS.items():
+            before = _metric(baseline_results[result["name"]], metric)
+            after = _metric(result, metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            changes.append(
+                {
+                    "name": result["name"],
+                    "metric": metric,
+                    "baseline": before,
+                    "candidate": after,
+                    "change": round(change, 4),
+                    "regression": change * direction < -threshold,
+                }
+            )
+        if result["errors"] > baseline_results[result["name"]]["errors"]:
+            changes.append(
+                {
+                    "name": result["name"],
+                    "metric": "errors",
+                    "baseline": baseline_results[result["name"]]["errors"],
+                    "candidate": result["errors"],
+                    "change": None,
+                    "regression": True,
+                }
+            )
+    return changes
+
+
+def main_compare(baseline_path: str, candidate_path: str, threshold: float) -> int:
+    """
+    Logs the changes between two runs.
+    Args:
+        baseline_path (str): Path of the results of the earlier run.
+        candidate_path (str): Path of the results of the later run.
+        threshold (float): Relative change, which is tolerated as noise.
+
+    Returns:
+        Exit code 1 if a metric regressed, otherwise 0.
+    """
+    changes = compare(
+        read_data(filepath=baseline_path),
+        read_data(filepath=candidate_path),
+        threshold=threshold,
+    )
+    for change in changes:
+        logger.log(
+            logging.WARNING if change["regression"] else logging.INFO,
+            "%-55s | %-16s | %10s -> %10s | %8s%s",
+            change["name"],
+            change["metric"],
+            change["baseline"],
+            change["candidate"],
+            "" if change["change"] is None else f"{change['change']:+.1%}",
+            " | REGRESSION" if change["regression"] else "",
+        )
+    regressions = sum(change["regression"] for change in changes)
+    logger.info("%d of %d compared metrics regressed.", regressions, len(changes))
+    return int(regressions > 0)
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to load test the API endpoints and to compare two runs."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Load test the endpoints.")
+    run_parser.add_argument(
+        "--targets",
+        "-t",
+        dest="targets",
+        nargs="+",
+        choices=["inprocess", "uvicorn"],
+        default=["inprocess"],
+        help="Drive the apps in this process and/or a local uvicorn server.",
+    )
+    run_parser.add_argument(
+        "--endpoints",
+        "-e",
+        dest="endpoints",
+        nargs="+",
+        choices=list(ENDPOINTS),
+        default=list(ENDPOINTS),
+        help="Endpoints to load test.",
+    )
+    run_parser.add_argument(
+        "--batch-sizes",
+        "-b",
+        dest="batch_sizes",
+        type=int,
+        nargs="+",
+        default=[1, 100],
+        help="Rows per request.",
+    )
+    run_parser.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrencies",
+        type=int,
+        nargs="+",
+        default=[1, 8],
+        help="Numbers of concurrent clients.",
+    )
+    run_parser.add_argument(
+        "--requests",
+        "-n",
+        dest="n_requests",
+        type=int,
+        default=200,
+        help="Number of timed requests per scenario.",
+    )
+    run_parser.add_argument(
+        "--warm-up",
+        dest="warm_up",
+        type=int,
+        default=20,
+        help="Number of requests sent before timing each scenario.",
+    )
+    run_parser.add_argument(
+        "--timeout",
+        dest="timeout",
+        type=float,
+        default=60,
+        help="Time in seconds a request and the start of a server may take.",
+    )
+    run_parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the results, e.g. results.json.",
+    )
+    compare_parser = subparsers.add_parser(
+        "compare", help="Flag regressions between two runs."
+    )
+    compare_parser.add_argument("baseline_path", help="Results of the earlier run.")
+    compare_parser.add_argument("candidate_path", help="Results of the later run.")
+    compare_parser.add_argument(
+        "--threshold",
+        dest="threshold",
+        type=float,
+        default=0.1,
+        help="Relative change of a metric, which is tolerated as noise.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    if args.command == "compare":
+        sys.exit(main_compare(args.baseline_path, args.candidate_path, args.threshold))
+    main(
+        targets=args.targets,
+        endpoints=args.endpoints,
+        batch_sizes=args.batch_sizes,
+        concurrencies=args.concurrencies,
+        n_requests=args.n_requests,
+        warm_up=args.warm_up,
+        timeout=args.timeout,
+        output_path=args.output_path,
+    )
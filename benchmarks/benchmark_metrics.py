@@ -0,0 +1,81 @@
+""" Benchmark of the cost of recording the in-process metrics of the API """
+from typing import Dict
+import argparse
+import logging
+import os
+import timeit
+
+from api.metrics import LATENCY_BUCKETS, Counter, Histogram, StageTimer
+from utils import log
+from utils.data_io import write_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+
+def main(number: int, repeats: int, **kwargs) -> Dict[str, float]:
+    """
+    Measures the time of recording a counter increment, a histogram observation and a stage lap.
+    Args:
+        number (int): Number of recordings per timed repeat.
+        repeats (int): Number of timed repeats. The fastest repeat is reported.
+        **kwargs: Additional keyword arguments:
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        Nanoseconds per recording.
+    """
+    counter = Counter()
+    histogram = Histogram(buckets=LATENCY_BUCKETS)
+    timer = StageTimer()
+    statements = {
+        "counter_inc": "counter.inc()",
+        "histogram_observe": "histogram.observe(0.003)",
+        "stage_lap": "timer.lap('clean')",
+    }
+    namespace = {"counter": counter, "histogram": histogram, "timer": timer}
+    results = {}
+    for name, statement in statements.items():
+        durations = timeit.repeat(
+            statement, number=number, repeat=repeats, globals=namespace
+        )
+        results[name] = min(durations) / number * 1e9
+        logger.info("%-17s | %8.1f ns", name, results[name])
+    if kwargs.get("output_path"):
+        write_data(data=results, filepath=kwargs["output_path"])
+    return results
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to benchmark recording metrics."
+    )
+    parser.add_argument(
+        "--number",
+        "-n",
+        dest="number",
+        type=int,
+        default=1000000,
+        help="Number of recordings per timed repeat.",
+    )
+    parser.add_argument(
+        "--repeats",
+        "-r",
+        dest="repeats",
+        type=int,
+        default=5,
+        help="Number of timed repeats.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the results.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(number=args.number, repeats=args.repeats, output_path=args.output_path)
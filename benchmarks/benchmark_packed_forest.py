@@ -0,0 +1,163 @@
+""" Benchmark of the packed forest against the sklearn inference of the forest for the small batch sizes it serves """
+from typing import Dict, List
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from modeling.packed_forest import PackedForest
+from utils import log
+from utils.data_io import read_data, write_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+
+def make_features(n_rows: int, seed: int) -> np.ndarray:
+    """Creates random features in the ranges of the transformed survey features."""
+    rng = np.random.default_rng(seed)
+    # Year, Age, Gender, City, Seniority, Position, Years_of_Experience, Company_Size, Company_Type
+    upper_bounds = [3, 50, 3, 30, 8, 40, 0, 6, 10]
+    features = np.column_stack(
+        [rng.integers(0, max(bound, 1), size=n_rows) for bound in upper_bounds]
+    ).astype(np.float32)
+    features[:, 0] += 2018
+    features[:, 1] += 18
+    features[:, 6] = (rng.random(n_rows) * (features[:, 1] - 18)).astype(np.float32)
+    return features
+
+
+def time_call(function, X: np.ndarray, repeats: int) -> float:
+    """Returns the median duration of the function call in milliseconds."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(X)
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations) * 1e3)
+
+
+def main(
+    hyperparameters_path: str, batch_sizes: List[int], repeats: int, **kwargs
+) -> List[Dict[str, float]]:
+    """
+    Trains a forest on synthetic data and compares the latency of sklearn and the packed forest. Logs the largest
+    batch size the packed forest is faster for, which `PACKED_MAX_ROWS` should not exceed.
+    Args:
+        hyperparameters_path (str): Path to the hyperparameters of the forest.
+        batch_sizes (List[int]): Number of rows to predict at once.
+        repeats (int): Number of timed predictions per batch size.
+        **kwargs: Additional keyword arguments:
+            - n_estimators (int): Overrides the number of trees of the hyperparameters.
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        Latencies in milliseconds per batch size.
+    """
+    hyperparameters = read_data(hyperparameters_path)
+    if kwargs.get("n_estimators"):
+        hyperparameters["n_estimators"] = kwargs["n_estimators"]
+    X_train = make_features(n_rows=3000, seed=0)
+    y_train = X_train @ np.linspace(500, 1500, X_train.shape[1])
+    estimator = RandomForestRegressor(random_state=0, **hyperparameters)
+    estimator.fit(X_train, y_train)
+    start = time.perf_counter()
+    packed_forest = PackedForest.from_estimator(estimator)
+    logger.info(
+        "Packed %d trees with %d nodes in %.1f s.",
+        packed_forest.n_trees,
+        len(packed_forest.value),
+        time.perf_counter() - start,
+    )
+    results = []
+    for batch_size in batch_sizes:
+        X = make_features(n_rows=batch_size, seed=1)
+        if not np.array_equal(estimator.predict(X), packed_forest.predict(X)):
+            raise AssertionError("Predictions of the packed forest differ.")
+        sklearn_ms = time_call(estimator.predict, X, repeats)
+        packed_ms = time_call(packed_forest.predict, X, repeats)
+        results.append(
+            {
+                "batch_size": batch_size,
+                "sklearn_ms": sklearn_ms,
+                "packed_ms": packed_ms,
+                "speedup": sklearn_ms / packed_ms,
+            }
+        )
+        logger.info(
+            "batch size %7d | sklearn %10.2f ms | packed %10.2f ms | speedup %6.2fx",
+            batch_size,
+            sklearn_ms,
+            packed_ms,
+            sklearn_ms / packed_ms,
+        )
+    logger.info(
+        "The packed forest is faster up to a batch size of %s.",
+        max(
+            (result["batch_size"] for result in results if result["speedup"] > 1),
+            default=None,
+        ),
+    )
+    if kwargs.get("output_path"):
+        write_data(data=results, filepath=kwargs["output_path"])
+    return results
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to benchmark the packed forest inference."
+    )
+    parser.add_argument(
+        "--hyperparameters-path",
+        "-p",
+        dest="hyperparameters_path",
+        default="artefacts/hyperparameters.json",
+        help="Path to the hyperparameters of the forest.",
+    )
+    parser.add_argument(
+        "--batch-sizes",
+        "-b",
+        dest="batch_sizes",
+        nargs="+",
+        type=int,
+        default=[1, 8, 32, 64, 128, 256],
+        help="Number of rows to predict at once.",
+    )
+    parser.add_argument(
+        "--repeats",
+        "-r",
+        dest="repeats",
+        type=int,
+        default=5,
+        help="Number of timed predictions per batch size.",
+    )
+    parser.add_argument(
+        "--n-estimators",
+        "-n",
+        dest="n_estimators",
+        type=int,
+        default=None,
+        help="Overrides the number of trees of the hyperparameters.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the results.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(
+        hyperparameters_path=args.hyperparameters_path,
+        batch_sizes=args.batch_sizes,
+        repeats=args.repeats,
+        n_estimators=args.n_estimators,
+        output_path=args.output_path,
+    )
@@ -0,0 +1,225 @@
+""" Benchmark of the memory used by the worker processes of the pre-fork server """
+from typing import Dict, List
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from utils import log
+from utils.data_io import write_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+SERVER_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "api", "server.py")
+REQUEST = [
+    {
+        "Timestamp": "2020-01-01T00:00:00",
+        "Age": 30,
+        "Gender": "male",
+        "City": "Berlin",
+        "Seniority": "Senior",
+        "Position": "Developer",
+        "Years_of_Experience": 8.0,
+        "Company_Size": "101-1000",
+        "Company_Type": "Product",
+    }
+]
+
+
+def free_port() -> int:
+    """Returns a port no socket is bound to."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_memory_kb(pid: int) -> Dict[str, int]:
+    """Reads the resident, proportional and private memory of a process in kB from procfs."""
+    with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as file:
+        values = {
+            line.split(":")[0]: int(line.split()[1])
+            for line in file
+            if line.rstrip().endswith("kB")
+        }
+    return {
+        "rss_kb": values["Rss"],
+        "pss_kb": values["Pss"],
+        "private_kb": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def read_children(pid: int) -> List[int]:
+    """Returns the child processes of a process."""
+    with open(f"/proc/{pid}/task/{pid}/children", encoding="utf-8") as file:
+        return [int(child) for child in file.read().split()]
+
+
+def wait_until_stable(pids: List[int], interval: float = 1) -> None:
+    """Waits until the resident memory of the processes stops growing, e.g. while importing the app."""
+    previous = None
+    current = [read_memory_kb(pid)["rss_kb"] for pid in pids]
+    while current != previous:
+        time.sleep(interval)
+        previous, current = current, [read_memory_kb(pid)["rss_kb"] for pid in pids]
+
+
+def send_requests(port: int, n_requests: int) -> None:
+    """Sends prediction requests, each on a new connection."""
+    data = json.dumps(REQUEST).encode()
+    for _ in range(n_requests):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/get_salary",
+            data=data,
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+
+
+def measure(workers: int, preload: bool, n_requests: int, timeout: float) -> Dict:
+    """
+    Starts the server, sends requests and measures the memory of its processes.
+    Args:
+        workers (int): Number of worker processes.
+        preload (bool): Whether the app is imported once in the parent process.
+        n_requests (int): Number of prediction requests to send before measuring.
+        timeout (float): Time in seconds to wait for the workers to start.
+
+    Returns:
+        Memory of the parent and the workers in kB.
+    """
+    port = free_port()
+    command = [
+        sys.executable,
+        SERVER_PATH,
+        f"--port={port}",
+        f"--workers={workers}",
+        "--log-level=warning",
+    ]
+    command.append("--preload-hook=api.main:STARTUP.run" if preload else "--no-preload")
+    with subprocess.Popen(command) as process:
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    send_requests(port, n_requests=1)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.5)
+            while len(read_children(process.pid)) < workers:
+                time.sleep(0.5)
+            wait_until_stable(read_children(process.pid))
+            send_requests(port, n_requests=n_requests)
+            worker_memory = [read_memory_kb(pid) for pid in read_children(process.pid)]
+            result = {
+                "workers": workers,
+                "preload": preload,
+                "parent_rss_kb": read_memory_kb(process.pid)["rss_kb"],
+            }
+            for key in ("rss_kb", "pss_kb", "private_kb"):
+                result[f"worker_{key}"] = int(
+                    sum(memory[key] for memory in worker_memory) / workers
+                )
+            result["total_pss_kb"] = read_memory_kb(process.pid)["pss_kb"] + sum(
+                memory["pss_kb"] for memory in worker_memory
+            )
+        finally:
+            process.send_signal(signal.SIGTERM)
+    return result
+
+
+def main(worker_counts: List[int], n_requests: int, **kwargs) -> List[Dict]:
+    """
+    Measures the memory of the API served by the pre-fork server with and without preloading the app.
+    The model and labels are configured with the environment variables `MODEL_PATH` and `LABELS_PATH`.
+    Args:
+        worker_counts (List[int]): Numbers of worker processes to measure.
+        n_requests (int): Number of prediction requests to send before measuring.
+        **kwargs: Additional keyword arguments:
+            - timeout (float): Time in seconds to wait for the workers to start. Defaults to 120.
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        Memory per worker and in total for each number of workers.
+    """
+    results = []
+    for workers in worker_counts:
+        for preload in (True, False):
+            result = measure(
+                workers=workers,
+                preload=preload,
+                n_requests=n_requests,
+                timeout=kwargs.get("timeout", 120),
+            )
+            results.append(result)
+            logger.info(
+                "workers %2d | preload %-5s | worker RSS %8.1f MB | worker PSS %8.1f MB | "
+                "worker private %8.1f MB | total PSS %8.1f MB",
+                workers,
+                preload,
+                result["worker_rss_kb"] / 1024,
+                result["worker_pss_kb"] / 1024,
+                result["worker_private_kb"] / 1024,
+                result["total_pss_kb"] / 1024,
+            )
+    if kwargs.get("output_path"):
+        write_data(data=results, filepath=kwargs["output_path"])
+    return results
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to benchmark the memory of the pre-fork server."
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        dest="worker_counts",
+        nargs="+",
+        type=int,
+        default=[1, 2, 4],
+        help="Numbers of worker processes to measure.",
+    )
+    parser.add_argument(
+        "--requests",
+        "-r",
+        dest="n_requests",
+        type=int,
+        default=100,
+        help="Number of prediction requests to send before measuring.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the results.",
+    )
+    parser.add_argument(
+        "--timeout",
+        "-t",
+        dest="timeout",
+        type=float,
+        default=120,
+        help="Time in seconds to wait for the workers to start.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(
+        worker_counts=args.worker_counts,
+        n_requests=args.n_requests,
+        timeout=args.timeout,
+        output_path=args.output_path,
+    )
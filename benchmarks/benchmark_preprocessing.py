@@ -0,0 +1,390 @@
+""" Benchmark of the duration and peak memory of the preprocessing steps across data sizes """
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import functools
+import logging
+import math
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.clean_features import KaggleFeatureCleaner
+from preprocessing.clean_targets import KaggleTargetCleaner
+from preprocessing.label_encoder import LabelEncoder
+from preprocessing.transform_features import KaggleFeatureTransformer
+from preprocessing.transform_targets import KaggleTargetTransformer
+from utils import log
+from utils.data_io import write_data
+from utils.data_models import (
+    CleanedFeaturesSchema,
+    CleanedTargetsSchema,
+    ExecutionMode,
+    RawInputSchema,
+    TransformedFeaturesSchema,
+    TransformedTargetsSchema,
+    ValidationMode,
+)
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+# Sizes below are dominated by the constant overhead of the steps, so their scaling is not reported
+MIN_SCALING_ROWS = 10000
+# Growth of the duration beyond linear, which is tolerated as noise
+SCALING_TOLERANCE = 0.15
+
+ANSWERS = {
+    "Gender": ["Male", "Female", "M", "F", "Diverse"],
+    "City": ["Berlin", "München", "Munich", "Hamburg", "Köln", "Frankfurt", "Kyiv"],
+    "Seniority": ["Senior", "Middle", "Junior", "Lead", "Head", "Principal", None],
+    "Position": [
+        "Senior Backend Developer",
+        "Backend Developer",
+        "Lead QA Engineer",
+        "Data Scientist",
+        "Head of Data",
+        "Middle Frontend Developer",
+        "Junior ML Engineer",
+        "Devops",
+        "CTO",
+        None,
+    ],
+    "Years_of_Experience": ["1", "2", "3", "5", "10", "1,5", "2,5", "0,5", "15"],
+    "Company_Size": ["up to 10", "10-50", "50-100", "100-1000", "1000+", None],
+    "Company_Type": ["Product", "Startup", "Consulting / Agency", "Bank", None],
+}
+
+
+def synthetic_raw_data(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Draws raw survey answers with the columns of ``utils.data_models.RawInputSchema``.
+    Args:
+        n_rows (int): Number of rows.
+        seed (int): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        The raw data.
+    """
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(
+        {
+            "Timestamp": pd.Timestamp("2018-01-01")
+            + pd.to_timedelta(rng.integers(0, 3 * 365, n_rows), unit="D"),
+            "Age": rng.integers(20, 65, n_rows).astype(float),
+        }
+    )
+    for column, answers in ANSWERS.items():
+        data[column] = rng.choice(np.array(answers, dtype=object), n_rows)
+    data["Salary_Yearly"] = np.round(rng.lognormal(11, 0.4, n_rows), -2)
+    return data
+
+
+def prepare_stages(raw: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Runs the preprocessing once to get the input of each step. The features are cleaned in mode `INFERENCE`, which
+    keeps all rows, so every step gets the same number of rows.
+    Args:
+        raw (pd.DataFrame): Raw data.
+
+    Returns:
+        Dictionary with the data before and after each stage and the labels of the cleaned data.
+    """
+    validated = RawInputSchema.validate_data(raw, ValidationMode.COMPILED)
+    unified_input = validated.copy()
+    unified_input[
+        "Years_of_Experience"
+    ] = KaggleFeatureCleaner.clean_years_of_experience_column(
+        validated["Years_of_Experience"], validated["Age"]
+    )
+    unified_input["Position"] = KaggleFeatureCleaner.clean_position_column(
+        validated["Position"], validated["Seniority"]
+    )
+    unified_input["Year"] = KaggleFeatureCleaner.timestamp_to_year(
+        validated["Timestamp"]
+    )
+    unified = KaggleFeatureCleaner.unify_row_values(unified_input)
+    cleaned = CleanedFeaturesSchema.validate_data(unified, ValidationMode.COMPILED)
+    trained = KaggleFeatureTransformer(
+        cleaned, ExecutionMode.TRAIN, validation_mode=ValidationMode.COMPILED
+    )
+    encoded = trained.encode_categorical_features()
+    cleaned_targets = CleanedTargetsSchema.validate_data(
+        validated.dropna(subset=["Salary_Yearly"]), ValidationMode.COMPILED
+    )
+    return {
+        "raw": raw,
+        "validated": validated,
+        "unified_input": unified_input,
+        "unified": unified,
+        "cleaned": cleaned,
+        "labels": trained.labels,
+        "encoded": encoded[list(TransformedFeaturesSchema.get_column_names())],
+        "cleaned_targets": cleaned_targets,
+    }
+
+
+def _steps(
+    stages: Dict[str, Any], validation_modes: List[ValidationMode]
+) -> Dict[str, Callable[[], Any]]:
+    """Returns the function of each step, the validations and processors once per validation mode"""
+    category_columns = list(CleanedFeaturesSchema.get_category_columns())
+    inference = KaggleFeatureTransformer(
+        stages["cleaned"],
+        ExecutionMode.INFERENCE,
+        label_encoder=LabelEncoder(stages["labels"]),
+        validation_mode=ValidationMode.COMPILED,
+    )
+    steps = {
+        "clean_years_of_experience_column": lambda: KaggleFeatureCleaner.clean_years_of_experience_column(
+            stages["validated"]["Years_of_Experience"], stages["validated"]["Age"]
+        ),
+        "clean_position_column": lambda: KaggleFeatureCleaner.clean_position_column(
+            stages["validated"]["Position"], stages["validated"]["Seniority"]
+        ),
+        "timestamp_to_year": lambda: KaggleFeatureCleaner.timestamp_to_year(
+            stages["validated"]["Timestamp"]
+        ),
+        "unify_row_values": lambda: KaggleFeatureCleaner.unify_row_values(
+            stages["unified_input"]
+        ),
+        "remove_null_and_duplicate_records": lambda: KaggleFeatureCleaner.remove_null_and_duplicate_records(
+            stages["unified"]
+        ),
+        "reduce_cardinality": lambda: KaggleFeatureCleaner.reduce_cardinality(
+            stages["unified"][category_columns]
+        ),
+        "encode_categorical_features": lambda: inference.encode_categorical_features(
+            labels=inference.label_encoder
+        ),
+        "remove_outliers": lambda: KaggleTargetCleaner.remove_outliers(
+            stages["cleaned_targets"]
+        ),
+    }
+    for mode in validation_modes:
+        validations = (
+            (RawInputSchema, "raw"),
+            (CleanedFeaturesSchema, "unified"),
+            (TransformedFeaturesSchema, "encoded"),
+            (CleanedTargetsSchema, "validated"),
+            (TransformedTargetsSchema, "cleaned_targets"),
+        )
+        for schema, stage in validations:
+            steps[f"validate_{schema.__name__}[{mode.value}]"] = functools.partial(
+                schema.validate_data, stages[stage], mode
+            )
+        processors = {
+            "KaggleFeatureCleaner": lambda mode=mode: KaggleFeatureCleaner(
+                stages["raw"], ExecutionMode.TRAIN, validation_mode=mode
+            ).execute(),
+            "KaggleTargetCleaner": lambda mode=mode: KaggleTargetCleaner(
+                stages["raw"], validation_mode=mode
+            ).execute(),
+            "KaggleFeatureTransformer": lambda mode=mode: KaggleFeatureTransformer(
+                stages["cleaned"],
+                ExecutionMode.INFERENCE,
+                label_encoder=inference.label_encoder,
+                validation_mode=mode,
+            ).execute(),
+            "KaggleTargetTransformer": lambda mode=mode: KaggleTargetTransformer(
+                stages["cleaned_targets"], validation_mode=mode
+            ).execute(),
+        }
+        for name, function in processors.items():
+            steps[f"{name}.execute[{mode.value}]"] = function
+    return steps
+
+
+def _fastest(function: Callable[[], Any], repeats: int, budget_s: float) -> float:
+    """Returns the fastest duration of calling the function in seconds, repeating it only within the budget"""
+    durations: List[float] = []
+    while len(durations) < repeats and sum(durations) < budget_s:
+        started_at = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started_at)
+    return min(durations)
+
+
+def _peak_bytes(function: Callable[[], Any]) -> int:
+    """Returns the peak of the memory allocated while calling the function in bytes"""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def scaling(durations: Dict[int, Optional[float]]) -> Optional[float]:
+    """
+    Estimates the exponent k of a duration growing like n^k with the number of rows n from the two largest sizes of
+    at least `MIN_SCALING_ROWS` rows. Linear steps have an exponent of about 1.
+    Args:
+        durations (Dict[int, Optional[float]]): Seconds per number of rows. None for skipped sizes.
+
+    Returns:
+        The exponent, or None if fewer than two sizes were measured.
+    """
+    measured = sorted(
+        (n_rows, seconds)
+        for n_rows, seconds in durations.items()
+        if seconds is not None and n_rows >= MIN_SCALING_ROWS
+    )
+    if len(measured) < 2:
+        return None
+    (rows_before, before), (rows_after, after) = measured[-2:]
+    return math.log(after / before) / math.log(rows_after / rows_before)
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    """Formats a duration with a readable unit"""
+    if seconds is None:
+        return "skipped"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def log_table(results: Dict[str, Dict[str, Any]], rows: List[int]) -> None:
+    """Logs the duration of each step per number of rows, its scaling exponent and its peak memory"""
+    name_width = max(len(step) for step in results)
+    logger.info(
+        "%s | %s | exponent | peak MiB",
+        "step".ljust(name_width),
+        " | ".join(f"{n_rows:>10}" for n_rows in rows),
+    )
+    for step, result in results.items():
+        peaks = [peak for peak in result["peak_bytes"].values() if peak is not None]
+        exponent = result["exponent"]
+        logger.info(
+            "%s | %s | %8s | %8s%s",
+            step.ljust(name_width),
+            " | ".join(
+                f"{_format_seconds(result['seconds'][n_rows]):>10}" for n_rows in rows
+            ),
+            "-" if exponent is None else f"{exponent:.2f}",
+            f"{peaks[-1] / 2**20:.1f}" if peaks else "-",
+            " | SUPER-LINEAR" if result["super_linear"] else "",
+        )
+
+
+def main(rows: List[int], repeats: int, **kwargs) -> Dict[str, Dict[str, Any]]:
+    """
+    Measures the duration and peak memory of each public preprocessing step, schema validation and processor on
+    synthetic survey data of each size and estimates how the duration scales with the number of rows.
+    Args:
+        rows (List[int]): Numbers of rows of the synthetic data.
+        repeats (int): Number of timed repeats. The fastest repeat is reported.
+        **kwargs: Additional keyword arguments:
+            - validation_modes (List[``utils.data_models.ValidationMode``]): Modes to validate with. Defaults to
+              both.
+            - max_step_s (float): Duration in seconds after which a step is skipped for larger sizes. Defaults to
+              120.
+            - memory (bool): Whether to measure the peak memory in an additional untimed call. Defaults to True.
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        Dictionary of type {'step': {'seconds': {n_rows: ...}, 'peak_bytes': {n_rows: ...}, 'exponent': ...,
+        'super_linear': ...}, ...}.
+    """
+    rows = sorted(rows)
+    validation_modes = kwargs.get("validation_modes") or list(ValidationMode)
+    max_step_s = kwargs.get("max_step_s", 120)
+    results: Dict[str, Dict[str, Any]] = {}
+    for n_rows in rows:
+        steps = _steps(prepare_stages(synthetic_raw_data(n_rows)), validation_modes)
+        for step, function in steps.items():
+            result = results.setdefault(step, {"seconds": {}, "peak_bytes": {}})
+            measured = [seconds for seconds in result["seconds"].values() if seconds]
+            if measured and measured[-1] > max_step_s:
+                result["seconds"][n_rows] = result["peak_bytes"][n_rows] = None
+                continue
+            result["seconds"][n_rows] = _fastest(function, repeats, budget_s=1)
+            result["peak_bytes"][n_rows] = (
+                _peak_bytes(function) if kwargs.get("memory", True) else None
+            )
+            logger.debug(
+                "%9d rows | %s | %s",
+                n_rows,
+                step,
+                _format_seconds(result["seconds"][n_rows]),
+            )
+        logger.info("Measured %d steps with %d rows.", len(steps), n_rows)
+    for result in results.values():
+        result["exponent"] = scaling(result["seconds"])
+        result["super_linear"] = (
+            result["exponent"] is not None
+            and result["exponent"] > 1 + SCALING_TOLERANCE
+        )
+    log_table(results, rows)
+    if kwargs.get("output_path"):
+        write_data(data=results, filepath=kwargs["output_path"])
+    return results
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to benchmark the preprocessing steps across data sizes."
+    )
+    parser.add_argument(
+        "--rows",
+        "-n",
+        dest="rows",
+        type=int,
+        nargs="+",
+        default=[1, 100, 10000, 1000000, 10000000],
+        help="Numbers of rows of the synthetic survey data.",
+    )
+    parser.add_argument(
+        "--repeats",
+        "-r",
+        dest="repeats",
+        type=int,
+        default=3,
+        help="Number of timed repeats per step, as long as the repeats take less than a second.",
+    )
+    parser.add_argument(
+        "--validation-modes",
+        dest="validation_modes",
+        type=ValidationMode,
+        nargs="+",
+        default=list(ValidationMode),
+        help="Modes to validate the schemas with.",
+    )
+    parser.add_argument(
+        "--max-step-s",
+        dest="max_step_s",
+        type=float,
+        default=120,
+        help="Duration in seconds after which a step is skipped for larger sizes.",
+    )
+    parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="Skip measuring the peak memory, which calls each step once more.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the durations, peak memory and scaling.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(
+        rows=args.rows,
+        repeats=args.repeats,
+        validation_modes=args.validation_modes,
+        max_step_s=args.max_step_s,
+        memory=args.memory,
+        output_path=args.output_path,
+    )
@@ -0,0 +1,163 @@
+""" Benchmark of looking up schema metadata from the registry against deriving it from the pandera schema """
+from typing import Dict, List
+from unittest.mock import patch
+import argparse
+import functools
+import logging
+import os
+import timeit
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from pandera.dtypes import Category
+
+from preprocessing.clean_features import KaggleFeatureCleaner
+from preprocessing.label_encoder import LabelEncoder
+from preprocessing.transform_features import KaggleFeatureTransformer
+from utils import log
+from utils.data_io import write_data
+from utils.data_models import (
+    BaseSchema,
+    CleanedFeaturesSchema,
+    ExecutionMode,
+    TransformedFeaturesSchema,
+)
+from utils.request_models import RequestInputInference
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+GETTERS = ("get_column_names", "get_category_columns", "get_non_nullable_columns")
+
+REQUEST = RequestInputInference(
+    Timestamp="2020-01-01T00:00:00",
+    Age=30,
+    Gender="Male",
+    City="Berlin",
+    Seniority="Middle",
+    Position="Backend Developer",
+    Years_of_Experience=5,
+    Company_Size="100-1000",
+    Company_Type="Product",
+)
+
+
+def derive_from_schema(schema: BaseSchema, getter: str) -> List[str]:
+    """Derives the metadata from the pandera schema on every call, like the getters did before the registry"""
+    pandera_schema = schema.to_schema()
+    if getter == "get_column_names":
+        return list(pandera_schema.columns.keys())
+    if getter == "get_category_columns":
+        return [
+            name
+            for name, dtype in pandera_schema.dtypes.items()
+            if isinstance(dtype, Category)
+        ]
+    return [
+        name
+        for name, column in pandera_schema.columns.items()
+        if column.nullable is False
+    ]
+
+
+def _counting(getter: str, counts: Dict[str, int]) -> classmethod:
+    """Returns the getter counting its calls"""
+    function = getattr(BaseSchema, getter).__func__
+
+    def counted(cls):
+        counts[getter] += 1
+        return function(cls)
+
+    return classmethod(counted)
+
+
+def count_request_calls() -> Dict[str, int]:
+    """Counts the getter calls preprocessing a single request makes"""
+    data = pd.DataFrame(jsonable_encoder([REQUEST]))
+    label_encoder = LabelEncoder(
+        {column: [] for column in CleanedFeaturesSchema.get_category_columns()}
+    )
+    counts = dict.fromkeys(GETTERS, 0)
+    with patch.multiple(
+        BaseSchema, **{getter: _counting(getter, counts) for getter in GETTERS}
+    ):
+        cleaned = KaggleFeatureCleaner(
+            data=data, mode=ExecutionMode.INFERENCE
+        ).execute()
+        KaggleFeatureTransformer(
+            data=cleaned, mode=ExecutionMode.INFERENCE, label_encoder=label_encoder
+        ).execute()
+    return counts
+
+
+def main(number: int, repeats: int, **kwargs) -> Dict[str, float]:
+    """
+    Measures the time of the schema metadata getters with the registry and when deriving the metadata from the
+    pandera schema, and the time saved per preprocessed request.
+    Args:
+        number (int): Number of calls per timed repeat.
+        repeats (int): Number of timed repeats. The fastest repeat is reported.
+        **kwargs: Additional keyword arguments:
+            - output_path (str): Path with file ending to store the results.
+
+    Returns:
+        Nanoseconds per call of each getter and method and nanoseconds saved per request.
+    """
+    results = {}
+    for getter in GETTERS:
+        for schema in (CleanedFeaturesSchema, TransformedFeaturesSchema):
+            for method, statement in (
+                ("derived", functools.partial(derive_from_schema, schema, getter)),
+                ("registry", getattr(schema, getter)),
+            ):
+                durations = timeit.repeat(statement, number=number, repeat=repeats)
+                name = f"{schema.__name__}.{getter}.{method}"
+                results[name] = min(durations) / number * 1e9
+                logger.info("%-60s | %8.1f ns", name, results[name])
+    saved = 0.0
+    for getter, calls in count_request_calls().items():
+        saved += calls * (
+            results[f"CleanedFeaturesSchema.{getter}.derived"]
+            - results[f"CleanedFeaturesSchema.{getter}.registry"]
+        )
+        logger.info("%-60s | %8d calls", f"{getter} per request", calls)
+    results["saved_per_request"] = saved
+    logger.info("%-60s | %8.1f ns", "saved per request", saved)
+    if kwargs.get("output_path"):
+        write_data(data=results, filepath=kwargs["output_path"])
+    return results
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to benchmark the schema metadata registry."
+    )
+    parser.add_argument(
+        "--number",
+        "-n",
+        dest="number",
+        type=int,
+        default=100000,
+        help="Number of calls per timed repeat.",
+    )
+    parser.add_argument(
+        "--repeats",
+        "-r",
+        dest="repeats",
+        type=int,
+        default=5,
+        help="Number of timed repeats, of which the fastest is reported.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        default=None,
+        help="Path with file ending to store the timings and savings.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(number=args.number, repeats=args.repeats, output_path=args.output_path)
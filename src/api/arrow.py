@@ -0,0 +1,186 @@
+""" Apache Arrow IPC stream bodies for the columnar requests and responses of the services """
+import os
+import logging
+from typing import Any, Callable, Coroutine, Dict, Iterator, List, Mapping
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import DictError, ListError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from api.columnar import ColumnarResponse
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+JSON_MEDIA_TYPE = "application/json"
+
+# pyarrow is imported on the first Arrow body, so importing the API does not wait for it
+# pylint: disable=import-outside-toplevel
+
+
+def write_columns(columns: Mapping[str, Any]) -> bytes:
+    """
+    Writes columns as a single record batch of an Arrow IPC stream. Numeric arrays are not copied into the batch.
+    Args:
+        columns (Mapping[str, Any]): Arrays, series or lists per column, e.g. a ``pd.DataFrame``.
+
+    Returns:
+        The Arrow IPC stream.
+    """
+    import pyarrow as pa
+
+    batch = pa.RecordBatch.from_arrays(
+        [pa.array(values) for _, values in columns.items()],
+        names=[str(column) for column in columns.keys()],
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def read_columns(body: bytes) -> Dict[str, Any]:
+    """
+    Reads the columns of an Arrow IPC stream. Numeric columns without nulls in a single batch are numpy views of
+    the body, so integer codes and floats are used without decoding or copying them.
+    Args:
+        body (bytes): The Arrow IPC stream.
+
+    Returns:
+        Dictionary of type {'column': np.ndarray, ...}. Nulls are None or NaN.
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    return {
+        name: (
+            table.column(name).chunk(0).to_numpy(zero_copy_only=False)
+            if table.column(name).num_chunks == 1
+            else table.column(name).to_numpy()
+        )
+        for name in table.column_names
+    }
+
+
+class ArrowResponse(Response):
+    """Arrow IPC stream response of columns, e.g. {'column': np.ndarray, ...} or a ``pd.DataFrame``"""
+
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+    def render(self, content: Mapping[str, Any]) -> bytes:
+        return write_columns(content)
+
+
+class ArrowRequest(Request):
+    """
+    Request with an Arrow IPC stream body. FastAPI only parses bodies with JSON content type, so the request
+    announces JSON and returns the columns of the stream from `json`, which are validated like a columnar JSON body.
+    """
+
+    def __init__(self, scope, receive):
+        headers = [
+            (name, value) for name, value in scope["headers"] if name != b"content-type"
+        ]
+        headers.append((b"content-type", JSON_MEDIA_TYPE.encode()))
+        super().__init__(dict(scope, headers=headers), receive)
+        self._columns = None
+
+    async def json(self) -> Dict[str, Any]:
+        if self._columns is None:
+            self._columns = read_columns(await self.body())
+        return self._columns
+
+
+class ArrowRoute(APIRoute):
+    """
+    Route parsing Arrow IPC stream bodies besides JSON bodies. Validation errors of bodies which are either a list
+    of rows or columns only report the errors of the format the body has.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            if (
+                _media_type(request.headers.get("content-type"))
+                == ARROW_STREAM_MEDIA_TYPE
+            ):
+                request = ArrowRequest(request.scope, request.receive)
+            try:
+                return await handler(request)
+            except RequestValidationError as error:
+                raise RequestValidationError(
+                    _errors_of_body_format(error), body=error.body
+                ) from None
+
+        return route_handler
+
+
+def _errors_of_body_format(error: RequestValidationError) -> List[Any]:
+    """
+    Drops the error that the body is no list when it is an object of columns, or no object when it is a list of
+    rows. Both are raised by the branch of the format the body doesn't have.
+    """
+    errors = list(_flatten(error.raw_errors))
+    mismatch = {dict: ListError, list: DictError}.get(type(error.body), ())
+    kept = [
+        wrapper
+        for wrapper in errors
+        if not (wrapper.loc_tuple() == ("body",) and isinstance(wrapper.exc, mismatch))
+    ]
+    return kept or errors
+
+
+def _flatten(errors: Any) -> Iterator[ErrorWrapper]:
+    """Iterates over the error wrappers of nested lists"""
+    for error in errors:
+        if isinstance(error, ErrorWrapper):
+            yield error
+        else:
+            yield from _flatten(error)
+
+
+def accepts_arrow(request: Request) -> bool:
+    """
+    Negotiates the format of a columnar response. Arrow is used if the `Accept` header prefers it over JSON, or if
+    the request body was Arrow and the header does not ask for JSON.
+    Args:
+        request (``starlette.requests.Request``): The http request.
+
+    Returns:
+        Whether to respond with an Arrow IPC stream.
+    """
+    accepted = [
+        _media_type(media_range)
+        for media_range in request.headers.get("accept", "").split(",")
+    ]
+    if ARROW_STREAM_MEDIA_TYPE in accepted:
+        return (
+            JSON_MEDIA_TYPE not in accepted[: accepted.index(ARROW_STREAM_MEDIA_TYPE)]
+        )
+    return isinstance(request, ArrowRequest) and JSON_MEDIA_TYPE not in accepted
+
+
+def columnar_response(columns: Mapping[str, Any], request: Request = None) -> Response:
+    """
+    Creates the response of columns in the format the request negotiated.
+    Args:
+        columns (Mapping[str, Any]): Arrays, series or lists per column, e.g. a ``pd.DataFrame``.
+        request (``starlette.requests.Request``, optional): The http request. Defaults to None, which responds
+            with JSON.
+
+    Returns:
+        Arrow IPC stream or JSON response.
+    """
+    if request is not None and accepts_arrow(request):
+        return ArrowResponse(columns)
+    return ColumnarResponse(columns)
+
+
+def _media_type(header_value: str) -> str:
+    """Returns the media type of a header value without parameters"""
+    return (header_value or "").split(";")[0].strip().lower()
@@ -0,0 +1,277 @@
+""" Micro-batching of concurrent prediction requests """
+import os
+import time
+import asyncio
+import functools
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Set
+
+import numpy as np
+
+from api.metrics import BATCH_QUEUE_WAIT, BATCH_SIZE
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+
+class BatchingStatistics:
+    """
+    Keeps the sizes and queue waits of the most recent batches.
+    Args:
+        window (int, optional): Number of recent batches and requests to keep. Defaults to 10000.
+    """
+
+    def __init__(self, window: int = 10000):
+        self.batches = 0
+        self.rows = 0
+        self.batch_sizes: Deque[int] = deque(maxlen=window)
+        self.queue_waits_us: Deque[float] = deque(maxlen=window)
+
+    def record(self, batch_size: int, queue_waits_us: List[float]) -> None:
+        """
+        Records a predicted batch in the statistics and the exported metrics.
+        Args:
+            batch_size (int): Number of rows in the batch.
+            queue_waits_us (List[float]): Time in microseconds each request of the batch waited in the queue.
+
+        Returns:
+            None.
+        """
+        self.batches += 1
+        self.rows += batch_size
+        self.batch_sizes.append(batch_size)
+        self.queue_waits_us.extend(queue_waits_us)
+        BATCH_SIZE.observe(batch_size)
+        for queue_wait_us in queue_waits_us:
+            BATCH_QUEUE_WAIT.observe(queue_wait_us / 1e6)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns count, mean, max and percentiles of the recent batch sizes and queue waits"""
+        return {
+            "total": {"batches": self.batches, "rows": self.rows},
+            "batch_size": self._describe(self.batch_sizes),
+            "queue_wait_us": self._describe(self.queue_waits_us),
+        }
+
+    @staticmethod
+    def _describe(values: Deque[float]) -> Dict[str, float]:
+        """Describes the distribution of the values"""
+        if not values:
+            return {"count": 0}
+        array = np.fromiter(values, dtype=np.float64, count=len(values))
+        p50, p95, p99 = np.percentile(array, [50, 95, 99])
+        return {
+            "count": len(array),
+            "mean": float(array.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(array.max()),
+        }
+
+
+class _PendingRequest(NamedTuple):
+    """Rows of a request waiting in the queue"""
+
+    features: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float
+    predict: Optional[Callable[[np.ndarray], np.ndarray]] = None
+
+
+class PredictionBatcher:
+    """
+    Collects the rows of concurrent requests, predicts them with a single call and scatters the predictions
+    back to the waiting requests. A batch is closed once it holds `max_rows` rows or its first request waited
+    `max_wait_us` microseconds. Up to `max_concurrent_batches` batches are predicted at the same time; while all
+    of them run new requests queue up, so batches grow with the load. Requests of at least `max_rows` rows skip
+    the queue and are predicted on their own as soon as a slot is free, so a large request doesn't hold up the
+    batches of the small ones.
+    Args:
+        predict (Callable[[np.ndarray], np.ndarray]): Function to calculate predictions for a feature matrix.
+        max_rows (int, optional): Maximum number of rows of a batch. Defaults to 256.
+        max_wait_us (int, optional): Maximum time in microseconds to wait for further requests. Defaults to 1000.
+        max_concurrent_batches (int, optional): Maximum number of batches predicted at the same time. Defaults to 4.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], np.ndarray],
+        max_rows: int = 256,
+        max_wait_us: int = 1000,
+        max_concurrent_batches: int = 4,
+    ):
+        self.predict_batch = predict
+        self.max_rows = max_rows
+        self.max_wait_us = max_wait_us
+        self.max_concurrent_batches = max_concurrent_batches
+        self.statistics = BatchingStatistics()
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._overflow: Optional[_PendingRequest] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def predict(
+        self,
+        features: np.ndarray,
+        predict: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ) -> np.ndarray:
+        """
+        Queues the rows and waits for their predictions.
+        Args:
+            features (np.ndarray): Feature matrix of a request.
+            predict (Callable[[np.ndarray], np.ndarray], optional): Function to predict the rows with instead of
+                the function of the batcher, e.g. of the model version the request started with. Rows are only
+                batched with rows of the same function. Defaults to None.
+
+        Returns:
+            Array with the predictions of the rows.
+        """
+        if len(features) == 0:
+            return np.empty(0)
+        loop = asyncio.get_running_loop()
+        if (
+            self._worker is None
+            or self._worker.get_loop() is not loop
+            or self._worker.done()
+        ):
+            self._start(loop)
+        if len(features) >= self.max_rows:
+            enqueued_at = time.perf_counter()
+            async with self._slots:
+                self.statistics.record(
+                    batch_size=len(features),
+                    queue_waits_us=[(time.perf_counter() - enqueued_at) * 1e6],
+                )
+                return await loop.run_in_executor(
+                    None, predict or self.predict_batch, features
+                )
+        future = loop.create_future()
+        self._queue.put_nowait(
+            _PendingRequest(features, future, time.perf_counter(), predict)
+        )
+        return await future
+
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Starts the worker on the running event loop, keeping the queued requests of a failed worker"""
+        if self._worker is None or self._worker.get_loop() is not loop:
+            self._fail_queued(RuntimeError("The event loop of the batcher changed."))
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._overflow = None
+        elif self._worker.done() and not self._worker.cancelled():
+            logger.error(
+                "Restarting the batching worker, which failed with: %r",
+                self._worker.exception(),
+            )
+        self._worker = loop.create_task(self._run())
+
+    def _fail_queued(self, error: Exception) -> None:
+        """Fails the queued requests of the previous event loop, unless it is closed"""
+        queued = [self._overflow] if self._overflow is not None else []
+        while self._queue is not None and not self._queue.empty():
+            queued.append(self._queue.get_nowait())
+        for pending in queued:
+            loop = pending.future.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_set_exception, pending.future, error)
+
+    async def _run(self) -> None:
+        """Forms batches and starts their predictions until cancelled"""
+        slots = self._slots
+        while True:
+            await slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                slots.release()
+                raise
+            task = asyncio.get_running_loop().create_task(self._predict_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(functools.partial(self._finish_batch, slots))
+
+    def _finish_batch(self, slots: asyncio.Semaphore, task: asyncio.Task) -> None:
+        """Frees the slot of a predicted batch"""
+        self._in_flight.discard(task)
+        slots.release()
+
+    async def _collect_batch(self) -> List[_PendingRequest]:
+        """
+        Waits for requests until the batch is full or the wait time of its first request is over. If the worker
+        is stopped meanwhile, the requests of the batch fail instead of waiting forever.
+        """
+        batch = [self._overflow or await self._queue.get()]
+        self._overflow = None
+        try:
+            await self._fill_batch(batch)
+        except BaseException:
+            for pending in batch:
+                _set_exception(
+                    pending.future, RuntimeError("The batching worker stopped.")
+                )
+            raise
+        return batch
+
+    async def _fill_batch(self, batch: List[_PendingRequest]) -> None:
+        """Adds queued requests to the batch until it is full or the wait time of its first request is over"""
+        rows = len(batch[0].features)
+        deadline = batch[0].enqueued_at + self.max_wait_us / 1e6
+        while rows < self.max_rows:
+            if self._queue.empty():
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                pending = self._queue.get_nowait()
+            if (
+                rows + len(pending.features) > self.max_rows
+                or pending.predict != batch[0].predict
+                or pending.features.shape[1:] != batch[0].features.shape[1:]
+            ):
+                self._overflow = pending
+                break
+            batch.append(pending)
+            rows += len(pending.features)
+
+    async def _predict_batch(self, batch: List[_PendingRequest]) -> None:
+        """Predicts a batch in the default executor and resolves the futures of its requests"""
+        started_at = time.perf_counter()
+        try:
+            features = np.concatenate([pending.features for pending in batch])
+            self.statistics.record(
+                batch_size=len(features),
+                queue_waits_us=[
+                    (started_at - pending.enqueued_at) * 1e6 for pending in batch
+                ],
+            )
+            predictions = await asyncio.get_running_loop().run_in_executor(
+                None, batch[0].predict or self.predict_batch, features
+            )
+            offsets = np.cumsum([len(pending.features) for pending in batch])[:-1]
+            results = np.split(predictions, offsets)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.exception(
+                "Prediction of a batch with %d requests failed.", len(batch)
+            )
+            for pending in batch:
+                _set_exception(pending.future, error)
+            return
+        for pending, result in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+        logger.debug(
+            "Predicted batch of %d requests with %d rows.", len(batch), len(features)
+        )
+
+
+def _set_exception(future: asyncio.Future, error: Exception) -> None:
+    """Fails the future, unless it is already done"""
+    if not future.done():
+        future.set_exception(error)
@@ -0,0 +1,224 @@
+""" Cache of the predictions of preprocessed feature vectors """
+import os
+import time
+import asyncio
+import functools
+import logging
+from collections import OrderedDict
+from typing import (
+    AbstractSet,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+
+from api.metrics import CACHE_ENTRIES, CACHE_EVICTIONS, CACHE_LOOKUPS
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+HITS = CACHE_LOOKUPS.labels(result="hit")
+MISSES = CACHE_LOOKUPS.labels(result="miss")
+COALESCED = CACHE_LOOKUPS.labels(result="coalesced")
+EVICTED = CACHE_EVICTIONS.labels(reason="capacity")
+EXPIRED = CACHE_EVICTIONS.labels(reason="expired")
+INVALIDATED = CACHE_EVICTIONS.labels(reason="invalidated")
+
+
+class PredictionCache:
+    """
+    Least recently used cache of the predictions of feature vectors with expiring entries.
+    The key of an entry is the model version together with the bytes of the float32 feature vector in the column
+    order of ``utils.data_models.TransformedFeaturesSchema``, so equal inputs share their entry independent of the
+    pipeline which preprocessed them. Several models share the cache, each with its own version, e.g. the model id
+    together with the version of its files. Rows of concurrent requests whose vector is already being predicted wait
+    for that prediction instead of predicting it again. The entries of a version are dropped once it is no longer
+    current, e.g. because another version was swapped in or the model was unloaded.
+    The cache is not thread-safe and has to be used from a single event loop.
+    Args:
+        predict (Callable[[np.ndarray], Awaitable[np.ndarray]]): Coroutine function to calculate the predictions
+            of a feature matrix.
+        versions (Callable[[], AbstractSet[Hashable]]): Function returning the current versions of all models.
+        max_entries (int, optional): Maximum number of entries. Defaults to 10000.
+        ttl_s (float, optional): Time in seconds an entry is valid. Defaults to 3600.
+        **kwargs: Additional keyword arguments:
+            - check_interval_s (float): Minimum time in seconds between two checks of the model versions.
+              Defaults to 1.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], Awaitable[np.ndarray]],
+        versions: Callable[[], AbstractSet[Hashable]],
+        max_entries: int = 10000,
+        ttl_s: float = 3600,
+        **kwargs,
+    ):
+        self.predict_features = predict
+        self.versions = versions
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.check_interval_s = kwargs.get("check_interval_s", 1.0)
+        self._entries: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._versions = frozenset(versions())
+        self._next_check = time.monotonic() + self.check_interval_s
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def predict(
+        self,
+        features: np.ndarray,
+        version: Hashable,
+        predict: Optional[Callable[[np.ndarray], Awaitable[np.ndarray]]] = None,
+    ) -> np.ndarray:
+        """
+        Looks up the predictions of the rows and predicts the rows which are neither cached nor being predicted.
+        Args:
+            features (np.ndarray): Feature matrix of a request.
+            version (Hashable): Model version the request started with. Requests of a version which is no longer
+                current are predicted without the cache.
+            predict (Callable[[np.ndarray], Awaitable[np.ndarray]], optional): Coroutine function to calculate the
+                predictions of the model version instead of the function of the cache. Defaults to None.
+
+        Returns:
+            Array with the predictions of the rows.
+        """
+        self._check_versions()
+        if version not in self._versions:
+            return await (predict or self.predict_features)(features)
+        predictions = np.empty(len(features))
+        missing, waiting = self._lookup(features, version, predictions)
+        if missing:
+            futures = self._start_prediction(
+                features, missing, predict or self.predict_features
+            )
+            waiting.update(
+                (key, (futures[key], indices)) for key, indices in missing.items()
+            )
+        for future, indices in waiting.values():
+            if not future.done():
+                # Shielded, so a cancelled request does not cancel the prediction other requests wait for
+                await asyncio.shield(future)
+            predictions[indices] = future.result()
+        return predictions
+
+    def _lookup(
+        self, features: np.ndarray, version: Hashable, predictions: np.ndarray
+    ) -> Tuple[
+        Dict[Hashable, List[int]], Dict[Hashable, Tuple[asyncio.Future, List[int]]]
+    ]:
+        """Fills in the cached predictions and returns the rows to predict and the rows being predicted per key"""
+        now = time.monotonic()
+        missing: Dict[Hashable, List[int]] = {}
+        waiting: Dict[Hashable, Tuple[asyncio.Future, List[int]]] = {}
+        hits = coalesced = 0
+        for index, row in enumerate(np.asarray(features, dtype=np.float32)):
+            key = (version, row.tobytes())
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                EXPIRED.inc()
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                predictions[index] = entry[0]
+                hits += 1
+            elif key in missing:
+                missing[key].append(index)
+                coalesced += 1
+            elif key in self._pending:
+                waiting.setdefault(key, (self._pending[key], []))[1].append(index)
+                coalesced += 1
+            else:
+                missing[key] = [index]
+        HITS.inc(hits)
+        COALESCED.inc(coalesced)
+        MISSES.inc(len(missing))
+        return missing, waiting
+
+    def clear(self) -> None:
+        """Drops all entries"""
+        INVALIDATED.inc(len(self._entries))
+        self._entries.clear()
+        CACHE_ENTRIES.set(0)
+
+    def _start_prediction(
+        self,
+        features: np.ndarray,
+        missing: Dict[Hashable, List[int]],
+        predict: Callable[[np.ndarray], Awaitable[np.ndarray]],
+    ) -> Dict[Hashable, asyncio.Future]:
+        """Starts predicting the first row of each missing key and returns the futures of the keys"""
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in missing}
+        self._pending.update(futures)
+        # The prediction runs in its own task, so it finishes even if the request starting it is cancelled
+        task = loop.create_task(
+            predict(features[[indices[0] for indices in missing.values()]])
+        )
+        task.add_done_callback(functools.partial(self._resolve, futures))
+        return futures
+
+    def _resolve(
+        self, futures: Dict[Hashable, asyncio.Future], task: asyncio.Task
+    ) -> None:
+        """Stores the predictions of the finished task and resolves the futures of its keys"""
+        for key, future in futures.items():
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        if task.cancelled():
+            for future in futures.values():
+                future.cancel()
+            return
+        error = task.exception()
+        if error is not None:
+            for future in futures.values():
+                future.set_exception(error)
+                # Marks the exception as retrieved, it is raised in the requests waiting for the future anyway
+                future.exception()
+            return
+        expires_at = time.monotonic() + self.ttl_s
+        for (key, future), value in zip(futures.items(), task.result()):
+            value = float(value)
+            future.set_result(value)
+            self._store(key, value, expires_at)
+        CACHE_ENTRIES.set(len(self._entries))
+
+    def _store(self, key: Tuple[Hashable, bytes], value: float, expires_at: float):
+        """Stores an entry of a current version and evicts the least recently used entries beyond the maximum"""
+        if key[0] not in self._versions:
+            return
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            EVICTED.inc()
+
+    def _check_versions(self) -> None:
+        """Drops the entries of the versions which are no longer current since the last check"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval_s
+        versions = frozenset(self.versions())
+        if versions == self._versions:
+            return
+        self._versions = versions
+        stale = [key for key in self._entries if key[0] not in versions]
+        if stale:
+            logger.info(
+                "Model versions changed, dropping %d cached predictions.", len(stale)
+            )
+        for key in stale:
+            del self._entries[key]
+        INVALIDATED.inc(len(stale))
+        CACHE_ENTRIES.set(len(self._entries))
@@ -0,0 +1,248 @@
+""" Zero-downtime reloading of the model and labels files while serving requests """
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, NamedTuple, Optional, Sequence, Tuple
+
+from api.metrics import MODEL_RELOADS
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+MODEL_VERSION_HEADER = "x-model-version"
+MODEL_ID_HEADER = "x-model-id"
+# Requests with the same routing key, e.g. a user id, are routed to the same model
+ROUTING_KEY_HEADER = "x-routing-key"
+
+RELOAD_SUCCESSES = MODEL_RELOADS.labels(result="success")
+RELOAD_FAILURES = MODEL_RELOADS.labels(result="failure")
+
+
+class Versioned(NamedTuple):
+    """Value together with its version, e.g. a loaded model or the predictions of a model"""
+
+    version: Optional[str]
+    value: Any
+
+
+def file_version(*paths: Optional[str]) -> Tuple:
+    """
+    Returns a version of files, which changes once one of them is modified or replaced.
+    Args:
+        *paths (str): Paths of the files. Paths which are None are skipped.
+
+    Returns:
+        Tuple with the path, modification time, size and inode of each file.
+    """
+    version = []
+    for path in paths:
+        if path is None:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            version.append((path, None, None, None))
+            continue
+        version.append((path, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(version)
+
+
+def content_version(*paths: Optional[str]) -> str:
+    """
+    Returns a version of the contents of files, which is the same on every host serving the same files.
+    Args:
+        *paths (str): Paths of the files. Paths which are None are skipped.
+
+    Returns:
+        The first 12 hex digits of the BLAKE2 hash of the contents.
+    """
+    digest = hashlib.blake2b(digest_size=6)
+    for path in paths:
+        if path is None:
+            continue
+        with open(path, "rb") as file:
+            for chunk in iter(functools.partial(file.read, 1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HotSwap:
+    """
+    Holds a value loaded from files, e.g. the model and its labels, and replaces it without downtime once the files
+    change. A watcher thread polls the files every `interval_s` seconds. Once they changed and stayed unchanged
+    for a whole interval, so files copied one after another are loaded as a pair, the new value is loaded and
+    warmed up in the watcher thread and then swapped atomically. Requests which took the current value before keep
+    using it until they finish. If loading fails, the old value is kept and the files are loaded again once they
+    change. After a fork the watcher is restarted in the child process.
+    Args:
+        load (Callable[[], Any]): Function loading the value from the files.
+        paths (Sequence[str]): Paths of the files the value is loaded from. Paths which are None are skipped.
+        warm_up (Callable[[Any], None], optional): Function warming up a new value before it is swapped in.
+            Defaults to None.
+        interval_s (float, optional): Time in seconds between two polls of the files. 0 disables the watcher.
+            Defaults to 0.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        load: Callable[[], Any],
+        paths: Sequence[Optional[str]],
+        warm_up: Optional[Callable[[Any], None]] = None,
+        interval_s: float = 0,
+    ):
+        self.load = load
+        self.paths = tuple(paths)
+        self.warm_up = warm_up
+        self.interval_s = interval_s
+        self._files = file_version(*self.paths)
+        value = load()
+        self._current = Versioned(content_version(*self.paths), value)
+        self._polled_files = self._files
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.register_at_fork(
+            after_in_child=functools.partial(
+                _call_weak_method, weakref.WeakMethod(self._restart_in_child)
+            )
+        )
+        self.start()
+
+    @property
+    def current(self) -> Versioned:
+        """The current version and value. Callers should keep it for the rest of their request"""
+        return self._current
+
+    def reload(self) -> bool:
+        """
+        Loads, warms up and swaps in the value of the files, unless they did not change since the last load.
+
+        Returns:
+            Whether a new value was swapped in.
+        """
+        with self._lock:
+            files = file_version(*self.paths)
+            if files == self._files:
+                return False
+            started_at = time.perf_counter()
+            try:
+                loaded = self._load()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Loading the changed files %s failed.", self.paths)
+                RELOAD_FAILURES.inc()
+                # The files are loaded again once they change
+                self._files = files
+                return False
+            if file_version(*self.paths) != files:
+                logger.info(
+                    "Files changed while loading them, loading them again later."
+                )
+                return False
+            self._current, self._files = loaded, files
+        RELOAD_SUCCESSES.inc()
+        logger.info(
+            "Swapped in version %s of %s after %.2f s.",
+            loaded.version,
+            self.paths,
+            time.perf_counter() - started_at,
+        )
+        return True
+
+    def poll(self) -> bool:
+        """
+        Reloads the files if they changed and stayed unchanged since the previous poll.
+
+        Returns:
+            Whether a new value was swapped in.
+        """
+        files = file_version(*self.paths)
+        previous, self._polled_files = self._polled_files, files
+        if files == self._files or files != previous:
+            return False
+        return self.reload()
+
+    def start(self) -> None:
+        """Starts the watcher thread, if enabled and not running"""
+        if self.interval_s <= 0 or (
+            self._thread is not None and self._thread.is_alive()
+        ):
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="hot-swap", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the watcher thread"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _load(self) -> Versioned:
+        """Loads and warms up the value of the files"""
+        value = self.load()
+        if self.warm_up is not None:
+            self.warm_up(value)
+        return Versioned(content_version(*self.paths), value)
+
+    def _restart_in_child(self) -> None:
+        """Restarts the watcher in a forked child process, in which only the forking thread runs"""
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.start()
+
+    def _watch(self) -> None:
+        """Polls the files until stopped"""
+        while not self._stopped.wait(self.interval_s):
+            try:
+                self.poll()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Watching the files %s failed.", self.paths)
+
+
+def _call_weak_method(method: weakref.WeakMethod) -> None:
+    """Calls the method, unless its object was garbage collected"""
+    function = method()
+    if function is not None:
+        function()
+
+
+class ModelVersionMiddleware:
+    """
+    Adds the headers `X-Model-Version` and `X-Model-Id` with the version and the id of the model a request was
+    answered with. Endpoints store them in `request.state.model_version` and `request.state.model_id` before their
+    response starts.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Created before the endpoint runs, so requests working on a copy of the scope share it
+        state = scope.setdefault("state", {})
+
+        async def send_with_version(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (header.encode(), str(state[key]).encode())
+                    for header, key in (
+                        (MODEL_VERSION_HEADER, "model_version"),
+                        (MODEL_ID_HEADER, "model_id"),
+                    )
+                    if state.get(key) is not None
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
@@ -1,17 +1,36 @@
 """ Service to orchestrate the microservices """
-from typing import List
+import os
+import time
+import datetime
+import functools
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
-from api.preprocessing_service import preprocess_data
-from api.prediction_service import predict
-from utils.data_models import RequestInputInference, RequestOutput
+from api.arrow import ArrowRoute, columnar_response
+from api.hot_swap import ModelVersionMiddleware, Versioned
+from api.metrics import CONTENT_TYPE, REGISTRY, ROWS, MetricsMiddleware, StageTimer
+from api.startup import Startup
+from api.streaming import RequestStreamingResponse, score_ndjson
+from api.threads import limit_request_threads
+from utils.request_models import (
+    ColumnarRequestInputInference,
+    ColumnarRequestOutput,
+    RequestInputInference,
+    RequestOutput,
+)
 
 
 app = FastAPI()
+# Columnar bodies are also accepted as Arrow IPC streams
+app.router.route_class = ArrowRoute
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
 
 # TODO: Change once frontend deployed
 origins = ["*"]
@@ -22,6 +41,140 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ModelVersionMiddleware)
+
+# Inference engine to use: 'dataframe' runs the preprocessing services, 'compiled' the DataFrame free pipeline
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "dataframe")
+# Orchestration mode: 'local' runs the services in-process, 'remote' calls them over HTTP as separate tiers
+ORCHESTRATION_MODE = os.getenv("ORCHESTRATION_MODE", "local")
+
+# Row predicted once after loading, so the first requests don't pay for lazy initializations
+WARM_UP_ROW = RequestInputInference(
+    Timestamp=datetime.datetime(2020, 1, 1),
+    Age=30,
+    Gender="Male",
+    City="Berlin",
+    Seniority="Middle",
+    Position="Backend Developer",
+    Years_of_Experience=5,
+    Company_Size="100-1000",
+    Company_Type="Product",
+)
+
+GET_SALARY_ROWS = ROWS.labels(path="/get_salary")
+STREAM_ROWS = ROWS.labels(path="/get_salary/stream")
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "1000"))
+
+
+class Services(NamedTuple):
+    """Modules and factory of the compiled pipeline loaded on startup, or the client of the remote services"""
+
+    preprocessing: Optional[ModuleType]
+    prediction: Optional[ModuleType]
+    feature_pipeline: Optional[Callable[..., object]]
+    remote: Optional[object] = None
+
+
+# Compiled pipelines of the labels of the recently used model versions, as each model and swap may bring other labels
+_COMPILED_PIPELINES: Dict[str, object] = {}
+_MAX_COMPILED_PIPELINES = 8
+
+
+def load_services() -> Services:
+    """
+    Imports the preprocessing and prediction services, which load the labels and the model, and the compiled
+    feature pipeline of the configured inference engine, which is compiled per model version. In remote orchestration
+    mode only the client of the remote services is created.
+
+    Returns:
+        The loaded services.
+    """
+    # Imported here, so importing the app does not wait for pandas, pandera, sklearn and the model
+    # pylint: disable=import-outside-toplevel
+    if ORCHESTRATION_MODE == "remote":
+        from api.remote import create_remote_services
+
+        return Services(
+            preprocessing=None,
+            prediction=None,
+            feature_pipeline=None,
+            remote=create_remote_services(),
+        )
+    from api import prediction_service, preprocessing_service
+    from preprocessing.compiled_features import CompiledFeaturePipeline
+
+    return Services(
+        preprocessing=preprocessing_service,
+        prediction=prediction_service,
+        feature_pipeline=(
+            CompiledFeaturePipeline if INFERENCE_ENGINE == "compiled" else None
+        ),
+    )
+
+
+def warm_up_services(services: Services) -> None:
+    """
+    Preprocesses a row with the configured inference engine and warms up the model. Remote services warm up
+    themselves.
+    Args:
+        services (Services): The loaded services.
+
+    Returns:
+        None.
+    """
+    if services.remote is not None:
+        return
+    bundle = services.prediction.BUNDLES.current
+    if services.feature_pipeline is not None:
+        _compiled_pipeline(services, bundle).transform(rows=[WARM_UP_ROW])
+    else:
+        services.preprocessing.preprocess_rows(
+            [WARM_UP_ROW], label_encoder=bundle.value.label_encoder
+        )
+    services.prediction.warm_up()
+
+
+def _compiled_pipeline(services: Services, bundle: Versioned) -> object:
+    """Returns the compiled feature pipeline of the labels of the model version, compiling it on first use"""
+    pipeline = _COMPILED_PIPELINES.pop(bundle.version, None)
+    if pipeline is None:
+        labels = (
+            bundle.value.label_encoder or services.preprocessing.LABELS.current.value
+        )
+        pipeline = services.feature_pipeline(labels=labels.labels)
+        while len(_COMPILED_PIPELINES) >= _MAX_COMPILED_PIPELINES:
+            _COMPILED_PIPELINES.pop(next(iter(_COMPILED_PIPELINES)))
+    # Inserted again as most recently used
+    _COMPILED_PIPELINES[bundle.version] = pipeline
+    return pipeline
+
+
+STARTUP = Startup(load=load_services, warm_up=warm_up_services)
+
+
+@app.on_event("startup")
+async def start_loading() -> None:
+    """Limits the request threads and starts loading and warming up the services in the background."""
+    limit_request_threads()
+    STARTUP.start()
+
+
+@app.on_event("shutdown")
+async def close_remote_services() -> None:
+    """Closes the pooled connections to the remote services."""
+    if STARTUP.ready:
+        services = await STARTUP.wait()
+        if services.remote is not None:
+            await services.remote.aclose()
+
+
+async def _services() -> Services:
+    """Waits until the services are loaded"""
+    try:
+        return await STARTUP.wait()
+    except RuntimeError as error:
+        raise HTTPException(status_code=503, detail=str(error)) from error
 
 
 @app.get("/ping")
@@ -30,22 +183,192 @@ def ping():
     return Response(content="successful", status_code=200)
 
 
-@app.post("/get_salary", response_model=List[RequestOutput])
-def preprocess_and_predict(
-    user_request: List[RequestInputInference],
-) -> List[RequestOutput]:
+@app.get("/ready")
+def ready():
+    """Returns status code 200 once the services are loaded and warmed up, otherwise 503 and the status."""
+    if STARTUP.ready:
+        return Response(content="ready", status_code=200)
+    content = STARTUP.status if STARTUP.error is None else STARTUP.error
+    return Response(content=content, status_code=503)
+
+
+@app.get("/batching")
+async def batching() -> Dict[str, Dict[str, float]]:
+    """Returns the batch size and queue wait statistics of the recent prediction batches."""
+    services = await _services()
+    if services.remote is not None:
+        return await services.remote.batching_statistics()
+    return services.prediction.batching_statistics()
+
+
+@app.get("/models")
+async def models() -> Dict[str, Dict[str, Any]]:
+    """Returns the version and estimated memory in bytes of the loaded models, the least recently used first."""
+    services = await _services()
+    if services.remote is not None:
+        return await services.remote.loaded_models()
+    return services.prediction.loaded_models()
+
+
+@app.get("/threads")
+async def threads() -> Dict[str, int]:
+    """Returns the thread budget of the predictions and the threads in use."""
+    services = await _services()
+    if services.remote is not None:
+        return await services.remote.thread_usage()
+    return services.prediction.thread_usage()
+
+
+@app.get("/metrics")
+def metrics():
+    """Returns the request, stage latency, batching and model load metrics in the Prometheus text format."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.post(
+    "/get_salary", response_model=Union[List[RequestOutput], ColumnarRequestOutput]
+)
+async def preprocess_and_predict(
+    user_request: Union[List[RequestInputInference], ColumnarRequestInputInference],
+    request: Request,
+) -> Union[List[RequestOutput], Response]:
+    """
+    Preprocessed the input and calculates predictions for the preprocessed data. Columnar inputs, as JSON or Arrow
+    IPC stream, get a columnar response in the format the `Accept` header negotiates. The header `X-Model-Version`
+    of the response reports the version of the model the predictions were calculated with.
+    Args:
+        user_request (List[``utils.request_models.RequestInputInference``] or
+            ``utils.request_models.ColumnarRequestInputInference``): Raw input to preprocess and calculate
+            predictions for as list of rows or as lists of values per column.
+        request (``fastapi.Request``): The http request.
+
+    Returns:
+        List of calculated predictions or the response with the list of predictions.
+    """
+    # The time since the request arrived is spent on reading and parsing the body
+    StageTimer(started_at=getattr(request.state, "started_at", None)).lap("parse")
+    GET_SALARY_ROWS.inc(len(user_request))
+    services = await _services()
+    bundle = await _route(services, request)
+    if isinstance(user_request, ColumnarRequestInputInference):
+        predictions = await _predict_columns(services, user_request, request, bundle)
+        response = columnar_response({"Salary_Yearly": predictions}, request)
+    else:
+        predictions = await _predict_rows(services, user_request, request, bundle)
+        response = [RequestOutput(Salary_Yearly=pred) for pred in predictions]
+    request.state.handled_at = time.perf_counter()
+    return response
+
+
+@app.post("/get_salary/stream", response_class=RequestStreamingResponse)
+async def preprocess_and_predict_stream(request: Request) -> RequestStreamingResponse:
     """
-    Preprocessed the input and calculates predictions for the preprocessed data.
+    Calculates predictions for a body of newline delimited JSON objects of type
+    ``utils.request_models.RequestInputInference``. The rows are read, preprocessed and predicted in chunks and the
+    predictions of each chunk are streamed back as newline delimited JSON, one line per non-empty input line.
+    Lines which are invalid or belong to a failed chunk get an object with the key `error` instead. All chunks are
+    predicted with the model version the stream started with, which the header `X-Model-Version` reports.
     Args:
-        user_request (``utils.data_models.RequestInputInference``): Raw input to preprocess and calculate
-            predictions for.
+        request (``fastapi.Request``): The http request with the streamed body.
 
     Returns:
-        List of calculated predictions.
+        Streamed predictions.
+    """
+    services = await _services()
+    bundle = await _route(services, request)
+
+    async def predict_rows(rows: List[RequestInputInference]) -> List[RequestOutput]:
+        predictions = await _predict_rows(services, rows, request, bundle)
+        return [RequestOutput(Salary_Yearly=pred) for pred in predictions]
+
+    return RequestStreamingResponse(
+        score_ndjson(
+            request,
+            predict_rows=predict_rows,
+            chunk_rows=STREAM_CHUNK_ROWS,
+            on_rows=STREAM_ROWS.inc,
+        )
+    )
+
+
+async def _route(services: Services, request: Request) -> Optional[Versioned]:
+    """
+    Chooses the model bundle of the request, which it keeps until it finishes, and reports its id and version in
+    the response headers. Returns None for remote services, which route the request themselves.
     """
-    preprocessed_data = preprocess_data(user_request=user_request)
-    predictions = predict(user_request=preprocessed_data)
-    return predictions
+    if services.remote is not None:
+        return None
+    model_id, bundle = await services.prediction.route_request(request.headers)
+    request.state.model_id = model_id
+    request.state.model_version = bundle.version
+    return bundle
+
+
+def _remote_values(request: Request, predictions) -> Iterable[float]:
+    """Reports the model the remote prediction service routed the request to and returns the predictions"""
+    request.state.model_id = predictions.model_id
+    request.state.model_version = predictions.model_version
+    return predictions.values
+
+
+async def _predict_rows(
+    services: Services,
+    rows: List[RequestInputInference],
+    request: Request,
+    bundle: Optional[Versioned],
+) -> Iterable[float]:
+    """Preprocesses the rows with the configured inference engine and predicts them with the model bundle"""
+    if services.remote is not None:
+        predictions = await services.remote.predict_rows(rows, headers=request.headers)
+        return _remote_values(request, predictions)
+    if services.feature_pipeline is not None:
+        pipeline = _compiled_pipeline(services, bundle)
+        timer = StageTimer()
+        try:
+            features = await run_in_threadpool(pipeline.transform, rows=rows)
+        except ValueError as error:
+            logger.warning("Falling back to the dataframe pipeline. Reason: %s", error)
+        else:
+            timer.lap("compiled_transform")
+            return await services.prediction.predict_features(
+                features, bundle, request.state.model_id
+            )
+    transformed_data = await run_in_threadpool(
+        functools.partial(
+            services.preprocessing.preprocess_rows,
+            rows,
+            label_encoder=bundle.value.label_encoder,
+        )
+    )
+    features = services.prediction.to_features(transformed_data)
+    return await services.prediction.predict_features(
+        features, bundle, request.state.model_id
+    )
+
+
+async def _predict_columns(
+    services: Services,
+    columns: ColumnarRequestInputInference,
+    request: Request,
+    bundle: Optional[Versioned],
+) -> Iterable[float]:
+    """Preprocesses the columns with the DataFrame pipeline and predicts them with the model bundle"""
+    if services.remote is not None:
+        predictions = await services.remote.predict_columns(
+            dict(columns), headers=request.headers
+        )
+        return _remote_values(request, predictions)
+    transformed_data = await run_in_threadpool(
+        functools.partial(
+            services.preprocessing.preprocess_columns,
+            columns,
+            label_encoder=bundle.value.label_encoder,
+        )
+    )
+    features = services.prediction.to_features(transformed_data)
+    return await services.prediction.predict_features(
+        features, bundle, request.state.model_id
+    )
 
 
 if __name__ == "__main__":
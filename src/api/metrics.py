@@ -0,0 +1,527 @@
+""" In-process metrics of the API exposed in the Prometheus text format """
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import math
+import threading
+import time
+import weakref
+
+from starlette.routing import Match
+
+
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class _ThreadShards:
+    """
+    Values of a metric split into one list per thread. Each thread only writes to its own list, so recording
+    needs neither a lock nor atomic operations. Readers sum the lists of all threads. When a thread exits, the
+    values of its list are added to the values of the exited threads and the list is dropped, so short-lived
+    worker threads don't accumulate lists.
+    Args:
+        size (int): Number of values per thread.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.local = threading.local()
+        self._shards: List[List[float]] = []
+        self._exited = [0] * size
+        self._lock = threading.Lock()
+
+    def add(self) -> List[float]:
+        """Adds the list of the current thread"""
+        values = [0] * self.size
+        with self._lock:
+            self._shards.append(values)
+        self.local.values = values
+        # The thread-local attributes are released when the thread exits, which retires its list
+        self.local.owner = _ShardOwner()
+        weakref.finalize(self.local.owner, self._retire, values)
+        return values
+
+    def _retire(self, values: List[float]) -> None:
+        """Adds the values of an exited thread to the values of the exited threads and drops its list"""
+        with self._lock:
+            self._exited = [
+                exited + value for exited, value in zip(self._exited, values)
+            ]
+            self._shards = [shard for shard in self._shards if shard is not values]
+
+    @property
+    def n_shards(self) -> int:
+        """Number of lists of running threads"""
+        return len(self._shards)
+
+    def totals(self) -> List[float]:
+        """Returns the sums of the values of all threads"""
+        with self._lock:
+            shards = [self._exited, *self._shards]
+        return [sum(values) for values in zip(*shards)]
+
+
+class _ShardOwner:
+    """Thread-local object, whose release marks the exit of the thread"""
+
+    __slots__ = ("__weakref__",)
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    def __init__(self):
+        self._shards = _ThreadShards(size=1)
+        self._local = self._shards.local
+
+    def inc(self, amount: float = 1) -> None:
+        """
+        Increases the counter.
+        Args:
+            amount (float, optional): Non-negative amount to add. Defaults to 1.
+
+        Returns:
+            None.
+        """
+        # Inlined lookup of the list of the current thread, which is the hot path
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._shards.add()
+        values[0] += amount
+
+    @property
+    def value(self) -> float:
+        """Current value of the counter"""
+        return self._shards.totals()[0]
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[str]:
+        """Returns the lines of the counter in the Prometheus text format"""
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Gauge:
+    """Value which is set to its current state"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """
+        Sets the gauge.
+        Args:
+            value (float): Current value.
+
+        Returns:
+            None.
+        """
+        self.value = value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[str]:
+        """Returns the lines of the gauge in the Prometheus text format"""
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Histogram:
+    """
+    Distribution of observed values counted in fixed buckets.
+    Args:
+        buckets (Sequence[float]): Upper bounds of the buckets. A bucket for infinity is added.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        # Count per bucket including the infinity bucket, followed by the sum of all observations
+        self._shards = _ThreadShards(size=len(self.buckets) + 2)
+        self._local = self._shards.local
+
+    def observe(self, value: float) -> None:
+        """
+        Records an observation.
+        Args:
+            value (float): Observed value.
+
+        Returns:
+            None.
+        """
+        # Inlined lookup of the list of the current thread, which is the hot path
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._shards.add()
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """
+        Returns the cumulative count of observations per upper bound and the sum of all observations.
+        The last count belongs to the infinity bucket and is the number of all observations.
+        """
+        totals = self._shards.totals()
+        cumulative_counts, count = [], 0
+        for bucket_count in totals[:-1]:
+            count += bucket_count
+            cumulative_counts.append(count)
+        return cumulative_counts, totals[-1]
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[str]:
+        """Returns the lines of the histogram in the Prometheus text format"""
+        cumulative_counts, total = self.snapshot()
+        upper_bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        lines = [
+            f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}"
+            for bound, count in zip(upper_bounds, cumulative_counts)
+        ]
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative_counts[-1]}")
+        return lines
+
+
+class MetricFamily:
+    """
+    Metrics of the same name and type, which differ in the values of their labels.
+    Args:
+        name (str): Name of the metric.
+        documentation (str): Description of the metric.
+        kind (str): Prometheus type of the metric: 'counter', 'gauge' or 'histogram'.
+        label_names (Sequence[str]): Names of the labels.
+        **kwargs: Additional keyword arguments passed to the metric of each label combination.
+    """
+
+    # pylint: disable=too-many-arguments
+
+    metric_types = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        label_names: Sequence[str] = (),
+        **kwargs,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.kwargs = kwargs
+        self._metrics: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **label_values: str):
+        """
+        Returns the metric of the label values. Callers on hot paths should keep the returned metric.
+        Args:
+            **label_values (str): Value of each label.
+
+        Returns:
+            The metric of the label values.
+        """
+        if set(label_values) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} expects the labels {self.label_names}, got {tuple(label_values)}."
+            )
+        key = tuple(str(label_values[name]) for name in self.label_names)
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(
+                    key, self.metric_types[self.kind](**self.kwargs)
+                )
+        return metric
+
+    def render(self) -> List[str]:
+        """Returns the lines of all metrics of the family in the Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for key, metric in list(self._metrics.items()):
+            lines.extend(metric.samples(self.name, dict(zip(self.label_names, key))))
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together"""
+
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+
+    def register(
+        self, name: str, documentation: str, kind: str, **kwargs
+    ) -> MetricFamily:
+        """
+        Creates a metric family.
+        Args:
+            name (str): Unique name of the metric.
+            documentation (str): Description of the metric.
+            kind (str): Prometheus type of the metric: 'counter', 'gauge' or 'histogram'.
+            **kwargs: Additional keyword arguments of ``MetricFamily``.
+
+        Returns:
+            The metric family.
+        """
+        if name in self.families:
+            raise ValueError(f"Metric {name} is already registered.")
+        if kind not in MetricFamily.metric_types:
+            raise ValueError(f"Metric type {kind} is not supported.")
+        family = MetricFamily(
+            name=name, documentation=documentation, kind=kind, **kwargs
+        )
+        self.families[name] = family
+        return family
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text format"""
+        lines = []
+        for family in list(self.families.values()):
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Records the time between consecutive laps as the duration of the stage the lap names.
+    Args:
+        started_at (float, optional): Start of the first stage as `time.perf_counter()` value. Defaults to now.
+    """
+
+    __slots__ = ("last",)
+
+    def __init__(self, started_at: float = None):
+        self.last = time.perf_counter() if started_at is None else started_at
+
+    def lap(self, stage: str) -> None:
+        """
+        Records the time since the last lap as duration of the stage.
+        Args:
+            stage (str): Name of the finished stage.
+
+        Returns:
+            None.
+        """
+        now = time.perf_counter()
+        STAGES[stage].observe(now - self.last)
+        self.last = now
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and recording their durations. The start of each request is stored as
+    `started_at` and the end of its endpoint, if the endpoint sets it, as `handled_at` in the request state.
+    The time after the endpoint is recorded as stage `respond`. Requests are labelled with the path template of
+    their route, requests without a matching route as 'unmatched'.
+    Args:
+        app: ASGI app to wrap.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started_at = time.perf_counter()
+        state = scope.setdefault("state", {})
+        state["started_at"] = started_at
+        status = [500]
+
+        async def send_with_status(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finished_at = time.perf_counter()
+            path = _route_path(scope) if status[0] != 404 else "unmatched"
+            REQUEST_DURATION.labels(path=path).observe(finished_at - started_at)
+            REQUESTS.labels(path=path, status=status[0]).inc()
+            if "handled_at" in state:
+                STAGES["respond"].observe(finished_at - state["handled_at"])
+
+
+def _route_path(scope) -> str:
+    """
+    Returns the path template of the route matching the request, so each route gets one label value however many
+    urls the clients send. Requests without a fully matching route, e.g. with another method, are 'unmatched'.
+    """
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match is Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Formats labels with escaped values"""
+    if not labels:
+        return ""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in labels.items()]
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    """Escapes backslashes, quotes and line breaks of a label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """Formats a sample value"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+# Stages of a request in the order they are executed
+STAGE_NAMES = (
+    "parse",
+    "compiled_transform",
+    "dataframe",
+    "validate_input",
+    "clean",
+    "validate_cleaned",
+    "transform",
+    "serialize",
+    "predict_input",
+    "remote_preprocess",
+    "remote_predict",
+    "predict",
+    "respond",
+)
+STAGE_DURATION = REGISTRY.register(
+    "salary_api_stage_duration_seconds",
+    "Duration of the pipeline stages of the requests.",
+    kind="histogram",
+    label_names=("stage",),
+    buckets=LATENCY_BUCKETS,
+)
+STAGES: Dict[str, Histogram] = {
+    stage: STAGE_DURATION.labels(stage=stage) for stage in STAGE_NAMES
+}
+REQUEST_DURATION = REGISTRY.register(
+    "salary_api_request_duration_seconds",
+    "Duration of the requests.",
+    kind="histogram",
+    label_names=("path",),
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = REGISTRY.register(
+    "salary_api_requests_total",
+    "Number of finished requests.",
+    kind="counter",
+    label_names=("path", "status"),
+)
+ROWS = REGISTRY.register(
+    "salary_api_rows_total",
+    "Number of rows received by the endpoints.",
+    kind="counter",
+    label_names=("path",),
+)
+BATCH_SIZE = REGISTRY.register(
+    "salary_api_batch_size_rows",
+    "Number of rows of the predicted batches.",
+    kind="histogram",
+    buckets=SIZE_BUCKETS,
+).labels()
+BATCH_QUEUE_WAIT = REGISTRY.register(
+    "salary_api_batch_queue_wait_seconds",
+    "Time the requests waited for their batch to be predicted.",
+    kind="histogram",
+    buckets=LATENCY_BUCKETS,
+).labels()
+MODEL_LOAD_DURATION = REGISTRY.register(
+    "salary_api_model_load_seconds",
+    "Time it took to load the model.",
+    kind="gauge",
+).labels()
+CACHE_LOOKUPS = REGISTRY.register(
+    "salary_api_prediction_cache_lookups_total",
+    "Number of rows looked up in the prediction cache, labeled by result.",
+    kind="counter",
+    label_names=("result",),
+)
+CACHE_EVICTIONS = REGISTRY.register(
+    "salary_api_prediction_cache_evictions_total",
+    "Number of entries removed from the prediction cache, labeled by reason.",
+    kind="counter",
+    label_names=("reason",),
+)
+CACHE_ENTRIES = REGISTRY.register(
+    "salary_api_prediction_cache_entries",
+    "Number of entries in the prediction cache.",
+    kind="gauge",
+).labels()
+TABLE_LOOKUPS = REGISTRY.register(
+    "salary_api_prediction_table_lookups_total",
+    "Number of rows looked up in the prediction table, labeled by result.",
+    kind="counter",
+    label_names=("result",),
+)
+STARTUP_DURATION = REGISTRY.register(
+    "salary_api_startup_seconds",
+    "Time it took to load and to warm up the API, labeled by phase.",
+    kind="gauge",
+    label_names=("phase",),
+)
+REMOTE_ATTEMPTS = REGISTRY.register(
+    "salary_api_remote_attempts_total",
+    "Number of requests to the remote services, labeled by service and result.",
+    kind="counter",
+    label_names=("service", "result"),
+)
+MODEL_RELOADS = REGISTRY.register(
+    "salary_api_model_reloads_total",
+    "Number of loads of changed model and labels files, labeled by result.",
+    kind="counter",
+    label_names=("result",),
+)
+MODEL_RESIDENT_BYTES = REGISTRY.register(
+    "salary_api_model_resident_bytes",
+    "Estimated memory of the loaded models, labeled by model id.",
+    kind="gauge",
+    label_names=("model",),
+)
+MODEL_EVICTIONS = REGISTRY.register(
+    "salary_api_model_evictions_total",
+    "Number of models unloaded to stay within the memory budget.",
+    kind="counter",
+).labels()
+MODEL_ROUTES = REGISTRY.register(
+    "salary_api_model_routes_total",
+    "Number of requests routed to each model, labeled by model id.",
+    kind="counter",
+    label_names=("model",),
+)
+INFERENCE_THREADS = REGISTRY.register(
+    "salary_api_inference_threads",
+    "Threads of the predictions, labeled by state: the budget and the threads in use.",
+    kind="gauge",
+    label_names=("state",),
+)
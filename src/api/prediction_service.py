@@ -1,44 +1,382 @@
 """ Service to make model predictions accessible via http requests """
+import functools
+import mmap
 import os
-from typing import List
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 import uvicorn
+import numpy as np
 import pandas as pd
 
+from api.arrow import ArrowRoute, columnar_response
+from api.batching import PredictionBatcher
+from api.caching import PredictionCache
+from api.hot_swap import (
+    MODEL_ID_HEADER,
+    ROUTING_KEY_HEADER,
+    HotSwap,
+    ModelVersionMiddleware,
+    Versioned,
+)
+from api.metrics import MODEL_LOAD_DURATION, STAGES, TABLE_LOOKUPS, StageTimer
+from api.registry import (
+    DEFAULT_MODEL_ID,
+    ModelRegistry,
+    ModelSpec,
+    RegistryConfig,
+)
+from api.threads import ThreadBudget, available_cpus, limit_request_threads
+from modeling.prediction_table import PredictionTable
 from modeling.sklearn_models import SKLearnModel
-from utils.data_models import PreprocessedRequestInference, RequestOutput
+from preprocessing.label_encoder import LabelEncoder
+from utils.data_models import (
+    ColumnarPreprocessedRequestInference,
+    ColumnarRequestOutput,
+    PreprocessedRequestInference,
+    RequestOutput,
+    TransformedFeaturesSchema,
+)
 
 
 app = FastAPI()
+# Columnar bodies are also accepted as Arrow IPC streams
+app.router.route_class = ArrowRoute
+app.add_middleware(ModelVersionMiddleware)
 logger = logging.getLogger(os.getenv("LOGGER", "default"))
 
 
-MODEL = SKLearnModel()
-MODEL.load(os.getenv("MODEL_PATH", None))
+MODEL_PATH = os.getenv("MODEL_PATH", None)
+LABELS_PATH = os.getenv("LABELS_PATH", None)
+PREDICTION_TABLE_PATH = os.getenv("PREDICTION_TABLE_PATH", None) or None
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "10"))
+# Further models, which are loaded on demand, and the split of the requests between the models
+MODEL_REGISTRY_CONFIG = RegistryConfig.from_path(
+    os.getenv("MODEL_REGISTRY_PATH", None) or None
+)
 
+# Threads all concurrent predictions share, a batch gets one thread per PARALLEL_MIN_ROWS rows
+THREADS = ThreadBudget(
+    threads=int(os.getenv("INFERENCE_THREADS", "0")) or available_cpus(),
+    parallel_min_rows=int(os.getenv("PARALLEL_MIN_ROWS", "1024")),
+    native_threads=int(os.getenv("NATIVE_THREADS", "1")),
+)
 
-@app.post("/predict", response_model=List[RequestOutput])
-def predict(
-    user_request: List[PreprocessedRequestInference],
-) -> List[RequestOutput]:
+FEATURE_COLUMNS = list(TransformedFeaturesSchema.get_column_names())
+
+TABLE_HITS = TABLE_LOOKUPS.labels(result="hit")
+TABLE_MISSES = TABLE_LOOKUPS.labels(result="miss")
+
+
+class ModelBundle(NamedTuple):
+    """Model together with the labels it was trained with and its prediction table, which are swapped together"""
+
+    model: SKLearnModel
+    label_encoder: Optional[LabelEncoder]
+    table: Optional[PredictionTable]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Predicts a batch with the threads reserved for its size and records the duration of the prediction"""
+        started_at = time.perf_counter()
+        with THREADS.reserve(len(features)):
+            predictions = self.model.predict(features)
+        STAGES["predict"].observe(time.perf_counter() - started_at)
+        return predictions
+
+
+def _load_prediction_table(spec: ModelSpec) -> Optional[PredictionTable]:
+    """Memory maps the prediction table of the model, if it was built with the model file"""
+    if spec.prediction_table_path is None:
+        return None
+    try:
+        table = PredictionTable.from_path(
+            spec.prediction_table_path,
+            model_path=spec.model_path,
+            feature_names=FEATURE_COLUMNS,
+        )
+    except (OSError, ValueError) as error:
+        logger.warning("Predicting without the prediction table. Reason: %s", error)
+        return None
+    logger.info(
+        "Loaded prediction table with %d rows from %s",
+        len(table),
+        spec.prediction_table_path,
+    )
+    return table
+
+
+def load_bundle(spec: Optional[ModelSpec] = None) -> ModelBundle:
+    """
+    Loads the model, the labels and the prediction table. The number of jobs of the model is left to ``THREADS``.
+    Args:
+        spec (``api.registry.ModelSpec``, optional): Paths of the files. Defaults to None, which loads the files
+            of `MODEL_PATH`, `LABELS_PATH` and `PREDICTION_TABLE_PATH`.
+
+    Returns:
+        The loaded bundle.
+    """
+    if spec is None:
+        spec = ModelSpec(MODEL_PATH, LABELS_PATH, PREDICTION_TABLE_PATH)
+    model = SKLearnModel(
+        packed_inference=os.getenv("PACKED_INFERENCE", "false").lower() == "true",
+        packed_max_rows=int(os.getenv("PACKED_MAX_ROWS", "32")),
+    )
+    started_at = time.perf_counter()
+    model.load(spec.model_path)
+    THREADS.adopt(model.model)
+    THREADS.limit_native_threads()
+    MODEL_LOAD_DURATION.set(time.perf_counter() - started_at)
+    return ModelBundle(
+        model=model,
+        label_encoder=(
+            LabelEncoder.from_path(spec.labels_path)
+            if spec.labels_path is not None
+            else None
+        ),
+        table=_load_prediction_table(spec),
+    )
+
+
+def warm_up_bundle(bundle: ModelBundle) -> None:
+    """
+    Predicts a single row with the model and reads the memory-mapped arrays of the packed forest and the prediction
+    table once, so the first requests don't wait for the model to be paged into memory.
+    Args:
+        bundle (ModelBundle): The bundle to warm up.
+
+    Returns:
+        None.
+    """
+    bundle.model.predict(np.zeros((1, len(FEATURE_COLUMNS)), dtype=np.float32))
+    for state in (bundle.model.packed_forest, bundle.table):
+        for array in vars(state).values() if state is not None else ():
+            if isinstance(array, np.ndarray) and array.dtype.kind != "O":
+                # Reading one byte per page faults the whole array in
+                np.ascontiguousarray(array).reshape(-1).view(np.uint8)[
+                    :: mmap.PAGESIZE
+                ].sum()
+
+
+# Changed model, labels or table files are loaded and swapped in while serving
+BUNDLES = HotSwap(
+    load=load_bundle,
+    paths=(MODEL_PATH, LABELS_PATH, PREDICTION_TABLE_PATH),
+    warm_up=warm_up_bundle,
+    interval_s=MODEL_WATCH_INTERVAL_S,
+)
+
+
+def _open_model(model_id: str) -> HotSwap:
+    """Loads and warms up a registered model, which is swapped again once its files change"""
+    spec = MODEL_REGISTRY_CONFIG.models[model_id]
+    return HotSwap(
+        load=functools.partial(load_bundle, spec),
+        paths=spec,
+        warm_up=warm_up_bundle,
+        interval_s=MODEL_WATCH_INTERVAL_S,
+    )
+
+
+# The default model is always loaded, registered models are unloaded beyond the memory budget
+MODELS = ModelRegistry(
+    load=_open_model,
+    model_ids=MODEL_REGISTRY_CONFIG.models,
+    memory_budget_bytes=float(os.getenv("MODEL_MEMORY_BUDGET_MB", "2048")) * 2**20,
+    pinned={DEFAULT_MODEL_ID: BUNDLES},
+    weights=MODEL_REGISTRY_CONFIG.weights,
+)
+
+
+def _predict_current(features: np.ndarray) -> np.ndarray:
+    """Predicts a batch with the current bundle"""
+    return BUNDLES.current.value.predict(features)
+
+
+BATCHER = PredictionBatcher(
+    predict=_predict_current,
+    max_rows=int(os.getenv("PREDICTION_BATCH_MAX_ROWS", "256")),
+    max_wait_us=int(os.getenv("PREDICTION_BATCH_MAX_WAIT_US", "1000")),
+    max_concurrent_batches=int(os.getenv("PREDICTION_BATCH_CONCURRENCY", "4")),
+)
+
+# Predictions are cached per model id and version and dropped once another version is swapped in or the model unloaded
+_cache_size = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+CACHE = (
+    PredictionCache(
+        predict=BATCHER.predict,
+        versions=MODELS.versions,
+        max_entries=_cache_size,
+        ttl_s=float(os.getenv("PREDICTION_CACHE_TTL_S", "3600")),
+        check_interval_s=0,
+    )
+    if _cache_size > 0
+    else None
+)
+
+
+async def route_request(headers: Mapping[str, str]) -> Tuple[str, Versioned]:
+    """
+    Chooses the model of a request by its header `X-Model-Id` or splits the requests between the models by weight,
+    keeping requests with the same header `X-Routing-Key` on the same model, and loads the model if needed.
+    Args:
+        headers (Mapping[str, str]): Headers of the request.
+
+    Returns:
+        The model id and the current version of its ``ModelBundle``, which the request should keep.
+
+    Raises:
+        ``api.registry.UnknownModelError``: If the requested model is not registered.
+    """
+    model_id = MODELS.route(
+        headers.get(MODEL_ID_HEADER), headers.get(ROUTING_KEY_HEADER)
+    )
+    bundle = MODELS.current(model_id)
+    if bundle is None:
+        # Loading takes seconds, so other requests are served meanwhile
+        bundle = await run_in_threadpool(MODELS.get, model_id)
+    return model_id, bundle
+
+
+async def predict_features(
+    features: np.ndarray,
+    bundle: Optional[Versioned] = None,
+    model_id: str = DEFAULT_MODEL_ID,
+) -> np.ndarray:
+    """
+    Looks up the predictions of a feature matrix in the prediction table, if configured, and calculates the
+    predictions of the remaining rows with the cache, if enabled, and the batcher.
+    Args:
+        features (np.ndarray): Feature matrix in the column order of ``utils.data_models.TransformedFeaturesSchema``.
+        bundle (``api.hot_swap.Versioned``, optional): Version and ``ModelBundle`` the request started with.
+            Defaults to None, which is the current bundle of the default model.
+        model_id (str, optional): Id of the model of the bundle, which keys the cached predictions together with
+            the version. Defaults to the default model.
+
+    Returns:
+        Array with the predictions of the rows.
     """
-    Calculates predictions for a preprocessed input.
+    bundle = BUNDLES.current if bundle is None else bundle
+    table = bundle.value.table
+    if table is None:
+        return await _predict_model(features, bundle, model_id)
+    predictions, found = table.lookup(features)
+    hits = int(found.sum())
+    TABLE_HITS.inc(hits)
+    TABLE_MISSES.inc(len(found) - hits)
+    if hits < len(found):
+        predictions[~found] = await _predict_model(features[~found], bundle, model_id)
+    return predictions
+
+
+async def _predict_model(
+    features: np.ndarray, bundle: Versioned, model_id: str
+) -> np.ndarray:
+    """Calculates the predictions of a feature matrix with the cache, if enabled, and the batcher"""
+    predict_batched = functools.partial(BATCHER.predict, predict=bundle.value.predict)
+    if CACHE is not None:
+        return await CACHE.predict(
+            features, version=(model_id, bundle.version), predict=predict_batched
+        )
+    return await predict_batched(features)
+
+
+@app.on_event("startup")
+async def limit_threads() -> None:
+    """Limits the threads of the synchronous endpoints to `REQUEST_THREADS`, if configured."""
+    limit_request_threads()
+
+
+@app.post("/predict", response_model=Union[List[RequestOutput], ColumnarRequestOutput])
+async def predict(
+    user_request: Union[
+        List[PreprocessedRequestInference], ColumnarPreprocessedRequestInference
+    ],
+    request: Request = None,
+) -> Union[List[RequestOutput], Response]:
+    """
+    Calculates predictions for a preprocessed input with the model the request is routed to, which the headers
+    `X-Model-Id` and `X-Model-Version` of the response report. Columnar inputs, as JSON or Arrow IPC stream, get a
+    columnar response in the format the `Accept` header negotiates.
     Args:
-        user_request (``utils.data_models.PreprocessedRequestInference``): Preprocessed data to calculate
-            predictions for.
+        user_request (List[``utils.data_models.PreprocessedRequestInference``] or
+            ``utils.data_models.ColumnarPreprocessedRequestInference``): Preprocessed data to calculate
+            predictions for as list of rows or as lists of values per column.
+        request (``fastapi.Request``, optional): The http request, which chooses the model and negotiates the
+            columnar response format. Defaults to None, which predicts with the default model and responds with JSON.
 
     Returns:
-        List of calculated predictions.
+        List of calculated predictions or the response with the list of predictions.
     """
     logger.debug("Got request to prediction service: \n %s", user_request)
-    input_data = pd.DataFrame(jsonable_encoder(user_request))
-    predictions = MODEL.predict(input_data)
+    timer = StageTimer()
+    if request is not None:
+        model_id, bundle = await route_request(request.headers)
+        request.state.model_id = model_id
+        request.state.model_version = bundle.version
+    else:
+        model_id, bundle = DEFAULT_MODEL_ID, BUNDLES.current
+    if isinstance(user_request, ColumnarPreprocessedRequestInference):
+        columns = dict(user_request)
+        features = np.column_stack(
+            [columns[column].astype(np.float32) for column in FEATURE_COLUMNS]
+        ).reshape(len(user_request), len(FEATURE_COLUMNS))
+        timer.lap("predict_input")
+        return columnar_response(
+            {"Salary_Yearly": await predict_features(features, bundle, model_id)},
+            request,
+        )
+    input_data = pd.DataFrame(jsonable_encoder(user_request), columns=FEATURE_COLUMNS)
+    features = input_data.to_numpy(dtype=np.float32)
+    timer.lap("predict_input")
+    predictions = await predict_features(features, bundle, model_id)
     request_output = [RequestOutput(Salary_Yearly=pred) for pred in predictions]
     return request_output
 
 
+def to_features(data: pd.DataFrame) -> np.ndarray:
+    """
+    Converts transformed features to the feature matrix the model predicts.
+    Args:
+        data (pd.DataFrame): Transformed features with the columns of ``utils.data_models.TransformedFeaturesSchema``.
+
+    Returns:
+        C-contiguous float32 array of shape (n_rows, n_features).
+    """
+    return np.ascontiguousarray(data[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+
+
+def warm_up() -> None:
+    """
+    Warms up the current bundle, so the first requests don't wait for the model to be paged into memory.
+
+    Returns:
+        None.
+    """
+    warm_up_bundle(BUNDLES.current.value)
+
+
+@app.get("/batching")
+def batching_statistics() -> Dict[str, Dict[str, float]]:
+    """Returns the batch size and queue wait statistics of the recent prediction batches."""
+    return BATCHER.statistics.summary()
+
+
+@app.get("/models")
+def loaded_models() -> Dict[str, Dict[str, Any]]:
+    """Returns the version and estimated memory in bytes of the loaded models, the least recently used first."""
+    return MODELS.resident()
+
+
+@app.get("/threads")
+def thread_usage() -> Dict[str, int]:
+    """Returns the thread budget of the predictions and the threads in use."""
+    return THREADS.usage()
+
+
 if __name__ == "__main__":
     uvicorn.run("prediction_service:app", log_level="info", port=8001)
@@ -1,58 +1,180 @@
 """ Service to make preprocessing accessible via http requests """
 import os
-from typing import List, Literal
+from typing import List, Literal, Optional, Union
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 import uvicorn
 import pandas as pd
 
+from api.arrow import ArrowRoute, columnar_response
+from api.hot_swap import HotSwap, ModelVersionMiddleware
+from api.metrics import StageTimer
+from api.threads import limit_request_threads
 from preprocessing.clean_features import KaggleFeatureCleaner
+from preprocessing.label_encoder import LabelEncoder
 from preprocessing.transform_features import KaggleFeatureTransformer
 from utils.data_models import (
+    ColumnarPreprocessedRequestInference,
+    ColumnarRequestInputInference,
     RequestInputInference,
     PreprocessedRequestInference,
     ExecutionMode,
+    ValidationMode,
 )
 
 
 app = FastAPI()
+# Columnar bodies are also accepted as Arrow IPC streams
+app.router.route_class = ArrowRoute
+app.add_middleware(ModelVersionMiddleware)
 logger = logging.getLogger(os.getenv("LOGGER", "default"))
 
 
-@app.post("/preprocess", response_model=List[PreprocessedRequestInference])
+LABELS_PATH = os.getenv("LABELS_PATH", None)
+
+# A changed labels file is loaded and swapped in while serving
+LABELS = HotSwap(
+    load=lambda: LabelEncoder.from_path(LABELS_PATH),
+    paths=(LABELS_PATH,),
+    interval_s=float(os.getenv("MODEL_WATCH_INTERVAL_S", "10")),
+)
+
+# Validate requests with the compiled schemas, or with pandera as reference
+VALIDATION_MODE = ValidationMode(os.getenv("VALIDATION_MODE", "compiled"))
+
+
+@app.on_event("startup")
+async def limit_threads() -> None:
+    """Limits the threads of the synchronous endpoints to `REQUEST_THREADS`, if configured."""
+    limit_request_threads()
+
+
+@app.post(
+    "/preprocess",
+    response_model=Union[
+        List[PreprocessedRequestInference], ColumnarPreprocessedRequestInference
+    ],
+)
 def preprocess_data(
-    user_request: List[RequestInputInference], mode: Literal["inference"] = "inference"
-) -> List[PreprocessedRequestInference]:
+    user_request: Union[List[RequestInputInference], ColumnarRequestInputInference],
+    mode: Literal["inference"] = "inference",
+    request: Request = None,
+) -> Union[List[PreprocessedRequestInference], Response]:
     """
-    Preprocesses the posted input data.
+    Preprocesses the posted input data with the current labels, whose version the response reports in the header
+    `X-Model-Version`. Columnar inputs, as JSON or Arrow IPC stream, get a columnar response in the format the
+    `Accept` header negotiates.
     Args:
-        user_request (List[``utils.data_models.PreprocessedRequestInference``]): List of request inputs to be processed.
+        user_request (List[``utils.data_models.RequestInputInference``] or
+            ``utils.data_models.ColumnarRequestInputInference``): Request inputs to be processed as list of rows
+            or as lists of values per column.
         mode (str): Mode to execute the preprocessing. Allowable: 'inference'.
+        request (``fastapi.Request``, optional): The http request, which negotiates the columnar response format.
+            Defaults to None, which responds with JSON.
 
     Returns:
-        List of preprocessed inputs.
+        List of preprocessed inputs or the response with the preprocessed values per column.
     """
     logger.debug("Got request to preprocessing service: \n %s", user_request)
-    execution_mode = ExecutionMode(mode)
-    input_data = pd.DataFrame(jsonable_encoder(user_request))
-    cleaner = KaggleFeatureCleaner(data=input_data, mode=execution_mode)
+    timer = StageTimer()
+    labels = LABELS.current
+    if request is not None:
+        request.state.model_version = labels.version
+    if isinstance(user_request, ColumnarRequestInputInference):
+        transformed_data = preprocess_columns(
+            user_request, mode=mode, timer=timer, label_encoder=labels.value
+        )
+        response = columnar_response(transformed_data, request)
+        timer.lap("serialize")
+        return response
+    transformed_data = preprocess_rows(
+        user_request, mode=mode, timer=timer, label_encoder=labels.value
+    )
+    return_data = transformed_data.to_dict(orient="records")
+    timer.lap("serialize")
+    return return_data
+
+
+def preprocess_rows(
+    rows: List[RequestInputInference],
+    mode: Literal["inference"] = "inference",
+    timer: Optional[StageTimer] = None,
+    label_encoder: Optional[LabelEncoder] = None,
+) -> pd.DataFrame:
+    """
+    Preprocesses input data with a list of rows.
+    Args:
+        rows (List[``utils.data_models.RequestInputInference``]): Validated input rows.
+        mode (str): Mode to execute the preprocessing. Allowable: 'inference'.
+        timer (``api.metrics.StageTimer``, optional): Timer to record the stages with. Defaults to a new timer.
+        label_encoder (``preprocessing.label_encoder.LabelEncoder``, optional): Labels to encode the categories
+            with, e.g. the labels of the model the rows are predicted with. Defaults to the current labels.
+
+    Returns:
+        The transformed features.
+    """
+    timer = StageTimer() if timer is None else timer
+    input_data = pd.DataFrame(jsonable_encoder(rows))
+    timer.lap("dataframe")
+    return _preprocess_frame(input_data, ExecutionMode(mode), timer, label_encoder)
+
+
+def preprocess_columns(
+    user_request: ColumnarRequestInputInference,
+    mode: Literal["inference"] = "inference",
+    timer: Optional[StageTimer] = None,
+    label_encoder: Optional[LabelEncoder] = None,
+) -> pd.DataFrame:
+    """
+    Preprocesses input data with a list of values per column, without converting it to rows.
+    Args:
+        user_request (``utils.data_models.ColumnarRequestInputInference``): Validated input columns.
+        mode (str): Mode to execute the preprocessing. Allowable: 'inference'.
+        timer (``api.metrics.StageTimer``, optional): Timer to record the stages with. Defaults to a new timer.
+        label_encoder (``preprocessing.label_encoder.LabelEncoder``, optional): Labels to encode the categories
+            with, e.g. the labels of the model the rows are predicted with. Defaults to the current labels.
+
+    Returns:
+        The transformed features.
+    """
+    timer = StageTimer() if timer is None else timer
+    input_data = pd.DataFrame(dict(user_request))
+    timer.lap("dataframe")
+    return _preprocess_frame(input_data, ExecutionMode(mode), timer, label_encoder)
+
+
+def _preprocess_frame(
+    input_data: pd.DataFrame,
+    execution_mode: ExecutionMode,
+    timer: StageTimer,
+    label_encoder: Optional[LabelEncoder] = None,
+) -> pd.DataFrame:
+    """Cleans and transforms the input data and records the duration of each stage with the timer"""
+    cleaner = KaggleFeatureCleaner(
+        data=input_data, mode=execution_mode, validation_mode=VALIDATION_MODE
+    )
+    timer.lap("validate_input")
     cleaned_data = cleaner.execute()
+    timer.lap("clean")
     transformer = KaggleFeatureTransformer(
         data=cleaned_data,
         mode=execution_mode,
-        labels_path=os.getenv("LABELS_PATH", None),
+        label_encoder=LABELS.current.value if label_encoder is None else label_encoder,
+        validation_mode=VALIDATION_MODE,
     )
+    timer.lap("validate_cleaned")
     transformed_data = transformer.execute()
+    timer.lap("transform")
     # if execution_mode is ExecutionMode.TRAIN:
     #     target_cleaner = KaggleTargetCleaner(data=input_data)
     #     cleaned_targets = target_cleaner.execute()
     #     target_transformer = KaggleTargetTransformer(data=cleaned_targets)
     #     transformed_targets = target_transformer.execute()
     #     transformed_data = KaggleTrainDataLoader.match(features=transformed_data, targets=transformed_targets)
-    return_data = transformed_data.to_dict(orient="records")
-    return return_data
+    return transformed_data
 
 
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+""" Registry of several models, which are loaded on demand within a memory budget and routed to per request """
+import bisect
+import hashlib
+import itertools
+import logging
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from api.hot_swap import HotSwap, Versioned
+from api.metrics import MODEL_EVICTIONS, MODEL_RESIDENT_BYTES, MODEL_ROUTES
+from utils.data_io import read_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+# Id of the model of `MODEL_PATH`, which is always loaded
+DEFAULT_MODEL_ID = "default"
+
+
+class ModelSpec(NamedTuple):
+    """Paths of the files of a registered model"""
+
+    model_path: str
+    labels_path: Optional[str] = None
+    prediction_table_path: Optional[str] = None
+
+
+class RegistryConfig(NamedTuple):
+    """Registered models and the weights of the models requests without model id are split between"""
+
+    models: Dict[str, ModelSpec]
+    weights: Dict[str, float]
+
+    @classmethod
+    def from_path(cls, path: Optional[str]) -> "RegistryConfig":
+        """
+        Reads the registry configuration from a JSON file of the form
+        `{"models": {"<id>": {"model_path": ..., "labels_path": ..., "prediction_table_path": ...}},
+        "weights": {"<id>": <weight>}}`.
+        Args:
+            path (str): Path of the JSON file. None registers the default model only.
+
+        Returns:
+            The configuration.
+
+        Raises:
+            ValueError: If a weighted model is not registered or a model is registered as default model.
+        """
+        if path is None:
+            return cls(models={}, weights={DEFAULT_MODEL_ID: 1.0})
+        config = dict(read_data(filepath=path))
+        models = {
+            model_id: ModelSpec(**spec)
+            for model_id, spec in config.get("models", {}).items()
+        }
+        weights = {
+            model_id: float(weight)
+            for model_id, weight in config.get("weights", {DEFAULT_MODEL_ID: 1}).items()
+        }
+        if DEFAULT_MODEL_ID in models:
+            raise ValueError(
+                f"The model id '{DEFAULT_MODEL_ID}' is reserved for the model of MODEL_PATH."
+            )
+        unknown = set(weights) - set(models) - {DEFAULT_MODEL_ID}
+        if unknown:
+            raise ValueError(f"Weighted models {sorted(unknown)} are not registered.")
+        if sum(weights.values()) <= 0:
+            raise ValueError("At least one model needs a positive weight.")
+        return cls(models=models, weights=weights)
+
+
+class UnknownModelError(HTTPException):
+    """
+    Request for a model id, which is not registered.
+    Args:
+        model_id (str): The requested model id.
+    """
+
+    def __init__(self, model_id: str):
+        super().__init__(
+            status_code=404, detail=f"Model '{model_id}' is not registered."
+        )
+
+
+def resident_bytes(value: Any) -> int:
+    """
+    Estimates the memory a loaded model occupies as the size of the NumPy arrays it references, which hold almost
+    all memory of forests and prediction tables. The trees of sklearn forests are included.
+    Args:
+        value (Any): The loaded model, e.g. a ``api.prediction_service.ModelBundle``.
+
+    Returns:
+        The estimated number of bytes.
+    """
+    total = 0
+    # Keeps the visited items alive, so the ids of temporary states are not reused
+    seen: Dict[int, Any] = {}
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, (str, bytes, int, float, type)):
+            continue
+        seen[id(item)] = item
+        if isinstance(item, np.ndarray):
+            total += item.nbytes
+            if item.dtype.kind == "O":
+                stack.extend(item.ravel())
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            stack.extend(vars(item).values())
+        elif hasattr(item, "__getstate__"):
+            # Extension types like the trees of sklearn expose their arrays in their state
+            stack.append(item.__getstate__())
+    return total
+
+
+class ModelRegistry:
+    """
+    Models loaded by id on demand, each held by a ``api.hot_swap.HotSwap``. Once the estimated memory of the loaded
+    models exceeds the budget, the least recently used models are unloaded. Pinned models, like the default model,
+    are never unloaded. Requests which took a model before it was unloaded keep using it until they finish.
+    Models are loaded in the calling thread, concurrent requests for the same model wait for one load.
+    Args:
+        load (Callable[[str], HotSwap]): Function loading the model of a registered id.
+        model_ids (Iterable[str]): Registered ids, which can be loaded.
+        memory_budget_bytes (float): Memory the loaded models may occupy.
+        **kwargs: Additional keyword arguments:
+            - pinned (Mapping[str, HotSwap]): Loaded models, which are never unloaded. Defaults to none.
+            - weights (Mapping[str, float]): Weights of the ids requests without model id are split between.
+              Defaults to the first pinned id.
+            - size (Callable[[Any], int]): Function estimating the bytes of a loaded model. Defaults to
+              ``resident_bytes``.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        load: Callable[[str], HotSwap],
+        model_ids: Iterable[str],
+        memory_budget_bytes: float,
+        **kwargs,
+    ):
+        self.load = load
+        self.memory_budget_bytes = memory_budget_bytes
+        self.size = kwargs.get("size", resident_bytes)
+        self.pinned: Dict[str, HotSwap] = dict(kwargs.get("pinned", {}))
+        self.model_ids = frozenset(model_ids) | frozenset(self.pinned)
+        weights = dict(kwargs.get("weights") or {next(iter(self.pinned)): 1.0})
+        self._route_ids = [
+            model_id for model_id, weight in weights.items() if weight > 0
+        ]
+        self._route_bounds = list(
+            itertools.accumulate(weights[model_id] for model_id in self._route_ids)
+        )
+        self._loaded: "OrderedDict[str, HotSwap]" = OrderedDict()
+        self._sizes: Dict[str, Versioned] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._routes = {
+            model_id: MODEL_ROUTES.labels(model=model_id) for model_id in self.model_ids
+        }
+        for model_id, hot_swap in self.pinned.items():
+            self._sizes[model_id] = self._measure(model_id, hot_swap.current)
+
+    def route(
+        self, model_id: Optional[str] = None, routing_key: Optional[str] = None
+    ) -> str:
+        """
+        Chooses the model of a request.
+        Args:
+            model_id (str, optional): Id the request asked for. Defaults to None, which splits the requests by weight.
+            routing_key (str, optional): Key of the caller, e.g. a user id, which is always routed to the same model
+                by weight. Defaults to None, which routes randomly by weight.
+
+        Returns:
+            The model id.
+
+        Raises:
+            UnknownModelError: If the requested id is not registered.
+        """
+        if model_id is None:
+            if routing_key is None:
+                position = random.random()
+            else:
+                digest = hashlib.blake2b(routing_key.encode(), digest_size=8).digest()
+                position = int.from_bytes(digest, "big") / 2**64
+            index = bisect.bisect_right(
+                self._route_bounds, position * self._route_bounds[-1]
+            )
+            model_id = self._route_ids[min(index, len(self._route_ids) - 1)]
+        elif model_id not in self.model_ids:
+            raise UnknownModelError(model_id)
+        self._routes[model_id].inc()
+        return model_id
+
+    def current(self, model_id: str) -> Optional[Versioned]:
+        """
+        Returns the current version of a model, if it is loaded, and marks it as recently used.
+        Args:
+            model_id (str): Id of the model.
+
+        Returns:
+            The version and the loaded model, or None if the model is not loaded.
+        """
+        hot_swap = self.pinned.get(model_id)
+        if hot_swap is not None:
+            return hot_swap.current
+        with self._lock:
+            hot_swap = self._loaded.get(model_id)
+            if hot_swap is None:
+                return None
+            self._loaded.move_to_end(model_id)
+        return hot_swap.current
+
+    def get(self, model_id: str) -> Versioned:
+        """
+        Returns the current version of a model and loads it first if it is not loaded. Blocks while loading.
+        Args:
+            model_id (str): Id of the model.
+
+        Returns:
+            The version and the loaded model.
+
+        Raises:
+            UnknownModelError: If the id is not registered.
+        """
+        loaded = self.current(model_id)
+        if loaded is not None:
+            return loaded
+        if model_id not in self.model_ids:
+            raise UnknownModelError(model_id)
+        with self._lock:
+            loading = self._loading.setdefault(model_id, threading.Lock())
+        with loading:
+            loaded = self.current(model_id)
+            if loaded is not None:
+                return loaded
+            hot_swap = self.load(model_id)
+            loaded = hot_swap.current
+            size = self._measure(model_id, loaded)
+            self._measure_swapped()
+            with self._lock:
+                self._loaded[model_id] = hot_swap
+                self._sizes[model_id] = size
+                evicted = self._evict(keep=model_id)
+        logger.info(
+            "Loaded model %s version %s with %.1f MB.",
+            model_id,
+            loaded.version,
+            size.value / 2**20,
+        )
+        for evicted_id, evicted_swap in evicted:
+            evicted_swap.stop()
+            MODEL_RESIDENT_BYTES.labels(model=evicted_id).set(0)
+            MODEL_EVICTIONS.inc()
+            logger.info(
+                "Unloaded model %s to stay within the memory budget.", evicted_id
+            )
+        return loaded
+
+    def versions(self) -> FrozenSet[Tuple[str, str]]:
+        """
+        Returns the current version of each loaded model, e.g. to key cached predictions by.
+
+        Returns:
+            Set of tuples of type ('model_id', 'version').
+        """
+        with self._lock:
+            hot_swaps = {**self.pinned, **self._loaded}
+        return frozenset(
+            (model_id, hot_swap.current.version)
+            for model_id, hot_swap in hot_swaps.items()
+        )
+
+    def resident(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the version and estimated bytes of each loaded model, the least recently used first.
+
+        Returns:
+            Dictionary of type {'model_id': {'version': ..., 'bytes': ...}, ...}.
+        """
+        self._measure_swapped()
+        with self._lock:
+            sizes = {
+                model_id: self._sizes[model_id]
+                for model_id in itertools.chain(self.pinned, self._loaded)
+            }
+        return {
+            model_id: {"version": size.version, "bytes": size.value}
+            for model_id, size in sizes.items()
+        }
+
+    def _evict(self, keep: str):
+        """Removes the least recently used models beyond the budget and returns them. Requires the lock"""
+        total = sum(
+            self._sizes[model_id].value
+            for model_id in itertools.chain(self.pinned, self._loaded)
+        )
+        evicted = []
+        for model_id in list(self._loaded):
+            if total <= self.memory_budget_bytes:
+                break
+            if model_id == keep:
+                continue
+            hot_swap = self._loaded.pop(model_id)
+            total -= self._sizes.pop(model_id).value
+            evicted.append((model_id, hot_swap))
+        if total > self.memory_budget_bytes:
+            logger.warning(
+                "Loaded models occupy %.1f MB, more than the budget of %.1f MB.",
+                total / 2**20,
+                self.memory_budget_bytes / 2**20,
+            )
+        return evicted
+
+    def _measure_swapped(self) -> None:
+        """
+        Measures the loaded models whose current version was swapped in after they were measured. Walking the
+        model takes long, so it happens outside the lock, which only guards the lookups of the requests.
+        """
+        with self._lock:
+            hot_swaps = {**self.pinned, **self._loaded}
+            sizes = dict(self._sizes)
+        for model_id, hot_swap in hot_swaps.items():
+            loaded = hot_swap.current
+            if sizes[model_id].version == loaded.version:
+                continue
+            size = self._measure(model_id, loaded)
+            with self._lock:
+                if model_id in self.pinned or model_id in self._loaded:
+                    self._sizes[model_id] = size
+
+    def _measure(self, model_id: str, loaded: Versioned) -> Versioned:
+        """Estimates the bytes of a loaded version and reports them as metric"""
+        size = self.size(loaded.value)
+        MODEL_RESIDENT_BYTES.labels(model=model_id).set(size)
+        return Versioned(loaded.version, size)
@@ -0,0 +1,362 @@
+""" Client of the preprocessing and prediction services running as separate tiers """
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Mapping, NamedTuple, Optional
+
+import httpx
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from api.arrow import ARROW_STREAM_MEDIA_TYPE, read_columns, write_columns
+from api.hot_swap import MODEL_ID_HEADER, MODEL_VERSION_HEADER, ROUTING_KEY_HEADER
+from api.metrics import REMOTE_ATTEMPTS, StageTimer
+from utils.request_models import RequestInputInference
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+PREPROCESSING_URL = os.getenv("PREPROCESSING_URL", "http://localhost:8000")
+PREDICTION_URL = os.getenv("PREDICTION_URL", "http://localhost:8001")
+# Time in seconds a single attempt of a hop may take, including waiting for a pooled connection
+PREPROCESSING_TIMEOUT_S = float(os.getenv("PREPROCESSING_TIMEOUT_S", "10"))
+PREDICTION_TIMEOUT_S = float(os.getenv("PREDICTION_TIMEOUT_S", "10"))
+REMOTE_RETRIES = int(os.getenv("REMOTE_RETRIES", "2"))
+REMOTE_BACKOFF_S = float(os.getenv("REMOTE_BACKOFF_S", "0.05"))
+REMOTE_RETRY_RATIO = float(os.getenv("REMOTE_RETRY_RATIO", "0.2"))
+REMOTE_MAX_CONNECTIONS = int(os.getenv("REMOTE_MAX_CONNECTIONS", "100"))
+REMOTE_KEEPALIVE_S = float(os.getenv("REMOTE_KEEPALIVE_S", "30"))
+
+# Status codes of overloaded, restarting or unreachable services, which a retry may succeed for
+RETRY_STATUS_CODES = (502, 503, 504)
+ARROW_HEADERS = {
+    "content-type": ARROW_STREAM_MEDIA_TYPE,
+    "accept": ARROW_STREAM_MEDIA_TYPE,
+}
+
+
+class RemotePredictions(NamedTuple):
+    """Predictions of the remote services together with the model the prediction service routed the request to"""
+
+    values: Any
+    model_id: Optional[str]
+    model_version: Optional[str]
+
+
+class RemoteServiceError(HTTPException):
+    """
+    Failed request to a remote service, which is answered with a gateway status code.
+    Args:
+        status_code (int): Status code of the answer.
+        detail (str): Description of the failure.
+        retriable (bool, optional): Whether a retry may succeed. Defaults to True.
+    """
+
+    def __init__(self, status_code: int, detail: str, retriable: bool = True):
+        super().__init__(status_code=status_code, detail=detail)
+        self.retriable = retriable
+
+
+class RetryBudget:
+    """
+    Limits the retries to a share of the recent requests, so retries do not multiply the load of a service which is
+    already overloaded. The budget is not thread-safe and has to be used from a single event loop.
+    Args:
+        ratio (float, optional): Retries allowed per request of the window. Defaults to 0.2.
+        min_retries (int, optional): Retries allowed per window independent of the number of requests, so rarely
+            used services can retry as well. Defaults to 10.
+        window_s (float, optional): Time in seconds requests and retries are counted. Defaults to 10.
+        clock (Callable[[], float], optional): Function returning the current time in seconds. Defaults to
+            ``time.monotonic``.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries: int = 10,
+        window_s: float = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_s = window_s
+        self.now = clock
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _expire(self, now: float) -> None:
+        """Forgets the requests and retries older than the window"""
+        for times in (self._requests, self._retries):
+            while times and times[0] <= now - self.window_s:
+                times.popleft()
+
+    def record_request(self) -> None:
+        """Records a request, which deposits `ratio` retries into the budget"""
+        now = self.now()
+        self._expire(now)
+        self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        """
+        Withdraws a retry from the budget.
+
+        Returns:
+            Whether the retry is allowed.
+        """
+        now = self.now()
+        self._expire(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class RemoteService:
+    """
+    Service called over HTTP. Attempts which time out, fail to connect or are answered with 502, 503 or 504 are
+    retried with exponential backoff and jitter as long as retries and the retry budget are left. Other failed
+    responses are not retried.
+    Args:
+        name (str): Name of the service used in errors, logs and metrics.
+        url (str): Base URL of the service.
+        client (``httpx.AsyncClient``): Client, whose pooled connections are shared by all services.
+        timeout_s (float): Time in seconds a single attempt may take.
+        **kwargs: Additional keyword arguments:
+            - retries (int): Maximum number of retries of a request. Defaults to 2.
+            - backoff_s (float): Maximum delay in seconds before the first retry, which doubles with every retry.
+              Defaults to 0.05.
+            - budget (RetryBudget): Budget of the retries. Defaults to a budget with a ratio of 0.2.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self, name: str, url: str, client: httpx.AsyncClient, timeout_s: float, **kwargs
+    ):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.client = client
+        self.timeout_s = timeout_s
+        self.retries = kwargs.get("retries", 2)
+        self.backoff_s = kwargs.get("backoff_s", 0.05)
+        self.budget = kwargs.get("budget") or RetryBudget()
+        self._attempts = {
+            result: REMOTE_ATTEMPTS.labels(service=name, result=result)
+            for result in ("success", "retry", "failure")
+        }
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request to the service and retries it on transient failures.
+        Args:
+            method (str): HTTP method.
+            path (str): Path of the endpoint.
+            **kwargs: Additional keyword arguments passed to ``httpx.AsyncClient.request``.
+
+        Returns:
+            The successful response.
+
+        Raises:
+            RemoteServiceError: If the request failed and is not retried anymore. Its status code is 504 for
+                timeouts, 503 if the service is unavailable and 502 otherwise.
+        """
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                response = await self._attempt(method, path, **kwargs)
+            except RemoteServiceError as error:
+                if (
+                    not error.retriable
+                    or attempt >= self.retries
+                    or not self.budget.try_retry()
+                ):
+                    self._attempts["failure"].inc()
+                    raise
+                self._attempts["retry"].inc()
+                logger.warning(
+                    "Retrying request to the %s service. Reason: %s",
+                    self.name,
+                    error.detail,
+                )
+            else:
+                self._attempts["success"].inc()
+                return response
+            await asyncio.sleep(random.uniform(0, self.backoff_s * 2**attempt))
+            attempt += 1
+
+    async def _attempt(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Sends the request once and raises a ``RemoteServiceError`` if it failed"""
+        try:
+            response = await asyncio.wait_for(
+                self.client.request(method, self.url + path, **kwargs), self.timeout_s
+            )
+        except asyncio.TimeoutError as error:
+            raise RemoteServiceError(
+                504,
+                f"The {self.name} service did not respond within {self.timeout_s} s.",
+            ) from error
+        except httpx.TransportError as error:
+            raise RemoteServiceError(
+                502, f"The {self.name} service is unreachable: {error!r}"
+            ) from error
+        if not response.is_success:
+            raise RemoteServiceError(
+                503 if response.status_code == 503 else 502,
+                f"The {self.name} service responded with {response.status_code}: {response.text[:200]}",
+                retriable=response.status_code in RETRY_STATUS_CODES,
+            )
+        return response
+
+    async def post_arrow(
+        self, path: str, body: bytes, headers: Optional[Mapping[str, str]] = None
+    ) -> httpx.Response:
+        """
+        Posts an Arrow IPC stream body and accepts an Arrow IPC stream as response.
+        Args:
+            path (str): Path of the endpoint.
+            body (bytes): The Arrow IPC stream.
+            headers (Mapping[str, str], optional): Further headers of the request. Defaults to None.
+
+        Returns:
+            The successful response.
+        """
+        return await self.request(
+            "POST", path, content=body, headers={**ARROW_HEADERS, **(headers or {})}
+        )
+
+
+class RemoteServices:
+    """
+    Preprocessing and prediction services called over HTTP. Columns are sent as Arrow IPC streams, and the
+    preprocessed stream is passed on to the prediction service without decoding it. Encoding and decoding run in
+    the thread pool, so large requests do not block the event loop.
+    Args:
+        preprocessing (RemoteService): The preprocessing service.
+        prediction (RemoteService): The prediction service.
+    """
+
+    def __init__(self, preprocessing: RemoteService, prediction: RemoteService):
+        self.preprocessing = preprocessing
+        self.prediction = prediction
+
+    async def predict_columns(
+        self, columns: Mapping[str, Any], headers: Optional[Mapping[str, str]] = None
+    ) -> RemotePredictions:
+        """
+        Preprocesses the columns and calculates their predictions with the remote services.
+        Args:
+            columns (Mapping[str, Any]): Arrays or lists per column of ``utils.request_models.RequestInputInference``.
+            headers (Mapping[str, str], optional): Headers of the request to the API. Its headers `X-Model-Id` and
+                `X-Routing-Key` are passed on to the prediction service, which routes the request. Defaults to None.
+
+        Returns:
+            The predictions together with the model id and version the prediction service reported, if any.
+        """
+        routing_headers = {
+            header: headers[header]
+            for header in (MODEL_ID_HEADER, ROUTING_KEY_HEADER)
+            if headers is not None and header in headers
+        }
+        body = await run_in_threadpool(write_columns, columns)
+        timer = StageTimer()
+        features = await self.preprocessing.post_arrow("/preprocess", body)
+        timer.lap("remote_preprocess")
+        response = await self.prediction.post_arrow(
+            "/predict", features.content, headers=routing_headers
+        )
+        timer.lap("remote_predict")
+        predictions = await run_in_threadpool(read_columns, response.content)
+        return RemotePredictions(
+            values=predictions["Salary_Yearly"],
+            model_id=response.headers.get(MODEL_ID_HEADER),
+            model_version=response.headers.get(MODEL_VERSION_HEADER),
+        )
+
+    async def predict_rows(
+        self,
+        rows: List[RequestInputInference],
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> RemotePredictions:
+        """
+        Preprocesses the rows and calculates their predictions with the remote services.
+        Args:
+            rows (List[``utils.request_models.RequestInputInference``]): Raw input rows.
+            headers (Mapping[str, str], optional): Headers of the request to the API, see ``predict_columns``.
+                Defaults to None.
+
+        Returns:
+            The predictions together with the model id and version the prediction service reported, if any.
+        """
+        columns = {
+            column: [getattr(row, column) for row in rows]
+            for column in RequestInputInference.__fields__
+        }
+        # ISO 8601 strings keep the time zones, which the columns may mix
+        columns["Timestamp"] = [
+            timestamp.isoformat() for timestamp in columns["Timestamp"]
+        ]
+        return await self.predict_columns(columns, headers=headers)
+
+    async def batching_statistics(self) -> Any:
+        """Returns the batching statistics of the prediction service"""
+        return (await self.prediction.request("GET", "/batching")).json()
+
+    async def loaded_models(self) -> Any:
+        """Returns the models loaded by the prediction service"""
+        return (await self.prediction.request("GET", "/models")).json()
+
+    async def thread_usage(self) -> Any:
+        """Returns the thread budget of the prediction service and the threads in use"""
+        return (await self.prediction.request("GET", "/threads")).json()
+
+    async def aclose(self) -> None:
+        """Closes the pooled connections"""
+        await self.preprocessing.client.aclose()
+        await self.prediction.client.aclose()
+
+
+def create_remote_services(**kwargs) -> RemoteServices:
+    """
+    Creates the remote services configured by the environment, which share one client with keep-alive connections.
+    Args:
+        **kwargs: Additional keyword arguments passed to ``httpx.AsyncClient``, e.g. the transports of tests.
+
+    Returns:
+        The remote services.
+    """
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=REMOTE_MAX_CONNECTIONS,
+            max_keepalive_connections=REMOTE_MAX_CONNECTIONS,
+            keepalive_expiry=REMOTE_KEEPALIVE_S,
+        ),
+        # Each attempt is limited by the timeout of its service
+        timeout=None,
+        **kwargs,
+    )
+    options = {
+        "retries": REMOTE_RETRIES,
+        "backoff_s": REMOTE_BACKOFF_S,
+    }
+    return RemoteServices(
+        preprocessing=RemoteService(
+            "preprocessing",
+            PREPROCESSING_URL,
+            client,
+            PREPROCESSING_TIMEOUT_S,
+            budget=RetryBudget(ratio=REMOTE_RETRY_RATIO),
+            **options,
+        ),
+        prediction=RemoteService(
+            "prediction",
+            PREDICTION_URL,
+            client,
+            PREDICTION_TIMEOUT_S,
+            budget=RetryBudget(ratio=REMOTE_RETRY_RATIO),
+            **options,
+        ),
+    )
@@ -0,0 +1,297 @@
+""" Pre-fork server sharing the loaded model and preprocessing state between worker processes """
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from utils import log
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+RESTART_SIGNALS = (signal.SIGHUP,)
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class PreforkServer:
+    """
+    Imports the app once in the parent process and forks worker processes serving it on a shared socket.
+    Everything created while importing the app and by the preload hook, like the model and the label encoder, is
+    moved to the permanent generation of the garbage collector before forking. The garbage collectors of the
+    workers then don't write to these objects, so their memory stays shared copy-on-write between all workers.
+    Workers which exit unexpectedly are replaced. `SIGHUP` replaces all workers without dropping requests,
+    `SIGTERM` and `SIGINT` stop the workers gracefully.
+    Args:
+        config (``uvicorn.Config``): Config of the app and the socket to serve it on.
+        workers (int, optional): Number of worker processes. Defaults to 1.
+        preload (bool, optional): Whether to import the app in the parent process. Otherwise every worker
+            imports the app on its own. Defaults to True.
+        preload_hook (Callable[[], Any], optional): Function called in the parent process after importing the
+            app, e.g. to load state the app loads lazily. Defaults to None.
+        graceful_timeout (float, optional): Time in seconds workers get to finish their requests before they
+            are killed. Defaults to 30.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers: int = 1,
+        preload: bool = True,
+        graceful_timeout: float = 30,
+        preload_hook: Optional[Callable[[], Any]] = None,
+    ):
+        if workers < 1:
+            raise ValueError(f"At least one worker is required, got {workers}.")
+        self.config = config
+        self.workers = workers
+        self.preload = preload
+        self.graceful_timeout = graceful_timeout
+        self.preload_hook = preload_hook
+        self._worker_pids: Dict[int, float] = {}
+        self._retiring_pids: List[int] = []
+        self._signals: List[int] = []
+
+    def run(self) -> None:
+        """
+        Serves the app until the server receives a stop signal.
+
+        Returns:
+            None.
+        """
+        sock = self.config.bind_socket()
+        if self.preload:
+            self.config.load()
+            if self.preload_hook is not None:
+                self.preload_hook()
+            gc.collect()
+            gc.freeze()
+            logger.info(
+                "Loaded app in parent process %d and froze %d objects.",
+                os.getpid(),
+                gc.get_freeze_count(),
+            )
+        for sig in RESTART_SIGNALS + STOP_SIGNALS:
+            signal.signal(sig, self._handle_signal)
+        for _ in range(self.workers):
+            self._spawn_worker(sock)
+        try:
+            while not any(sig in STOP_SIGNALS for sig in self._signals):
+                if any(sig in RESTART_SIGNALS for sig in self._signals):
+                    self._signals.clear()
+                    self._restart_workers(sock)
+                self._reap_workers(sock)
+                time.sleep(0.1)
+        finally:
+            self._stop_workers()
+            sock.close()
+
+    def _handle_signal(self, sig: int, _frame) -> None:
+        """Records the signal for the main loop"""
+        self._signals.append(sig)
+
+    def _spawn_worker(self, sock: socket.socket) -> None:
+        """Forks a worker process serving the app on the socket"""
+        pid = os.fork()
+        if pid != 0:
+            self._worker_pids[pid] = time.monotonic()
+            logger.info("Started worker process %d.", pid)
+            return
+        exit_code = 1
+        try:
+            for sig in RESTART_SIGNALS + STOP_SIGNALS:
+                signal.signal(sig, signal.SIG_DFL)
+            uvicorn.Server(config=self.config).run(sockets=[sock])
+            exit_code = 0
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Worker process %d failed.", os.getpid())
+        finally:
+            # Skips the cleanup of the parent process, which the worker inherited
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    def _reap_workers(self, sock: socket.socket) -> None:
+        """Collects exited workers and replaces the ones which were not retired"""
+        while self._worker_pids or self._retiring_pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self._retiring_pids:
+                self._retiring_pids.remove(pid)
+                logger.info("Retired worker process %d exited.", pid)
+                continue
+            started_at = self._worker_pids.pop(pid, None)
+            if started_at is None:
+                continue
+            logger.warning(
+                "Worker process %d exited with status %d after %.1f s, replacing it.",
+                pid,
+                os.WEXITSTATUS(status)
+                if os.WIFEXITED(status)
+                else -os.WTERMSIG(status),
+                time.monotonic() - started_at,
+            )
+            self._spawn_worker(sock)
+
+    def _restart_workers(self, sock: socket.socket) -> None:
+        """Starts new workers before the current ones finish their requests and exit"""
+        old_pids = list(self._worker_pids)
+        logger.info("Replacing worker processes %s.", old_pids)
+        for _ in old_pids:
+            self._spawn_worker(sock)
+        for pid in old_pids:
+            del self._worker_pids[pid]
+            self._retiring_pids.append(pid)
+            self._kill(pid, signal.SIGTERM)
+
+    def _stop_workers(self) -> None:
+        """Stops all workers gracefully and kills the ones exceeding the graceful timeout"""
+        pids = list(self._worker_pids) + self._retiring_pids
+        logger.info("Stopping worker processes %s.", pids)
+        for pid in pids:
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while pids and time.monotonic() < deadline:
+            pids = [pid for pid in pids if not self._has_exited(pid)]
+            time.sleep(0.1)
+        for pid in pids:
+            logger.warning("Killing worker process %d after the graceful timeout.", pid)
+            self._kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self._worker_pids.clear()
+        self._retiring_pids.clear()
+
+    @staticmethod
+    def _has_exited(pid: int) -> bool:
+        """Collects the worker if it exited"""
+        try:
+            return os.waitpid(pid, os.WNOHANG)[0] != 0
+        except ChildProcessError:
+            return True
+
+    @staticmethod
+    def _kill(pid: int, sig: int) -> None:
+        """Sends the signal to the worker if it's still running"""
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+
+def main(app: str, host: str, port: int, workers: int, **kwargs) -> None:
+    """
+    Serves the app with a pre-fork server.
+    Args:
+        app (str): Import string of the app of type '<module>:<attribute>'.
+        host (str): Host to bind the socket to.
+        port (int): Port to bind the socket to.
+        workers (int): Number of worker processes.
+        **kwargs: Additional keyword arguments:
+            - preload (bool): Whether to import the app in the parent process. Defaults to True.
+            - preload_hook (str): Import string of a function to call in the parent process after importing the
+              app. Defaults to None.
+            - graceful_timeout (float): Time in seconds workers get to finish their requests. Defaults to 30.
+            - log_level (str): Log level of uvicorn. Defaults to 'info'.
+
+    Returns:
+        None.
+    """
+    config = uvicorn.Config(
+        app=app, host=host, port=port, log_level=kwargs.get("log_level", "info")
+    )
+    PreforkServer(
+        config=config,
+        workers=workers,
+        preload=kwargs.get("preload", True),
+        graceful_timeout=kwargs.get("graceful_timeout", 30),
+        preload_hook=(
+            import_from_string(kwargs["preload_hook"])
+            if kwargs.get("preload_hook")
+            else None
+        ),
+    ).run()
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to serve the API with several worker processes."
+    )
+    parser.add_argument(
+        "--app",
+        "-a",
+        dest="app",
+        default="api.main:app",
+        help="Import string of the app of type '<module>:<attribute>'.",
+    )
+    parser.add_argument(
+        "--host",
+        dest="host",
+        default="127.0.0.1",
+        help="Host to bind the socket to.",
+    )
+    parser.add_argument(
+        "--port",
+        "-p",
+        dest="port",
+        type=int,
+        default=8000,
+        help="Port to bind the socket to.",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        dest="workers",
+        type=int,
+        default=int(os.getenv("WORKERS", "1")),
+        help="Number of worker processes.",
+    )
+    parser.add_argument(
+        "--no-preload",
+        dest="preload",
+        action="store_false",
+        help="Import the app in every worker instead of once in the parent process.",
+    )
+    parser.add_argument(
+        "--preload-hook",
+        dest="preload_hook",
+        default=os.getenv("PRELOAD_HOOK"),
+        help="Import string of a function to call in the parent process after importing the app.",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        dest="graceful_timeout",
+        type=float,
+        default=30,
+        help="Time in seconds workers get to finish their requests before they are killed.",
+    )
+    parser.add_argument(
+        "--log-level",
+        dest="log_level",
+        default="info",
+        help="Log level of uvicorn.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(
+        app=args.app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        preload=args.preload,
+        preload_hook=args.preload_hook,
+        graceful_timeout=args.graceful_timeout,
+        log_level=args.log_level,
+    )
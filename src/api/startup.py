@@ -0,0 +1,108 @@
+""" Deferred loading and warm-up of the heavy dependencies, model and labels of the API """
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from api.metrics import STARTUP_DURATION
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+
+class Startup:
+    """
+    Loads and warms up everything the requests need once. Servers start the loading in the background on startup,
+    so they answer liveness probes right away, while requests wait until the loading finished. Loading in the
+    parent process of a pre-fork server before forking shares the loaded state with all workers.
+    Args:
+        load (Callable[[], Any]): Function importing and loading everything the requests need. Its result is
+            returned to the waiting requests.
+        warm_up (Callable[[Any], None]): Function warming up the result of `load`, e.g. with a prediction.
+    """
+
+    def __init__(self, load: Callable[[], Any], warm_up: Callable[[Any], None]):
+        self.load = load
+        self.warm_up = warm_up
+        self.status = "not_started"
+        self.error: Optional[str] = None
+        self._result: Any = None
+        self._lock = threading.Lock()
+        self._future: Optional[asyncio.Future] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether loading and warm-up finished successfully"""
+        return self.status == "ready"
+
+    def run(self) -> Any:
+        """
+        Loads and warms up in the calling thread, unless this happened already.
+
+        Returns:
+            The result of `load`.
+
+        Raises:
+            RuntimeError: If loading or warm-up failed.
+        """
+        with self._lock:
+            if self.status == "not_started":
+                self.status = "loading"
+                try:
+                    started_at = time.perf_counter()
+                    result = self.load()
+                    loaded_at = time.perf_counter()
+                    self.warm_up(result)
+                except Exception as error:
+                    self.status, self.error = (
+                        "failed",
+                        f"{type(error).__name__}: {error}",
+                    )
+                    logger.exception("Loading the API failed.")
+                    raise RuntimeError(self.error) from error
+                STARTUP_DURATION.labels(phase="load").set(loaded_at - started_at)
+                STARTUP_DURATION.labels(phase="warm_up").set(
+                    time.perf_counter() - loaded_at
+                )
+                logger.info(
+                    "Loaded the API in %.2f s and warmed it up in %.2f s.",
+                    loaded_at - started_at,
+                    time.perf_counter() - loaded_at,
+                )
+                self._result, self.status = result, "ready"
+            if self.status == "failed":
+                raise RuntimeError(self.error)
+            return self._result
+
+    def start(self) -> None:
+        """
+        Starts loading in the default executor of the running event loop, unless it is loading already.
+
+        Returns:
+            None.
+        """
+        loop = asyncio.get_running_loop()
+        if self._future is None or self._future.get_loop() is not loop:
+            self._future = loop.run_in_executor(None, self.run)
+            # Marks failures as retrieved, they are raised in the waiting requests
+            self._future.add_done_callback(
+                lambda future: future.cancelled() or future.exception()
+            )
+
+    async def wait(self) -> Any:
+        """
+        Waits until loading and warm-up finished and starts them if no server did.
+
+        Returns:
+            The result of `load`.
+
+        Raises:
+            RuntimeError: If loading or warm-up failed.
+        """
+        if self.status == "ready":
+            return self._result
+        self.start()
+        # Shielded, so a cancelled request does not cancel the loading other requests wait for
+        return await asyncio.shield(self._future)
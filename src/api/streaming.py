@@ -0,0 +1,191 @@
+""" Chunked scoring of NDJSON request bodies streamed to NDJSON responses """
+import json
+import os
+import logging
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, List, Union
+
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import StreamingResponse
+
+from utils.request_models import RequestInputInference, RequestOutput
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MAX_LINE_BYTES = 64 * 1024
+MAX_ERROR_CHARS = 1000
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    Streaming response whose body iterator reads the request body while the response is sent.
+    ``StreamingResponse`` listens for disconnects by receiving messages concurrently to the body iterator,
+    which would swallow the request body. The body iterator has to detect disconnects instead.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int = MAX_LINE_BYTES
+) -> AsyncIterator[bytes]:
+    """
+    Splits a stream of bytes into lines.
+    Args:
+        chunks (AsyncIterable[bytes]): Stream of bytes.
+        max_line_bytes (int, optional): Maximum length of a line. Defaults to 64 KiB.
+
+    Returns:
+        Iterator over the lines without line breaks.
+
+    Raises:
+        ValueError: If a line exceeds the maximum length.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        start = 0
+        end = chunk.find(b"\n")
+        while end != -1:
+            buffer += chunk[start:end]
+            _check_line_length(buffer, max_line_bytes)
+            yield bytes(buffer)
+            buffer.clear()
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        buffer += chunk[start:]
+        _check_line_length(buffer, max_line_bytes)
+    if buffer:
+        yield bytes(buffer)
+
+
+def _check_line_length(line: bytearray, max_line_bytes: int) -> None:
+    """Raises if the line exceeds the maximum length"""
+    if len(line) > max_line_bytes:
+        raise ValueError(f"Line exceeds the maximum of {max_line_bytes} bytes.")
+
+
+def parse_row(line: bytes) -> Union[RequestInputInference, str]:
+    """
+    Parses a line to a request row.
+    Args:
+        line (bytes): JSON object of the row.
+
+    Returns:
+        The parsed row or the error message if the line is invalid.
+    """
+    try:
+        return RequestInputInference.parse_raw(line)
+    except ValidationError as error:
+        return _one_line(str(error))
+
+
+async def score_ndjson(
+    request: Request,
+    predict_rows: Callable[
+        [List[RequestInputInference]], Awaitable[List[RequestOutput]]
+    ],
+    chunk_rows: int = 1000,
+    **kwargs,
+) -> AsyncIterator[bytes]:
+    """
+    Reads the NDJSON request body in chunks of rows and yields the predictions of each chunk as NDJSON.
+    Every non-empty input line results in one output line in the same order: the prediction or, if the row is
+    invalid or fails to be predicted, an object with the error message. Rows of a failed chunk are retried in
+    smaller groups, so one failing row doesn't fail the valid rows of its chunk. At most one chunk is held in
+    memory and scoring stops once the client disconnects.
+    Args:
+        request (``starlette.requests.Request``): Request with the NDJSON body.
+        predict_rows (Callable): Coroutine function to calculate the predictions of a list of rows.
+        chunk_rows (int, optional): Number of rows to predict at once. Defaults to 1000.
+        **kwargs: Additional keyword arguments:
+            - max_line_bytes (int): Maximum length of a line. Defaults to 64 KiB.
+            - on_rows (Callable[[int], None]): Called with the number of rows of each chunk.
+
+    Returns:
+        Iterator over the NDJSON lines of each chunk.
+    """
+    chunk: List[Union[RequestInputInference, str]] = []
+    rows = 0
+    try:
+        lines = iter_lines(
+            request.stream(), kwargs.get("max_line_bytes", MAX_LINE_BYTES)
+        )
+        async for line in lines:
+            if not line.strip():
+                continue
+            chunk.append(parse_row(line))
+            if len(chunk) >= chunk_rows:
+                yield await _score_chunk(chunk, predict_rows, kwargs.get("on_rows"))
+                rows += len(chunk)
+                chunk = []
+        if chunk and not await request.is_disconnected():
+            yield await _score_chunk(chunk, predict_rows, kwargs.get("on_rows"))
+            rows += len(chunk)
+    except ClientDisconnect:
+        logger.info("Client disconnected, stopped scoring after %d rows.", rows)
+    except ValueError as error:
+        logger.warning("Stopped scoring after %d rows. Reason: %s", rows, error)
+        yield _error_line(str(error))
+
+
+async def _score_chunk(
+    chunk: List[Union[RequestInputInference, str]],
+    predict_rows: Callable[
+        [List[RequestInputInference]], Awaitable[List[RequestOutput]]
+    ],
+    on_rows: Callable[[int], None] = None,
+) -> bytes:
+    """Predicts the valid rows of the chunk and returns the NDJSON lines of all rows"""
+    valid_rows = [row for row in chunk if isinstance(row, RequestInputInference)]
+    if on_rows is not None:
+        on_rows(len(chunk))
+    outputs = iter(await _predict_isolated(valid_rows, predict_rows))
+    lines = []
+    for row in chunk:
+        output = row if isinstance(row, str) else next(outputs)
+        if isinstance(output, str):
+            lines.append(_error_line(output))
+        else:
+            lines.append(output.json().encode() + b"\n")
+    return b"".join(lines)
+
+
+async def _predict_isolated(
+    rows: List[RequestInputInference],
+    predict_rows: Callable[
+        [List[RequestInputInference]], Awaitable[List[RequestOutput]]
+    ],
+) -> List[Union[RequestOutput, str]]:
+    """
+    Predicts the rows at once. If that fails, the rows are split in halves which are predicted separately, so
+    only the rows which fail on their own get the error message instead of their prediction. A few invalid rows
+    among n cost about log2(n) additional predictions each.
+    """
+    if not rows:
+        return []
+    try:
+        return list(await predict_rows(rows))
+    except Exception as error:  # pylint: disable=broad-except
+        if len(rows) == 1:
+            logger.warning("Scoring a row failed. Reason: %s", error)
+            return [_one_line(str(error))]
+    middle = len(rows) // 2
+    first = await _predict_isolated(rows[:middle], predict_rows)
+    return first + await _predict_isolated(rows[middle:], predict_rows)
+
+
+def _one_line(message: str) -> str:
+    """Joins the lines of an error message and shortens it"""
+    return " ".join(message.split())[:MAX_ERROR_CHARS]
+
+
+def _error_line(message: str) -> bytes:
+    """Returns the NDJSON line of an error"""
+    return json.dumps({"error": message}).encode() + b"\n"
@@ -0,0 +1,152 @@
+""" Budget of the CPU threads the predictions and the request threads of the API may use """
+import contextlib
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from api.metrics import INFERENCE_THREADS
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+# Threads which run the synchronous endpoints and the preprocessing of each service, unset keeps anyio's 40
+REQUEST_THREADS = int(os.getenv("REQUEST_THREADS", "0")) or None
+
+# joblib and threadpoolctl are imported once predictions run, so importing the API does not wait for them
+# pylint: disable=import-outside-toplevel
+
+
+def available_cpus() -> int:
+    """Returns the number of CPUs the process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ThreadBudget:
+    """
+    Owns the threads the predictions of a process may use. Each prediction reserves threads for its duration:
+    batches smaller than `parallel_min_rows` are predicted single-threaded, larger batches get a thread per
+    `parallel_min_rows` rows as long as the budget has free threads. Predictions wait while all threads are
+    reserved. The reservation is applied as thread-local joblib backend, so concurrent predictions of the same
+    estimator use their own number of jobs. The thread pools of native libraries like OpenBLAS and OpenMP are capped
+    at `native_threads`, as the parallelism comes from the requests and the reserved threads instead.
+    Args:
+        threads (int): Threads all concurrent predictions may use together.
+        parallel_min_rows (int, optional): Rows per thread of parallel predictions. Defaults to 1024.
+        native_threads (int, optional): Maximum number of threads of the native thread pools. Defaults to 1.
+    """
+
+    def __init__(
+        self, threads: int, parallel_min_rows: int = 1024, native_threads: int = 1
+    ):
+        self.threads = max(1, threads)
+        self.parallel_min_rows = max(1, parallel_min_rows)
+        self.native_threads = native_threads
+        self._in_use = 0
+        self._released = threading.Condition()
+        self._native_limits: Optional[Any] = None
+        self._gauges = {
+            state: INFERENCE_THREADS.labels(state=state)
+            for state in ("budget", "in_use")
+        }
+        self._gauges["budget"].set(self.threads)
+
+    @property
+    def in_use(self) -> int:
+        """Number of threads reserved by the running predictions"""
+        return self._in_use
+
+    @contextlib.contextmanager
+    def reserve(self, rows: int) -> Iterator[int]:
+        """
+        Reserves the threads of a prediction and lets joblib parallelize the prediction on them in this thread.
+        Estimators have to leave their number of jobs unset, see ``adopt``.
+        Args:
+            rows (int): Number of rows to predict.
+
+        Yields:
+            The number of reserved threads, at least 1 for the calling thread once a thread is free.
+        """
+        from joblib import parallel_backend
+
+        threads = self._acquire(rows)
+        try:
+            with parallel_backend("threading", n_jobs=threads):
+                yield threads
+        finally:
+            self._release(threads)
+
+    @staticmethod
+    def adopt(estimator: Any) -> None:
+        """
+        Unsets the number of jobs of an estimator and its nested estimators, so the reservations decide it.
+        Args:
+            estimator (Any): sklearn estimator.
+
+        Returns:
+            None.
+        """
+        if not hasattr(estimator, "get_params"):
+            return
+        params = {
+            name: None
+            for name in estimator.get_params(deep=True)
+            if name == "n_jobs" or name.endswith("__n_jobs")
+        }
+        if params:
+            estimator.set_params(**params)
+
+    def limit_native_threads(self) -> None:
+        """Caps the thread pools of the native libraries loaded so far, e.g. after loading a model"""
+        from threadpoolctl import threadpool_limits
+
+        self._native_limits = threadpool_limits(limits=self.native_threads)
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Returns the budget and the threads in use.
+
+        Returns:
+            Dictionary of type {'budget': ..., 'in_use': ...}.
+        """
+        return {"budget": self.threads, "in_use": self._in_use}
+
+    def _acquire(self, rows: int) -> int:
+        """
+        Reserves a thread per `parallel_min_rows` rows, at least one and at most the free threads. Waits while
+        all threads are reserved, so concurrent predictions never use more threads than the budget.
+        """
+        with self._released:
+            self._released.wait_for(lambda: self._in_use < self.threads)
+            threads = max(1, rows // self.parallel_min_rows)
+            threads = min(threads, self.threads - self._in_use)
+            self._in_use += threads
+            self._gauges["in_use"].set(self._in_use)
+        return threads
+
+    def _release(self, threads: int) -> None:
+        """Returns reserved threads to the budget"""
+        with self._released:
+            self._in_use -= threads
+            self._gauges["in_use"].set(self._in_use)
+            self._released.notify_all()
+
+
+def limit_request_threads(threads: Optional[int] = REQUEST_THREADS) -> None:
+    """
+    Limits the number of threads which run synchronous endpoints and ``run_in_threadpool`` calls at the same time.
+    Has to be called from the event loop, e.g. in a startup event.
+    Args:
+        threads (int, optional): Maximum number of threads. Defaults to `REQUEST_THREADS`. None keeps the limit.
+
+    Returns:
+        None.
+    """
+    if threads is None:
+        return
+    import anyio.to_thread
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+    logger.info("Limited the request threads to %d.", threads)
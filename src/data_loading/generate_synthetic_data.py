@@ -0,0 +1,410 @@
+""" Module to generate synthetic survey data with the distributions of loaded raw data """
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import argparse
+import itertools
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loading.load_raw_data import KaggleRawDataLoader
+from preprocessing import kaggle_survey_mappings
+from utils import log
+from utils.data_io import write_data_chunks
+from utils.data_models import RawInputSchema, ValidationMode
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+# Columns drawn from their marginal distribution
+MARGINAL_COLUMNS = ("Gender", "City", "Company_Size", "Company_Type")
+# Spellings the cleaning maps to the same value, of type {'column': {'lowered value': ['spelling', ...], ...}, ...}
+SPELLING_VARIANTS: Dict[str, Dict[str, List[str]]] = {}
+for _column, _mapping in (
+    ("Gender", kaggle_survey_mappings.GENDER_MAPPING),
+    ("City", kaggle_survey_mappings.CITY_MAPPING),
+    ("Position", kaggle_survey_mappings.POSITION_MAPPING),
+    ("Seniority", kaggle_survey_mappings.SENIORITY_MAPPING),
+    ("Company_Type", kaggle_survey_mappings.COMPANY_TYPE_MAPPING),
+    ("Company_Size", kaggle_survey_mappings.COMPANY_SIZE_MAPPING),
+):
+    for _spelling, _value in _mapping.items():
+        SPELLING_VARIANTS.setdefault(_column, {}).setdefault(_value.lower(), []).append(
+            _spelling
+        )
+
+
+class Categorical(NamedTuple):
+    """Distribution of the values of a column, including missing values as None"""
+
+    values: np.ndarray
+    probabilities: np.ndarray
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> "Categorical":
+        """Learns the frequency of each value of the series"""
+        frequencies = series.astype(object).value_counts(dropna=False, normalize=True)
+        values = np.array(
+            [None if pd.isna(value) else value for value in frequencies.index],
+            dtype=object,
+        )
+        return cls(values=values, probabilities=frequencies.to_numpy())
+
+    def sample_codes(self, rng: np.random.Generator, n_rows: int) -> np.ndarray:
+        """Draws the indices of the values of `n_rows` rows"""
+        return rng.choice(len(self.values), size=n_rows, p=self.probabilities)
+
+
+class SalaryDistribution(NamedTuple):
+    """Log-normal salary distribution of a group of rows"""
+
+    mean_log: float
+    std_log: float
+
+    @classmethod
+    def from_series(cls, salary: pd.Series) -> "SalaryDistribution":
+        """Fits the distribution to the positive salaries of the group"""
+        logs = np.log(salary[salary > 0].to_numpy(dtype=float))
+        return cls(
+            mean_log=float(logs.mean()) if len(logs) else 0.0,
+            std_log=float(logs.std()) if len(logs) > 1 else 0.0,
+        )
+
+
+class SeniorityGroup(NamedTuple):
+    """Distributions of the columns which depend on the seniority, learned from the rows of one seniority level"""
+
+    positions: Categorical
+    salaries: List[SalaryDistribution]
+    experience_answers: np.ndarray
+    experience_years: np.ndarray
+
+
+def parse_experience(answers: pd.Series) -> pd.Series:
+    """Parses survey answers of the years of experience like the cleaning, answers which are no number become nan"""
+    replaced = answers.astype(object).where(answers.notna()).astype(str)
+    return pd.to_numeric(replaced.str.replace(",", ".", regex=False), errors="coerce")
+
+
+class SyntheticSurveyGenerator:
+    """
+    Generates any number of raw survey rows with the columns of ``utils.data_models.RawInputSchema`` and the
+    distributions of loaded raw data:
+        - `Gender`, `City`, `Company_Size`, `Company_Type` and `Timestamp` are drawn from their marginal distribution
+        - `Seniority` is drawn from its marginal distribution, `Position` and `Years_of_Experience` given the seniority
+        - `Age` is the drawn experience plus the difference of age and experience of a random loaded row
+        - `Salary_Yearly` is drawn log-normally per seniority and position, or per seniority for rare positions
+    The answers keep the spellings of the loaded data. On top, a share `messiness` of the rows gets the seniority
+    inside the position name, half years of experience with a comma decimal and spelling variants the cleaning
+    maps back, so generated data exercises the cleaning like real answers.
+    Args:
+        data (pd.DataFrame): Loaded raw data to learn the distributions from.
+        min_group_rows (int, optional): Minimum number of rows of a seniority and position to learn its own salary
+            distribution. Defaults to 20.
+        messiness (float, optional): Share of the rows and columns which get messy answers. Defaults to 0.05.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self, data: pd.DataFrame, min_group_rows: int = 20, messiness: float = 0.05
+    ):
+        data = RawInputSchema.validate_data(data, ValidationMode.COMPILED)
+        if data.empty:
+            raise ValueError("Learning the distributions requires at least one row.")
+        self.messiness = messiness
+        self.min_group_rows = min_group_rows
+        self.timestamps = data["Timestamp"].to_numpy()
+        self.marginals = {
+            column: Categorical.from_series(data[column]) for column in MARGINAL_COLUMNS
+        }
+        self.seniority = Categorical.from_series(data["Seniority"])
+        experience_years = parse_experience(data["Years_of_Experience"])
+        self.age_offsets = (data["Age"] - experience_years).dropna().to_numpy()
+        self.ages = data["Age"].dropna().to_numpy()
+        self.age_missing = float(data["Age"].isna().mean())
+        salary = (
+            data["Salary_Yearly"] if "Salary_Yearly" in data else pd.Series(dtype=float)
+        )
+        self.salary_missing = float(salary.isna().mean()) if len(salary) else 1.0
+        overall_salary = SalaryDistribution.from_series(salary.dropna())
+        self.groups: List[SeniorityGroup] = []
+        seniority = data["Seniority"].astype(object)
+        for level in self.seniority.values:
+            rows = seniority.isna() if level is None else seniority == level
+            group = data[rows.to_numpy()]
+            group_salary = self._group_salary(group, group.index, overall_salary)
+            positions = Categorical.from_series(group["Position"])
+            self.groups.append(
+                SeniorityGroup(
+                    positions=positions,
+                    salaries=[
+                        self._position_salary(group, position, group_salary)
+                        for position in positions.values
+                    ],
+                    experience_answers=group["Years_of_Experience"]
+                    .astype(object)
+                    .to_numpy(),
+                    experience_years=experience_years[rows.to_numpy()].to_numpy(),
+                )
+            )
+        logger.info(
+            "Learned the distributions of %d rows with %d seniority levels.",
+            len(data),
+            len(self.groups),
+        )
+
+    def _position_salary(
+        self, group: pd.DataFrame, position: Optional[str], fallback: SalaryDistribution
+    ) -> SalaryDistribution:
+        """Fits the salary of a position within a seniority level"""
+        positions = group["Position"].astype(object)
+        rows = positions.isna() if position is None else positions == position
+        return self._group_salary(group, group.index[rows.to_numpy()], fallback)
+
+    def _group_salary(
+        self, data: pd.DataFrame, rows: pd.Index, fallback: SalaryDistribution
+    ) -> SalaryDistribution:
+        """Fits the salary of the rows, if at least `min_group_rows` of them have a salary"""
+        if "Salary_Yearly" not in data:
+            return fallback
+        salary = data.loc[rows, "Salary_Yearly"].dropna()
+        if len(salary) < self.min_group_rows:
+            return fallback
+        return SalaryDistribution.from_series(salary)
+
+    def generate(
+        self, n_rows: int, chunk_rows: int = 100000, seed: int = 0
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Generates rows chunk by chunk, so any number of rows can be written without holding them in memory.
+        Args:
+            n_rows (int): Number of rows to generate.
+            chunk_rows (int, optional): Number of rows per chunk. Defaults to 100000.
+            seed (int, optional): Seed of the random generator. Defaults to 0.
+
+        Returns:
+            Iterator over the chunks, which conform to ``utils.data_models.RawInputSchema``. The index of each chunk
+            continues the index of the previous chunk.
+        """
+        rng = np.random.default_rng(seed)
+        for start in range(0, n_rows, chunk_rows):
+            chunk = self._generate_chunk(rng, min(chunk_rows, n_rows - start))
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            yield RawInputSchema.validate_data(chunk, ValidationMode.COMPILED)
+
+    def _generate_chunk(self, rng: np.random.Generator, n_rows: int) -> pd.DataFrame:
+        """Draws the rows of a chunk"""
+        data = {
+            "Timestamp": self.timestamps[rng.integers(0, len(self.timestamps), n_rows)]
+        }
+        for column, distribution in self.marginals.items():
+            data[column] = distribution.values[distribution.sample_codes(rng, n_rows)]
+        seniority_codes = self.seniority.sample_codes(rng, n_rows)
+        data["Seniority"] = self.seniority.values[seniority_codes]
+        data.update(self._draw_by_seniority(rng, seniority_codes))
+        return self._add_messy_answers(rng, pd.DataFrame(data))
+
+    def _draw_by_seniority(
+        self, rng: np.random.Generator, seniority_codes: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Draws the position, experience, age and salary of the rows given their seniority"""
+        n_rows = len(seniority_codes)
+        positions = np.empty(n_rows, dtype=object)
+        experience = np.empty(n_rows, dtype=object)
+        years = np.full(n_rows, np.nan)
+        salary = np.empty(n_rows)
+        for code, group in enumerate(self.groups):
+            rows = np.flatnonzero(seniority_codes == code)
+            position_codes = group.positions.sample_codes(rng, len(rows))
+            positions[rows] = group.positions.values[position_codes]
+            answers = rng.integers(0, len(group.experience_answers), len(rows))
+            experience[rows] = group.experience_answers[answers]
+            years[rows] = group.experience_years[answers]
+            log_salary = np.array(group.salaries).reshape(-1, 2)[position_codes]
+            salary[rows] = np.exp(rng.normal(log_salary[:, 0], log_salary[:, 1]))
+        salary = np.round(salary, -2)
+        salary[rng.random(n_rows) < self.salary_missing] = np.nan
+        return {
+            "Position": positions,
+            "Years_of_Experience": experience,
+            "Age": self._draw_age(rng, years),
+            "Salary_Yearly": salary,
+        }
+
+    def _draw_age(self, rng: np.random.Generator, years: np.ndarray) -> np.ndarray:
+        """Draws the age as the experience plus a loaded difference of age and experience"""
+        n_rows = len(years)
+        if len(self.age_offsets):
+            age = (
+                years + self.age_offsets[rng.integers(0, len(self.age_offsets), n_rows)]
+            )
+        else:
+            age = np.full(n_rows, np.nan)
+        without_experience = np.isnan(age)
+        if len(self.ages):
+            age[without_experience] = self.ages[
+                rng.integers(0, len(self.ages), int(without_experience.sum()))
+            ]
+        age = np.round(age)
+        age[rng.random(n_rows) < self.age_missing] = np.nan
+        return age
+
+    def _add_messy_answers(
+        self, rng: np.random.Generator, chunk: pd.DataFrame
+    ) -> pd.DataFrame:
+        """Adds the seniority to position names, comma decimals and spelling variants to a share of the rows"""
+        if self.messiness <= 0:
+            return chunk
+        experience = parse_experience(chunk["Years_of_Experience"])
+        rows = self._messy_rows(rng, chunk) & (experience % 1 == 0)
+        chunk.loc[rows, "Years_of_Experience"] = (
+            experience[rows].astype(int).astype(str) + ",5"
+        )
+        for column, variants in SPELLING_VARIANTS.items():
+            rows = self._messy_rows(rng, chunk) & chunk[column].notna()
+            chunk.loc[rows, column] = [
+                self._spelling(rng, value, variants)
+                for value in chunk.loc[rows, column]
+            ]
+        # The cleaning removes the seniority as answered, so it is added after its spelling is drawn
+        position, seniority = chunk["Position"], chunk["Seniority"]
+        rows = self._messy_rows(rng, chunk) & position.notna() & seniority.notna()
+        chunk.loc[rows, "Position"] = seniority[rows] + " " + position[rows]
+        return chunk
+
+    def _messy_rows(self, rng: np.random.Generator, chunk: pd.DataFrame) -> pd.Series:
+        """Draws the rows of a chunk, which get a messy answer"""
+        return pd.Series(rng.random(len(chunk)) < self.messiness, index=chunk.index)
+
+    @staticmethod
+    def _spelling(
+        rng: np.random.Generator, value: str, variants: Dict[str, List[str]]
+    ) -> str:
+        """Returns a spelling the cleaning maps to the value, or the value with other case and whitespace"""
+        spellings = variants.get(value.lower().strip())
+        if spellings:
+            return spellings[rng.integers(0, len(spellings))]
+        styles: Tuple[str, ...] = (value.lower(), value.upper(), f" {value} ")
+        return styles[rng.integers(0, len(styles))]
+
+
+def main(input_paths: List[str], output_path: str, n_rows: int, **kwargs) -> int:
+    """
+    Learns the distributions of the raw data and writes synthetic rows to parquet files chunk by chunk.
+    Args:
+        input_paths (List[str]): Paths of the raw survey files or of the loaded raw data.
+        output_path (str): Path with file ending `.parquet` to store the generated rows. With `rows_per_file`, the
+            files get the suffixes `-00000`, `-00001`, ... before the file ending.
+        n_rows (int): Number of rows to generate.
+        **kwargs: Additional keyword arguments:
+            - chunk_rows (int): Number of rows per chunk and parquet row group. Defaults to 100000.
+            - rows_per_file (int): Number of rows per file. Defaults to None, which writes one file.
+            - seed (int): Seed of the random generator. Defaults to 0.
+            - messiness (float): Share of messy answers. Defaults to 0.05.
+            - min_group_rows (int): Minimum number of rows of a seniority and position to learn its own salary
+              distribution. Defaults to 20.
+
+    Returns:
+        Number of written rows.
+    """
+    generator = SyntheticSurveyGenerator(
+        KaggleRawDataLoader(input_paths=input_paths).load(),
+        min_group_rows=kwargs.get("min_group_rows", 20),
+        messiness=kwargs.get("messiness", 0.05),
+    )
+    chunk_rows = kwargs.get("chunk_rows", 100000)
+    rows_per_file = kwargs.get("rows_per_file")
+    if rows_per_file is not None:
+        chunk_rows = min(chunk_rows, rows_per_file)
+        if rows_per_file % chunk_rows:
+            raise ValueError(
+                "The rows per file have to be a multiple of the chunk rows."
+            )
+    chunks = generator.generate(
+        n_rows, chunk_rows=chunk_rows, seed=kwargs.get("seed", 0)
+    )
+    if rows_per_file is None:
+        return write_data_chunks(chunks, output_path)
+    path = Path(output_path)
+    written = 0
+    for index, start in enumerate(range(0, n_rows, rows_per_file)):
+        file_chunks = itertools.islice(
+            chunks, -(-min(rows_per_file, n_rows - start) // chunk_rows)
+        )
+        written += write_data_chunks(
+            file_chunks, str(path.with_name(f"{path.stem}-{index:05d}{path.suffix}"))
+        )
+    return written
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to generate synthetic survey data."
+    )
+    parser.add_argument(
+        "--input-paths",
+        "-i",
+        dest="input_paths",
+        nargs="+",
+        required=True,
+        help="List of file paths to the kaggle survey data or the loaded raw data to learn from.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        required=True,
+        help="Path with file ending .parquet to store the generated data.",
+    )
+    parser.add_argument(
+        "--rows",
+        "-n",
+        dest="n_rows",
+        type=int,
+        required=True,
+        help="Number of rows to generate.",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        dest="chunk_rows",
+        type=int,
+        default=100000,
+        help="Number of rows generated and written at once.",
+    )
+    parser.add_argument(
+        "--rows-per-file",
+        dest="rows_per_file",
+        type=int,
+        default=None,
+        help="Number of rows per parquet file. By default all rows are written to one file.",
+    )
+    parser.add_argument(
+        "--seed",
+        dest="seed",
+        type=int,
+        default=0,
+        help="Seed of the random generator.",
+    )
+    parser.add_argument(
+        "--messiness",
+        dest="messiness",
+        type=float,
+        default=0.05,
+        help="Share of the rows and columns which get messy answers.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(
+        input_paths=args.input_paths,
+        output_path=args.output_path,
+        n_rows=args.n_rows,
+        chunk_rows=args.chunk_rows,
+        rows_per_file=args.rows_per_file,
+        seed=args.seed,
+        messiness=args.messiness,
+    )
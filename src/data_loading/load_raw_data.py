@@ -52,7 +52,7 @@ class KaggleRawDataLoader:
         """
         all_files = [self.rename_columns(read_data(file)) for file in self.input_paths]
         data = pd.concat(all_files, ignore_index=True, axis=0)
-        data = RawInputSchema.to_schema()(data)
+        data = RawInputSchema.validate_data(data)
         logger.info(
             "Read %d files with a total of %d records", len(self.input_paths), len(data)
         )
@@ -0,0 +1,246 @@
+""" Module to score large files of raw survey records offline with a trained model """
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+import argparse
+import gc
+import logging
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from modeling.sklearn_models import SKLearnModel
+from preprocessing.clean_features import KaggleFeatureCleaner
+from preprocessing.label_encoder import LabelEncoder
+from preprocessing.transform_features import KaggleFeatureTransformer
+from utils import log
+from utils.data_io import count_rows, read_data_chunks, write_data_chunks
+from utils.data_models import ExecutionMode
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+PREDICTION_COLUMN = "Salary_Yearly"
+ERROR_COLUMN = "error"
+MAX_ERROR_CHARS = 1000
+
+# Model and label encoder of the current process. Filled before forking, so forked workers share them.
+_STATE: Dict[str, object] = {}
+
+
+def load_state(model_path: str, labels_path: str) -> None:
+    """
+    Loads the model and the label encoder into the state of the current process, unless they are loaded already.
+    Args:
+        model_path (str): Path to the trained model.
+        labels_path (str): Path to the labels used during training.
+
+    Returns:
+        None.
+    """
+    if _STATE.get("paths") == (model_path, labels_path):
+        return
+    model = SKLearnModel()
+    model.load(filename=model_path)
+    _STATE.update(
+        paths=(model_path, labels_path),
+        model=model,
+        label_encoder=LabelEncoder.from_path(labels_path),
+    )
+
+
+def score_chunk(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans, transforms and predicts a chunk of raw records with the loaded state. If the chunk fails, e.g. because
+    of a record which violates the schema, it is split in halves which are scored separately, so only the records
+    failing on their own get no prediction.
+    Args:
+        data (pd.DataFrame): Raw records with the columns of ``utils.data_models.RawInputSchema``.
+
+    Returns:
+        The predictions and, for records which failed, the error message with the index of the records.
+        Failed records have a missing prediction, the other records a missing error.
+    """
+    try:
+        predictions = _predict(data)
+    except Exception as error:  # pylint: disable=broad-except
+        if len(data) == 1:
+            message = " ".join(str(error).split())[:MAX_ERROR_CHARS]
+            logger.warning(
+                "Scoring record %s failed. Reason: %s", data.index[0], message
+            )
+            return _scored(data.index, [np.nan], [message])
+        middle = len(data) // 2
+        return pd.concat(
+            [score_chunk(data.iloc[:middle]), score_chunk(data.iloc[middle:])]
+        )
+    return _scored(data.index, predictions, [None] * len(data))
+
+
+def _predict(data: pd.DataFrame) -> np.ndarray:
+    """Cleans, transforms and predicts raw records with the loaded state"""
+    cleaner = KaggleFeatureCleaner(data=data, mode=ExecutionMode.INFERENCE)
+    transformer = KaggleFeatureTransformer(
+        data=cleaner.execute(),
+        mode=ExecutionMode.INFERENCE,
+        label_encoder=_STATE["label_encoder"],
+    )
+    return _STATE["model"].predict(transformer.execute())
+
+
+def _scored(index: pd.Index, predictions, errors: List[Optional[str]]) -> pd.DataFrame:
+    """Returns the scored records with the same types, whether or not records failed"""
+    return pd.DataFrame(
+        {
+            PREDICTION_COLUMN: pd.Series(predictions, index=index, dtype=float),
+            ERROR_COLUMN: pd.Series(errors, index=index, dtype="string"),
+        }
+    )
+
+
+def _score_in_pool(
+    pool, chunks: Iterable[pd.DataFrame], max_pending: int
+) -> Iterator[pd.DataFrame]:
+    """Scores the chunks in the pool and yields the results in order with a bounded number of pending chunks"""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(score_chunk, (chunk,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _log_progress(
+    chunks: Iterator[pd.DataFrame], total_rows: Optional[int]
+) -> Iterator[pd.DataFrame]:
+    """Passes the scored chunks through and logs the progress and throughput"""
+    started_at, rows, failed = time.perf_counter(), 0, 0
+    for chunk in chunks:
+        rows += len(chunk)
+        failed += int(chunk[ERROR_COLUMN].notna().sum())
+        elapsed = time.perf_counter() - started_at
+        logger.info(
+            "Scored %d%s rows in %.1f s (%.0f rows/s), %d rows failed.",
+            rows,
+            f"/{total_rows}" if total_rows else "",
+            elapsed,
+            rows / elapsed if elapsed > 0 else 0,
+            failed,
+        )
+        yield chunk
+
+
+def main(
+    data_path: str, model_path: str, labels_path: str, output_path: str, **kwargs
+) -> int:
+    """
+    Scores all records of a parquet or csv file in chunks across a pool of worker processes and writes the
+    predictions in the order of the records to a parquet file. Records which fail to be scored get a missing
+    prediction and their error message in the column `error`.
+    Args:
+        data_path (str): Path to the parquet or csv file with raw records.
+        model_path (str): Path to the trained model.
+        labels_path (str): Path to the labels used during training.
+        output_path (str): Path with file ending `.parquet` to store the predictions.
+        **kwargs: Additional keyword arguments:
+            - workers (int): Number of worker processes. Defaults to the number of cores.
+            - chunk_rows (int): Number of records per chunk. Parquet files are read by row group if not given.
+              Defaults to 100000 for csv files.
+
+    Returns:
+        Number of scored records.
+    """
+    workers = kwargs.get("workers") or os.cpu_count() or 1
+    chunk_rows = kwargs.get("chunk_rows")
+    if chunk_rows is None and not str(data_path).endswith(".parquet"):
+        chunk_rows = 100000
+    chunks = read_data_chunks(filepath=data_path, chunk_rows=chunk_rows)
+    load_state(model_path=model_path, labels_path=labels_path)
+    total_rows = count_rows(data_path)
+    if workers == 1:
+        return write_data_chunks(
+            _log_progress(map(score_chunk, chunks), total_rows), filepath=output_path
+        )
+    # Forked workers share the state loaded above, other start methods load it in the initializer
+    context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    )
+    gc.freeze()
+    try:
+        with context.Pool(
+            processes=workers,
+            initializer=load_state,
+            initargs=(model_path, labels_path),
+        ) as pool:
+            scored = _score_in_pool(pool, chunks, max_pending=2 * workers)
+            return write_data_chunks(
+                _log_progress(scored, total_rows), filepath=output_path
+            )
+    finally:
+        gc.unfreeze()
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to score a file of raw records with a trained model."
+    )
+    parser.add_argument(
+        "--data-path",
+        "-d",
+        dest="data_path",
+        required=True,
+        help="Path to the parquet or csv file with raw records.",
+    )
+    parser.add_argument(
+        "--model-path",
+        "-m",
+        dest="model_path",
+        default="artefacts/model.joblib",
+        help="Path to the trained model.",
+    )
+    parser.add_argument(
+        "--labels-path",
+        "-l",
+        dest="labels_path",
+        default="artefacts/labels.json",
+        help="Path to the labels used during training.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        required=True,
+        help="Path with file ending '.parquet' to store the predictions.",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        dest="workers",
+        type=int,
+        default=None,
+        help="Number of worker processes. Defaults to the number of cores.",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        "-c",
+        dest="chunk_rows",
+        type=int,
+        default=None,
+        help="Number of records per chunk. Parquet files are read by row group if not given.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(
+        data_path=args.data_path,
+        model_path=args.model_path,
+        labels_path=args.labels_path,
+        output_path=args.output_path,
+        workers=args.workers,
+        chunk_rows=args.chunk_rows,
+    )
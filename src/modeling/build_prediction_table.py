@@ -0,0 +1,262 @@
+""" Module to precompute the predictions of frequent feature vectors into a memory-mappable lookup table """
+from typing import Dict, List, Optional, Tuple
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from modeling.prediction_table import PredictionTable, file_digest
+from modeling.sklearn_models import SKLearnModel
+from utils import log
+from utils.data_io import read_data, write_data
+from utils.data_models import TransformedFeaturesSchema
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+FEATURE_COLUMNS = list(TransformedFeaturesSchema.get_column_names())
+
+# Number of feature vectors predicted at once
+PREDICTION_CHUNK_ROWS = 100000
+
+
+def to_feature_matrix(data: pd.DataFrame) -> np.ndarray:
+    """
+    Converts transformed features to the canonical float32 matrix the prediction table is keyed on.
+    Args:
+        data (pd.DataFrame): Transformed features with the columns of ``utils.data_models.TransformedFeaturesSchema``.
+
+    Returns:
+        Array of shape (n_rows, n_features) with NaN for missing values.
+    """
+    return PredictionTable.canonical(
+        data[FEATURE_COLUMNS].to_numpy(dtype=np.float32, na_value=np.nan)
+    )
+
+
+def frequent_combinations(
+    features: np.ndarray, top_k: Optional[int] = None, years: Optional[List[int]] = None
+) -> np.ndarray:
+    """
+    Selects the most frequent distinct feature vectors.
+    Args:
+        features (np.ndarray): Canonical feature matrix in the column order of
+            ``utils.data_models.TransformedFeaturesSchema``.
+        top_k (int, optional): Number of vectors to select. Defaults to all distinct vectors.
+        years (List[int], optional): Years to combine the selected vectors with instead of their observed year.
+            Combinations are counted without the year then. Defaults to None.
+
+    Returns:
+        Distinct feature vectors ordered by descending frequency and first occurrence.
+    """
+    year_column = FEATURE_COLUMNS.index("Year")
+    if years:
+        features = features.copy()
+        features[:, year_column] = 0
+    words = features.view(np.uint32)
+    _, first, counts = np.unique(words, axis=0, return_index=True, return_counts=True)
+    # Most frequent first, ties in the order of their first occurrence
+    order = np.lexsort((first, -counts))[:top_k]
+    combinations = features[first[order]]
+    if not years:
+        return combinations
+    combinations = np.repeat(combinations[np.newaxis], len(years), axis=0)
+    combinations[:, :, year_column] = np.asarray(years, dtype=np.float32)[:, None]
+    return combinations.reshape(-1, len(FEATURE_COLUMNS))
+
+
+def split_holdout(
+    features: np.ndarray, fraction: float, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Randomly splits the rows of a feature matrix into rows to build the table from and held-out rows to measure its
+    hit rate on.
+    Args:
+        features (np.ndarray): Feature matrix.
+        fraction (float): Share of the rows to hold out.
+        seed (int, optional): Seed of the random split. Defaults to 0.
+
+    Returns:
+        The rows to build the table from and the held-out rows.
+    """
+    holdout = np.zeros(len(features), dtype=bool)
+    holdout[
+        np.random.default_rng(seed).permutation(len(features))[
+            : int(round(len(features) * fraction))
+        ]
+    ] = True
+    return features[~holdout], features[holdout]
+
+
+def main(feature_path: str, model_path: str, output_path: str, **kwargs) -> Dict:
+    """
+    Predicts the most frequent feature vectors with the model and stores them as prediction table. Reports the size
+    of the table and its hit rate, the share of the evaluation rows found in the table. The hit rate is never
+    measured on the rows the table is built from, which are always found.
+    Args:
+        feature_path (str): Path to the transformed features to select the feature vectors from.
+        model_path (str): Path to the trained model.
+        output_path (str): Path with file ending `.table` to store the prediction table.
+        **kwargs: Additional keyword arguments:
+            - top_k (int): Number of most frequent feature vectors to store. Defaults to all distinct vectors.
+            - years (List[int]): Years to combine the selected vectors with. Defaults to the observed years.
+            - holdout_fraction (float): Share of the rows of `feature_path` to hold out from building the table
+              and to calculate the hit rate for. Their year is replaced with the last of `years`, as live requests
+              carry the current year. Defaults to 0.
+            - evaluation_path (str): Path to transformed features to calculate the hit rate for instead of the
+              held-out rows, e.g. preprocessed requests of the API. Defaults to None.
+            - metrics_path (str): Path with file ending to store the report.
+
+    Returns:
+        The report with the number of rows, the file size in bytes and the hit rate of the table, which is None if
+        neither held-out rows nor an evaluation path are given.
+
+    Raises:
+        ValueError: If the evaluation path is the feature path.
+    """
+    evaluation_path = kwargs.get("evaluation_path")
+    if evaluation_path and os.path.realpath(evaluation_path) == os.path.realpath(
+        feature_path
+    ):
+        raise ValueError(
+            "The hit rate can't be measured on the rows the table is built from."
+        )
+    features, holdout = split_holdout(
+        to_feature_matrix(read_data(filepath=feature_path)),
+        fraction=kwargs.get("holdout_fraction") or 0.0,
+    )
+    combinations = frequent_combinations(
+        features, top_k=kwargs.get("top_k"), years=kwargs.get("years")
+    )
+    model = SKLearnModel()
+    model.load(filename=model_path)
+    predictions = np.concatenate(
+        [
+            model.predict(
+                pd.DataFrame(
+                    combinations[start : start + PREDICTION_CHUNK_ROWS],
+                    columns=FEATURE_COLUMNS,
+                )
+            )
+            for start in range(0, len(combinations), PREDICTION_CHUNK_ROWS)
+        ]
+    )
+    table = PredictionTable.from_predictions(
+        combinations,
+        predictions,
+        feature_names=FEATURE_COLUMNS,
+        model_digest=file_digest(model_path),
+    )
+    write_data(data=table.to_dict(), filepath=output_path)
+    if evaluation_path:
+        evaluation = to_feature_matrix(read_data(filepath=evaluation_path))
+    else:
+        evaluation = holdout
+        if kwargs.get("years"):
+            evaluation[:, FEATURE_COLUMNS.index("Year")] = kwargs["years"][-1]
+    report = {
+        "rows": len(table),
+        "bytes": os.path.getsize(output_path),
+        "max_probe": int(table.max_probe),
+        "evaluation_rows": len(evaluation),
+        "hit_rate": (
+            float(table.lookup(evaluation)[1].mean()) if len(evaluation) else None
+        ),
+    }
+    if report["hit_rate"] is None:
+        logger.warning(
+            "Hit rate not measured, as neither held-out rows nor an evaluation path are given."
+        )
+    logger.info(
+        "Stored prediction table with %d rows and %d bytes to %s. Hit rate: %s",
+        report["rows"],
+        report["bytes"],
+        output_path,
+        report["hit_rate"],
+    )
+    if kwargs.get("metrics_path"):
+        write_data(data=report, filepath=kwargs["metrics_path"])
+    return report
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to precompute the predictions of frequent feature vectors."
+    )
+    parser.add_argument(
+        "--input-feature-path",
+        "-f",
+        dest="input_feature_path",
+        required=True,
+        help="Path to the transformed features to select the feature vectors from.",
+    )
+    parser.add_argument(
+        "--model-path",
+        "-m",
+        dest="model_path",
+        required=True,
+        help="Path to the trained model to predict the feature vectors with.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        required=True,
+        help="Path with file ending '.table' to store the prediction table.",
+    )
+    parser.add_argument(
+        "--top-k",
+        "-k",
+        dest="top_k",
+        type=int,
+        default=None,
+        help="Number of most frequent feature vectors to store. Defaults to all.",
+    )
+    parser.add_argument(
+        "--years",
+        "-y",
+        dest="years",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Years to combine the feature vectors with. Defaults to the observed years.",
+    )
+    parser.add_argument(
+        "--holdout-fraction",
+        "-d",
+        dest="holdout_fraction",
+        type=float,
+        default=0.0,
+        help="Share of the rows to hold out from the table to calculate the hit rate for.",
+    )
+    parser.add_argument(
+        "--evaluation-path",
+        "-v",
+        dest="evaluation_path",
+        default=None,
+        help="Path to transformed features, e.g. of logged requests, to calculate the hit rate for.",
+    )
+    parser.add_argument(
+        "--metrics-path",
+        "-e",
+        dest="metrics_path",
+        default=None,
+        help="Path with file ending to store the size and hit rate of the table.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(
+        feature_path=args.input_feature_path,
+        model_path=args.model_path,
+        output_path=args.output_path,
+        top_k=args.top_k,
+        years=args.years,
+        holdout_fraction=args.holdout_fraction,
+        evaluation_path=args.evaluation_path,
+        metrics_path=args.metrics_path,
+    )
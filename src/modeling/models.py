@@ -27,7 +27,7 @@ class Model(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def predict(self, X: pd.DataFrame) -> np.ndarray:
+    def predict(self, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
         """Calculates predictions for the input data using the model."""
         raise NotImplementedError
 
@@ -0,0 +1,52 @@
+""" Module to convert a trained forest into the memory-mappable packed format """
+import logging
+import os
+import argparse
+
+from modeling.sklearn_models import SKLearnModel
+from utils import log
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+
+def main(model_path: str, output_path: str) -> None:
+    """
+    Loads a trained model and stores it as packed forest.
+    Args:
+        model_path (str): Path to the trained model.
+        output_path (str): Path with file ending `.forest` to store the packed forest.
+
+    Returns:
+        None.
+    """
+    model = SKLearnModel()
+    model.load(filename=model_path)
+    model.save(filename=output_path)
+    logger.info("Stored packed forest of %s to %s", model_path, output_path)
+
+
+if __name__ == "__main__":
+    log.setup_logger("default")
+    parser = argparse.ArgumentParser(
+        description="Arguments to convert a trained forest into the packed format."
+    )
+    parser.add_argument(
+        "--model-path",
+        "-m",
+        dest="model_path",
+        required=True,
+        help="Path to the trained model.",
+    )
+    parser.add_argument(
+        "--output-path",
+        "-o",
+        dest="output_path",
+        required=True,
+        help="Path with file ending '.forest' to store the packed forest.",
+    )
+
+    args = parser.parse_args()
+    logger.info("Read cli arguments: %s", args)
+
+    main(model_path=args.model_path, output_path=args.output_path)
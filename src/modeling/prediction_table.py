@@ -0,0 +1,257 @@
+""" Module containing the memory-mappable lookup table of precomputed predictions """
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from utils.data_io import read_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+# Maximum share of occupied slots of the hash table
+MAX_LOAD_FACTOR = 0.5
+
+_MIX_SHIFT = np.uint64(33)
+_MIX_PRIMES = (np.uint64(0xFF51AFD7ED558CCD), np.uint64(0xC4CEB9FE1A85EC53))
+
+
+class PredictionTable:
+    """
+    Open addressing hash table of the predictions of feature vectors stored in contiguous arrays.
+    The keys are the bits of the float32 feature vectors, so lookups find exactly the vectors the predictions were
+    calculated for. All rows are looked up at once with vectorized NumPy operations probing the slots linearly.
+    Args:
+        slots (np.ndarray): Index of the key in each slot of the hash table. `-1` for empty slots. The number of
+            slots has to be a power of two.
+        keys (np.ndarray): Float32 feature vectors of shape (n_keys, n_features).
+        values (np.ndarray): Prediction of each key.
+        max_probe (int): Maximum distance of a key from the slot of its hash.
+        feature_names (List[str], optional): Names of the features in the order of the keys. Defaults to None.
+        model_digest (str, optional): SHA-256 digest of the model file the predictions were calculated with.
+            Defaults to None.
+    """
+
+    # pylint: disable=too-many-arguments
+
+    def __init__(
+        self,
+        slots: np.ndarray,
+        keys: np.ndarray,
+        values: np.ndarray,
+        max_probe: int,
+        feature_names: Optional[List[str]] = None,
+        model_digest: Optional[str] = None,
+    ):
+        self.slots = slots
+        self.keys = keys
+        self.values = values
+        self.max_probe = max_probe
+        self.feature_names = feature_names
+        self.model_digest = model_digest
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_predictions(
+        cls, features: np.ndarray, predictions: np.ndarray, **kwargs
+    ) -> "PredictionTable":
+        """
+        Builds the hash table of distinct feature vectors and their predictions.
+        Args:
+            features (np.ndarray): Distinct feature vectors of shape (n_keys, n_features).
+            predictions (np.ndarray): Prediction of each feature vector.
+            **kwargs: Additional keyword arguments `feature_names` and `model_digest` stored with the table.
+
+        Returns:
+            The prediction table.
+
+        Raises:
+            ValueError: If feature vectors are not distinct.
+        """
+        keys = cls.canonical(features)
+        words = keys.view(np.uint32)
+        if len(np.unique(words, axis=0)) != len(words):
+            raise ValueError(
+                "Feature vectors of the prediction table have to be distinct."
+            )
+        n_slots = 1 << int(np.ceil(np.log2(max(len(keys) / MAX_LOAD_FACTOR, 2))))
+        slots = np.full(
+            n_slots, -1, dtype=np.int32 if len(keys) < 2**31 else np.int64
+        )
+        positions = (_hash(words) & np.uint64(n_slots - 1)).astype(np.int64)
+        pending = np.arange(len(keys))
+        probe = -1
+        while pending.size:
+            probe += 1
+            # Of all pending keys probing a free slot, the first one takes it and the others probe the next slot
+            free = pending[slots[positions[pending]] < 0]
+            taken_positions, first = np.unique(positions[free], return_index=True)
+            slots[taken_positions] = free[first]
+            pending = pending[slots[positions[pending]] != pending]
+            positions[pending] = (positions[pending] + 1) & (n_slots - 1)
+        return cls(
+            slots=slots,
+            keys=keys,
+            values=np.asarray(predictions, dtype=np.float64),
+            max_probe=max(probe, 0),
+            **kwargs,
+        )
+
+    def lookup(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Looks up the predictions of feature vectors.
+        Args:
+            features (np.ndarray): Feature vectors of shape (n_rows, n_features) in the order of the keys.
+
+        Returns:
+            Tuple of the predictions, which are NaN for vectors not in the table, and a boolean mask of the
+            vectors found in the table.
+        """
+        words = self.canonical(features).view(np.uint32)
+        key_words = self.keys.view(np.uint32)
+        mask = len(self.slots) - 1
+        positions = (_hash(words) & np.uint64(mask)).astype(np.int64)
+        indices = np.full(len(words), -1, dtype=np.int64)
+        active = np.arange(len(words))
+        for _ in range(self.max_probe + 1):
+            candidates = self.slots[positions[active]]
+            occupied = candidates >= 0
+            active, candidates = active[occupied], candidates[occupied]
+            matches = (key_words[candidates] == words[active]).all(axis=1)
+            indices[active[matches]] = candidates[matches]
+            active = active[~matches]
+            if not active.size:
+                break
+            positions[active] = (positions[active] + 1) & mask
+        found = indices >= 0
+        predictions = np.full(len(words), np.nan)
+        predictions[found] = self.values[indices[found]]
+        return predictions, found
+
+    @staticmethod
+    def canonical(features: np.ndarray) -> np.ndarray:
+        """
+        Converts feature vectors to contiguous float32 arrays with a single bit pattern for zero and for NaN.
+        Args:
+            features (np.ndarray): Feature vectors of shape (n_rows, n_features).
+
+        Returns:
+            The canonical feature vectors.
+        """
+        keys = np.array(features, dtype=np.float32, order="C", ndmin=2)
+        # Adding zero turns negative zeros into positive ones
+        keys += np.float32(0)
+        keys[np.isnan(keys)] = np.nan
+        return keys
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Converts the table to typed arrays and metadata, which can be written with ``utils.data_io.write_data`` to a
+        file with ending ``utils.data_models.FileEnding.TABLE``.
+
+        Returns:
+            Dictionary with the keys `metadata` and `arrays`.
+        """
+        return {
+            "metadata": {
+                "max_probe": int(self.max_probe),
+                "feature_names": self.feature_names,
+                "model_digest": self.model_digest,
+            },
+            "arrays": {"slots": self.slots, "keys": self.keys, "values": self.values},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PredictionTable":
+        """
+        Creates the table from the arrays and metadata of ``to_dict``. The arrays are used without copying,
+        so read-only memory-mapped arrays are shared with all processes mapping the same file.
+        Args:
+            data (Dict[str, Any]): Dictionary with the keys `metadata` and `arrays`.
+
+        Returns:
+            The prediction table.
+        """
+        metadata, arrays = data["metadata"], data["arrays"]
+        return cls(
+            slots=arrays["slots"],
+            keys=arrays["keys"],
+            values=arrays["values"],
+            max_probe=metadata["max_probe"],
+            feature_names=metadata["feature_names"],
+            model_digest=metadata["model_digest"],
+        )
+
+    @classmethod
+    def from_path(
+        cls, filepath: str, model_path: str, feature_names: List[str]
+    ) -> "PredictionTable":
+        """
+        Memory maps a stored table and checks that it belongs to the model and features.
+        Args:
+            filepath (str): Path to the table with file ending ``utils.data_models.FileEnding.TABLE``.
+            model_path (str): Path to the model the predictions have to be calculated with.
+            feature_names (List[str]): Names of the features in the order of the looked up vectors.
+
+        Returns:
+            The prediction table.
+
+        Raises:
+            ValueError: If the table was built with another model or other features.
+        """
+        table = cls.from_dict(read_data(filepath=filepath))
+        if table.feature_names != list(feature_names):
+            raise ValueError(
+                f"Prediction table {filepath} has features {table.feature_names} instead of {feature_names}."
+            )
+        if table.model_digest != file_digest(model_path):
+            raise ValueError(
+                f"Prediction table {filepath} was not built with the model {model_path}."
+            )
+        return table
+
+
+def file_digest(filepath: str) -> str:
+    """
+    Calculates the SHA-256 digest of a file.
+    Args:
+        filepath (str): Path to the file.
+
+    Returns:
+        The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _splitmix64(count: int) -> List[int]:
+    """Returns the first numbers of the SplitMix64 sequence with seed zero"""
+    numbers, state = [], 0
+    for _ in range(count):
+        state = (state + 0x9E3779B97F4A7C15) % 2**64
+        number = ((state ^ (state >> 30)) * 0xBF58476D1CE4E5B9) % 2**64
+        number = ((number ^ (number >> 27)) * 0x94D049BB133111EB) % 2**64
+        numbers.append(number ^ (number >> 31))
+    return numbers
+
+
+# Fixed odd multipliers of the words of a feature vector, so hashes are the same in every process and version
+_MULTIPLIERS = np.array([number | 1 for number in _splitmix64(64)], dtype=np.uint64)
+
+
+def _hash(words: np.ndarray) -> np.ndarray:
+    """Hashes the rows of 32 bit words with a multilinear hash followed by the MurmurHash3 finalizer"""
+    multipliers = _MULTIPLIERS[: words.shape[1]]
+    hashes = (words.astype(np.uint64) * multipliers).sum(axis=1, dtype=np.uint64)
+    for prime in _MIX_PRIMES:
+        hashes ^= hashes >> _MIX_SHIFT
+        hashes *= prime
+    hashes ^= hashes >> _MIX_SHIFT
+    return hashes
@@ -1,14 +1,18 @@
 """ Module containing all model classes """
 from typing import Literal, Dict, Union
+from pathlib import Path
 import logging
 import os
+import warnings
 
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 
 from modeling.models import Model
+from modeling.packed_forest import PackedForest, pack_or_none
 from utils.data_io import read_data, write_data
+from utils.data_models import FileEnding
 
 
 logger = logging.getLogger(os.getenv("LOGGER", "default"))
@@ -22,17 +26,26 @@ class SKLearnModel(Model):
             initialize the model. Defaults to None.
         model_type (str, optional): Name of the model object to initialize.
             Allowable: `'RandomForest'`, `'GradientBoosting'`. Defaults to `'RandomForest'`.
+        packed_inference (bool, optional): Whether to compile supported forests into a
+            ``modeling.packed_forest.PackedForest`` when loading or fitting. Defaults to False.
+        packed_max_rows (int, optional): Maximum number of rows predicted with the packed forest. Larger inputs
+            are predicted by sklearn, which is faster once its per-tree overhead is amortized. Defaults to 32.
     """
 
     def __init__(
         self,
         hyperparameters: Dict[str, Union[str, float, bool]] = None,
         model_type: Literal["RandomForest", "GradientBoosting"] = "RandomForest",
+        packed_inference: bool = False,
+        packed_max_rows: int = 32,
     ):
         super().__init__(hyperparameters)
         self.hyperparameters = hyperparameters if hyperparameters else {}
         self.model_type = model_type
         self.model = self.__initialize_model()
+        self.packed_inference = packed_inference
+        self.packed_max_rows = packed_max_rows
+        self.packed_forest = None
 
     def fit(self, X: pd.DataFrame, y: pd.Series) -> None:
         """
@@ -46,28 +59,80 @@ class SKLearnModel(Model):
         """
         self.model.fit(X, y)
         logger.info("Fitted model with %d train records.", len(X))
+        self.__compile()
 
-    def predict(self, X: pd.DataFrame) -> np.ndarray:
+    def predict(self, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
         """
         Predicts values for the given input data using the model.
         Args:
-            X (pd.DataFrame): Data to calculate predictions for. Features have to be the same used during training.
+            X (Union[pd.DataFrame, np.ndarray]): Data to calculate predictions for. Features have to be the same
+                used during training. Arrays have to contain the features in the order used during training.
 
         Returns:
             Array with the prediction.
         """
-        prediction = self.model.predict(X)
+        if self.packed_forest is not None and (
+            self.model is self.packed_forest or len(X) <= self.packed_max_rows
+        ):
+            prediction = self.packed_forest.predict(self.__to_array(X))
+        else:
+            with warnings.catch_warnings():
+                # Arrays hold the features in the order used during training
+                warnings.filterwarnings(
+                    "ignore",
+                    message="X does not have valid feature names",
+                    category=UserWarning,
+                )
+                prediction = self.model.predict(X)
         logger.info("Calculated predictions for %d records.", len(X))
         return prediction
 
     def load(self, filename: str) -> None:
-        """Loads a model from a given filename."""
+        """
+        Loads a model from a given filename. Files with ending ``utils.data_models.FileEnding.FOREST`` are
+        memory-mapped read-only and always predicted with the packed forest.
+        """
+        if FileEnding(Path(filename).suffix) is FileEnding.FOREST:
+            self.model = PackedForest.from_dict(read_data(filepath=filename))
+            self.packed_forest = self.model
+            return
         self.model = read_data(filepath=filename)
+        self.__compile()
 
     def save(self, filename: str):
-        """Stores the model object to the given filename."""
+        """
+        Stores the model object to the given filename. Files with ending ``utils.data_models.FileEnding.FOREST``
+        store the forest as packed typed arrays.
+        """
+        if FileEnding(Path(filename).suffix) is FileEnding.FOREST:
+            packed_forest = (
+                self.model
+                if isinstance(self.model, PackedForest)
+                else PackedForest.from_estimator(self.model)
+            )
+            write_data(data=packed_forest.to_dict(), filepath=filename)
+            return
         write_data(data=self.model, filepath=filename)
 
+    def __compile(self) -> None:
+        """Compiles the model into a packed forest if packed inference is enabled."""
+        self.packed_forest = pack_or_none(self.model) if self.packed_inference else None
+        if self.packed_forest is not None:
+            logger.info(
+                "Compiled %d trees into a packed forest.", self.packed_forest.n_trees
+            )
+
+    def __to_array(self, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Converts the input to an array with the features in the order used during training."""
+        feature_names = getattr(self.model, "feature_names_in_", None)
+        if (
+            isinstance(X, pd.DataFrame)
+            and feature_names is not None
+            and list(X.columns) != list(feature_names)
+        ):
+            X = X[feature_names]
+        return np.asarray(X, dtype=np.float32)
+
     def __initialize_model(self):
         """Initializes a new model based on the model_type."""
         if self.model_type == "RandomForest":
@@ -0,0 +1,135 @@
+""" This module contains the normalizer of categorical values compiled from the manual mappings """
+import os
+import re
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.kaggle_survey_mappings import MAPPINGS, REGEX_MAPPINGS
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+EMPTY_STRING_PATTERN = re.compile(r"^\s*$")
+
+# Maximum number of distinct values memoized per column, so unexpected inputs cannot grow the memo without bounds
+MAX_MEMOIZED_VALUES = 10000
+
+
+class CategoryNormalizer:
+    """
+    Normalizes categorical values like lowering and stripping them followed by ``pd.DataFrame.replace`` with the
+    mappings, the regex mappings and of empty strings with nan. Columns have few distinct values, so each distinct
+    value is normalized once per column and memoized, instead of running the mappings and regexes on every row.
+    Args:
+        mappings (Dict[str, Dict[str, str]]): Mappings of type {'column': {'value': 'replacement', ...}, ...}.
+        regex_mappings (Dict[str, Dict[str, str]]): Mappings of type {'column': {'pattern': 'replacement', ...}, ...}.
+        max_memoized (int): Maximum number of distinct values memoized per column. Defaults to
+            `MAX_MEMOIZED_VALUES`.
+    """
+
+    def __init__(
+        self,
+        mappings: Dict[str, Dict[str, str]],
+        regex_mappings: Dict[str, Dict[str, str]],
+        max_memoized: int = MAX_MEMOIZED_VALUES,
+    ):
+        self.mappings = mappings
+        self.regex_mappings = {
+            column: [
+                (re.compile(pattern), replacement)
+                for pattern, replacement in column_mappings.items()
+            ]
+            for column, column_mappings in regex_mappings.items()
+        }
+        self.max_memoized = max_memoized
+        self._memo: Dict[Tuple[str, bool], Dict[str, Optional[str]]] = {}
+
+    def normalize_value(
+        self, column: str, value: str, lower: bool = True
+    ) -> Optional[str]:
+        """
+        Normalizes a value of a column.
+        Args:
+            column (str): Name of the column the value belongs to.
+            value (str): Value to normalize.
+            lower (bool): Whether to lower and strip the value first. Defaults to True.
+
+        Returns:
+            The normalized value or None if the value is empty.
+        """
+        memo = self._memo.setdefault((column, lower), {})
+        if value in memo:
+            return memo[value]
+        normalized = self._normalize(column, value, lower)
+        if len(memo) < self.max_memoized:
+            memo[value] = normalized
+        return normalized
+
+    def _normalize(self, column: str, value: str, lower: bool) -> Optional[str]:
+        """Normalizes a value without memoizing it"""
+        if lower:
+            value = value.lower().strip()
+        value = self.mappings.get(column, {}).get(value, value)
+        # Like ``pd.DataFrame.replace`` all patterns are matched against the value before any regex replacement
+        mapped = value
+        for pattern, replacement in self.regex_mappings.get(column, ()):
+            if pattern.search(mapped) is not None:
+                value = pattern.sub(replacement, value)
+        if EMPTY_STRING_PATTERN.search(value) is not None:
+            return None
+        return value
+
+    def normalize_column(self, values: pd.Series, lower: bool = True) -> pd.Series:
+        """
+        Normalizes the string values of a column through the codes of its distinct values. Missing values are kept,
+        other values are set to nan if the column is lowered and kept otherwise, like the string methods of pandas.
+        Args:
+            values (pd.Series): Object series named by its column.
+            lower (bool): Whether to lower and strip the values first. Defaults to True.
+
+        Returns:
+            The normalized series, converted to a more specific dtype if possible.
+        """
+        original = values.to_numpy(dtype=object)
+        codes, uniques = pd.factorize(original)
+        # The last entry is selected by the code -1 of missing values, which keep their original value
+        normalized = np.full(len(uniques) + 1, np.nan, dtype=object)
+        keep = np.ones(len(uniques) + 1, dtype=bool)
+        for code, value in enumerate(uniques):
+            if isinstance(value, str):
+                normalized[code] = self.normalize_value(values.name, value, lower)
+                keep[code] = False
+            else:
+                keep[code] = not lower
+        normalized[pd.isna(normalized)] = np.nan
+        result = np.where(keep[codes], original, normalized[codes])
+        return pd.Series(result, index=values.index, name=values.name).infer_objects()
+
+    def normalize(
+        self, data: pd.DataFrame, lower_columns: Iterable[str] = ()
+    ) -> pd.DataFrame:
+        """
+        Normalizes all object columns of the data.
+        Args:
+            data (pd.DataFrame): Data to normalize.
+            lower_columns (Iterable[str]): Columns to lower and strip first. Defaults to none.
+
+        Returns:
+            Copy of the data with normalized object columns.
+        """
+        normalized = data.copy()
+        lower_columns = set(lower_columns)
+        for column in data.columns[data.dtypes == object]:
+            normalized[column] = self.normalize_column(
+                data[column], lower=column in lower_columns
+            )
+        return normalized
+
+
+# Built once, so the regexes are compiled and the memo is shared by all cleaners in the process
+CATEGORY_NORMALIZER = CategoryNormalizer(
+    mappings=MAPPINGS, regex_mappings=REGEX_MAPPINGS
+)
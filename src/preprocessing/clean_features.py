@@ -6,8 +6,8 @@ import argparse
 import numpy as np
 import pandas as pd
 
+from preprocessing.category_normalizer import CATEGORY_NORMALIZER
 from preprocessing.data_processor import DataProcessor
-from preprocessing.kaggle_survey_mappings import MAPPINGS, REGEX_MAPPINGS
 from utils import log
 from utils.data_io import read_data, write_data
 from utils.data_models import RawInputSchema, CleanedFeaturesSchema, ExecutionMode
@@ -22,11 +22,12 @@ class KaggleFeatureCleaner(DataProcessor):
     Args:
         data (pd.DataFrame): The read raw data.
         mode (``utils.data_models.ExecutionMode``): Mode to execute: `TRAIN` or `INFERENCE`.
+        **kwargs: Additional keyword arguments of ``preprocessing.data_processor.DataProcessor``.
     """
 
     def __init__(self, data: pd.DataFrame, mode: ExecutionMode, **kwargs):
-        data = RawInputSchema.to_schema()(data)
         super().__init__(data, mode, **kwargs)
+        self.data = RawInputSchema.validate_data(data, self.validation_mode)
 
     def execute(self) -> pd.DataFrame:
         """
@@ -49,11 +50,13 @@ class KaggleFeatureCleaner(DataProcessor):
         cleaned_data = self.unify_row_values(data=cleaned_data)
         if self.mode is ExecutionMode.TRAIN:
             cleaned_data = self.remove_null_and_duplicate_records(data=cleaned_data)
-            category_columns = CleanedFeaturesSchema.get_category_columns()
+            category_columns = list(CleanedFeaturesSchema.get_category_columns())
             cleaned_data[category_columns] = self.reduce_cardinality(
                 data=cleaned_data[category_columns]
             )
-        cleaned_data = CleanedFeaturesSchema.to_schema()(cleaned_data)
+        cleaned_data = CleanedFeaturesSchema.validate_data(
+            cleaned_data, self.validation_mode
+        )
         return cleaned_data
 
     @staticmethod
@@ -97,7 +100,7 @@ class KaggleFeatureCleaner(DataProcessor):
             The cleaned data.
         """
         cleaned_nulls = data.dropna(
-            subset=CleanedFeaturesSchema.get_non_nullable_columns()
+            subset=list(CleanedFeaturesSchema.get_non_nullable_columns())
         )
         cleaned = cleaned_nulls.drop_duplicates(
             subset=list(set(CleanedFeaturesSchema.get_column_names()) - {"Timestamp"})
@@ -116,18 +119,16 @@ class KaggleFeatureCleaner(DataProcessor):
             - by lowering and stripping all string characters
             - with manual defined mappings from ``preprocessing.kaggle_survey_mappings`` module
             - all empty strings with nan
+        Each distinct value is normalized once by ``preprocessing.category_normalizer.CATEGORY_NORMALIZER``.
         Args:
             data (pd.DataFrame): Data to apply mappings to.
 
         Returns:
             Data with applied mappings.
         """
-        cleaned = data.copy()
-        for column in CleanedFeaturesSchema.get_category_columns():
-            cleaned[column] = cleaned[column].str.lower().str.strip()
-        cleaned = cleaned.replace(MAPPINGS)
-        cleaned = cleaned.replace(REGEX_MAPPINGS, regex=True)
-        cleaned = cleaned.replace(r"^\s*$", np.nan, regex=True)
+        cleaned = CATEGORY_NORMALIZER.normalize(
+            data, lower_columns=CleanedFeaturesSchema.get_category_columns()
+        )
         logger.info(
             "Applied mappings, lowering and replacement of empty strings with nan."
         )
@@ -153,6 +154,7 @@ class KaggleFeatureCleaner(DataProcessor):
     def clean_position_column(position: pd.Series, seniority: pd.Series) -> pd.Series:
         """
         Cleans the column `"Position"` by replacing the seniority level from the position name.
+        The seniority is replaced column-wise for all rows with the same seniority level at once.
         Args:
             position (pd.Series): Series of the position column.
             seniority (pd.Series): Series with the seniority level.
@@ -160,11 +162,17 @@ class KaggleFeatureCleaner(DataProcessor):
         Returns:
             The cleaned series of the position names.
         """
-
-        cleaned = pd.DataFrame(data=[position, seniority]).T.apply(
-            KaggleFeatureCleaner._replace_seniority_in_position_name, axis=1
-        )
-        cleaned = cleaned.astype("object").rename("Position")
+        cleaned = position.astype("object").rename("Position")
+        has_seniority = seniority.notna().to_numpy()
+        cleaned[position.isna().to_numpy()] = np.NAN
+        has_both = has_seniority & position.notna().to_numpy()
+        codes, levels = pd.factorize(seniority[has_both])
+        rows = np.flatnonzero(has_both)
+        for code, level in enumerate(levels):
+            level_rows = rows[codes == code]
+            cleaned.iloc[level_rows] = (
+                cleaned.iloc[level_rows].str.replace(level, "", regex=False).str.strip()
+            )
         logger.info("Cleaned column 'Position'.")
         return cleaned
 
@@ -183,21 +191,31 @@ class KaggleFeatureCleaner(DataProcessor):
         Returns:
             Cleaned Series.
         """
-        cleaned = years_of_experience.str.replace(",", ".")
-        cleaned = cleaned.apply(KaggleFeatureCleaner._transform_to_float)
+        # Survey answers repeat a lot, so each distinct answer is parsed once
+        codes, answers = pd.factorize(years_of_experience)
+        replaced = pd.Series(answers, dtype=years_of_experience.dtype).str.replace(
+            ",", ".", regex=False
+        )
+        parsed = pd.to_numeric(replaced, errors="coerce").notna()
+        # Code -1 of missing answers selects the trailing NaN
+        values = np.full(len(answers) + 1, np.nan)
+        answer_values = values[:-1]
+        # Casting the parsed answers parses them like `float` does, which rounds long decimals exactly
+        answer_values[parsed.to_numpy()] = replaced[parsed].astype(float)
+        # Answers like '1_000' are not parsed by `pd.to_numeric`, but by `float`
+        unparsed = (~parsed & replaced.notna()).to_numpy()
+        answer_values[unparsed] = replaced[unparsed].map(
+            KaggleFeatureCleaner._transform_to_float
+        )
+        cleaned = pd.Series(
+            values[codes],
+            index=years_of_experience.index,
+            name=years_of_experience.name,
+        )
         cleaned[(age - cleaned) < 18] = age - 18
         logger.info("Cleaned column 'Years_of_Experience'")
         return cleaned
 
-    @staticmethod
-    def _replace_seniority_in_position_name(row: pd.DataFrame):
-        """Removes the seniority of the position"""
-        if pd.isna(row["Seniority"]):
-            return row["Position"]
-        if not pd.isna(row["Position"]):
-            return row["Position"].replace(row["Seniority"], "").strip()
-        return np.NAN
-
     @staticmethod
     def _transform_to_float(value: str) -> float:
         """
@@ -18,19 +18,24 @@ class KaggleTargetCleaner(DataProcessor):
     Class containing all utility functions to clean the targets from the Kaggle survey.
     Args:
         data (pd.DataFrame): The read data.
+        mode (``utils.data_models.ExecutionMode``, optional): Mode to execute. Defaults to `TRAIN`.
+        **kwargs: Additional keyword arguments of ``preprocessing.data_processor.DataProcessor``.
     """
 
-    def __init__(self, data: pd.DataFrame, mode: ExecutionMode = ExecutionMode.TRAIN):
-        data = RawInputSchema.to_schema()(data)
-        super().__init__(data, mode)
-        self.data = data
+    def __init__(
+        self, data: pd.DataFrame, mode: ExecutionMode = ExecutionMode.TRAIN, **kwargs
+    ):
+        super().__init__(data, mode, **kwargs)
+        self.data = RawInputSchema.validate_data(data, self.validation_mode)
         self.target_column = CleanedTargetsSchema.get_column_names()[0]
 
     def execute(self) -> pd.DataFrame:
         """Executes all cleaning steps for the target column"""
         cleaned = self.data.dropna(subset=[self.target_column])
         cleaned_data = self.remove_outliers(data=cleaned)
-        cleaned_targets = CleanedTargetsSchema.to_schema()(cleaned_data)
+        cleaned_targets = CleanedTargetsSchema.validate_data(
+            cleaned_data, self.validation_mode
+        )
         return cleaned_targets
 
     @staticmethod
@@ -0,0 +1,153 @@
+""" This module contains a DataFrame free implementation of the inference feature preprocessing """
+import math
+import os
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from preprocessing.category_normalizer import CATEGORY_NORMALIZER
+from utils.data_io import read_data
+from utils.data_models import (
+    CleanedFeaturesSchema,
+    TransformedFeaturesSchema,
+    RequestInputInference,
+)
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+MIN_AGE, MAX_AGE = 18, 100
+
+
+class CompiledFeaturePipeline:
+    """
+    Precompiled state of ``KaggleFeatureCleaner`` and ``KaggleFeatureTransformer`` in mode `INFERENCE`.
+    Turns raw request rows directly into the contiguous float32 feature matrix consumed by the model,
+    without building intermediate DataFrames. The output is identical to running the cleaner, the transformer
+    and the conversion the model applies to its input.
+    Args:
+        labels (Dict[str, List[str]]): Dictionary of type {'column': ['label1', ...], ...} used during training.
+    """
+
+    def __init__(self, labels: Dict[str, List[str]]):
+        category_columns = CleanedFeaturesSchema.get_category_columns()
+        missing_columns = set(category_columns) - set(labels)
+        if missing_columns:
+            raise ValueError(
+                f"Labels for the categorical columns {sorted(missing_columns)} are missing."
+            )
+        self.columns = tuple(TransformedFeaturesSchema.get_column_names())
+        self.category_columns = tuple(category_columns)
+        self.non_nullable_columns = frozenset(
+            CleanedFeaturesSchema.get_non_nullable_columns()
+        )
+        self.label_indices = {
+            column: {
+                label: index
+                for index, label in reversed(list(enumerate(labels[column])))
+            }
+            for column in self.category_columns
+        }
+        self.unseen_codes = {
+            column: len(labels[column]) for column in self.category_columns
+        }
+        self.normalizer = CATEGORY_NORMALIZER
+
+    @classmethod
+    def from_labels_path(cls, labels_path: str) -> "CompiledFeaturePipeline":
+        """
+        Compiles the pipeline from the labels stored during training.
+        Args:
+            labels_path (str): Path to load the labels from.
+
+        Returns:
+            The compiled pipeline.
+        """
+        if labels_path is None:
+            raise ValueError(
+                "Providing a path to load the labels used in training is mandatory to compile the pipeline."
+            )
+        return cls(labels=read_data(filepath=labels_path))
+
+    def transform(self, rows: Sequence[RequestInputInference]) -> np.ndarray:
+        """
+        Transforms the raw request rows to the feature matrix.
+        Args:
+            rows (Sequence[``utils.data_models.RequestInputInference``]): Raw rows to transform.
+
+        Returns:
+            C-contiguous float32 array of shape (len(rows), len(self.columns)).
+
+        Raises:
+            ValueError: If a row is outside the domain the schemas accept. The DataFrame pipeline should be used
+                for those rows to surface the schema error.
+        """
+        features = np.array(
+            [self.transform_row(row) for row in rows], dtype=np.float64
+        ).reshape(len(rows), len(self.columns))
+        logger.info("Compiled pipeline transformed %d records.", len(rows))
+        return np.ascontiguousarray(features, dtype=np.float32)
+
+    def transform_row(self, row: RequestInputInference) -> Tuple[float, ...]:
+        """
+        Transforms a single raw request row to its feature values in the order of ``self.columns``.
+        Args:
+            row (``utils.data_models.RequestInputInference``): Raw row to transform.
+
+        Returns:
+            Tuple with the feature values.
+        """
+        if row.Timestamp.tzinfo is not None:
+            raise ValueError("Timezone aware timestamps are not supported.")
+        if not MIN_AGE <= row.Age <= MAX_AGE:
+            raise ValueError(f"Age {row.Age} is outside of the allowed range.")
+        age = float(row.Age)
+        years_of_experience = float(row.Years_of_Experience)
+        if math.isnan(years_of_experience):
+            raise ValueError("Years of experience must not be nan.")
+        if age - years_of_experience < 18:
+            years_of_experience = age - 18
+        values = {
+            "Year": row.Timestamp.year,
+            "Age": row.Age,
+            "Years_of_Experience": float(np.float32(years_of_experience)),
+            "Position": self._remove_seniority(row.Position, row.Seniority),
+        }
+        for column in self.category_columns:
+            value = self.normalize(column, values.get(column, getattr(row, column)))
+            if value is None and column in self.non_nullable_columns:
+                raise ValueError(f"Column {column} must not be empty.")
+            values[column] = self.encode(column, value)
+        return tuple(values[column] for column in self.columns)
+
+    def normalize(self, column: str, value: str) -> Optional[str]:
+        """
+        Applies lowering, stripping and the mappings of ``preprocessing.kaggle_survey_mappings`` to a value.
+        Args:
+            column (str): Name of the column the value belongs to.
+            value (str): Value to normalize.
+
+        Returns:
+            The normalized value or None if the value is empty.
+        """
+        return self.normalizer.normalize_value(column, value)
+
+    def encode(self, column: str, value: Optional[str]) -> int:
+        """
+        Encodes a normalized value by the index of the training labels.
+        Args:
+            column (str): Name of the column the value belongs to.
+            value (str, optional): Normalized value to encode.
+
+        Returns:
+            `-1` for empty values, `len(labels)` for unseen values and the label index otherwise.
+        """
+        if value is None:
+            return -1
+        return self.label_indices[column].get(value, self.unseen_codes[column])
+
+    @staticmethod
+    def _remove_seniority(position: str, seniority: str) -> str:
+        """Removes the seniority of the position"""
+        return position.replace(seniority, "").strip()
@@ -3,7 +3,7 @@ from abc import ABC, abstractmethod
 
 import pandas as pd
 
-from utils.data_models import ExecutionMode
+from utils.data_models import ExecutionMode, ValidationMode
 
 
 class DataProcessor(ABC):
@@ -12,13 +12,18 @@ class DataProcessor(ABC):
     Args:
         data (pd.DataFrame): Data to process.
         mode (``utils.data_models.ExecutionMode``): Mode to execute: `TRAIN` or `INFERENCE`.
-        **kwargs: Additional keyword arguments specific for implemented data processors.
+        **kwargs: Additional keyword arguments specific for implemented data processors and:
+            - validation_mode (``utils.data_models.ValidationMode``): Whether to validate the data with pandera or
+              the compiled schemas. Defaults to `PANDERA`.
     """
 
     def __init__(self, data: pd.DataFrame, mode: ExecutionMode, **kwargs):
         self.data = data
         self.mode = mode
         self.kwargs = kwargs
+        self.validation_mode = ValidationMode(
+            kwargs.get("validation_mode", ValidationMode.PANDERA)
+        )
 
     @abstractmethod
     def execute(self) -> pd.DataFrame:
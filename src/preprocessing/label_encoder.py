@@ -0,0 +1,78 @@
+""" This module contains the encoder for categorical features based on the labels used during training """
+import os
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.data_io import read_data
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
+
+
+class LabelEncoder:
+    """
+    Encodes categorical columns by the index of the labels used during training. Missing values are encoded
+    with `-1`, values not seen during training with the number of labels of the column.
+    Args:
+        labels (Dict[str, List[str]]): Dictionary of type {'column': ['label1', ...], ...}.
+    """
+
+    def __init__(self, labels: Dict[str, List[str]]):
+        self.labels = labels
+        self.indices = {column: pd.Index(values) for column, values in labels.items()}
+        duplicated_columns = [
+            column for column, index in self.indices.items() if not index.is_unique
+        ]
+        if duplicated_columns:
+            raise ValueError(
+                f"Labels of the columns {duplicated_columns} contain duplicates."
+            )
+
+    @classmethod
+    def from_path(cls, labels_path: str) -> "LabelEncoder":
+        """
+        Loads the labels stored during training.
+        Args:
+            labels_path (str): Path to load the labels from.
+
+        Returns:
+            The label encoder.
+        """
+        if labels_path is None:
+            raise ValueError(
+                "Providing a path to load the labels used in training is mandatory to create a label encoder."
+            )
+        return cls(labels=read_data(filepath=labels_path))
+
+    @property
+    def columns(self) -> List[str]:
+        """Names of all columns the encoder holds labels for"""
+        return list(self.indices.keys())
+
+    def encode(self, column: str, values: pd.Series) -> pd.Series:
+        """
+        Encodes all values of a column.
+        Args:
+            column (str): Name of the column to encode.
+            values (pd.Series): Values of the column.
+
+        Returns:
+            Series with the int64 encodings and the index of the input values.
+        """
+        index = self.indices[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            category_codes = self._encode_array(index, values.cat.categories)
+            codes = np.append(category_codes, -1)[values.cat.codes.to_numpy()]
+        else:
+            codes = self._encode_array(index, values)
+        return pd.Series(codes, index=values.index, name=values.name, dtype="int64")
+
+    @staticmethod
+    def _encode_array(index: pd.Index, values) -> np.ndarray:
+        """Looks up the values in the index and marks unseen values"""
+        codes = index.get_indexer(values)
+        codes[(codes == -1) & ~np.asarray(pd.isna(values))] = len(index)
+        return codes
@@ -7,6 +7,7 @@ import argparse
 import pandas as pd
 
 from preprocessing.data_processor import DataProcessor
+from preprocessing.label_encoder import LabelEncoder
 from utils import log
 from utils.data_io import read_data, write_data
 from utils.data_models import (
@@ -27,18 +28,21 @@ class KaggleFeatureTransformer(DataProcessor):
         data (pd.DataFrame): Data to transform.
         mode (``utils.data_models.ExecutionMode``): Mode to execute: `TRAIN` or `INFERENCE`.
         **kwargs: Additional keyword arguments:
-            - labels_path (str): Path to load labels used during training. Mandatory argument for mode `INFERENCE`.
+            - label_encoder (``preprocessing.label_encoder.LabelEncoder``): Encoder with the labels used during
+              training. Either `label_encoder` or `labels_path` is mandatory for mode `INFERENCE`.
+            - labels_path (str): Path to load labels used during training. Only used if no `label_encoder` is given.
+            - validation_mode (``utils.data_models.ValidationMode``): Whether to validate the data with pandera or
+              the compiled schemas. Defaults to `PANDERA`.
     """
 
     def __init__(self, data: pd.DataFrame, mode: ExecutionMode, **kwargs):
-        data = CleanedFeaturesSchema.to_schema()(data)
         super().__init__(data, mode, **kwargs)
+        self.data = CleanedFeaturesSchema.validate_data(data, self.validation_mode)
         self.labels_path = self.kwargs.get("labels_path", None)
-        self.labels = (
-            self._load_encoding_labels()
-            if self.mode is ExecutionMode.INFERENCE
-            else None
+        self.label_encoder = (
+            self._load_label_encoder() if self.mode is ExecutionMode.INFERENCE else None
         )
+        self.labels = self.label_encoder.labels if self.label_encoder else None
 
     def execute(self) -> pd.DataFrame:
         """
@@ -46,40 +50,41 @@ class KaggleFeatureTransformer(DataProcessor):
         Returns:
             Transformed features. Labels used for encoding.
         """
-        data = self.encode_categorical_features(labels=self.labels)
-        data = TransformedFeaturesSchema.to_schema()(
-            data[TransformedFeaturesSchema.get_column_names()]
+        data = self.encode_categorical_features(
+            labels=self.label_encoder if self.label_encoder else self.labels
+        )
+        data = TransformedFeaturesSchema.validate_data(
+            data[list(TransformedFeaturesSchema.get_column_names())],
+            self.validation_mode,
         )
         return data
 
     def encode_categorical_features(
-        self, labels: Union[None, Dict[str, List[str]]] = None
+        self, labels: Union[None, Dict[str, List[str]], LabelEncoder] = None
     ) -> pd.DataFrame:
         """
         Encodes all categorical columns in the input data.
         Options for encoding:
-            - based on already present labels by passing a dictionary as the labels argument
+            - based on already present labels by passing a dictionary or a label encoder as the labels argument
             - by creating new labels
         Args:
-            labels (Dict[str, List[str]], optional): Dictionary of type {'column': ['label1', ...], ...}.
-                Defaults to None.
+            labels (Union[Dict[str, List[str]], ``preprocessing.label_encoder.LabelEncoder``], optional): Dictionary
+                of type {'column': ['label1', ...], ...} or label encoder. Defaults to None.
         Returns:
             The encoded data.
         """
         encoded_data = self.data.copy()
         if labels is not None:
-            for column, values in labels.items():
-                encoded_data[column] = encoded_data[column].apply(
-                    self.encode_based_on_list, label_values=values
+            label_encoder = (
+                labels if isinstance(labels, LabelEncoder) else LabelEncoder(labels)
+            )
+            for column in label_encoder.columns:
+                if encoded_data[column].isnull().all():
+                    logger.warning("Column %s only contains nan values.", column)
+                encoded_data[column] = label_encoder.encode(
+                    column=column, values=encoded_data[column]
                 )
                 logger.info("Successfully encoded column %s", column)
-                # Apply doesn't work on columns where all entries are nan
-                if encoded_data[column].isnull().all():
-                    encoded_data[column] = -1
-                    logger.warning(
-                        "Column %s only contains nan values. Encoding with -1 successful.",
-                        column,
-                    )
         else:
             labels = {}
             for column in CleanedFeaturesSchema.get_category_columns():
@@ -89,34 +94,17 @@ class KaggleFeatureTransformer(DataProcessor):
             self.labels = labels
         return encoded_data
 
-    @staticmethod
-    def encode_based_on_list(value: str, label_values: list):
-        """
-        Encodes a input value by index of the input labels
-        Args:
-            value (str): Value to encode.
-            label_values (list): Reference list.
-
-        Returns:
-            Encoded value.
-        """
-        if pd.isna(value):
-            encoding = -1
-        elif value not in label_values:
-            encoding = len(label_values)
-        else:
-            encoding = label_values.index(value)
-        return encoding
-
-    def _load_encoding_labels(self) -> Dict[str, List[str]]:
-        """Loads in the labels dictionary"""
+    def _load_label_encoder(self) -> LabelEncoder:
+        """Gets the passed label encoder or loads it from the labels path"""
+        label_encoder = self.kwargs.get("label_encoder", None)
+        if label_encoder is not None:
+            return label_encoder
         if self.labels_path is None:
             raise ValueError(
-                "Providing a path to load the labels used in training is mandatory in mode 'INFERENCE. "
-                "Please provide 'labels_path' argument to KaggleFeatureTransformer."
+                "Providing a label encoder or a path to load the labels used in training is mandatory in mode "
+                "'INFERENCE. Please provide 'label_encoder' or 'labels_path' argument to KaggleFeatureTransformer."
             )
-        labels = read_data(filepath=self.labels_path)
-        return labels
+        return LabelEncoder.from_path(labels_path=self.labels_path)
 
 
 def main(input_path: str, output_path: str, mode: str, **kwargs) -> None:
@@ -22,18 +22,23 @@ class KaggleTargetTransformer(DataProcessor):
     Class containing all utility functions to transform the targets from the Kaggle survey.
     Args:
         data (pd.DataFrame): The read data.
+        mode (``utils.data_models.ExecutionMode``, optional): Mode to execute. Defaults to `TRAIN`.
+        **kwargs: Additional keyword arguments of ``preprocessing.data_processor.DataProcessor``.
     """
 
-    def __init__(self, data: pd.DataFrame, mode: ExecutionMode = ExecutionMode.TRAIN):
-        data = CleanedTargetsSchema.to_schema()(data)
-        super().__init__(data, mode)
-        self.data = data
+    def __init__(
+        self, data: pd.DataFrame, mode: ExecutionMode = ExecutionMode.TRAIN, **kwargs
+    ):
+        super().__init__(data, mode, **kwargs)
+        self.data = CleanedTargetsSchema.validate_data(data, self.validation_mode)
         self.target_column = TransformedTargetsSchema.get_column_names()[0]
 
     def execute(self) -> pd.DataFrame:
         """Executes all transforming steps for the target column"""
         transformed_data = self.data.copy()
-        transformed_targets = TransformedTargetsSchema.to_schema()(transformed_data)
+        transformed_targets = TransformedTargetsSchema.validate_data(
+            transformed_data, self.validation_mode
+        )
         return transformed_targets
 
 
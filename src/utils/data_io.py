@@ -1,10 +1,11 @@
 """ Utility functions to input and output data """
-from typing import Union, Any
+from typing import Union, Any, Dict, Iterable, Iterator, Optional
 from pathlib import Path
 import logging
 import json
 import joblib
 
+import numpy as np
 import pandas as pd
 
 from utils.data_models import FileEnding
@@ -12,6 +13,9 @@ from utils.data_models import FileEnding
 
 logger = logging.getLogger("default")
 
+ARRAY_FILE_MAGIC = b"FCARRAY1"
+ARRAY_ALIGNMENT = 64
+
 
 def read_data(
     filepath: str, file_ending: FileEnding = None
@@ -24,7 +28,9 @@ def read_data(
             Defaults to None.
 
     Returns:
-        The data as pandas dataframe.
+        The data as pandas dataframe. Files with ending ``utils.data_models.FileEnding.FOREST`` or
+        ``utils.data_models.FileEnding.TABLE`` are returned as dictionary with the keys `metadata` and `arrays`,
+        where the arrays are read-only memory maps of the file.
     """
     if not file_ending:
         file_ending = FileEnding(Path(filepath).suffix)
@@ -37,6 +43,8 @@ def read_data(
             data = json.load(f)
     elif file_ending is FileEnding.JOBLIB:
         data = joblib.load(filepath)
+    elif file_ending in (FileEnding.FOREST, FileEnding.TABLE):
+        data = _read_array_file(filepath)
     else:
         raise ValueError(
             f"File ending {file_ending.value} currently not supported to be read."
@@ -51,7 +59,9 @@ def write_data(
     """
     Writes a given dataframe to disk.
     Args:
-        data (pd.DataFrame): The data to store.
+        data (pd.DataFrame): The data to store. For file endings ``utils.data_models.FileEnding.FOREST`` and
+            ``utils.data_models.FileEnding.TABLE`` a dictionary with json serializable `metadata` and a dictionary
+            of numpy `arrays`.
         filepath (str): Path with file ending to the storage location.
         store_index (bool, optional): Whether to store the index of the input data. Defaults to ``True``.
 
@@ -70,8 +80,170 @@ def write_data(
             json.dump(data, f, indent=2)
     elif file_ending is FileEnding.JOBLIB:
         joblib.dump(data, filepath)
+    elif file_ending in (FileEnding.FOREST, FileEnding.TABLE):
+        _write_array_file(data, filepath)
     else:
         raise ValueError(
             f"File ending {file_ending.value} currently not supported to be read."
         )
     logger.info("Successfully wrote file to %s", filepath)
+
+
+def read_data_chunks(
+    filepath: str, chunk_rows: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads tabular data chunk by chunk. The index of each chunk continues the index of the previous chunk.
+    Args:
+        filepath (str): Path to the parquet or csv file to read.
+        chunk_rows (int, optional): Number of rows per chunk. Mandatory for csv files. Parquet files are read by
+            row group if not given. Defaults to None.
+
+    Returns:
+        Iterator over the chunks as pandas dataframes.
+    """
+    file_ending = FileEnding(Path(filepath).suffix)
+    if file_ending is FileEnding.PARQUET:
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        parquet_file = pq.ParquetFile(filepath)
+        if chunk_rows is None:
+            tables = (
+                parquet_file.read_row_group(index)
+                for index in range(parquet_file.num_row_groups)
+            )
+        else:
+            tables = parquet_file.iter_batches(batch_size=chunk_rows)
+        chunks = (table.to_pandas() for table in tables)
+    elif file_ending is FileEnding.CSV:
+        if chunk_rows is None:
+            raise ValueError("Reading csv files in chunks requires a number of rows.")
+        chunks = pd.read_csv(filepath, chunksize=chunk_rows)
+    else:
+        raise ValueError(
+            f"File ending {file_ending.value} currently not supported to be read in chunks."
+        )
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+    logger.info("Successfully read %d rows in chunks from %s", start, filepath)
+
+
+def count_rows(filepath: str) -> Optional[int]:
+    """
+    Counts the rows of a file without reading it, if its format stores the number of rows.
+    Args:
+        filepath (str): Path to the file.
+
+    Returns:
+        The number of rows or None if it is unknown.
+    """
+    if FileEnding(Path(filepath).suffix) is FileEnding.PARQUET:
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        return pq.ParquetFile(filepath).metadata.num_rows
+    return None
+
+
+def write_data_chunks(chunks: Iterable[pd.DataFrame], filepath: str) -> int:
+    """
+    Writes dataframes one after another to a parquet file, each as its own row group. The index is not stored.
+    Args:
+        chunks (Iterable[pd.DataFrame]): Dataframes with the same columns and types to write in order.
+        filepath (str): Path with file ending `.parquet` to the storage location.
+
+    Returns:
+        Number of written rows.
+    """
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+    import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+    if FileEnding(Path(filepath).suffix) is not FileEnding.PARQUET:
+        raise ValueError("Only parquet files can be written in chunks.")
+    if not Path(filepath).parent.is_dir():
+        Path(filepath).parent.mkdir(parents=True)
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(filepath, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    logger.info("Successfully wrote %d rows in chunks to %s", rows, filepath)
+    return rows
+
+
+def _write_array_file(data: Dict[str, Any], filepath: str) -> None:
+    """
+    Writes typed arrays and metadata to one file. The file starts with a magic number, the length of the json header
+    and the json header itself. The header holds the metadata and the dtype, shape and offset of each array relative
+    to the data section, which starts after the header. Arrays are stored in C order aligned to 64 bytes.
+    Args:
+        data (Dict[str, Any]): Dictionary with json serializable `metadata` and a dictionary of numpy `arrays`.
+        filepath (str): Path with file ending to the storage location.
+
+    Returns:
+        None.
+    """
+    arrays = {
+        name: np.ascontiguousarray(array) for name, array in data["arrays"].items()
+    }
+    header = {"metadata": data.get("metadata", {}), "arrays": {}}
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = _align(offset + array.nbytes)
+    encoded_header = json.dumps(header).encode("utf-8")
+    data_start = _align(len(ARRAY_FILE_MAGIC) + 8 + len(encoded_header))
+    with open(filepath, "wb") as f:
+        f.write(ARRAY_FILE_MAGIC)
+        f.write(len(encoded_header).to_bytes(8, "little"))
+        f.write(encoded_header)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + header["arrays"][name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+
+
+def _read_array_file(filepath: str) -> Dict[str, Any]:
+    """
+    Memory maps a file written by ``_write_array_file`` read-only.
+    Args:
+        filepath (str): Path to the file to read.
+
+    Returns:
+        Dictionary with the `metadata` and the memory-mapped `arrays`.
+    """
+    buffer = np.memmap(filepath, dtype=np.uint8, mode="r")
+    header_start = len(ARRAY_FILE_MAGIC) + 8
+    if bytes(buffer[: len(ARRAY_FILE_MAGIC)]) != ARRAY_FILE_MAGIC:
+        raise ValueError(f"File {filepath} is not a valid array file.")
+    header_length = int.from_bytes(
+        bytes(buffer[len(ARRAY_FILE_MAGIC) : header_start]), "little"
+    )
+    header = json.loads(bytes(buffer[header_start : header_start + header_length]))
+    data_start = _align(header_start + header_length)
+    arrays = {
+        name: np.ndarray(
+            shape=tuple(layout["shape"]),
+            dtype=np.dtype(layout["dtype"]),
+            buffer=buffer,
+            offset=data_start + layout["offset"],
+        )
+        for name, layout in header["arrays"].items()
+    }
+    return {"metadata": header["metadata"], "arrays": arrays}
+
+
+def _align(offset: int) -> int:
+    """Rounds the offset up to the array alignment"""
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
@@ -1,14 +1,32 @@
 """ Utilities used throughout the whole project """
-import datetime
+import os
+import logging
 from enum import Enum
-from typing import List, Optional
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Type, Union
 
+import numpy as np
 import pandas as pd
 
-from pandera import Field, SchemaModel, dataframe_check
+from pandera import Check, DataFrameSchema, Field, SchemaModel, dataframe_check
+from pandera.engines import pandas_engine
+from pandera.schema_components import Column, Index as IndexComponent
 from pandera.typing import Series, Index
 from pandera.dtypes import DateTime, Category, Float32, Int64
-from pydantic import BaseModel
+
+# Request models live in a module without pandas and pandera, so the API can be imported quickly
+from utils.request_models import (  # pylint: disable=unused-import
+    ColumnarPreprocessedRequestInference,
+    ColumnarRequestInputInference,
+    ColumnarRequestOutput,
+    PreprocessedRequestInference,
+    PreprocessedRequestTrain,
+    RequestInputInference,
+    RequestInputTrain,
+    RequestOutput,
+)
+
+
+logger = logging.getLogger(os.getenv("LOGGER", "default"))
 
 
 class ExecutionMode(str, Enum):
@@ -18,6 +36,13 @@ class ExecutionMode(str, Enum):
     INFERENCE = "inference"
 
 
+class ValidationMode(str, Enum):
+    """Class to formalize the validation mode"""
+
+    PANDERA = "pandera"
+    COMPILED = "compiled"
+
+
 class FileEnding(str, Enum):
     """Class to formalize the file endings"""
 
@@ -25,6 +50,44 @@ class FileEnding(str, Enum):
     PARQUET = ".parquet"
     JSON = ".json"
     JOBLIB = ".joblib"
+    FOREST = ".forest"
+    TABLE = ".table"
+
+
+class SchemaMetadata(NamedTuple):
+    """Metadata derived from a pandera schema"""
+
+    schema: DataFrameSchema
+    column_names: Tuple[str, ...]
+    category_columns: Tuple[str, ...]
+    non_nullable_columns: Tuple[str, ...]
+    dtypes: Tuple[Tuple[str, pandas_engine.DataType], ...]
+
+    @classmethod
+    def from_schema(cls, schema: DataFrameSchema) -> "SchemaMetadata":
+        """
+        Derives the metadata of a schema.
+        Args:
+            schema (``pandera.DataFrameSchema``): The schema.
+
+        Returns:
+            The metadata with the columns in the order of the schema.
+        """
+        return cls(
+            schema=schema,
+            column_names=tuple(schema.columns),
+            category_columns=tuple(
+                name
+                for name, dtype in schema.dtypes.items()
+                if isinstance(dtype, Category)
+            ),
+            non_nullable_columns=tuple(
+                name
+                for name, column in schema.columns.items()
+                if column.nullable is False
+            ),
+            dtypes=tuple(schema.dtypes.items()),
+        )
 
 
 class BaseSchema(SchemaModel):
@@ -42,30 +105,62 @@ class BaseSchema(SchemaModel):
     @dataframe_check
     def check_index_sorted(cls, df: pd.DataFrame) -> bool:
         """Checks if the index is sorted"""
-        return df.index.sort_values().equals(df.index)
+        return df.index.is_monotonic_increasing
 
     @classmethod
-    def get_column_names(cls) -> List[str]:
+    def metadata(cls) -> SchemaMetadata:
+        """Gets the metadata of the schema from the registry, which derives it once per schema"""
+        metadata = _SCHEMA_REGISTRY.get(cls)
+        if metadata is None:
+            metadata = _SCHEMA_REGISTRY[cls] = SchemaMetadata.from_schema(
+                cls.to_schema()
+            )
+        return metadata
+
+    @classmethod
+    def get_column_names(cls) -> Tuple[str, ...]:
         """Gets all column names of the schema"""
-        return list(cls.to_schema().columns.keys())
+        return cls.metadata().column_names
 
     @classmethod
-    def get_category_columns(cls) -> List[str]:
+    def get_category_columns(cls) -> Tuple[str, ...]:
         """Gets all category columns of a schema"""
-        return [
-            name
-            for name, dtype in cls.to_schema().dtypes.items()
-            if isinstance(dtype, Category)
-        ]
+        return cls.metadata().category_columns
 
     @classmethod
-    def get_non_nullable_columns(cls) -> List[str]:
+    def get_non_nullable_columns(cls) -> Tuple[str, ...]:
         """Gets all non-nullable columns of a schema"""
-        return [
-            name
-            for name, column in cls.to_schema().columns.items()
-            if column.nullable is False
-        ]
+        return cls.metadata().non_nullable_columns
+
+    @classmethod
+    def compile(cls) -> "CompiledSchema":
+        """Gets the schema compiled into vectorized coercions and checks"""
+        if cls not in _COMPILED_SCHEMAS:
+            _COMPILED_SCHEMAS[cls] = CompiledSchema(cls.metadata().schema)
+        return _COMPILED_SCHEMAS[cls]
+
+    @classmethod
+    def validate_data(
+        cls,
+        data: pd.DataFrame,
+        validation_mode: ValidationMode = ValidationMode.PANDERA,
+    ) -> pd.DataFrame:
+        """
+        Validates and coerces data with the schema.
+        Args:
+            data (pd.DataFrame): Data to validate.
+            validation_mode (``utils.data_models.ValidationMode``, optional): Whether to validate with pandera or
+                with the compiled schema. Defaults to `PANDERA`.
+
+        Returns:
+            The validated data.
+
+        Raises:
+            pandera.errors.SchemaError: If the data does not match the schema.
+        """
+        if ValidationMode(validation_mode) is ValidationMode.COMPILED:
+            return cls.compile().validate(data)
+        return cls.metadata().schema(data)
 
 
 class RawInputSchema(BaseSchema):
@@ -158,47 +253,222 @@ class TransformedTargetsSchema(BaseSchema):
         name = "TransformedTargets"
 
 
-class RequestInputInference(BaseModel):
-    """Raw inference request input"""
-
-    Timestamp: datetime.datetime
-    Age: int
-    Gender: str
-    City: str
-    Seniority: str
-    Position: str
-    Years_of_Experience: float
-    Company_Size: str
-    Company_Type: str
-
-
-class RequestInputTrain(RequestInputInference):
-    """Raw train request input"""
-
-    Salary_Yearly: float
-
-
-class PreprocessedRequestInference(BaseModel):
-    """Return of the inference preprocessing service"""
-
-    Year: int
-    Age: int
-    Gender: int
-    City: int
-    Seniority: int
-    Position: int
-    Years_of_Experience: float
-    Company_Size: int
-    Company_Type: int
-
-
-class PreprocessedRequestTrain(PreprocessedRequestInference):
-    """Return of the train preprocessing service"""
-
-    Salary_Yearly: float
-
-
-class RequestOutput(BaseModel):
-    """Return of the prediction service"""
-
-    Salary_Yearly: float
+# Vectorized implementations of the built-in element-wise checks, called with the values and check statistics
+_ELEMENT_CHECKS: Dict[str, Callable[[np.ndarray, Dict], np.ndarray]] = {
+    "in_range": lambda values, stats: (
+        (np.less_equal if stats.get("include_min") is not False else np.less)(
+            stats["min_value"], values
+        )
+        & (np.greater_equal if stats.get("include_max") is not False else np.greater)(
+            stats["max_value"], values
+        )
+    ),
+    "greater_than": lambda values, stats: values > stats["min_value"],
+    "greater_than_or_equal_to": lambda values, stats: values >= stats["min_value"],
+    "less_than": lambda values, stats: values < stats["max_value"],
+    "less_than_or_equal_to": lambda values, stats: values <= stats["max_value"],
+}
+
+# Metadata and compiled validators of the schemas, created on first use
+_SCHEMA_REGISTRY: Dict[Type[BaseSchema], SchemaMetadata] = {}
+_COMPILED_SCHEMAS: Dict[Type[BaseSchema], "CompiledSchema"] = {}
+
+
+def _compile_coercion(
+    dtype: pandas_engine.DataType,
+) -> Callable[[Union[pd.Series, pd.Index]], Union[pd.Series, pd.Index]]:
+    """Returns a function coercing data like pandera, which skips data of the coerced type already"""
+    if isinstance(dtype, pandas_engine.Category):
+        return dtype.coerce
+    if isinstance(dtype, pandas_engine.NpString):
+        # Pandera converts all values which are not null to `str`, which keeps columns of strings unchanged
+        return lambda data: (
+            data
+            if data.dtype == object
+            and pd.api.types.infer_dtype(data.to_numpy(), skipna=True)
+            in ("string", "empty")
+            else dtype.coerce(data)
+        )
+    return lambda data: data if data.dtype == dtype.type else dtype.coerce(data)
+
+
+def _compile_element_check(check: Check) -> Callable[[pd.Series, np.ndarray], bool]:
+    """Returns a function checking all values of a column, whose null values are masked"""
+    if check.name in _ELEMENT_CHECKS and check.groupby is None:
+        function, stats = _ELEMENT_CHECKS[check.name], check.statistics
+
+        def passes(data: pd.Series, nulls: np.ndarray) -> bool:
+            passed = function(data.to_numpy(), stats)
+            return bool((passed | nulls).all() if check.ignore_na else passed.all())
+
+        return passes
+    return lambda data, nulls: bool(check(data).check_passed)
+
+
+def _compile_dataframe_check(
+    check: Check,
+) -> Callable[[pd.DataFrame, np.ndarray], bool]:
+    """Returns a function checking a dataframe, whose rows with null values are masked"""
+    if check.groupby is not None or check.element_wise:
+        return lambda data, null_rows: bool(check(data).check_passed)
+    # pylint: disable=protected-access
+    function = check._check_fn
+
+    def passes(data: pd.DataFrame, null_rows: np.ndarray) -> bool:
+        passed = function(data)
+        if isinstance(passed, pd.Series):
+            passed = passed.to_numpy(dtype=bool, na_value=False)
+            return bool((passed | null_rows).all() if check.ignore_na else passed.all())
+        if isinstance(passed, pd.DataFrame):
+            return bool(check(data).check_passed)
+        return bool(passed)
+
+    return passes
+
+
+class _CompiledComponent:
+    """Coercion and checks of a column or the index of a schema"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, component: Union[Column, IndexComponent], coerce: bool):
+        self.name = component.name
+        self.required = getattr(component, "required", True)
+        self.nullable = component.nullable
+        self.unique = component.unique
+        self.coerce = (
+            _compile_coercion(component.dtype)
+            if coerce and component.dtype is not None
+            else lambda data: data
+        )
+        self.checks = tuple(_compile_element_check(check) for check in component.checks)
+
+    def validate(
+        self, data: Union[pd.Series, pd.Index]
+    ) -> Tuple[Optional[Union[pd.Series, pd.Index]], np.ndarray]:
+        """Returns the coerced data, or None if it is invalid, and the mask of null values"""
+        data = self.coerce(data)
+        nulls = np.asarray(
+            data.isna() if isinstance(data, pd.Index) else data.array.isna()
+        )
+        if not self.nullable and nulls.any():
+            return None, nulls
+        if self.unique and data.duplicated().any():
+            return None, nulls
+        if not all(check(data, nulls) for check in self.checks):
+            return None, nulls
+        return data, nulls
+
+
+class CompiledSchema:
+    """
+    Schema compiled into a flat sequence of vectorized coercions and checks, which validates all columns in one pass
+    instead of running pandera's validation machinery. The coercions and checks are decided once on compilation:
+    coercions skip columns which have the coerced type already, built-in checks like ranges are evaluated as NumPy
+    expressions and dataframe checks are called directly on the coerced data.
+    Valid data is coerced exactly like pandera does. Invalid data is validated again with pandera, so the same
+    ``pandera.errors.SchemaError`` is raised as in mode ``utils.data_models.ValidationMode.PANDERA``.
+    Args:
+        schema (``pandera.DataFrameSchema``): The schema to compile.
+
+    Raises:
+        ValueError: If the schema uses regex columns, multi-indexes, a dataframe dtype or unique column combinations.
+    """
+
+    def __init__(self, schema: DataFrameSchema):
+        if (
+            schema.dtype is not None
+            or schema.unique
+            or any(column.regex for column in schema.columns.values())
+            or (
+                schema.index is not None
+                and not isinstance(schema.index, IndexComponent)
+            )
+        ):
+            raise ValueError(f"Schema {schema.name} can not be compiled.")
+        self.schema = schema
+        self.columns = tuple(
+            _CompiledComponent(column, coerce=schema.coerce or column.coerce)
+            for column in schema.columns.values()
+        )
+        self.index = (
+            _CompiledComponent(
+                schema.index, coerce=schema.coerce or schema.index.coerce
+            )
+            if schema.index is not None
+            else None
+        )
+        self.checks = tuple(_compile_dataframe_check(check) for check in schema.checks)
+        self.names = tuple(column.name for column in self.columns)
+
+    def validate(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Validates and coerces data like the pandera schema.
+        Args:
+            data (pd.DataFrame): Data to validate.
+
+        Returns:
+            The validated data.
+
+        Raises:
+            pandera.errors.SchemaError: If the data does not match the schema.
+        """
+        try:
+            validated = self._validate(data)
+        except (ValueError, TypeError, OverflowError, KeyError):
+            # Raised by coercions of invalid values
+            validated = None
+        if validated is None:
+            # Raises the error of the reference implementation
+            validated = self.schema.validate(data)
+            logger.warning(
+                "Compiled schema %s rejected data accepted by pandera.",
+                self.schema.name,
+            )
+        return validated
+
+    def _validate(self, data: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Returns the validated data or None if a check failed"""
+        names = self.names
+        if not self._valid_columns(data.columns, names):
+            return None
+        validated, nulls = {}, []
+        for column in self.columns:
+            if column.name not in data.columns:
+                if column.required:
+                    return None
+                continue
+            validated[column.name], column_nulls = column.validate(data[column.name])
+            if validated[column.name] is None:
+                return None
+            nulls.append(column_nulls)
+        if self.schema.strict != "filter":
+            for name in data.columns.difference(names, sort=False):
+                validated[name] = data[name]
+                nulls.append(np.asarray(data[name].array.isna()))
+        index = data.index
+        if self.index is not None:
+            index, _ = self.index.validate(index)
+            if index is None:
+                return None
+        frame = pd.DataFrame(
+            {name: validated[name].array for name in data.columns if name in validated},
+            index=index,
+            copy=True,
+        )
+        null_rows = (
+            np.logical_or.reduce(nulls) if nulls else np.zeros(len(frame), dtype=bool)
+        )
+        if not all(check(frame, null_rows) for check in self.checks):
+            return None
+        return frame
+
+    def _valid_columns(self, columns: pd.Index, names: Tuple[str, ...]) -> bool:
+        """Checks if the columns are unique, ordered and only contain the schema columns if required"""
+        if columns.has_duplicates:
+            return False
+        if self.schema.ordered:
+            present = [name for name in columns if name in names]
+            if present != [name for name in names if name in columns]:
+                return False
+        return self.schema.strict is not True or set(columns) <= set(names)
@@ -0,0 +1,245 @@
+""" Models of the requests and responses of the API """
+import datetime
+from typing import Any, Callable, Dict, Iterator, List
+
+from pydantic import BaseModel, ValidationError, parse_obj_as, root_validator
+from pydantic.datetime_parse import datetime_re
+
+
+class RequestInputInference(BaseModel):
+    """Raw inference request input"""
+
+    Timestamp: datetime.datetime
+    Age: int
+    Gender: str
+    City: str
+    Seniority: str
+    Position: str
+    Years_of_Experience: float
+    Company_Size: str
+    Company_Type: str
+
+
+class RequestInputTrain(RequestInputInference):
+    """Raw train request input"""
+
+    Salary_Yearly: float
+
+
+class PreprocessedRequestInference(BaseModel):
+    """Return of the inference preprocessing service"""
+
+    Year: int
+    Age: int
+    Gender: int
+    City: int
+    Seniority: int
+    Position: int
+    Years_of_Experience: float
+    Company_Size: int
+    Company_Type: int
+
+
+class PreprocessedRequestTrain(PreprocessedRequestInference):
+    """Return of the train preprocessing service"""
+
+    Salary_Yearly: float
+
+
+class RequestOutput(BaseModel):
+    """Return of the prediction service"""
+
+    Salary_Yearly: float
+
+
+# Columns import numpy and pandas on the first columnar request, so importing the API does not wait for them
+# pylint: disable=import-outside-toplevel
+
+
+class _Column:
+    """
+    Column of a columnar request, which is validated and converted to an array at once instead of value by value.
+    Columns whose values have another type than the column are coerced value by value like the fields of rows.
+    """
+
+    items_schema: Dict[str, str] = {}
+    item_type: Any = Any
+
+    @classmethod
+    def __get_validators__(cls) -> Iterator[Callable[[Any], Any]]:
+        yield cls.validate
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        field_schema.update(type="array", items=cls.items_schema)
+
+    @classmethod
+    def validate(cls, values: Any) -> Any:
+        """
+        Validates a column of values.
+        Args:
+            values (Any): Parsed JSON value of the column, or an array read from an Arrow body.
+
+        Returns:
+            The values as array, or as list of coerced values if the column has no conversion to an array.
+
+        Raises:
+            TypeError: If the column is not a list or array.
+            ValueError: If a value can't be coerced to the column type like the field of a row.
+        """
+        if not isinstance(values, list) and not hasattr(values, "__array__"):
+            raise TypeError("value is not a valid list")
+        array = cls.convert(values)
+        if array is None:
+            values = cls.coerce(values)
+            array = cls.convert(values)
+        return values if array is None else array
+
+    @classmethod
+    def coerce(cls, values: Any) -> List[Any]:
+        """Coerces the values one by one like the fields of rows"""
+        try:
+            return parse_obj_as(List[cls.item_type], list(values))
+        except ValidationError as error:
+            first = error.errors()[0]
+            raise ValueError(
+                f"value at index {first['loc'][-1]}: {first['msg']}"
+            ) from None
+
+    @staticmethod
+    def convert(values: Any) -> Any:
+        """
+        Converts a list or array of values of the column type to an array. Arrays of the column type are not copied.
+        Returns None for values of other types. Columns without conversion always return None, so their values are
+        coerced value by value.
+        """
+        del values
+
+
+class StrColumn(_Column):
+    """Column of strings"""
+
+    items_schema = {"type": "string"}
+    item_type = str
+
+    @staticmethod
+    def convert(values: Any) -> Any:
+        import numpy as np
+        from pandas.api.types import infer_dtype
+
+        if infer_dtype(values, skipna=False) not in ("string", "empty"):
+            return None
+        return np.asarray(values, dtype=object)
+
+
+class IntColumn(_Column):
+    """Column of integers. Floats are truncated like for rows"""
+
+    items_schema = {"type": "integer"}
+    item_type = int
+
+    @staticmethod
+    def convert(values: Any) -> Any:
+        import numpy as np
+
+        array = np.asarray(values)
+        if array.dtype.kind in "iu":
+            return array.astype(np.int64, copy=False)
+        if array.dtype.kind == "f" and np.isfinite(array).all():
+            return np.trunc(array).astype(np.int64)
+        return None
+
+
+class FloatColumn(_Column):
+    """Column of numbers"""
+
+    items_schema = {"type": "number"}
+    item_type = float
+
+    @staticmethod
+    def convert(values: Any) -> Any:
+        import numpy as np
+
+        array = np.asarray(values)
+        if array.dtype.kind not in "iuf":
+            return None
+        return array.astype(np.float64, copy=False)
+
+
+class DatetimeColumn(_Column):
+    """
+    Column of timestamps in the formats rows accept: ISO 8601 datetimes or Unix times in seconds or milliseconds.
+    Timestamps with time zone are converted to UTC.
+    """
+
+    items_schema = {"type": "string", "format": "date-time"}
+    item_type = datetime.datetime
+
+    @staticmethod
+    def convert(values: Any) -> Any:
+        import pandas as pd
+        from pandas.api.types import infer_dtype
+
+        kind = infer_dtype(values, skipna=False)
+        if kind == "string":
+            # Only datetimes of the format of rows, pandas would also accept dates and other formats
+            unique = pd.Series(pd.unique(pd.Series(values, dtype=object)))
+            if not unique.str.match(datetime_re.pattern).all():
+                return None
+        elif kind not in ("empty", "datetime64", "datetime"):
+            return None
+        try:
+            timestamps = pd.to_datetime(values, utc=True)
+        except (ValueError, OverflowError) as error:
+            raise ValueError("value is not a valid column of timestamps") from error
+        return timestamps.tz_convert(None).to_numpy()
+
+
+class _ColumnarModel(BaseModel):
+    """Model with a list of values per column, which all have the same length"""
+
+    @root_validator(skip_on_failure=True)
+    def same_length(  # pylint: disable=no-self-argument,no-self-use
+        cls, columns: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Checks that all columns have the same length"""
+        if len({len(values) for values in columns.values()}) > 1:
+            raise ValueError("All columns must have the same length.")
+        return columns
+
+    def __len__(self) -> int:
+        return len(next(iter(dict(self).values()), ()))
+
+
+class ColumnarRequestInputInference(_ColumnarModel):
+    """Raw inference request input with a list of values per column"""
+
+    Timestamp: DatetimeColumn
+    Age: IntColumn
+    Gender: StrColumn
+    City: StrColumn
+    Seniority: StrColumn
+    Position: StrColumn
+    Years_of_Experience: FloatColumn
+    Company_Size: StrColumn
+    Company_Type: StrColumn
+
+
+class ColumnarPreprocessedRequestInference(_ColumnarModel):
+    """Return of the inference preprocessing service with a list of values per column"""
+
+    Year: IntColumn
+    Age: IntColumn
+    Gender: IntColumn
+    City: IntColumn
+    Seniority: IntColumn
+    Position: IntColumn
+    Years_of_Experience: FloatColumn
+    Company_Size: IntColumn
+    Company_Type: IntColumn
+
+
+class ColumnarRequestOutput(_ColumnarModel):
+    """Return of the prediction service with a list of values per column"""
+
+    Salary_Yearly: FloatColumn
@@ -0,0 +1,192 @@
+"""Test cases for Arrow IPC stream bodies."""
+import json
+import unittest
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from parameterized import parameterized
+
+from api.arrow import (
+    ARROW_STREAM_MEDIA_TYPE,
+    ArrowRoute,
+    columnar_response,
+    read_columns,
+    write_columns,
+)
+from utils.request_models import (
+    ColumnarPreprocessedRequestInference,
+    PreprocessedRequestInference,
+)
+
+
+COLUMNS = {
+    column: np.arange(3, dtype=np.int64)
+    for column in ColumnarPreprocessedRequestInference.__fields__
+}
+COLUMNS["Years_of_Experience"] = np.array([0.5, 1.0, 10.0], dtype=np.float32)
+COLUMN_LISTS = {column: values.tolist() for column, values in COLUMNS.items()}
+ROW = {column: values[0] for column, values in COLUMN_LISTS.items()}
+
+app = FastAPI()
+app.router.route_class = ArrowRoute
+
+
+@app.post("/echo")
+def echo(user_request: ColumnarPreprocessedRequestInference, request: Request):
+    """Responds with the validated columns."""
+    return columnar_response(dict(user_request), request)
+
+
+@app.post("/rows_or_columns")
+def rows_or_columns(
+    user_request: Union[
+        List[PreprocessedRequestInference], ColumnarPreprocessedRequestInference
+    ]
+):
+    """Responds with the number of validated rows."""
+    return len(user_request)
+
+
+class ArrowColumnsTest(unittest.TestCase):
+    """Test case for writing and reading columns as Arrow IPC stream."""
+
+    # pylint: disable=no-self-use
+
+    def test_round_trip(self):
+        """Tests if the read columns equal the written columns and numeric columns are views of the body."""
+        columns = read_columns(write_columns(pd.DataFrame(COLUMNS)))
+        self.assertListEqual(list(COLUMNS), list(columns))
+        for column, values in COLUMNS.items():
+            np.testing.assert_array_equal(values, columns[column])
+            self.assertEqual(values.dtype, columns[column].dtype)
+            self.assertFalse(columns[column].flags.owndata)
+
+    def test_strings_and_timestamps(self):
+        """Tests if strings and timestamps are read as object and datetime arrays."""
+        columns = read_columns(
+            write_columns(
+                {
+                    "City": ["köln", "berlin"],
+                    "Timestamp": np.array(
+                        ["2020-01-01", "2021-06-30"], "datetime64[ns]"
+                    ),
+                }
+            )
+        )
+        self.assertListEqual(["köln", "berlin"], columns["City"].tolist())
+        self.assertEqual(np.dtype("datetime64[ns]"), columns["Timestamp"].dtype)
+
+    def test_multiple_batches(self):
+        """Tests if the batches of a stream are concatenated."""
+        batch = pa.RecordBatch.from_pydict({"Age": [24, 31]})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+            writer.write_batch(batch)
+        np.testing.assert_array_equal(
+            [24, 31, 24, 31], read_columns(sink.getvalue().to_pybytes())["Age"]
+        )
+
+
+class ArrowRouteTest(unittest.TestCase):
+    """Test case for negotiating Arrow and JSON bodies."""
+
+    def setUp(self) -> None:
+        """Sets up the client of an app echoing columnar requests."""
+        self.client = TestClient(app)
+        self.arrow_body = write_columns(COLUMNS)
+        self.json_body = json.dumps({k: v.tolist() for k, v in COLUMNS.items()})
+
+    def _assert_columns(self, response):
+        """Asserts that the response contains the columns in the format of its content type."""
+        self.assertEqual(200, response.status_code, response.text)
+        if response.headers["content-type"] == ARROW_STREAM_MEDIA_TYPE:
+            columns = read_columns(response.content)
+        else:
+            columns = response.json()
+        for column, values in COLUMNS.items():
+            np.testing.assert_array_equal(values, columns[column])
+
+    @parameterized.expand(
+        [
+            ("arrow", ARROW_STREAM_MEDIA_TYPE, None, ARROW_STREAM_MEDIA_TYPE),
+            ("arrow_any", ARROW_STREAM_MEDIA_TYPE, "*/*", ARROW_STREAM_MEDIA_TYPE),
+            (
+                "arrow_to_json",
+                ARROW_STREAM_MEDIA_TYPE,
+                "application/json",
+                "application/json",
+            ),
+            ("json", "application/json", None, "application/json"),
+            (
+                "json_to_arrow",
+                "application/json",
+                ARROW_STREAM_MEDIA_TYPE,
+                ARROW_STREAM_MEDIA_TYPE,
+            ),
+            (
+                "json_preferred",
+                "application/json",
+                f"application/json, {ARROW_STREAM_MEDIA_TYPE};q=0.5",
+                "application/json",
+            ),
+        ]
+    )
+    def test_negotiation(self, _, content_type, accept, expected_type):
+        """Tests if the body is parsed by its content type and the response has the accepted format."""
+        headers = {"content-type": content_type}
+        if accept is not None:
+            headers["accept"] = accept
+        body = (
+            self.arrow_body
+            if content_type == ARROW_STREAM_MEDIA_TYPE
+            else self.json_body
+        )
+        response = self.client.post("/echo", data=body, headers=headers)
+        self.assertEqual(expected_type, response.headers["content-type"])
+        self._assert_columns(response)
+
+    def test_invalid_stream(self):
+        """Tests if a body which is no Arrow IPC stream is rejected."""
+        response = self.client.post(
+            "/echo",
+            data=b"no stream",
+            headers={"content-type": ARROW_STREAM_MEDIA_TYPE},
+        )
+        self.assertEqual(400, response.status_code)
+
+    def test_nulls(self):
+        """Tests if columns with nulls are rejected like invalid JSON columns."""
+        columns = dict(COLUMNS, Age=pd.Series([1, None, 3], dtype="Int64"))
+        response = self.client.post(
+            "/echo",
+            data=write_columns(columns),
+            headers={"content-type": ARROW_STREAM_MEDIA_TYPE},
+        )
+        self.assertEqual(422, response.status_code)
+        self.assertListEqual(
+            [["body", "Age"]], [error["loc"] for error in response.json()["detail"]]
+        )
+
+    @parameterized.expand(
+        [
+            ("rows", [dict(ROW, Age="a")], [["body", 0, "Age"]]),
+            ("columns", {**COLUMN_LISTS, "Age": ["a"] * 3}, [["body", "Age"]]),
+            ("neither", 1, [["body"], ["body"]]),
+        ]
+    )
+    def test_errors_of_body_format(self, _, body, expected_locations):
+        """Tests if invalid rows or columns are only reported with the errors of their format."""
+        response = self.client.post("/rows_or_columns", json=body)
+        self.assertEqual(422, response.status_code)
+        self.assertListEqual(
+            expected_locations, [error["loc"] for error in response.json()["detail"]]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
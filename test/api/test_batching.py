@@ -0,0 +1,229 @@
+"""Test cases for micro-batching prediction requests."""
+import asyncio
+import threading
+import time
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from api.batching import BatchingStatistics, PredictionBatcher
+
+
+class PredictionBatcherTest(unittest.TestCase):
+    """Test case for the prediction batcher."""
+
+    def setUp(self) -> None:
+        """Sets up test prerequisites."""
+        self.batches = []
+
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        """Records the batch and predicts the sum of each row."""
+        self.batches.append(len(features))
+        return features.sum(axis=1)
+
+    @staticmethod
+    async def _gather(batcher: PredictionBatcher, requests):
+        """Sends all requests concurrently."""
+        return await asyncio.gather(*[batcher.predict(request) for request in requests])
+
+    def test_predict_concurrent_requests(self):
+        """Tests if concurrent requests are predicted in one batch and get their own predictions."""
+        batcher = PredictionBatcher(
+            predict=self._predict, max_rows=10, max_wait_us=50000
+        )
+        requests = [np.full((size, 2), size, dtype=np.float32) for size in (1, 3, 2)]
+        actual = asyncio.run(self._gather(batcher, requests))
+        self.assertListEqual([6], self.batches)
+        for request, result in zip(requests, actual):
+            assert_array_equal(request.sum(axis=1), result)
+
+    def test_predict_respects_max_rows(self):
+        """Tests if batches do not exceed the maximum number of rows."""
+        batcher = PredictionBatcher(
+            predict=self._predict, max_rows=4, max_wait_us=50000
+        )
+        requests = [np.ones((size, 2), dtype=np.float32) for size in (2, 2, 3, 6)]
+        actual = asyncio.run(self._gather(batcher, requests))
+        self.assertListEqual([3, 4, 6], sorted(self.batches))
+        self.assertListEqual([2, 2, 3, 6], [len(result) for result in actual])
+
+    def test_predict_groups_by_function(self):
+        """Tests if rows are only batched with rows predicted by the same function."""
+
+        def predict_negative(features):
+            self.batches.append(len(features))
+            return -features.sum(axis=1)
+
+        batcher = PredictionBatcher(
+            predict=self._predict, max_rows=10, max_wait_us=50000
+        )
+
+        async def gather():
+            return await asyncio.gather(
+                batcher.predict(np.ones((1, 2))),
+                batcher.predict(np.ones((2, 2)), predict=predict_negative),
+                batcher.predict(np.ones((3, 2)), predict=predict_negative),
+            )
+
+        actual = asyncio.run(gather())
+        self.assertListEqual([1, 5], self.batches)
+        assert_array_equal([2.0], actual[0])
+        assert_array_equal([-2.0, -2.0, -2.0], actual[2])
+
+    def test_predict_empty(self):
+        """Tests if empty requests are not queued."""
+        batcher = PredictionBatcher(predict=self._predict)
+        actual = asyncio.run(batcher.predict(np.empty((0, 2), dtype=np.float32)))
+        self.assertEqual(0, len(actual))
+        self.assertListEqual([], self.batches)
+
+    def test_predict_raises(self):
+        """Tests if errors of the prediction are raised for all requests of the batch."""
+
+        def predict(features):
+            raise ValueError(f"Failed for {len(features)} rows.")
+
+        batcher = PredictionBatcher(predict=predict, max_wait_us=50000)
+        requests = [np.ones((1, 2)), np.ones((1, 2))]
+
+        async def gather():
+            return await asyncio.gather(
+                *[batcher.predict(request) for request in requests],
+                return_exceptions=True,
+            )
+
+        actual = asyncio.run(gather())
+        self.assertTrue(all(isinstance(result, ValueError) for result in actual))
+
+    def test_large_request_skips_queue(self):
+        """Tests if small requests are predicted while a large request is predicted on its own."""
+        started, release = threading.Event(), threading.Event()
+
+        def predict(features):
+            if len(features) >= 100:
+                started.set()
+                release.wait(5)
+            self.batches.append(len(features))
+            return features.sum(axis=1)
+
+        batcher = PredictionBatcher(predict=predict, max_rows=100, max_wait_us=0)
+
+        async def gather():
+            large = asyncio.ensure_future(batcher.predict(np.ones((1000, 2))))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            small = await batcher.predict(np.ones((1, 2)))
+            release.set()
+            return small, await large
+
+        small, large = asyncio.run(gather())
+        self.assertListEqual([1, 1000], self.batches)
+        assert_array_equal([2.0], small)
+        self.assertEqual(1000, len(large))
+
+    def test_concurrent_batches(self):
+        """Tests if several batches are predicted at the same time, but not more than allowed."""
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def predict(features):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return features.sum(axis=1)
+
+        batcher = PredictionBatcher(
+            predict=predict, max_rows=1, max_wait_us=0, max_concurrent_batches=2
+        )
+        requests = [np.ones((1, 2))] * 2 + [np.ones((1, 3))] * 4
+        actual = asyncio.run(self._gather(batcher, requests))
+        self.assertEqual(2, peak[0])
+        self.assertListEqual([2.0] * 2 + [3.0] * 4, [result[0] for result in actual])
+
+    def test_mismatched_widths(self):
+        """Tests if requests with different numbers of features are predicted in separate batches."""
+        batcher = PredictionBatcher(
+            predict=self._predict, max_rows=10, max_wait_us=50000
+        )
+        requests = [np.ones((1, 2)), np.ones((2, 3)), np.ones((1, 2))]
+        actual = asyncio.run(self._gather(batcher, requests))
+        self.assertListEqual([1, 2, 1], self.batches)
+        assert_array_equal([3.0, 3.0], actual[1])
+
+    def test_worker_restart(self):
+        """Tests if a stopped worker keeps the queued requests and is restarted."""
+        release = threading.Event()
+
+        def predict(features):
+            release.wait(5)
+            self.batches.append(len(features))
+            return features.sum(axis=1)
+
+        batcher = PredictionBatcher(
+            predict=predict, max_rows=10, max_wait_us=0, max_concurrent_batches=1
+        )
+
+        async def stop_worker():
+            running = asyncio.ensure_future(batcher.predict(np.ones((1, 2))))
+            await asyncio.sleep(0.05)
+            # The worker waits for the running batch with the second request queued
+            queued = asyncio.ensure_future(batcher.predict(np.ones((2, 2))))
+            await asyncio.sleep(0.05)
+            batcher._worker.cancel()  # pylint: disable=protected-access
+            await asyncio.sleep(0.05)
+            release.set()
+            await running
+            return await asyncio.wait_for(
+                asyncio.gather(queued, batcher.predict(np.ones((3, 2)))), 5
+            )
+
+        asyncio.run(stop_worker())
+        self.assertListEqual([1, 5], self.batches)
+
+    def test_stopped_worker_fails_batch(self):
+        """Tests if the requests of a batch collected by a stopped worker fail instead of waiting forever."""
+        batcher = PredictionBatcher(predict=self._predict, max_wait_us=10**6)
+
+        async def stop_worker():
+            collected = asyncio.ensure_future(batcher.predict(np.ones((1, 2))))
+            await asyncio.sleep(0.05)
+            batcher._worker.cancel()  # pylint: disable=protected-access
+            return await asyncio.gather(collected, return_exceptions=True)
+
+        actual = asyncio.run(stop_worker())
+        self.assertIsInstance(actual[0], RuntimeError)
+
+    def test_predict_on_new_event_loop(self):
+        """Tests if the batcher restarts its worker on a new event loop."""
+        batcher = PredictionBatcher(predict=self._predict, max_wait_us=0)
+        for _ in range(2):
+            actual = asyncio.run(batcher.predict(np.ones((1, 2))))
+            assert_array_equal(np.array([2.0]), actual)
+        self.assertEqual(2, batcher.statistics.batches)
+
+
+class BatchingStatisticsTest(unittest.TestCase):
+    """Test case for the batching statistics."""
+
+    def test_summary(self):
+        """Tests the summary of the recorded batches."""
+        statistics = BatchingStatistics(window=2)
+        statistics.record(batch_size=1, queue_waits_us=[10.0])
+        statistics.record(batch_size=3, queue_waits_us=[20.0, 30.0])
+        statistics.record(batch_size=5, queue_waits_us=[40.0])
+        actual = statistics.summary()
+        self.assertDictEqual({"batches": 3, "rows": 9}, actual["total"])
+        self.assertEqual(2, actual["batch_size"]["count"])
+        self.assertEqual(4.0, actual["batch_size"]["mean"])
+        self.assertEqual(40.0, actual["queue_wait_us"]["max"])
+
+    def test_summary_empty(self):
+        """Tests the summary without recorded batches."""
+        actual = BatchingStatistics().summary()
+        self.assertDictEqual({"count": 0}, actual["batch_size"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""Test cases for the prediction cache."""
+import asyncio
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from api.caching import EVICTED, HITS, MISSES, PredictionCache
+
+
+class PredictionCacheTest(unittest.TestCase):
+    """Test case for caching the predictions of feature vectors."""
+
+    def setUp(self) -> None:
+        """Sets up a prediction function summing the features of each row."""
+        self.predicted = []
+        self.versions = {1}
+        self.delay_s = 0
+
+    async def _predict(self, features: np.ndarray) -> np.ndarray:
+        """Records the predicted rows and returns the sum of their features."""
+        self.predicted.append(len(features))
+        await asyncio.sleep(self.delay_s)
+        if (features < 0).any():
+            raise ValueError("Negative feature")
+        return features.sum(axis=1)
+
+    def _cache(self, **kwargs) -> PredictionCache:
+        """Returns a cache of the prediction function checking the version on every lookup."""
+        return PredictionCache(
+            predict=self._predict,
+            versions=lambda: self.versions,
+            check_interval_s=0,
+            **kwargs,
+        )
+
+    def test_hits(self):
+        """Tests if cached and duplicated rows are predicted once."""
+        cache = self._cache()
+        hits, misses = HITS.value, MISSES.value
+        first = asyncio.run(
+            cache.predict(np.array([[1, 2], [3, 4], [1, 2]]), version=1)
+        )
+        second = asyncio.run(cache.predict(np.array([[3, 4], [5, 6]]), version=1))
+        self.assertListEqual([3, 7, 3], first.tolist())
+        self.assertListEqual([7, 11], second.tolist())
+        self.assertListEqual([2, 1], self.predicted)
+        self.assertEqual(hits + 1, HITS.value)
+        self.assertEqual(misses + 3, MISSES.value)
+
+    def test_single_flight(self):
+        """Tests if concurrent lookups of the same rows wait for a single prediction."""
+        cache = self._cache()
+        self.delay_s = 0.01
+
+        async def lookup():
+            return await asyncio.gather(
+                cache.predict(np.array([[1, 2]]), version=1),
+                cache.predict(np.array([[1, 2], [3, 4]]), version=1),
+            )
+
+        first, second = asyncio.run(lookup())
+        self.assertListEqual([3], first.tolist())
+        self.assertListEqual([3, 7], second.tolist())
+        self.assertListEqual([1, 1], self.predicted)
+
+    def test_failure_is_not_cached(self):
+        """Tests if a failed prediction is raised to all waiting lookups and predicted again later."""
+        cache = self._cache()
+        self.delay_s = 0.01
+
+        async def lookup():
+            return await asyncio.gather(
+                cache.predict(np.array([[-1, 2]]), version=1),
+                cache.predict(np.array([[-1, 2]]), version=1),
+                return_exceptions=True,
+            )
+
+        self.assertTrue(all(isinstance(e, ValueError) for e in asyncio.run(lookup())))
+        with self.assertRaises(ValueError):
+            asyncio.run(cache.predict(np.array([[-1, 2]]), version=1))
+        self.assertListEqual([1, 1], self.predicted)
+
+    @parameterized.expand(
+        [
+            ("capacity", {"max_entries": 1}, [1, 1, 1]),
+            ("expired", {"ttl_s": 0}, [1, 1, 1]),
+            ("cached", {}, [1, 1]),
+        ]
+    )
+    def test_eviction(self, _, kwargs, expected):
+        """Tests if the least recently used and expired entries are predicted again."""
+        cache = self._cache(**kwargs)
+        for features in ([[1, 2]], [[3, 4]], [[1, 2]]):
+            asyncio.run(cache.predict(np.array(features), version=1))
+        self.assertListEqual(expected, self.predicted)
+
+    def test_eviction_counter(self):
+        """Tests if entries beyond the maximum are counted as evicted."""
+        cache = self._cache(max_entries=2)
+        evicted = EVICTED.value
+        asyncio.run(cache.predict(np.array([[1], [2], [3], [4]]), version=1))
+        self.assertEqual(2, len(cache))
+        self.assertEqual(evicted + 2, EVICTED.value)
+
+    def test_version_change(self):
+        """Tests if the entries of a version are dropped once it is no longer current."""
+        cache = self._cache()
+        asyncio.run(cache.predict(np.array([[1, 2]]), version=1))
+        self.versions = {2}
+        asyncio.run(cache.predict(np.array([[1, 2]]), version=2))
+        self.assertListEqual([1, 1], self.predicted)
+        self.assertEqual(1, len(cache))
+
+    def test_models(self):
+        """Tests if models share the cache with separate entries, which are kept while other models are swapped."""
+        self.versions = {("default", "a"), ("challenger", "b")}
+        cache = self._cache()
+        for version in self.versions:
+            asyncio.run(cache.predict(np.array([[1, 2]]), version=version))
+        self.assertListEqual([1, 1], self.predicted)
+        self.assertEqual(2, len(cache))
+        self.versions = {("default", "a"), ("challenger", "c")}
+        asyncio.run(cache.predict(np.array([[1, 2]]), version=("default", "a")))
+        self.assertListEqual([1, 1], self.predicted)
+        self.assertEqual(1, len(cache))
+
+    def test_previous_version(self):
+        """Tests if requests of a previous version are predicted with their function without the cache."""
+        cache = self._cache()
+        self.versions = {2}
+
+        async def predict_previous(features):
+            return -features.sum(axis=1)
+
+        actual = asyncio.run(
+            cache.predict(np.array([[1, 2]]), version=1, predict=predict_previous)
+        )
+        np.testing.assert_array_equal([-3], actual)
+        self.assertEqual(0, len(cache))
+        actual = asyncio.run(cache.predict(np.array([[1, 2]]), version=2))
+        np.testing.assert_array_equal([3], actual)
+        self.assertEqual(1, len(cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Test cases for responses with a list of values per column."""
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from api.columnar import ColumnarResponse
+
+
+class ColumnarResponseTest(unittest.TestCase):
+    """Test case for rendering columnar JSON responses."""
+
+    def test_render(self):
+        """Tests if arrays, series and lists are rendered as JSON lists of native values."""
+        response = ColumnarResponse(
+            {
+                "Salary_Yearly": np.array([1.5, 2.25]),
+                "Age": pd.Series([24, 31], dtype="Int64"),
+                "City": ["köln", "berlin"],
+            }
+        )
+        self.assertEqual("application/json", response.media_type)
+        self.assertEqual(
+            '{"Salary_Yearly":[1.5,2.25],"Age":[24,31],"City":["köln","berlin"]}'.encode(),
+            response.body,
+        )
+
+    def test_render_dataframe(self):
+        """Tests if a dataframe is rendered with a list per column."""
+        data = pd.DataFrame({"Year": [2020, 2021], "Years_of_Experience": [0.5, 1.0]})
+        self.assertDictEqual(
+            {"Year": [2020, 2021], "Years_of_Experience": [0.5, 1.0]},
+            json.loads(ColumnarResponse(data).body),
+        )
+
+    def test_render_nan(self):
+        """Tests if NaN, which is no valid JSON, raises."""
+        with self.assertRaises(ValueError):
+            ColumnarResponse({"Salary_Yearly": np.array([np.nan])})
+
+
+if __name__ == "__main__":
+    unittest.main()
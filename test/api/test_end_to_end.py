@@ -0,0 +1,141 @@
+"""Test cases for the API with the real preprocessing and prediction services, a model and labels."""
+import importlib
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from test.resources.sample_data import INFERENCE_REQUESTS, LABELS, TRANSFORMED_FEATURES
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from api import main
+from api.arrow import ARROW_STREAM_MEDIA_TYPE, read_columns, write_columns
+from api.caching import HITS
+from api.hot_swap import MODEL_ID_HEADER, MODEL_VERSION_HEADER
+from api.startup import Startup
+from modeling import batch_score
+from modeling.sklearn_models import SKLearnModel
+from utils.data_io import write_data
+
+
+ROWS = jsonable_encoder(INFERENCE_REQUESTS)
+COLUMNS = {column: [row[column] for row in ROWS] for column in ROWS[0]}
+
+
+class EndToEndTest(unittest.TestCase):
+    """Test case for predicting each body format with the services loaded in-process."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Writes a small default model, a registered model and their labels and loads the services with them."""
+        cls.temp_dir = tempfile.mkdtemp()
+        model_path = Path(cls.temp_dir, "model.joblib").as_posix()
+        challenger_path = Path(cls.temp_dir, "challenger.joblib").as_posix()
+        labels_path = Path(cls.temp_dir, "labels.json").as_posix()
+        registry_path = Path(cls.temp_dir, "registry.json").as_posix()
+        for path, targets in ((model_path, [1.0, 2.0]), (challenger_path, [5.0, 6.0])):
+            model = SKLearnModel(hyperparameters={"n_estimators": 5, "random_state": 0})
+            model.fit(X=TRANSFORMED_FEATURES, y=pd.Series(targets * 2))
+            model.save(filename=path)
+        write_data(LABELS, labels_path)
+        write_data(
+            {
+                "models": {
+                    "challenger": {
+                        "model_path": challenger_path,
+                        "labels_path": labels_path,
+                    }
+                }
+            },
+            registry_path,
+        )
+        # The services read their configuration once they are imported
+        with mock.patch.dict(
+            os.environ,
+            MODEL_PATH=model_path,
+            LABELS_PATH=labels_path,
+            MODEL_REGISTRY_PATH=registry_path,
+            MODEL_WATCH_INTERVAL_S="0",
+        ):
+            importlib.import_module("api.preprocessing_service")
+            importlib.import_module("api.prediction_service")
+        batch_score.load_state(model_path=model_path, labels_path=labels_path)
+        cls.expected = batch_score.score_chunk(pd.DataFrame(INFERENCE_REQUESTS))[
+            "Salary_Yearly"
+        ].to_numpy()
+        batch_score._STATE.clear()  # pylint: disable=protected-access
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Removes the model and the labels."""
+        shutil.rmtree(cls.temp_dir)
+
+    def setUp(self) -> None:
+        """Sets up the API to load the real services on startup."""
+        patch = mock.patch.object(
+            main,
+            "STARTUP",
+            Startup(load=main.load_services, warm_up=main.warm_up_services),
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_rows(self):
+        """Tests if a list of rows is preprocessed and predicted."""
+        with TestClient(main.app) as client:
+            response = client.post("/get_salary", json=ROWS)
+        self.assertEqual(200, response.status_code, response.text)
+        np.testing.assert_allclose(
+            self.expected, [row["Salary_Yearly"] for row in response.json()]
+        )
+        self.assertIn(MODEL_VERSION_HEADER, response.headers)
+
+    def test_columnar_json(self):
+        """Tests if a JSON object with a list per column is preprocessed and predicted."""
+        with TestClient(main.app) as client:
+            response = client.post("/get_salary", json=COLUMNS)
+        self.assertEqual(200, response.status_code, response.text)
+        np.testing.assert_allclose(self.expected, response.json()["Salary_Yearly"])
+
+    def test_arrow(self):
+        """Tests if an Arrow IPC stream body is preprocessed and predicted and answered with Arrow."""
+        with TestClient(main.app) as client:
+            response = client.post(
+                "/get_salary",
+                data=write_columns(pd.DataFrame(INFERENCE_REQUESTS)),
+                headers={"content-type": ARROW_STREAM_MEDIA_TYPE},
+            )
+        self.assertEqual(200, response.status_code, response.text)
+        self.assertEqual(ARROW_STREAM_MEDIA_TYPE, response.headers["content-type"])
+        np.testing.assert_allclose(
+            self.expected, read_columns(response.content)["Salary_Yearly"]
+        )
+
+    def test_registered_model_is_cached(self):
+        """Tests if the predictions of a registered model are cached separately from the default model."""
+        with TestClient(main.app) as client:
+            default = client.post("/get_salary", json=ROWS[:1])
+            hits = HITS.value
+            responses = [
+                client.post(
+                    "/get_salary",
+                    json=ROWS[:1],
+                    headers={MODEL_ID_HEADER: "challenger"},
+                )
+                for _ in range(2)
+            ]
+        self.assertEqual(hits + 1, HITS.value)
+        self.assertListEqual(
+            ["challenger"] * 2, [r.headers[MODEL_ID_HEADER] for r in responses]
+        )
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertNotEqual(default.json(), responses[0].json())
+
+
+if __name__ == "__main__":
+    unittest.main()
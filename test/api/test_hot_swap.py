@@ -0,0 +1,171 @@
+"""Test cases for reloading the model files while serving."""
+import os
+import tempfile
+import time
+import unittest
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api.hot_swap import (
+    MODEL_VERSION_HEADER,
+    RELOAD_FAILURES,
+    RELOAD_SUCCESSES,
+    HotSwap,
+    ModelVersionMiddleware,
+    content_version,
+    file_version,
+)
+
+
+def _write(path: str, text: str) -> None:
+    """Replaces the file atomically, as deployments should."""
+    with open(path + ".new", "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(path + ".new", path)
+
+
+class FileVersionTest(unittest.TestCase):
+    """Test case for the version of files."""
+
+    def test_file_version(self):
+        """Tests if the version changes once a file is replaced or removed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.joblib")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("a")
+            version = file_version(path, None)
+            self.assertEqual(version, file_version(path))
+            with open(path + ".new", "w", encoding="utf-8") as file:
+                file.write("bb")
+            os.replace(path + ".new", path)
+            self.assertNotEqual(version, file_version(path))
+            os.remove(path)
+            self.assertEqual(((path, None, None, None),), file_version(path))
+
+    def test_content_version(self):
+        """Tests if the content version only depends on the contents of the files."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.joblib")
+            _write(path, "a")
+            version = content_version(path, None)
+            self.assertEqual(12, len(version))
+            _write(path, "a")
+            self.assertEqual(version, content_version(path))
+            _write(path, "b")
+            self.assertNotEqual(version, content_version(path))
+
+
+class HotSwapTest(unittest.TestCase):
+    """Test case for swapping in the value of changed files."""
+
+    def setUp(self) -> None:
+        """Sets up a model and a labels file, whose contents are loaded together."""
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.model_path = os.path.join(directory.name, "model.joblib")
+        self.labels_path = os.path.join(directory.name, "labels.json")
+        _write(self.model_path, "model 1")
+        _write(self.labels_path, "labels 1")
+        self.warmed_up = []
+
+    def _load(self):
+        """Returns the contents of both files and fails for a broken model."""
+        with open(self.model_path, encoding="utf-8") as file:
+            model = file.read()
+        if model == "broken":
+            raise ValueError("Broken model")
+        with open(self.labels_path, encoding="utf-8") as file:
+            return model, file.read()
+
+    def _hot_swap(self, **kwargs) -> HotSwap:
+        """Returns the hot swap of both files."""
+        hot_swap = HotSwap(
+            load=self._load,
+            paths=(self.model_path, self.labels_path),
+            warm_up=self.warmed_up.append,
+            **kwargs,
+        )
+        self.addCleanup(hot_swap.stop)
+        return hot_swap
+
+    def test_reload(self):
+        """Tests if changed files are warmed up and swapped in, while a kept value stays unchanged."""
+        hot_swap = self._hot_swap()
+        kept = hot_swap.current
+        self.assertFalse(hot_swap.reload())
+        _write(self.model_path, "model 2")
+        _write(self.labels_path, "labels 2")
+        successes = RELOAD_SUCCESSES.value
+        self.assertTrue(hot_swap.reload())
+        self.assertEqual(("model 2", "labels 2"), hot_swap.current.value)
+        self.assertListEqual([("model 2", "labels 2")], self.warmed_up)
+        self.assertNotEqual(kept.version, hot_swap.current.version)
+        self.assertEqual(("model 1", "labels 1"), kept.value)
+        self.assertEqual(successes + 1, RELOAD_SUCCESSES.value)
+
+    def test_failed_reload(self):
+        """Tests if the previous value is kept if loading fails, until the files change again."""
+        hot_swap = self._hot_swap()
+        kept = hot_swap.current
+        _write(self.model_path, "broken")
+        failures = RELOAD_FAILURES.value
+        self.assertFalse(hot_swap.reload())
+        self.assertFalse(hot_swap.reload())
+        self.assertEqual(failures + 1, RELOAD_FAILURES.value)
+        self.assertIs(kept, hot_swap.current)
+        _write(self.model_path, "model 2")
+        self.assertTrue(hot_swap.reload())
+        self.assertEqual(("model 2", "labels 1"), hot_swap.current.value)
+
+    def test_poll_waits_for_settled_files(self):
+        """Tests if changed files are only loaded once they did not change between two polls."""
+        hot_swap = self._hot_swap()
+        _write(self.model_path, "model 2")
+        self.assertFalse(hot_swap.poll())
+        _write(self.labels_path, "labels 2")
+        self.assertFalse(hot_swap.poll())
+        self.assertTrue(hot_swap.poll())
+        self.assertEqual(("model 2", "labels 2"), hot_swap.current.value)
+        self.assertFalse(hot_swap.poll())
+
+    def test_watcher(self):
+        """Tests if the watcher thread swaps in changed files."""
+        hot_swap = self._hot_swap(interval_s=0.01)
+        _write(self.model_path, "model 2")
+        deadline = time.monotonic() + 5
+        while hot_swap.current.value[0] != "model 2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(("model 2", "labels 1"), hot_swap.current.value)
+        hot_swap.stop()
+        _write(self.model_path, "model 3")
+        time.sleep(0.05)
+        self.assertEqual(("model 2", "labels 1"), hot_swap.current.value)
+
+
+class ModelVersionMiddlewareTest(unittest.TestCase):
+    """Test case for reporting the model version in a header."""
+
+    def test_header(self):
+        """Tests if the version stored by the endpoint is added to its response only."""
+        app = FastAPI()
+        app.add_middleware(ModelVersionMiddleware)
+
+        @app.get("/versioned")
+        def versioned(request: Request):
+            request.state.model_version = "abc"
+            return "versioned"
+
+        @app.get("/unversioned")
+        def unversioned():
+            return "unversioned"
+
+        with TestClient(app) as client:
+            versioned_response = client.get("/versioned")
+            unversioned_response = client.get("/unversioned")
+        self.assertEqual("abc", versioned_response.headers[MODEL_VERSION_HEADER])
+        self.assertNotIn(MODEL_VERSION_HEADER, unversioned_response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
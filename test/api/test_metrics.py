@@ -0,0 +1,217 @@
+"""Test cases for the in-process metrics."""
+import gc
+import threading
+import unittest
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+from parameterized import parameterized
+
+from api.metrics import (
+    REQUESTS,
+    STAGES,
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    StageTimer,
+)
+
+
+class CounterTest(unittest.TestCase):
+    """Test case for the counter."""
+
+    def test_inc_from_threads(self):
+        """Tests if increments of concurrent threads are not lost."""
+        counter = Counter()
+
+        def increment():
+            for _ in range(10000):
+                counter.inc()
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(2.5)
+        self.assertEqual(40002.5, counter.value)
+
+    def test_exited_threads(self):
+        """Tests if the values of exited threads are kept after their lists are dropped."""
+        counter = Counter()
+        for _ in range(500):
+            thread = threading.Thread(target=counter.inc)
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(500, counter.value)
+        shards = counter._shards  # pylint: disable=protected-access
+        self.assertEqual(0, shards.n_shards)
+
+
+class HistogramTest(unittest.TestCase):
+    """Test case for the histogram."""
+
+    @parameterized.expand(
+        [
+            ("below_first_bucket", [0.5], [1, 1, 1]),
+            ("on_upper_bound", [1, 2], [1, 2, 2]),
+            ("above_last_bucket", [1.5, 3], [0, 1, 2]),
+        ]
+    )
+    def test_snapshot(self, _, values, expected_counts):
+        """Tests if observations are counted cumulatively in the buckets with upper bounds greater or equal."""
+        histogram = Histogram(buckets=[2, 1])
+        for value in values:
+            histogram.observe(value)
+        cumulative_counts, total = histogram.snapshot()
+        self.assertListEqual(expected_counts, cumulative_counts)
+        self.assertEqual(sum(values), total)
+
+    def test_observe_from_threads(self):
+        """Tests if observations of concurrent threads are not lost."""
+        histogram = Histogram(buckets=[1])
+        threads = [
+            threading.Thread(
+                target=lambda: [histogram.observe(value % 3) for value in range(3000)]
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(([8000, 12000], 12000), histogram.snapshot())
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    """Test case for rendering metrics in the Prometheus text format."""
+
+    def test_render(self):
+        """Tests if all metric types are rendered with escaped labels."""
+        registry = MetricsRegistry()
+        requests = registry.register(
+            "requests_total", "Requests.", kind="counter", label_names=("path",)
+        )
+        requests.labels(path='/a"b').inc(3)
+        registry.register("load_seconds", "Load.", kind="gauge").labels().set(0.25)
+        registry.register(
+            "size", "Size.", kind="histogram", buckets=[1, 10]
+        ).labels().observe(4)
+        expected = "\n".join(
+            [
+                "# HELP requests_total Requests.",
+                "# TYPE requests_total counter",
+                'requests_total{path="/a\\"b"} 3',
+                "# HELP load_seconds Load.",
+                "# TYPE load_seconds gauge",
+                "load_seconds 0.25",
+                "# HELP size Size.",
+                "# TYPE size histogram",
+                'size_bucket{le="1"} 0',
+                'size_bucket{le="10"} 1',
+                'size_bucket{le="+Inf"} 1',
+                "size_sum 4",
+                "size_count 1",
+            ]
+        )
+        self.assertEqual(expected + "\n", registry.render())
+
+    def test_labels_are_cached(self):
+        """Tests if the same label values return the same metric."""
+        family = MetricsRegistry().register(
+            "requests_total", "Requests.", kind="counter", label_names=("path",)
+        )
+        self.assertIs(family.labels(path="/a"), family.labels(path="/a"))
+        self.assertIsNot(family.labels(path="/a"), family.labels(path="/b"))
+
+    @parameterized.expand(
+        [
+            ("missing_label", {}),
+            ("unknown_label", {"path": "/a", "status": "200"}),
+        ]
+    )
+    def test_labels_raises(self, _, label_values):
+        """Tests if label values have to match the label names."""
+        family = MetricsRegistry().register(
+            "requests_total", "Requests.", kind="counter", label_names=("path",)
+        )
+        with self.assertRaises(ValueError):
+            family.labels(**label_values)
+
+    @parameterized.expand(
+        [
+            ("duplicated_name", "requests_total", "counter"),
+            ("unknown_type", "other", "summary"),
+        ]
+    )
+    def test_register_raises(self, _, name, kind):
+        """Tests if names have to be unique and types supported."""
+        registry = MetricsRegistry()
+        registry.register("requests_total", "Requests.", kind="counter")
+        with self.assertRaises(ValueError):
+            registry.register(name, "Other.", kind=kind)
+
+
+class MetricsMiddlewareTest(unittest.TestCase):
+    """Test case for recording requests with the middleware."""
+
+    def setUp(self) -> None:
+        """Sets up an app with the middleware."""
+        app = FastAPI()
+        app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"])
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        def item(item_id: int):
+            """Returns the item id."""
+            return {"item_id": item_id}
+
+        @app.get("/handled")
+        def handled(request: Request):
+            """Records the parse stage and marks the end of the endpoint."""
+            StageTimer(started_at=request.state.started_at).lap("parse")
+            request.state.handled_at = request.state.started_at
+            return {}
+
+        self.client = TestClient(app)
+
+    def test_record_requests(self):
+        """Tests if requests are counted by path and status and the stages are recorded."""
+        handled = REQUESTS.labels(path="/handled", status=200).value
+        unmatched = REQUESTS.labels(path="unmatched", status=404).value
+        parse_count = STAGES["parse"].snapshot()[0][-1]
+        respond_count = STAGES["respond"].snapshot()[0][-1]
+        self.client.get("/handled")
+        self.client.get("/handled")
+        self.client.get("/unknown")
+        self.assertEqual(
+            handled + 2, REQUESTS.labels(path="/handled", status=200).value
+        )
+        self.assertEqual(
+            unmatched + 1, REQUESTS.labels(path="unmatched", status=404).value
+        )
+        self.assertEqual(parse_count + 2, STAGES["parse"].snapshot()[0][-1])
+        self.assertEqual(respond_count + 2, STAGES["respond"].snapshot()[0][-1])
+
+    @parameterized.expand(
+        [
+            ("path_parameter", "get", "/items/1", "/items/{item_id}", 200),
+            ("other_method", "post", "/items/1", "unmatched", 405),
+            ("preflight", "options", "/any/url", "unmatched", 200),
+        ]
+    )
+    def test_route_label(self, _, method, url, path, status):
+        """Tests if requests are labelled with the path template of their route or as unmatched."""
+        before = REQUESTS.labels(path=path, status=status).value
+        headers = {"Origin": "http://client", "Access-Control-Request-Method": "GET"}
+        response = self.client.request(method, url, headers=headers)
+        self.assertEqual(status, response.status_code)
+        self.assertEqual(before + 1, REQUESTS.labels(path=path, status=status).value)
+        self.assertNotIn(f'path="{url}"', "\n".join(REQUESTS.render()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+"""Test cases for loading several models within a memory budget and routing requests to them."""
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+from parameterized import parameterized
+from sklearn.ensemble import RandomForestRegressor
+
+from api.hot_swap import HotSwap, Versioned
+from api.registry import (
+    DEFAULT_MODEL_ID,
+    ModelRegistry,
+    ModelSpec,
+    RegistryConfig,
+    UnknownModelError,
+    resident_bytes,
+)
+
+
+class RegistryConfigTest(unittest.TestCase):
+    """Test case for reading the registry configuration."""
+
+    @staticmethod
+    def _read(config) -> RegistryConfig:
+        """Writes the configuration to a file and reads it."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "models.json")
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(config, file)
+            return RegistryConfig.from_path(path)
+
+    def test_from_path(self):
+        """Tests if the models and weights are read."""
+        config = self._read(
+            {
+                "models": {"candidate": {"model_path": "candidate.joblib"}},
+                "weights": {"default": 9, "candidate": 1},
+            }
+        )
+        self.assertDictEqual(
+            {"candidate": ModelSpec(model_path="candidate.joblib")}, config.models
+        )
+        self.assertDictEqual({"default": 9.0, "candidate": 1.0}, config.weights)
+
+    def test_default(self):
+        """Tests if all requests go to the default model without configuration."""
+        self.assertDictEqual(
+            {DEFAULT_MODEL_ID: 1.0}, RegistryConfig.from_path(None).weights
+        )
+        self.assertDictEqual({DEFAULT_MODEL_ID: 1.0}, self._read({}).weights)
+
+    @parameterized.expand(
+        [
+            ("reserved_id", {"models": {"default": {"model_path": "a.joblib"}}}),
+            ("unknown_weight", {"weights": {"candidate": 1}}),
+            ("no_weight", {"weights": {"default": 0}}),
+        ]
+    )
+    def test_invalid(self, _, config):
+        """Tests if invalid configurations are rejected."""
+        with self.assertRaises(ValueError):
+            self._read(config)
+
+
+class ResidentBytesTest(unittest.TestCase):
+    """Test case for estimating the memory of loaded models."""
+
+    def test_arrays(self):
+        """Tests if referenced arrays are counted once."""
+        array = np.zeros(100, dtype=np.float64)
+        self.assertEqual(
+            1600, resident_bytes({"a": array, "b": [array, np.zeros(100)]})
+        )
+
+    def test_forest(self):
+        """Tests if the arrays of the trees of sklearn forests are counted."""
+        rng = np.random.default_rng(0)
+        forest = RandomForestRegressor(n_estimators=3, random_state=0).fit(
+            rng.random((50, 2)), rng.random(50)
+        )
+        expected = sum(
+            tree.tree_.__getstate__()["nodes"].nbytes
+            + tree.tree_.__getstate__()["values"].nbytes
+            for tree in forest.estimators_
+        )
+        self.assertGreaterEqual(resident_bytes(forest), expected)
+        self.assertLess(resident_bytes(forest), expected + 1024)
+
+
+class ModelRegistryTest(unittest.TestCase):
+    """Test case for loading models on demand within the memory budget."""
+
+    def setUp(self) -> None:
+        """Sets up models of 100 bytes and a pinned default model."""
+        self.loads = []
+        self.stopped = []
+        self.default = self._open(DEFAULT_MODEL_ID)
+
+    def _open(self, model_id: str) -> HotSwap:
+        """Records the load and returns a model of 100 bytes."""
+        self.loads.append(model_id)
+        hot_swap = HotSwap(load=lambda: np.zeros(100, dtype=np.uint8), paths=())
+        hot_swap.stop = lambda: self.stopped.append(model_id)
+        return hot_swap
+
+    def _registry(self, **kwargs) -> ModelRegistry:
+        """Returns a registry of the models a, b and c with a budget of three models."""
+        return ModelRegistry(
+            load=self._open,
+            model_ids=("a", "b", "c"),
+            memory_budget_bytes=300,
+            pinned={DEFAULT_MODEL_ID: self.default},
+            **kwargs,
+        )
+
+    def test_load_on_demand(self):
+        """Tests if models are loaded once on first use."""
+        registry = self._registry()
+        self.assertIsNone(registry.current("a"))
+        loaded = registry.get("a")
+        self.assertIs(loaded, registry.get("a"))
+        self.assertIs(loaded, registry.current("a"))
+        self.assertListEqual([DEFAULT_MODEL_ID, "a"], self.loads)
+        self.assertDictEqual(
+            {DEFAULT_MODEL_ID: 100, "a": 100},
+            {
+                model_id: model["bytes"]
+                for model_id, model in registry.resident().items()
+            },
+        )
+
+    def test_evict_least_recently_used(self):
+        """Tests if the least recently used models are unloaded beyond the budget, but not the pinned model."""
+        registry = self._registry()
+        kept = registry.get("a")
+        registry.get("b")
+        registry.current("a")
+        registry.get("c")
+        self.assertListEqual(["b"], self.stopped)
+        self.assertListEqual([DEFAULT_MODEL_ID, "a", "c"], list(registry.resident()))
+        self.assertIsNone(registry.current("b"))
+        self.assertIs(kept, registry.current("a"))
+        registry.get("b")
+        self.assertListEqual(["b", "c"], self.stopped)
+
+    def test_over_budget(self):
+        """Tests if a model larger than the budget is loaded anyway and unloads all other models."""
+        registry = self._registry()
+        registry.memory_budget_bytes = 150
+        registry.get("a")
+        registry.get("b")
+        self.assertListEqual(["a"], self.stopped)
+        self.assertListEqual([DEFAULT_MODEL_ID, "b"], list(registry.resident()))
+
+    def test_measure_outside_lock(self):
+        """Tests if measuring a swapped in version neither blocks the lookups nor is skipped by the budget."""
+        measuring, release = threading.Event(), threading.Event()
+
+        def size(value):
+            if len(value) == 200:
+                measuring.set()
+                release.wait(5)
+            return value.nbytes
+
+        self.default = SimpleNamespace(current=Versioned("1", np.zeros(100)))
+        registry = self._registry(size=size)
+        self.default.current = Versioned("2", np.zeros(200, dtype=np.uint8))
+        thread = threading.Thread(target=registry.get, args=("a",))
+        thread.start()
+        self.assertTrue(measuring.wait(5))
+        started_at = time.perf_counter()
+        self.assertIsNone(registry.current("b"))
+        self.assertLess(time.perf_counter() - started_at, 1)
+        release.set()
+        thread.join()
+        self.assertDictEqual(
+            {"version": "2", "bytes": 200}, registry.resident()[DEFAULT_MODEL_ID]
+        )
+        registry.get("b")
+        self.assertListEqual(["a"], self.stopped)
+
+    def test_concurrent_get(self):
+        """Tests if concurrent requests for a model wait for one load."""
+        registry = self._registry()
+        threads = [threading.Thread(target=registry.get, args=("a",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, self.loads.count("a"))
+
+    def test_unknown_model(self):
+        """Tests if unknown models are answered with 404."""
+        registry = self._registry()
+        for function in (registry.get, registry.route):
+            with self.assertRaises(UnknownModelError) as context:
+                function("unknown")
+            self.assertEqual(404, context.exception.status_code)
+
+    def test_route_by_header(self):
+        """Tests if requests for a model id are routed to it."""
+        registry = self._registry(weights={DEFAULT_MODEL_ID: 1})
+        self.assertEqual("b", registry.route("b"))
+        self.assertEqual(DEFAULT_MODEL_ID, registry.route())
+
+    def test_route_by_weight(self):
+        """Tests if requests are split by weight and requests with the same routing key stay on one model."""
+        registry = self._registry(weights={DEFAULT_MODEL_ID: 3, "a": 1, "b": 0})
+        routes = Counter(registry.route() for _ in range(4000))
+        self.assertSetEqual({DEFAULT_MODEL_ID, "a"}, set(routes))
+        self.assertAlmostEqual(0.25, routes["a"] / 4000, delta=0.05)
+        keyed = Counter(
+            registry.route(routing_key=f"user-{key}") for key in range(4000)
+        )
+        self.assertAlmostEqual(0.25, keyed["a"] / 4000, delta=0.05)
+        for key in range(20):
+            self.assertEqual(
+                registry.route(routing_key=f"user-{key}"),
+                registry.route(routing_key=f"user-{key}"),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
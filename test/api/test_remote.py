@@ -0,0 +1,255 @@
+"""Test cases for calling the preprocessing and prediction services over HTTP."""
+import asyncio
+import time
+import unittest
+from test.resources import sample_services
+from test.resources.sample_data import INFERENCE_REQUESTS
+from unittest import mock
+
+import httpx
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from api import main, remote
+from api.arrow import ARROW_STREAM_MEDIA_TYPE, read_columns, write_columns
+from api.hot_swap import MODEL_ID_HEADER, MODEL_VERSION_HEADER
+from api.remote import RemoteService, RemoteServiceError, RetryBudget
+from api.startup import Startup
+
+
+ROWS = jsonable_encoder(INFERENCE_REQUESTS)
+COLUMNS = {column: [row[column] for row in ROWS] for column in ROWS[0]}
+EXPECTED = [row["Age"] * 1000.0 + row["Years_of_Experience"] * 100 for row in ROWS]
+
+
+class RetryBudgetTest(unittest.TestCase):
+    """Test case for limiting retries to a share of the recent requests."""
+
+    def setUp(self) -> None:
+        """Sets up a budget with a controlled clock."""
+        self.now = 0.0
+        self.budget = RetryBudget(
+            ratio=0.5, min_retries=1, window_s=10, clock=lambda: self.now
+        )
+
+    def test_min_retries(self):
+        """Tests if the minimum retries are allowed without requests."""
+        self.assertTrue(self.budget.try_retry())
+        self.assertFalse(self.budget.try_retry())
+
+    def test_ratio(self):
+        """Tests if every request deposits the ratio of a retry."""
+        for _ in range(4):
+            self.budget.record_request()
+        self.assertListEqual(
+            [True, True, True, False], [self.budget.try_retry() for _ in range(4)]
+        )
+
+    def test_window(self):
+        """Tests if requests and retries older than the window are forgotten."""
+        self.budget.record_request()
+        self.budget.record_request()
+        self.assertTrue(self.budget.try_retry())
+        self.assertTrue(self.budget.try_retry())
+        self.now = 10.0
+        self.assertTrue(self.budget.try_retry())
+        self.assertFalse(self.budget.try_retry())
+
+
+class RemoteServiceTest(unittest.TestCase):
+    """Test case for retrying requests to a service."""
+
+    def setUp(self) -> None:
+        """Sets up the list of the answers of the mocked service."""
+        self.answers = []
+        self.attempts = 0
+
+    async def _handler(self, _):
+        """Returns or raises the next answer."""
+        self.attempts += 1
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        if isinstance(answer, float):
+            await asyncio.sleep(answer)
+            return httpx.Response(200)
+        return httpx.Response(answer, text="answer")
+
+    def _request(self, **kwargs):
+        """Sends a request to the mocked service."""
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self._handler))
+        service = RemoteService(
+            "mocked", "http://mocked", client, kwargs.pop("timeout_s", 1), **kwargs
+        )
+        return asyncio.run(service.request("GET", "/"))
+
+    def test_retry(self):
+        """Tests if unavailable services are retried until they answer."""
+        self.answers = [503, 502, 200]
+        self.assertEqual(200, self._request(backoff_s=0).status_code)
+        self.assertEqual(3, self.attempts)
+
+    def test_retries_exhausted(self):
+        """Tests if the last error is raised once all retries failed."""
+        self.answers = [503]
+        with self.assertRaises(RemoteServiceError) as context:
+            self._request(retries=2, backoff_s=0)
+        self.assertEqual(503, context.exception.status_code)
+        self.assertEqual(3, self.attempts)
+
+    def test_no_retry_of_client_errors(self):
+        """Tests if failed responses which a retry does not change are not retried."""
+        self.answers = [422]
+        with self.assertRaises(RemoteServiceError) as context:
+            self._request(backoff_s=0)
+        self.assertEqual(502, context.exception.status_code)
+        self.assertIn("422: answer", context.exception.detail)
+        self.assertEqual(1, self.attempts)
+
+    def test_budget_exhausted(self):
+        """Tests if requests are not retried without budget."""
+        self.answers = [503]
+        with self.assertRaises(RemoteServiceError):
+            self._request(backoff_s=0, budget=RetryBudget(ratio=0, min_retries=0))
+        self.assertEqual(1, self.attempts)
+
+    def test_timeout(self):
+        """Tests if attempts are cancelled after the timeout and retried."""
+        self.answers = [1.0, 0.0]
+        started_at = time.perf_counter()
+        self.assertEqual(200, self._request(timeout_s=0.05, backoff_s=0).status_code)
+        self.assertLess(time.perf_counter() - started_at, 0.5)
+        self.answers = [1.0]
+        with self.assertRaises(RemoteServiceError) as context:
+            self._request(timeout_s=0.05, retries=0)
+        self.assertEqual(504, context.exception.status_code)
+
+    def test_unreachable(self):
+        """Tests if connection errors are reported as bad gateway."""
+        self.answers = [httpx.ConnectError("refused")]
+        with self.assertRaises(RemoteServiceError) as context:
+            self._request(backoff_s=0)
+        self.assertEqual(502, context.exception.status_code)
+        self.assertEqual(3, self.attempts)
+
+
+class RemoteOrchestrationTest(unittest.TestCase):
+    """Test case for the API calling in-process stand-ins of the services over HTTP."""
+
+    def setUp(self) -> None:
+        """Sets up the API with remote services served by the stand-ins."""
+        sample_services.STATE.update(delay_s=0.0, failures=0, requests=0)
+        patches = [
+            mock.patch.object(remote, "PREPROCESSING_URL", "http://preprocessing"),
+            mock.patch.object(remote, "PREDICTION_URL", "http://prediction"),
+            mock.patch.object(remote, "REMOTE_BACKOFF_S", 0.0),
+            mock.patch.object(
+                main,
+                "STARTUP",
+                Startup(load=self._load_services, warm_up=main.warm_up_services),
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    @staticmethod
+    def _load_services():
+        """Creates the remote services, whose client sends the requests to the stand-ins."""
+        return main.Services(
+            preprocessing=None,
+            prediction=None,
+            feature_pipeline=None,
+            remote=remote.create_remote_services(
+                mounts={
+                    "http://preprocessing": httpx.ASGITransport(
+                        app=sample_services.preprocessing_app
+                    ),
+                    "http://prediction": httpx.ASGITransport(
+                        app=sample_services.prediction_app
+                    ),
+                }
+            ),
+        )
+
+    def test_rows_and_columns(self):
+        """Tests if rows, columnar JSON and Arrow requests are predicted by the remote services."""
+        with TestClient(main.app) as client:
+            rows = client.post("/get_salary", json=ROWS)
+            columns = client.post("/get_salary", json=COLUMNS)
+            arrow = client.post(
+                "/get_salary",
+                data=write_columns(COLUMNS),
+                headers={"content-type": ARROW_STREAM_MEDIA_TYPE},
+            )
+        np.testing.assert_allclose(
+            EXPECTED, [row["Salary_Yearly"] for row in rows.json()]
+        )
+        np.testing.assert_allclose(EXPECTED, columns.json()["Salary_Yearly"])
+        np.testing.assert_allclose(
+            EXPECTED, read_columns(arrow.content)["Salary_Yearly"]
+        )
+        self.assertEqual(6, sample_services.STATE["requests"])
+        for response in (rows, columns, arrow):
+            self.assertEqual("stand-in", response.headers[MODEL_VERSION_HEADER])
+
+    def test_retry_unavailable_service(self):
+        """Tests if unavailable services are retried and reported once the retries are exhausted."""
+        with TestClient(main.app) as client:
+            sample_services.STATE["failures"] = 2
+            self.assertEqual(200, client.post("/get_salary", json=ROWS).status_code)
+            sample_services.STATE["failures"] = 3
+            response = client.post("/get_salary", json=ROWS)
+        self.assertEqual(503, response.status_code)
+        self.assertIn("preprocessing service", response.json()["detail"])
+
+    def test_routing(self):
+        """Tests if the requested model is passed on to the prediction service and reported in the response."""
+        with TestClient(main.app) as client:
+            response = client.post(
+                "/get_salary", json=ROWS, headers={MODEL_ID_HEADER: "candidate"}
+            )
+            self.assertDictEqual(
+                {"default": {"version": "stand-in", "bytes": 0}},
+                client.get("/models").json(),
+            )
+        self.assertEqual("candidate", response.headers[MODEL_ID_HEADER])
+        self.assertEqual("stand-in", response.headers[MODEL_VERSION_HEADER])
+
+    def test_batching(self):
+        """Tests if the batching statistics are requested from the prediction service."""
+        with TestClient(main.app) as client:
+            self.assertDictEqual({"batch_size": {}}, client.get("/batching").json())
+
+    def test_threads(self):
+        """Tests if the thread usage is requested from the prediction service."""
+        with TestClient(main.app) as client:
+            self.assertDictEqual(
+                {"budget": 1, "in_use": 0}, client.get("/threads").json()
+            )
+
+    def test_concurrent_throughput(self):
+        """Tests if concurrent requests wait for the services concurrently instead of one after another."""
+        sample_services.STATE["delay_s"] = 0.05
+        n_requests = 40
+
+        async def requests():
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=main.app), base_url="http://api"
+            ) as client:
+                await client.post("/get_salary", json=ROWS[:1])
+                started_at = time.perf_counter()
+                responses = await asyncio.gather(
+                    *[client.post("/get_salary", json=ROWS) for _ in range(n_requests)]
+                )
+                return time.perf_counter() - started_at, responses
+
+        duration, responses = asyncio.run(requests())
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        # One after another the requests would wait n_requests * 2 hops * delay = 4 s
+        self.assertLess(duration, n_requests * 2 * 0.05 / 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
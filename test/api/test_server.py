@@ -0,0 +1,132 @@
+"""Test cases for the pre-fork server."""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import unittest
+import urllib.request
+from pathlib import Path
+
+import uvicorn
+
+from api.server import PreforkServer
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _free_port() -> int:
+    """Returns a port no socket is bound to."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(condition, timeout: float = 20):
+    """Polls the condition until it returns a truthy value."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = condition()
+        except OSError:
+            result = None
+        if result:
+            return result
+        time.sleep(0.1)
+    raise TimeoutError("Condition was not met in time.")
+
+
+@unittest.skipUnless(os.path.exists("/proc/self/task"), "Requires procfs.")
+class PreforkServerTest(unittest.TestCase):
+    """Test case for serving an app with several worker processes."""
+
+    def setUp(self) -> None:
+        """Starts the server with two workers."""
+        self.port = _free_port()
+        env = dict(os.environ, PYTHONPATH=f"{ROOT}{os.pathsep}{ROOT / 'src'}")
+        self.process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [
+                sys.executable,
+                str(ROOT / "src" / "api" / "server.py"),
+                "--app=test.resources.sample_app:app",
+                "--preload-hook=test.resources.sample_app:preload",
+                f"--port={self.port}",
+                "--workers=2",
+                "--log-level=warning",
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.addCleanup(self._terminate)
+
+    def _terminate(self):
+        """Kills the server if a test left it running."""
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def _workers(self):
+        """Returns the worker processes of the server."""
+        path = f"/proc/{self.process.pid}/task/{self.process.pid}/children"
+        with open(path, encoding="utf-8") as file:
+            return set(map(int, file.read().split()))
+
+    def _request(self):
+        """Requests the processes serving and importing the app."""
+        url = f"http://127.0.0.1:{self.port}/pid"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return json.loads(response.read())
+
+    def test_workers_share_preloaded_app(self):
+        """Tests if the app is imported and preloaded once in the parent and served by the workers."""
+        response = _wait_for(self._request)
+        workers = _wait_for(lambda: len(self._workers()) == 2 and self._workers())
+        self.assertEqual(self.process.pid, response["loaded_in"])
+        self.assertListEqual([self.process.pid], response["preloaded_in"])
+        self.assertIn(response["pid"], workers)
+
+    def test_restart_and_replace_workers(self):
+        """Tests if SIGHUP replaces all workers and a killed worker is replaced."""
+        _wait_for(self._request)
+        workers = _wait_for(lambda: len(self._workers()) == 2 and self._workers())
+        self.process.send_signal(signal.SIGHUP)
+        restarted = _wait_for(
+            lambda: len(self._workers()) == 2
+            and not self._workers() & workers
+            and self._workers()
+        )
+        self.assertIn(_wait_for(self._request)["pid"], restarted)
+        killed = restarted.pop()
+        os.kill(killed, signal.SIGKILL)
+        replaced = _wait_for(
+            lambda: len(self._workers()) == 2
+            and killed not in self._workers()
+            and self._workers()
+        )
+        self.assertIn(restarted.pop(), replaced)
+
+    def test_graceful_stop(self):
+        """Tests if SIGTERM stops the workers and the server."""
+        _wait_for(self._request)
+        workers = _wait_for(lambda: len(self._workers()) == 2 and self._workers())
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(0, self.process.wait(timeout=20))
+        for worker in workers:
+            self.assertFalse(os.path.exists(f"/proc/{worker}"))
+
+
+class PreforkServerConfigTest(unittest.TestCase):
+    """Test case for the configuration of the pre-fork server."""
+
+    def test_invalid_number_of_workers(self):
+        """Tests if at least one worker is required."""
+        with self.assertRaises(ValueError):
+            PreforkServer(config=uvicorn.Config(app="main:app"), workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Test cases for loading and warming up the API on startup."""
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+from api.startup import Startup
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Maximum time in seconds importing the app may take
+IMPORT_TIME_BUDGET_S = float(os.getenv("IMPORT_TIME_BUDGET_S", "1.0"))
+
+
+class StartupTest(unittest.TestCase):
+    """Test case for loading and warming up once."""
+
+    def setUp(self) -> None:
+        """Sets up a startup recording the calls of its load and warm-up functions."""
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.startup = Startup(load=self._load, warm_up=self._warm_up)
+
+    def _load(self):
+        """Records the call and waits until the loading is released."""
+        self.calls.append("load")
+        self.release.wait(timeout=5)
+        return "services"
+
+    def _warm_up(self, result):
+        """Records the call and fails for a failing result."""
+        self.calls.append(f"warm_up {result}")
+        if result == "failing":
+            raise ValueError("Warm-up failed")
+
+    def test_run_once(self):
+        """Tests if loading and warm-up run once and their result is returned."""
+        self.assertEqual("not_started", self.startup.status)
+        self.assertEqual("services", self.startup.run())
+        self.assertEqual("services", self.startup.run())
+        self.assertTrue(self.startup.ready)
+        self.assertListEqual(["load", "warm_up services"], self.calls)
+
+    def test_wait_for_background_loading(self):
+        """Tests if concurrent requests wait for the loading started in the background."""
+        self.release.clear()
+
+        async def requests():
+            self.startup.start()
+            waiting = asyncio.gather(self.startup.wait(), self.startup.wait())
+            await asyncio.sleep(0.01)
+            status = self.startup.status
+            self.release.set()
+            return status, await waiting
+
+        status, results = asyncio.run(requests())
+        self.assertEqual("loading", status)
+        self.assertListEqual(["services", "services"], results)
+        self.assertListEqual(["load", "warm_up services"], self.calls)
+
+    def test_failure(self):
+        """Tests if a failed warm-up is raised to all requests and not retried."""
+        startup = Startup(load=lambda: "failing", warm_up=self._warm_up)
+        with self.assertRaisesRegex(RuntimeError, "ValueError: Warm-up failed"):
+            asyncio.run(startup.wait())
+        with self.assertRaises(RuntimeError):
+            startup.run()
+        self.assertEqual("failed", startup.status)
+        self.assertFalse(startup.ready)
+        self.assertListEqual(["warm_up failing"], self.calls)
+
+
+class ImportTimeTest(unittest.TestCase):
+    """Test case for the time it takes to import the app."""
+
+    def test_import_time_budget(self):
+        """Tests if importing the app skips the heavy dependencies and stays within the time budget."""
+        env = dict(os.environ, PYTHONPATH=f"{ROOT}{os.pathsep}{ROOT / 'src'}")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import api.main"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # Lines have the format 'import time: <self us> | <cumulative us> | <indented module>'
+        cumulative_us = {
+            match.group(2): int(match.group(1))
+            for match in re.finditer(
+                r"^import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)$",
+                result.stderr,
+                re.MULTILINE,
+            )
+        }
+        for module in ("pandas", "pandera", "sklearn"):
+            self.assertNotIn(module, cumulative_us)
+        self.assertLess(cumulative_us["api.main"] / 1e6, IMPORT_TIME_BUDGET_S)
+
+
+if __name__ == "__main__":
+    unittest.main()
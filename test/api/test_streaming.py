@@ -0,0 +1,174 @@
+"""Test cases for scoring streamed NDJSON bodies."""
+import asyncio
+import json
+import unittest
+from typing import List
+from test.resources.sample_data import INFERENCE_REQUESTS
+
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from parameterized import parameterized
+from starlette.requests import ClientDisconnect
+
+from api.streaming import RequestStreamingResponse, iter_lines, score_ndjson
+from utils.request_models import RequestInputInference, RequestOutput
+
+
+async def _collect(iterator) -> list:
+    """Collects all items of an async iterator."""
+    return [item async for item in iterator]
+
+
+async def _iterate(items):
+    """Yields the items asynchronously."""
+    for item in items:
+        yield item
+
+
+class IterLinesTest(unittest.TestCase):
+    """Test case for splitting streamed bytes into lines."""
+
+    @parameterized.expand(
+        [
+            ("single_chunk", [b"a\nb\n"], [b"a", b"b"]),
+            ("split_lines", [b"a", b"b\nc", b"d\n", b"e"], [b"ab", b"cd", b"e"]),
+            ("empty_lines", [b"\n\na\n"], [b"", b"", b"a"]),
+        ]
+    )
+    def test_iter_lines(self, _, chunks, expected):
+        """Tests if lines are split across chunk boundaries."""
+        self.assertListEqual(
+            expected, asyncio.run(_collect(iter_lines(_iterate(chunks))))
+        )
+
+    def test_iter_lines_raises(self):
+        """Tests if lines exceeding the maximum length raise."""
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                _collect(iter_lines(_iterate([b"a\n", b"bbbb"]), max_line_bytes=3))
+            )
+
+
+class ScoreNDJSONTest(unittest.TestCase):
+    """Test case for scoring NDJSON request bodies in chunks."""
+
+    def setUp(self) -> None:
+        """Sets up an app streaming the age of each row as prediction."""
+        self.chunks: List[int] = []
+        app = FastAPI()
+
+        @app.post("/stream")
+        async def stream(request: Request):
+            """Scores the body in chunks of two rows."""
+            return RequestStreamingResponse(
+                score_ndjson(request, predict_rows=self._predict, chunk_rows=2)
+            )
+
+        self.client = TestClient(app)
+
+    async def _predict(self, rows: List[RequestInputInference]) -> List[RequestOutput]:
+        """Records the chunk size and predicts the age."""
+        self.chunks.append(len(rows))
+        if any(row.Age == 99 for row in rows):
+            raise ValueError("Age\n99")
+        return [RequestOutput(Salary_Yearly=row.Age) for row in rows]
+
+    @staticmethod
+    def _line(**changes) -> bytes:
+        """Returns the NDJSON line of the sample row with the changes."""
+        row = {**jsonable_encoder(INFERENCE_REQUESTS[0]), **changes}
+        return json.dumps(row).encode() + b"\n"
+
+    def test_stream(self):
+        """Tests if each non-empty line gets its prediction or error in order."""
+        body = b"".join(
+            [
+                self._line(Age=20),
+                b"\n",
+                b"no json\n",
+                self._line(Age=21),
+                self._line(Age=22),
+                self._line(Age=99),
+                self._line(Age=23).strip(),
+            ]
+        )
+        response = self.client.post("/stream", data=body)
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual("application/x-ndjson", response.headers["content-type"])
+        self.assertListEqual([1, 2, 2, 1, 1], self.chunks)
+        self.assertListEqual(
+            [{"Salary_Yearly": 20.0}, {"Salary_Yearly": 21.0}, {"Salary_Yearly": 22.0}],
+            [lines[0], lines[2], lines[3]],
+        )
+        self.assertIn("error", lines[1])
+        self.assertListEqual([{"error": "Age 99"}, {"Salary_Yearly": 23.0}], lines[4:])
+
+    def test_stream_isolates_failed_rows(self):
+        """Tests if rows which fail to be predicted don't fail the valid rows of their chunk."""
+        app = FastAPI()
+
+        @app.post("/stream")
+        async def stream(request: Request):
+            """Scores the body in one chunk."""
+            return RequestStreamingResponse(
+                score_ndjson(request, predict_rows=self._predict, chunk_rows=1000)
+            )
+
+        ages = [20, 21, 99, 22, 23, 24]
+        body = b"".join(self._line(Age=age) for age in ages)
+        response = TestClient(app).post("/stream", data=body)
+        expected = [
+            {"error": "Age 99"} if age == 99 else {"Salary_Yearly": float(age)}
+            for age in ages
+        ]
+        self.assertListEqual(
+            expected, [json.loads(line) for line in response.text.splitlines()]
+        )
+        self.assertLessEqual(len(self.chunks), 7)
+
+    def test_stop_on_disconnect(self):
+        """Tests if scoring stops once the client disconnects."""
+
+        class DisconnectingRequest:
+            """Request whose client disconnects after three rows."""
+
+            def __init__(self, lines):
+                self.lines = lines
+
+            async def stream(self):
+                """Yields the lines and raises on disconnect."""
+                for line in self.lines:
+                    yield line
+                raise ClientDisconnect()
+
+            @staticmethod
+            async def is_disconnected():
+                """Returns that the client disconnected."""
+                return True
+
+        request = DisconnectingRequest([self._line(Age=age) for age in (20, 21, 22)])
+        output = asyncio.run(
+            _collect(score_ndjson(request, predict_rows=self._predict, chunk_rows=2))
+        )
+        self.assertListEqual([2], self.chunks)
+        self.assertEqual(1, len(output))
+
+    def test_stream_too_long_line(self):
+        """Tests if scoring stops with an error line if a line exceeds the maximum length."""
+        app = FastAPI()
+
+        @app.post("/stream")
+        async def stream(request: Request):
+            """Scores the body with a small maximum line length."""
+            return RequestStreamingResponse(
+                score_ndjson(request, predict_rows=self._predict, max_line_bytes=10)
+            )
+
+        response = TestClient(app).post("/stream", data=self._line(Age=20))
+        self.assertListEqual([], self.chunks)
+        self.assertIn("error", json.loads(response.text))
+
+
+if __name__ == "__main__":
+    unittest.main()
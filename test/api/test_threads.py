@@ -0,0 +1,149 @@
+"""Test cases for the thread budget of the predictions and the request threads."""
+import asyncio
+import threading
+import time
+import unittest
+
+import anyio
+import anyio.to_thread
+import numpy as np
+from joblib import effective_n_jobs
+from parameterized import parameterized
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_info, threadpool_limits
+
+from api.batching import PredictionBatcher
+from api.metrics import INFERENCE_THREADS
+from api.threads import ThreadBudget, limit_request_threads
+
+
+class ThreadBudgetTest(unittest.TestCase):
+    """Test case for reserving threads per prediction."""
+
+    @parameterized.expand(
+        [
+            ("small", 100, 1),
+            ("parallel", 3000, 3),
+            ("capped", 100000, 4),
+        ]
+    )
+    def test_reserve(self, _, rows, expected):
+        """Tests if a batch gets a thread per `parallel_min_rows` rows within the budget and releases them."""
+        budget = ThreadBudget(threads=4, parallel_min_rows=1000)
+        with budget.reserve(rows) as threads:
+            self.assertEqual(expected, threads)
+            self.assertEqual(expected, effective_n_jobs(None))
+            self.assertDictEqual({"budget": 4, "in_use": expected}, budget.usage())
+            self.assertEqual(expected, INFERENCE_THREADS.labels(state="in_use").value)
+        self.assertDictEqual({"budget": 4, "in_use": 0}, budget.usage())
+
+    def test_concurrent_reservations(self):
+        """Tests if concurrent predictions share the budget and wait while all threads are reserved."""
+        budget = ThreadBudget(threads=4, parallel_min_rows=1000)
+        reserved, release = [], threading.Event()
+
+        def predict():
+            with budget.reserve(3000) as threads:
+                reserved.append(threads)
+                release.wait(5)
+
+        threads = [threading.Thread(target=predict) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.assertListEqual([3, 1], reserved)
+        self.assertEqual(4, budget.in_use)
+        release.set()
+        for thread in threads:
+            thread.join()
+        # The waiting prediction gets the threads released first
+        self.assertIn(reserved[2], (1, 3))
+        self.assertEqual(0, budget.in_use)
+
+    def test_batched_predictions(self):
+        """Tests if the concurrent batches of the batcher never reserve more threads than the budget."""
+        budget = ThreadBudget(threads=2, parallel_min_rows=1000)
+        peak, lock = [0], threading.Lock()
+
+        def predict(features):
+            with budget.reserve(len(features)):
+                with lock:
+                    peak[0] = max(peak[0], budget.in_use)
+                time.sleep(0.02)
+            return features.sum(axis=1)
+
+        batcher = PredictionBatcher(
+            predict=predict, max_rows=1, max_wait_us=0, max_concurrent_batches=4
+        )
+
+        async def gather():
+            requests = [np.ones((size, 2)) for size in (1, 2000, 1, 1, 3000, 1)]
+            return await asyncio.gather(*[batcher.predict(row) for row in requests])
+
+        actual = asyncio.run(gather())
+        self.assertEqual(2, peak[0])
+        self.assertListEqual([1, 2000, 1, 1, 3000, 1], [len(pred) for pred in actual])
+        self.assertEqual(0, budget.in_use)
+
+    def test_thread_local(self):
+        """Tests if a reservation only applies to the thread of the prediction."""
+        budget = ThreadBudget(threads=4, parallel_min_rows=1000)
+        n_jobs = []
+        with budget.reserve(4000):
+            thread = threading.Thread(
+                target=lambda: n_jobs.append(effective_n_jobs(None))
+            )
+            thread.start()
+            thread.join()
+            self.assertEqual(4, effective_n_jobs(None))
+        self.assertListEqual([1], n_jobs)
+
+    def test_release_on_error(self):
+        """Tests if the threads of a failed prediction are released."""
+        budget = ThreadBudget(threads=4, parallel_min_rows=1000)
+        with self.assertRaises(ValueError):
+            with budget.reserve(4000):
+                raise ValueError("Failed prediction")
+        self.assertEqual(0, budget.in_use)
+
+    def test_adopt(self):
+        """Tests if the number of jobs of nested estimators is left to the reservations."""
+        rng = np.random.default_rng(0)
+        pipeline = make_pipeline(
+            StandardScaler(), RandomForestRegressor(n_estimators=4, n_jobs=8)
+        ).fit(rng.random((50, 2)), rng.random(50))
+        ThreadBudget.adopt(pipeline)
+        ThreadBudget.adopt(object())
+        self.assertIsNone(pipeline.get_params()["randomforestregressor__n_jobs"])
+        budget = ThreadBudget(threads=2, parallel_min_rows=10)
+        with budget.reserve(100):
+            self.assertEqual(50, len(pipeline.predict(rng.random((50, 2)))))
+
+    def test_limit_native_threads(self):
+        """Tests if the loaded native thread pools are capped."""
+        budget = ThreadBudget(threads=4, native_threads=1)
+        # Restores the limits of the other tests afterwards
+        with threadpool_limits(limits=None):
+            budget.limit_native_threads()
+            for pool in threadpool_info():
+                self.assertEqual(1, pool["num_threads"])
+
+
+class LimitRequestThreadsTest(unittest.TestCase):
+    """Test case for limiting the request threads of the event loop."""
+
+    def test_limit(self):
+        """Tests if the thread limiter of the event loop is set and left unchanged without limit."""
+
+        async def limit(threads):
+            limit_request_threads(threads)
+            return anyio.to_thread.current_default_thread_limiter().total_tokens
+
+        self.assertEqual(8, anyio.run(limit, 8))
+        self.assertEqual(40, anyio.run(limit, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
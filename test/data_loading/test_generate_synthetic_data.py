@@ -0,0 +1,116 @@
+""" Tests for generating synthetic survey data. """
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from data_loading.generate_synthetic_data import SyntheticSurveyGenerator, main
+from preprocessing.clean_features import KaggleFeatureCleaner
+from utils.data_io import count_rows, read_data_chunks, write_data
+from utils.data_models import ExecutionMode, ValidationMode
+
+
+def _survey(n_seniors: int = 300, n_juniors: int = 100) -> pd.DataFrame:
+    """Returns raw data of seniors and juniors, whose position, experience and salary depend on the seniority"""
+    rng = np.random.default_rng(0)
+    n_rows = n_seniors + n_juniors
+    seniors = np.arange(n_rows) < n_seniors
+    return pd.DataFrame(
+        {
+            "Timestamp": pd.to_datetime(["2020-01-01", "2021-01-01"] * (n_rows // 2)),
+            "Age": np.where(seniors, 35.0, 27.0),
+            "Gender": ["male", "female", "female", "diverse"] * (n_rows // 4),
+            "City": ["Berlin", "Berlin", "Berlin", "Munich"] * (n_rows // 4),
+            "Seniority": np.where(seniors, "Senior", "Junior"),
+            "Position": np.where(seniors, "Data Scientist", "Developer"),
+            "Years_of_Experience": np.where(seniors, "10", "2"),
+            "Company_Size": ["101-1000"] * n_rows,
+            "Company_Type": ["Product", "Startup"] * (n_rows // 2),
+            "Salary_Yearly": np.where(seniors, 80000.0, 40000.0)
+            * rng.lognormal(0, 0.1, n_rows),
+        }
+    )
+
+
+class SyntheticSurveyGeneratorTest(unittest.TestCase):
+    """Test case for generating synthetic survey data."""
+
+    def test_generate_chunks(self):
+        """Tests if the rows are generated in chunks with a continued index and reproducibly by seed."""
+        generator = SyntheticSurveyGenerator(_survey())
+        chunks = list(generator.generate(100, chunk_rows=40, seed=1))
+        self.assertListEqual([40, 40, 20], [len(chunk) for chunk in chunks])
+        data = pd.concat(chunks)
+        self.assertListEqual(list(range(100)), data.index.tolist())
+        assert_frame_equal(
+            data, pd.concat(generator.generate(100, chunk_rows=40, seed=1))
+        )
+        self.assertFalse(
+            data.equals(pd.concat(generator.generate(100, chunk_rows=40, seed=2)))
+        )
+
+    def test_distributions(self):
+        """Tests if the marginal and conditional distributions of the loaded data are kept."""
+        generator = SyntheticSurveyGenerator(_survey(), min_group_rows=20, messiness=0)
+        data = pd.concat(generator.generate(20000, chunk_rows=5000))
+        self.assertAlmostEqual(0.75, (data["City"] == "Berlin").mean(), delta=0.02)
+        self.assertAlmostEqual(0.75, (data["Seniority"] == "Senior").mean(), delta=0.02)
+        seniors = data[data["Seniority"] == "Senior"]
+        juniors = data[data["Seniority"] == "Junior"]
+        self.assertSetEqual({"Data Scientist"}, set(seniors["Position"]))
+        self.assertSetEqual({"10"}, set(seniors["Years_of_Experience"]))
+        self.assertSetEqual({35.0}, set(seniors["Age"]))
+        self.assertSetEqual({27.0}, set(juniors["Age"]))
+        self.assertAlmostEqual(80000, seniors["Salary_Yearly"].median(), delta=2000)
+        self.assertAlmostEqual(40000, juniors["Salary_Yearly"].median(), delta=1000)
+
+    def test_messy_answers(self):
+        """Tests if messy answers are generated, which the cleaning maps back to the loaded values."""
+        generator = SyntheticSurveyGenerator(_survey(), messiness=0.2)
+        data = pd.concat(generator.generate(5000))
+        self.assertIn("Senior Data Scientist", set(data["Position"]))
+        self.assertIn("10,5", set(data["Years_of_Experience"]))
+        self.assertIn("München", set(data["City"]))
+        self.assertIn("M", set(data["Gender"]))
+        cleaned = KaggleFeatureCleaner(
+            data, ExecutionMode.TRAIN, validation_mode=ValidationMode.COMPILED
+        ).execute()
+        self.assertSetEqual(
+            {"data scientist", "software developer"},
+            set(cleaned["Position"].dropna()),
+        )
+        self.assertSetEqual({"berlin", "munich"}, set(cleaned["City"].dropna()))
+        self.assertSetEqual({2.0, 2.5, 10.0, 10.5}, set(cleaned["Years_of_Experience"]))
+
+    def test_empty_data(self):
+        """Tests if learning from empty data is rejected."""
+        with self.assertRaises(ValueError):
+            SyntheticSurveyGenerator(_survey().iloc[:0])
+
+    def test_main(self):
+        """Tests if the rows are written to parquet files with a row group per chunk."""
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "raw_data.parquet")
+            write_data(_survey(), input_path)
+            output_path = os.path.join(directory, "synthetic.parquet")
+            written = main(
+                [input_path], output_path, 250, chunk_rows=50, rows_per_file=100
+            )
+            paths = [
+                os.path.join(directory, f"synthetic-0000{index}.parquet")
+                for index in range(3)
+            ]
+            self.assertEqual(250, written)
+            self.assertListEqual([100, 100, 50], [count_rows(path) for path in paths])
+            self.assertListEqual(
+                [50, 50], [len(chunk) for chunk in read_data_chunks(paths[0])]
+            )
+            with self.assertRaises(ValueError):
+                main([input_path], output_path, 250, chunk_rows=40, rows_per_file=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
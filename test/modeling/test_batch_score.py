@@ -0,0 +1,78 @@
+""" Test cases for scoring files of raw records offline. """
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from test.resources.sample_data import INFERENCE_REQUESTS, LABELS, TRANSFORMED_FEATURES
+
+import pandas as pd
+from parameterized import parameterized
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+from modeling import batch_score
+from modeling.sklearn_models import SKLearnModel
+from utils.data_io import write_data
+
+
+class MainTest(unittest.TestCase):
+    """Test case for the main method."""
+
+    def setUp(self) -> None:
+        """Sets up test prerequisites."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_path = Path(self.temp_dir, "model.joblib").as_posix()
+        self.labels_path = Path(self.temp_dir, "labels.json").as_posix()
+        self.output_path = Path(self.temp_dir, "predictions.parquet").as_posix()
+        model = SKLearnModel(hyperparameters={"n_estimators": 5, "random_state": 0})
+        model.fit(X=TRANSFORMED_FEATURES, y=pd.Series([1.0, 2.0, 3.0, 4.0]))
+        model.save(filename=self.model_path)
+        write_data(LABELS, self.labels_path)
+        self.data = pd.DataFrame(INFERENCE_REQUESTS * 6)
+        self.data_path = Path(self.temp_dir, "raw.parquet").as_posix()
+        self.data.to_parquet(self.data_path, index=False, row_group_size=7)
+
+    def tearDown(self) -> None:
+        """Tears down written files."""
+        shutil.rmtree(self.temp_dir)
+        batch_score._STATE.clear()  # pylint: disable=protected-access
+
+    @parameterized.expand([("sequential", 1, None), ("pool", 2, None), ("rows", 2, 4)])
+    def test_batch_score_main(self, _, workers, chunk_rows):
+        """Tests if the predictions of all chunks are written in order."""
+        rows = batch_score.main(
+            data_path=self.data_path,
+            model_path=self.model_path,
+            labels_path=self.labels_path,
+            output_path=self.output_path,
+            workers=workers,
+            chunk_rows=chunk_rows,
+        )
+        expected = batch_score.score_chunk(self.data).reset_index(drop=True)
+        self.assertEqual(len(self.data), rows)
+        assert_frame_equal(expected, pd.read_parquet(self.output_path))
+
+    def test_batch_score_main_invalid_records(self):
+        """Tests if invalid records get an error instead of stopping the scoring of the other records."""
+        self.data.loc[[3, 20], "Age"] = 10
+        self.data.to_parquet(self.data_path, index=False, row_group_size=7)
+        batch_score.main(
+            data_path=self.data_path,
+            model_path=self.model_path,
+            labels_path=self.labels_path,
+            output_path=self.output_path,
+            workers=2,
+        )
+        actual = pd.read_parquet(self.output_path)
+        valid = actual.index.difference([3, 20])
+        self.assertEqual(len(self.data), len(actual))
+        self.assertTrue(actual.loc[[3, 20], "Salary_Yearly"].isna().all())
+        self.assertTrue(actual.loc[[3, 20], "error"].str.contains("Age").all())
+        self.assertTrue(actual.loc[valid, "error"].isna().all())
+        assert_series_equal(
+            batch_score.score_chunk(self.data.loc[valid])["Salary_Yearly"],
+            actual.loc[valid, "Salary_Yearly"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+""" Test cases for precomputing predictions into a lookup table. """
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from test.resources.sample_data import TRANSFORMED_FEATURES
+
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+from parameterized import parameterized
+
+from modeling.build_prediction_table import (
+    frequent_combinations,
+    main,
+    split_holdout,
+    to_feature_matrix,
+)
+from modeling.prediction_table import PredictionTable
+from modeling.sklearn_models import SKLearnModel
+from utils.data_io import read_data
+
+
+class FrequentCombinationsTest(unittest.TestCase):
+    """Test case for selecting frequent feature vectors."""
+
+    @parameterized.expand(
+        [
+            ("all", None, None, [1, 0, 2, 3]),
+            ("top_k", 2, None, [1, 0]),
+            ("years", 1, [2030, 2031], [1, 1]),
+        ]
+    )
+    def test_frequent_combinations(self, _, top_k, years, expected_rows):
+        """Tests if distinct vectors are ordered by frequency and combined with the years."""
+        features = to_feature_matrix(TRANSFORMED_FEATURES)
+        data = features[[0, 1, 1, 1, 0, 2, 3]]
+        combinations = frequent_combinations(data, top_k=top_k, years=years)
+        expected = features[expected_rows]
+        if years:
+            expected[:, 0] = years
+        self.assertListEqual(expected.tolist(), combinations.tolist())
+
+
+class MainTest(unittest.TestCase):
+    """Test case for the main method."""
+
+    def setUp(self) -> None:
+        """Sets up test prerequisites."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_path = Path(self.temp_dir, "model.joblib").as_posix()
+        self.feature_path = Path(self.temp_dir, "features.parquet").as_posix()
+        self.output_path = Path(self.temp_dir, "predictions.table").as_posix()
+        self.metrics_path = Path(self.temp_dir, "metrics.json").as_posix()
+        self.model = SKLearnModel(hyperparameters={"n_estimators": 5})
+        self.model.fit(X=TRANSFORMED_FEATURES, y=pd.Series([1.0, 2.0, 3.0, 4.0]))
+        self.model.save(filename=self.model_path)
+        features = pd.DataFrame(TRANSFORMED_FEATURES)
+        features.iloc[[0, 0, 1, 2, 3]].reset_index(drop=True).to_parquet(
+            self.feature_path
+        )
+
+    def tearDown(self) -> None:
+        """Tears down written files."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_build_prediction_table_main(self):
+        """Tests if the most frequent vectors are stored with the predictions of the model."""
+        report = main(
+            feature_path=self.feature_path,
+            model_path=self.model_path,
+            output_path=self.output_path,
+            top_k=3,
+            metrics_path=self.metrics_path,
+        )
+        table = PredictionTable.from_path(
+            self.output_path,
+            model_path=self.model_path,
+            feature_names=list(pd.DataFrame(TRANSFORMED_FEATURES).columns),
+        )
+        predictions, found = table.lookup(to_feature_matrix(TRANSFORMED_FEATURES))
+        self.assertListEqual([True, True, True, False], found.tolist())
+        assert_array_equal(
+            self.model.predict(TRANSFORMED_FEATURES)[:3], predictions[:3]
+        )
+        self.assertEqual(3, report["rows"])
+        self.assertIsNone(report["hit_rate"])
+        self.assertEqual(0, report["evaluation_rows"])
+        self.assertDictEqual(report, read_data(self.metrics_path))
+        self.assertTrue(np.isnan(predictions[3]))
+
+    def test_hit_rate_of_evaluation_path(self):
+        """Tests if the hit rate is the share of the rows of the evaluation path found in the table."""
+        evaluation_path = Path(self.temp_dir, "evaluation.parquet").as_posix()
+        pd.DataFrame(TRANSFORMED_FEATURES).iloc[[0, 3]].to_parquet(evaluation_path)
+        report = main(
+            feature_path=self.feature_path,
+            model_path=self.model_path,
+            output_path=self.output_path,
+            top_k=3,
+            evaluation_path=evaluation_path,
+        )
+        self.assertEqual(2, report["evaluation_rows"])
+        self.assertAlmostEqual(0.5, report["hit_rate"])
+
+    def test_hit_rate_of_held_out_rows(self):
+        """Tests if the hit rate is measured on held-out rows with the serving year."""
+        report = main(
+            feature_path=self.feature_path,
+            model_path=self.model_path,
+            output_path=self.output_path,
+            years=[2030],
+            holdout_fraction=0.4,
+        )
+        features, holdout = split_holdout(
+            to_feature_matrix(pd.read_parquet(self.feature_path)), fraction=0.4
+        )
+        features[:, 0] = holdout[:, 0] = 2030
+        expected = np.mean([row in features.tolist() for row in holdout.tolist()])
+        self.assertEqual(2, report["evaluation_rows"])
+        self.assertEqual(len(np.unique(features, axis=0)), report["rows"])
+        self.assertAlmostEqual(expected, report["hit_rate"])
+
+    def test_hit_rate_of_build_rows(self):
+        """Tests if measuring the hit rate on the rows the table is built from is refused."""
+        with self.assertRaises(ValueError):
+            main(
+                feature_path=self.feature_path,
+                model_path=self.model_path,
+                output_path=self.output_path,
+                evaluation_path=self.feature_path,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
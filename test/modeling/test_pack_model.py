@@ -0,0 +1,43 @@
+""" Test cases for converting a trained model into the packed format. """
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from modeling.pack_model import main
+from modeling.sklearn_models import SKLearnModel
+
+
+class MainTest(unittest.TestCase):
+    """Test case for the main method."""
+
+    def setUp(self) -> None:
+        """Sets up test prerequisites."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_path = Path(self.temp_dir, "model.joblib")
+        self.output_path = Path(self.temp_dir, "model.forest")
+        self.X = pd.DataFrame({"feature_1": [1, 2, 3, 4], "feature_2": [1, 3, 5, 7]})
+        self.model = SKLearnModel(hyperparameters={"n_estimators": 3})
+        self.model.fit(X=self.X, y=pd.Series([10, 11, 12, 13], name="target"))
+        self.model.save(filename=self.model_path.as_posix())
+
+    def tearDown(self) -> None:
+        """Tears down written files."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_pack_model_main(self):
+        """Tests the pack model main method."""
+        main(
+            model_path=self.model_path.as_posix(),
+            output_path=self.output_path.as_posix(),
+        )
+        packed_model = SKLearnModel()
+        packed_model.load(filename=self.output_path.as_posix())
+        assert_array_equal(self.model.predict(self.X), packed_model.predict(self.X))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+""" Test cases for the packed forest inference engine. """
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+import numpy as np
+from numpy.testing import assert_array_equal
+from sklearn.ensemble import (
+    RandomForestRegressor,
+    ExtraTreesRegressor,
+    GradientBoostingRegressor,
+)
+
+from modeling.packed_forest import PackedForest, pack_or_none
+from utils.data_io import read_data, write_data
+
+
+def make_data(n_rows: int, seed: int = 0):
+    """Creates integer and float features similar to the transformed survey features."""
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, 20, size=(n_rows, 4)).astype(np.float32)
+    X[:, 3] = rng.random(n_rows).astype(np.float32) * 20
+    y = X @ np.array([1.0, 2.0, 0.5, 3.0]) + rng.normal(size=n_rows)
+    return X, y
+
+
+class PackedForestTest(unittest.TestCase):
+    """Test case for the packed forest."""
+
+    def setUp(self) -> None:
+        """Sets up the prerequisites"""
+        self.X, self.y = make_data(n_rows=300)
+        self.X_test, _ = make_data(n_rows=200, seed=1)
+
+    @parameterized.expand(
+        [
+            (RandomForestRegressor(n_estimators=20, random_state=0),),
+            (
+                RandomForestRegressor(
+                    n_estimators=10, max_features="sqrt", max_depth=3, random_state=0
+                ),
+            ),
+            (ExtraTreesRegressor(n_estimators=10, random_state=0),),
+        ]
+    )
+    def test_predict(self, estimator):
+        """Tests if the predictions are identical to sklearn."""
+        estimator.fit(self.X, self.y)
+        packed_forest = PackedForest.from_estimator(estimator)
+        X = np.concatenate([self.X_test, self.X[:50]])
+        assert_array_equal(estimator.predict(X), packed_forest.predict(X))
+
+    def test_predict_in_chunks(self):
+        """Tests if predicting in several chunks gives the same predictions."""
+        estimator = RandomForestRegressor(n_estimators=5, random_state=0)
+        packed_forest = PackedForest.from_estimator(estimator.fit(self.X, self.y))
+        packed_forest.chunk_size = 7
+        assert_array_equal(
+            estimator.predict(self.X_test), packed_forest.predict(self.X_test)
+        )
+
+    @parameterized.expand(
+        [
+            (np.ones((2, 3), dtype=np.float32),),
+            (np.array([[1.0, 2.0, np.NaN, 4.0]], dtype=np.float32),),
+        ]
+    )
+    def test_predict_raises(self, X):
+        """Tests if invalid inputs raise an error."""
+        estimator = RandomForestRegressor(n_estimators=2).fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            _ = PackedForest.from_estimator(estimator).predict(X)
+
+    @parameterized.expand(
+        [
+            (GradientBoostingRegressor(n_estimators=2),),
+            (RandomForestRegressor(n_estimators=2),),
+        ]
+    )
+    def test_from_estimator_raises(self, estimator):
+        """Tests if unsupported or unfitted estimators raise an error."""
+        if isinstance(estimator, GradientBoostingRegressor):
+            estimator.fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            _ = PackedForest.from_estimator(estimator)
+        self.assertIsNone(pack_or_none(estimator))
+
+    def test_to_dict_round_trip(self):
+        """Tests if the forest round-trips through the packed file format."""
+        estimator = RandomForestRegressor(n_estimators=5, random_state=0)
+        packed_forest = PackedForest.from_estimator(estimator.fit(self.X, self.y))
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = Path(temp_dir, "model.forest").as_posix()
+            write_data(data=packed_forest.to_dict(), filepath=filepath)
+            actual = PackedForest.from_dict(read_data(filepath=filepath))
+            expected = packed_forest.to_dict()
+            self.assertDictEqual(expected["metadata"], actual.to_dict()["metadata"])
+            for name, array in expected["arrays"].items():
+                self.assertEqual(array.dtype, actual.to_dict()["arrays"][name].dtype)
+                assert_array_equal(array, actual.to_dict()["arrays"][name])
+            assert_array_equal(
+                estimator.predict(self.X_test), actual.predict(self.X_test)
+            )
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_round_threshold(self):
+        """Tests if rounded thresholds split float32 values like the float64 thresholds."""
+        threshold = np.array([0.1, 0.5, 1 / 3, 2.0000001, -0.7])
+        rounded = PackedForest.round_threshold(threshold)
+        self.assertEqual(np.float32, rounded.dtype)
+        self.assertTrue((rounded.astype(np.float64) <= threshold).all())
+        above = np.nextafter(rounded, np.float32(np.inf), dtype=np.float32)
+        assert_array_equal(above <= threshold, np.zeros(len(threshold), dtype=bool))
+
+
+if __name__ == "__main__":
+    unittest.main()
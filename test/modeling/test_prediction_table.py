@@ -0,0 +1,99 @@
+""" Test cases for the lookup table of precomputed predictions. """
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from parameterized import parameterized
+
+from modeling.prediction_table import PredictionTable, file_digest
+from utils.data_io import read_data, write_data
+
+
+class PredictionTableTest(unittest.TestCase):
+    """Test case for the prediction table."""
+
+    def setUp(self) -> None:
+        """Sets up a table of distinct random feature vectors."""
+        rng = np.random.default_rng(0)
+        features = rng.integers(-1, 20, size=(3000, 4)).astype(np.float32)
+        features[::5, 2] = np.nan
+        # Deduplicated by their bits, as NaNs are never equal
+        self.features = np.unique(features.view(np.uint32), axis=0).view(np.float32)
+        self.predictions = rng.random(len(self.features))
+        self.table = PredictionTable.from_predictions(
+            self.features, self.predictions, feature_names=["a", "b", "c", "d"]
+        )
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        """Tears down written files."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_lookup(self):
+        """Tests if all stored vectors are found with their predictions despite colliding hashes."""
+        predictions, found = self.table.lookup(self.features)
+        self.assertTrue(found.all())
+        self.assertGreater(self.table.max_probe, 0)
+        assert_array_equal(self.predictions, predictions)
+
+    @parameterized.expand(
+        [
+            ("missing", [[100, 0, 0, 0]], [False]),
+            ("negative_zero", [[-0.0, 0, 0, 0]], [True]),
+            ("nan", [[0, 0, np.nan, 0]], [True]),
+            ("empty", np.empty((0, 4)), []),
+        ]
+    )
+    def test_lookup_single(self, _, features, expected_found):
+        """Tests if missing vectors are not found and zeros and NaNs match independent of their bits."""
+        table = PredictionTable.from_predictions(
+            np.array([[0, 0, 0, 0], [0, 0, np.nan, 0]]), np.array([1.0, 2.0])
+        )
+        predictions, found = table.lookup(np.array(features, dtype=np.float32))
+        self.assertListEqual(expected_found, found.tolist())
+        self.assertFalse(np.isnan(predictions[found]).any())
+        self.assertTrue(np.isnan(predictions[~found]).all())
+
+    def test_from_predictions_raises(self):
+        """Tests if duplicated feature vectors raise."""
+        with self.assertRaises(ValueError):
+            PredictionTable.from_predictions(np.zeros((2, 3)), np.zeros(2))
+
+    def test_write_and_read(self):
+        """Tests if the memory-mapped table returns the same predictions."""
+        model_path = Path(self.temp_dir, "model.joblib").as_posix()
+        write_data(data={"model": 1}, filepath=model_path)
+        table_path = Path(self.temp_dir, "predictions.table").as_posix()
+        self.table.model_digest = file_digest(model_path)
+        write_data(data=self.table.to_dict(), filepath=table_path)
+        table = PredictionTable.from_path(
+            table_path, model_path=model_path, feature_names=["a", "b", "c", "d"]
+        )
+        self.assertIsInstance(read_data(table_path)["arrays"]["keys"].base, np.memmap)
+        assert_array_equal(self.predictions, table.lookup(self.features)[0])
+
+    @parameterized.expand(
+        [
+            ("other_model", {"model": 2}, ["a", "b", "c", "d"]),
+            ("other_features", {"model": 1}, ["a", "b", "c"]),
+        ]
+    )
+    def test_from_path_raises(self, _, model, feature_names):
+        """Tests if tables of another model or other features raise."""
+        model_path = Path(self.temp_dir, "model.joblib").as_posix()
+        write_data(data={"model": 1}, filepath=model_path)
+        table_path = Path(self.temp_dir, "predictions.table").as_posix()
+        self.table.model_digest = file_digest(model_path)
+        write_data(data=self.table.to_dict(), filepath=table_path)
+        write_data(data=model, filepath=model_path)
+        with self.assertRaises(ValueError):
+            PredictionTable.from_path(
+                table_path, model_path=model_path, feature_names=feature_names
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@
 import shutil
 import tempfile
 import unittest
+import warnings
 from unittest.mock import patch
 from pathlib import Path
 
@@ -59,6 +60,61 @@ class SKLearnTest(unittest.TestCase):
         read_data_mock.assert_called()
         self.assertTrue(self.model.model)
 
+    @patch("modeling.packed_forest.PackedForest.predict", return_value=np.ones(2))
+    def test_predict_packed(self, packed_predict_mock):
+        """Tests if small inputs are predicted with the packed forest."""
+        model = SKLearnModel(
+            hyperparameters={"n_estimators": 3},
+            packed_inference=True,
+            packed_max_rows=2,
+        )
+        X = pd.DataFrame({"feature_1": [1, 2, 3, 4], "feature_2": [1, 3, 5, 7]})
+        model.fit(X=X, y=pd.Series([10, 11, 12, 13], name="target"))
+        self.assertIsNotNone(model.packed_forest)
+        _ = model.predict(X[["feature_2", "feature_1"]].head(2))
+        packed_predict_mock.assert_called_once()
+        assert_array_equal(
+            np.array([[1, 1], [2, 3]], dtype=np.float32),
+            packed_predict_mock.call_args.args[0],
+        )
+        _ = model.predict(X)
+        packed_predict_mock.assert_called_once()
+
+    def test_predict_array(self):
+        """Tests if arrays are predicted without warning and the warning filters are left untouched."""
+        X = pd.DataFrame({"feature_1": [1, 2, 3, 4], "feature_2": [1, 3, 5, 7]})
+        self.model.fit(X=X, y=pd.Series([10, 11, 12, 13], name="target"))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            filters = list(warnings.filters)
+            assert_array_equal(self.model.predict(X), self.model.predict(X.to_numpy()))
+            self.assertListEqual(filters, warnings.filters)
+        self.assertListEqual([], [str(warning.message) for warning in caught])
+
+    def test_load_packed_falls_back(self):
+        """Tests if unsupported models are predicted by sklearn."""
+        model = SKLearnModel(model_type="GradientBoosting", packed_inference=True)
+        model.save(filename=self.out_file.as_posix())
+        model.load(filename=self.out_file.as_posix())
+        self.assertIsNone(model.packed_forest)
+
+    def test_save_and_load_forest(self):
+        """Tests if the model round-trips through the packed file format."""
+        X = pd.DataFrame({"feature_1": [1, 2, 3, 4], "feature_2": [1, 3, 5, 7]})
+        model = SKLearnModel(hyperparameters={"n_estimators": 3})
+        model.fit(X=X, y=pd.Series([10, 11, 12, 13], name="target"))
+        filename = Path(self.temp_dir, "sample.forest").as_posix()
+        model.save(filename=filename)
+        loaded = SKLearnModel(packed_max_rows=0)
+        loaded.load(filename=filename)
+        self.assertIs(loaded.model, loaded.packed_forest)
+        assert_array_equal(model.predict(X), loaded.predict(X))
+        loaded.save(filename=Path(self.temp_dir, "copy.forest").as_posix())
+        self.assertEqual(
+            Path(filename).read_bytes(),
+            Path(self.temp_dir, "copy.forest").read_bytes(),
+        )
+
     def test_save(self):
         """Tests persisting the model."""
         self.model.save(filename=self.out_file.as_posix())
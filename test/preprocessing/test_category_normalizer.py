@@ -0,0 +1,129 @@
+""" Tests the normalization of categorical values. """
+import unittest
+from unittest.mock import patch
+from test.resources.sample_data import RAW_DATA_COMBINED
+from parameterized import parameterized
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from preprocessing.category_normalizer import CategoryNormalizer
+from preprocessing.kaggle_survey_mappings import MAPPINGS, REGEX_MAPPINGS
+from utils.data_models import CleanedFeaturesSchema
+
+
+CATEGORY_COLUMNS = list(CleanedFeaturesSchema.get_category_columns())
+
+
+def _replace(data: pd.DataFrame, lower_columns) -> pd.DataFrame:
+    """Normalizes the data with pandas replacements as reference."""
+    replaced = data.copy()
+    for column in lower_columns:
+        replaced[column] = replaced[column].str.lower().str.strip()
+    replaced = replaced.replace(MAPPINGS)
+    replaced = replaced.replace(REGEX_MAPPINGS, regex=True)
+    return replaced.replace(r"^\s*$", np.nan, regex=True)
+
+
+class CategoryNormalizerTest(unittest.TestCase):
+    """Test case for normalizing categorical values once per distinct value."""
+
+    def setUp(self) -> None:
+        """Sets up a normalizer with an empty memo."""
+        self.normalizer = CategoryNormalizer(
+            mappings=MAPPINGS, regex_mappings=REGEX_MAPPINGS
+        )
+
+    @parameterized.expand(
+        [
+            ("sample", RAW_DATA_COMBINED, CATEGORY_COLUMNS),
+            (
+                "mappings_and_patterns",
+                pd.DataFrame(
+                    {
+                        "Position": [
+                            " Java Developer",
+                            "QA Manager ",
+                            "Developer",
+                            "SAP BW consultant",
+                            "Java Developer",
+                        ],
+                        "City": ["München", "Köln", "Kiev", "München", "Berlin"],
+                        "Company_Size": ["50-100", "up to 10", "", "1000+", "  "],
+                    }
+                ),
+                ["Position", "City", "Company_Size"],
+            ),
+            (
+                "missing_and_other_values",
+                pd.DataFrame(
+                    {
+                        "Gender": ["M", None, np.NaN, 1, "F"],
+                        "City": ["Köln", None, "München", 2.5, "\t"],
+                        "Seniority": [None, None, None, None, None],
+                        "Other": ["  ", "", None, "Bank", "a"],
+                        "Age": [20.0, 30.0, 40.0, 50.0, 60.0],
+                    }
+                ),
+                ["Gender", "Seniority"],
+            ),
+            (
+                "empty_columns",
+                pd.DataFrame({"Position": ["", " "], "Company_Type": [np.NaN, ""]}),
+                ["Position", "Company_Type"],
+            ),
+        ]
+    )
+    def test_normalize_like_replace(self, _, data, lower_columns):
+        """Tests if the data is normalized like with pandas replacements, including missing values and dtypes."""
+        expected = _replace(data, lower_columns)
+        actual = self.normalizer.normalize(data, lower_columns=lower_columns)
+        assert_frame_equal(expected, actual)
+        self.assertListEqual(
+            [value is None for value in expected.to_numpy().ravel()],
+            [value is None for value in actual.to_numpy().ravel()],
+        )
+
+    def test_normalize_value(self):
+        """Tests if single values are normalized like by the pandas replacements."""
+        self.assertEqual(
+            "software developer",
+            self.normalizer.normalize_value("Position", " Java Developer"),
+        )
+        self.assertEqual("cologne", self.normalizer.normalize_value("City", "Köln"))
+        self.assertEqual(
+            "Köln", self.normalizer.normalize_value("City", "Köln", lower=False)
+        )
+        self.assertIsNone(self.normalizer.normalize_value("Gender", "  "))
+
+    def test_memoized_per_distinct_value(self):
+        """Tests if each distinct value of a column is normalized once."""
+        data = pd.DataFrame({"City": ["Köln", "Berlin", "Köln"] * 100})
+        with patch.object(
+            self.normalizer,
+            "_normalize",
+            wraps=self.normalizer._normalize,  # pylint: disable=protected-access
+        ) as normalize_mock:
+            self.normalizer.normalize(data, lower_columns=["City"])
+            self.normalizer.normalize(data.iloc[::-1], lower_columns=["City"])
+            self.normalizer.normalize(data, lower_columns=[])
+        self.assertEqual(4, normalize_mock.call_count)
+
+    def test_memo_bounded(self):
+        """Tests if values beyond the memo size are normalized without being memoized."""
+        normalizer = CategoryNormalizer(
+            mappings=MAPPINGS, regex_mappings=REGEX_MAPPINGS, max_memoized=2
+        )
+        actual = normalizer.normalize_column(
+            pd.Series(["A", "B", "C", "D"], name="City")
+        )
+        self.assertListEqual(["a", "b", "c", "d"], actual.tolist())
+        self.assertDictEqual(
+            {"A": "a", "B": "b"},
+            normalizer._memo[("City", True)],  # pylint: disable=protected-access
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
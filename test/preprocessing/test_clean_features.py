@@ -12,7 +12,7 @@ import pandas as pd
 from pandas.testing import assert_series_equal, assert_frame_equal
 
 from preprocessing.clean_features import KaggleFeatureCleaner, main
-from utils.data_models import ExecutionMode
+from utils.data_models import ExecutionMode, ValidationMode
 
 
 class KaggleFeatureCleanerStaticFunctionsTest(unittest.TestCase):
@@ -308,6 +308,99 @@ class KaggleFeatureCleanerStaticFunctionsTest(unittest.TestCase):
         assert_series_equal(expected, actual)
 
 
+# pylint: disable=protected-access
+
+
+def _replace_seniority_in_position_name(position: str, seniority: str):
+    """Removes the seniority of a single position as reference."""
+    if pd.isna(seniority):
+        return position
+    if not pd.isna(position):
+        return position.replace(seniority, "").strip()
+    return np.NAN
+
+
+def _row_wise_position(position: pd.Series, seniority: pd.Series) -> pd.Series:
+    """Cleans the position row by row as reference."""
+    return pd.Series(
+        [
+            _replace_seniority_in_position_name(value, level)
+            for value, level in zip(position, seniority)
+        ],
+        index=position.index,
+        name="Position",
+        dtype="object",
+    )
+
+
+def _row_wise_years_of_experience(
+    years_of_experience: pd.Series, age: pd.Series
+) -> pd.Series:
+    """Cleans the years of experience row by row as reference."""
+    cleaned = years_of_experience.str.replace(",", ".", regex=False).apply(
+        KaggleFeatureCleaner._transform_to_float
+    )
+    cleaned[(age - cleaned) < 18] = age - 18
+    return cleaned
+
+
+def _synthetic_answers(n_rows: int) -> pd.DataFrame:
+    """Draws survey answers including missing, long decimal and invalid values."""
+    rng = np.random.default_rng(0)
+    levels = ["Senior", "Middle", "Junior", "Lead", "Head", None, np.NaN]
+    positions = [
+        "Senior Backend Developer",
+        "Backend Developer",
+        " Lead QA Engineer ",
+        "Head of Data",
+        "ML Engineer Junior",
+        "",
+        None,
+        np.NaN,
+    ]
+    experiences = ["5", "1,5", "12,75", "less than year", "1_000", "", None]
+    experiences += [repr(value) for value in rng.random(50) * 30]
+    return pd.DataFrame(
+        {
+            "Position": rng.choice(np.array(positions, dtype=object), n_rows),
+            "Seniority": rng.choice(np.array(levels, dtype=object), n_rows),
+            "Years_of_Experience": rng.choice(
+                np.array(experiences, dtype=object), n_rows
+            ),
+            "Age": rng.integers(16, 70, n_rows).astype(float),
+        }
+    )
+
+
+class KaggleFeatureCleanerVectorizedTest(unittest.TestCase):
+    """Test case for cleaning columns column-wise like row by row."""
+
+    # pylint: disable=no-self-use
+
+    @parameterized.expand(
+        [
+            ("sample", RAW_DATA_COMBINED),
+            ("synthetic", _synthetic_answers(100000)),
+        ]
+    )
+    def test_like_row_wise(self, _, data):
+        """Tests if position and experience are cleaned like row by row."""
+        assert_series_equal(
+            _row_wise_position(data["Position"], data["Seniority"]),
+            KaggleFeatureCleaner.clean_position_column(
+                data["Position"], data["Seniority"]
+            ),
+            check_exact=True,
+        )
+        assert_series_equal(
+            _row_wise_years_of_experience(data["Years_of_Experience"], data["Age"]),
+            KaggleFeatureCleaner.clean_years_of_experience_column(
+                data["Years_of_Experience"], data["Age"]
+            ),
+            check_exact=True,
+        )
+
+
 class KaggleFeatureCleanerTrainTest(unittest.TestCase):
     """Test case for the kaggle survey data."""
 
@@ -324,6 +417,15 @@ class KaggleFeatureCleanerTrainTest(unittest.TestCase):
         actual = self.cleaner.execute()
         assert_frame_equal(expected, actual)
 
+    def test_execute_compiled_validation(self):  # pylint: disable=no-self-use
+        """Tests if validating with the compiled schemas cleans like validating with pandera."""
+        cleaner = KaggleFeatureCleaner(
+            data=RAW_DATA_COMBINED,
+            mode=ExecutionMode.TRAIN,
+            validation_mode=ValidationMode.COMPILED,
+        )
+        assert_frame_equal(CLEANED_FEATURES, cleaner.execute())
+
 
 class MainTest(unittest.TestCase):
     """Test case for the main method."""
@@ -0,0 +1,104 @@
+"""Test cases for the DataFrame free inference pipeline."""
+import unittest
+from unittest.mock import patch
+from test.resources.sample_data import LABELS, INFERENCE_REQUESTS, TRANSFORMED_FEATURES
+
+from fastapi.encoders import jsonable_encoder
+from parameterized import parameterized
+import numpy as np
+import pandas as pd
+from pandera.errors import SchemaError
+from numpy.testing import assert_array_equal
+
+from modeling.sklearn_models import SKLearnModel
+from preprocessing.clean_features import KaggleFeatureCleaner
+from preprocessing.compiled_features import CompiledFeaturePipeline
+from preprocessing.label_encoder import LabelEncoder
+from preprocessing.transform_features import KaggleFeatureTransformer
+from utils.data_models import (
+    ExecutionMode,
+    RequestInputInference,
+    PreprocessedRequestInference,
+)
+
+
+def run_dataframe_pipeline(rows):
+    """Runs the preprocessing and model input conversion the same way as ``api.main``."""
+    input_data = pd.DataFrame(jsonable_encoder(rows))
+    cleaned_data = KaggleFeatureCleaner(
+        data=input_data, mode=ExecutionMode.INFERENCE
+    ).execute()
+    transformer = KaggleFeatureTransformer(
+        data=cleaned_data,
+        mode=ExecutionMode.INFERENCE,
+        label_encoder=LabelEncoder(labels=LABELS),
+    )
+    transformed_data = transformer.execute().to_dict(orient="records")
+    preprocessed = [PreprocessedRequestInference(**row) for row in transformed_data]
+    return pd.DataFrame(jsonable_encoder(preprocessed))
+
+
+class CompiledFeaturePipelineTest(unittest.TestCase):
+    """Test case for the compiled feature pipeline."""
+
+    def setUp(self) -> None:
+        """Sets up test prerequisites."""
+        self.pipeline = CompiledFeaturePipeline(labels=LABELS)
+        self.rows = [RequestInputInference(**row) for row in INFERENCE_REQUESTS]
+
+    def test_transform_matches_dataframe_pipeline(self):
+        """Tests if the feature matrix is bitwise identical to the DataFrame pipeline."""
+        expected = run_dataframe_pipeline(self.rows)
+        actual = self.pipeline.transform(rows=self.rows)
+        self.assertEqual(np.float32, actual.dtype)
+        self.assertTrue(actual.flags["C_CONTIGUOUS"])
+        self.assertEqual(self.pipeline.columns, tuple(expected.columns))
+        assert_array_equal(
+            expected.to_numpy(dtype=np.float32).view(np.uint32),
+            actual.view(np.uint32),
+        )
+
+    def test_predictions_match_dataframe_pipeline(self):
+        """Tests if the model predicts the same values for both pipelines."""
+        model = SKLearnModel(hyperparameters={"n_estimators": 5, "random_state": 0})
+        model.fit(X=TRANSFORMED_FEATURES, y=pd.Series([1.0, 2.0, 3.0, 4.0]))
+        expected = model.predict(run_dataframe_pipeline(self.rows))
+        actual = model.predict(self.pipeline.transform(rows=self.rows))
+        assert_array_equal(expected, actual)
+
+    def test_transform_empty(self):
+        """Tests transforming an empty request."""
+        actual = self.pipeline.transform(rows=[])
+        self.assertEqual((0, len(self.pipeline.columns)), actual.shape)
+
+    @parameterized.expand(
+        [
+            ({"Age": 17},),
+            ({"Age": 101},),
+            ({"Gender": " "},),
+            ({"Years_of_Experience": float("nan")},),
+        ]
+    )
+    def test_transform_raises(self, invalid_values):
+        """Tests if rows rejected by the schemas raise in both pipelines."""
+        rows = [RequestInputInference(**{**INFERENCE_REQUESTS[0], **invalid_values})]
+        with self.assertRaises(ValueError):
+            _ = self.pipeline.transform(rows=rows)
+        with self.assertRaises(SchemaError):
+            _ = run_dataframe_pipeline(rows)
+
+    def test_missing_labels_raises(self):
+        """Tests if compiling the pipeline fails when labels of categorical columns are missing."""
+        with self.assertRaises(ValueError):
+            _ = CompiledFeaturePipeline(labels={"Gender": ["male"]})
+
+    @patch("preprocessing.compiled_features.read_data", return_value=LABELS)
+    def test_from_labels_path(self, read_data_mock):
+        """Tests compiling the pipeline from a labels file."""
+        pipeline = CompiledFeaturePipeline.from_labels_path(labels_path="mocked.json")
+        read_data_mock.assert_called()
+        self.assertDictEqual(self.pipeline.label_indices, pipeline.label_indices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Test cases for encoding categorical features with the training labels."""
+import unittest
+from unittest.mock import patch
+from test.resources.sample_data import LABELS
+
+from parameterized import parameterized
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_series_equal
+
+from preprocessing.label_encoder import LabelEncoder
+
+
+def _encode_based_on_list(value: str, label_values: list) -> int:
+    """Encodes a single value by the index of the labels like before vectorizing, as reference."""
+    if pd.isna(value):
+        return -1
+    if value not in label_values:
+        return len(label_values)
+    return label_values.index(value)
+
+
+class LabelEncoderTest(unittest.TestCase):
+    """Test case for the label encoder."""
+
+    def setUp(self) -> None:
+        """Sets up test prerequisites."""
+        self.label_encoder = LabelEncoder(labels=LABELS)
+
+    @parameterized.expand(
+        [
+            (
+                pd.Series(["male", np.NaN, "unseen", "diverse"], name="Gender"),
+                pd.Series([2, -1, 3, 0], name="Gender"),
+            ),
+            (
+                pd.Series(
+                    ["male", np.NaN, "unseen", "diverse"],
+                    name="Gender",
+                    index=[3, 5, 7, 9],
+                    dtype="category",
+                ),
+                pd.Series([2, -1, 3, 0], name="Gender", index=[3, 5, 7, 9]),
+            ),
+            (
+                pd.Series([np.NaN, np.NaN], name="Gender"),
+                pd.Series([-1, -1], name="Gender"),
+            ),
+            (
+                pd.Series([np.NaN, np.NaN], name="Gender", dtype="category"),
+                pd.Series([-1, -1], name="Gender"),
+            ),
+            (
+                pd.Series([], name="Gender", dtype="object"),
+                pd.Series([], name="Gender", dtype="int64"),
+            ),
+        ]
+    )
+    def test_encode(self, values, expected):
+        """Tests encoding a column."""
+        actual = self.label_encoder.encode(column="Gender", values=values)
+        assert_series_equal(expected, actual)
+
+    @parameterized.expand(
+        [
+            (np.NaN, ["label", "label2"], -1),
+            ("not inside", ["random", "label"], 2),
+            ("male", ["male", "female", "diverse"], 0),
+        ]
+    )
+    def test_encode_single_value(self, value, labels, expected):
+        """Tests if a single value is encoded by its index in the labels."""
+        actual = LabelEncoder(labels={"Gender": labels}).encode(
+            column="Gender", values=pd.Series([value])
+        )
+        self.assertEqual(expected, _encode_based_on_list(value, labels))
+        self.assertListEqual([expected], actual.tolist())
+
+    def test_encode_matches_encode_based_on_list(self):
+        """Tests if the vectorized encoding matches the encoding of single values."""
+        values = pd.Series(["manager", "cto", np.NaN, "data scientist", "manager"])
+        expected = values.apply(
+            _encode_based_on_list,
+            label_values=LABELS["Position"],
+        ).tolist()
+        actual = self.label_encoder.encode(column="Position", values=values).tolist()
+        self.assertListEqual(expected, actual)
+
+    def test_duplicated_labels_raises(self):
+        """Tests if duplicated labels raise an error."""
+        with self.assertRaises(ValueError):
+            _ = LabelEncoder(labels={"Gender": ["male", "male"]})
+
+    @patch("preprocessing.label_encoder.read_data", return_value=LABELS)
+    def test_from_path(self, read_data_mock):
+        """Tests loading the labels from a file."""
+        label_encoder = LabelEncoder.from_path(labels_path="mocked.json")
+        read_data_mock.assert_called_once()
+        self.assertDictEqual(LABELS, label_encoder.labels)
+        self.assertListEqual(list(LABELS.keys()), label_encoder.columns)
+
+    def test_from_path_raises(self):
+        """Tests if a missing labels path raises an error."""
+        with self.assertRaises(ValueError):
+            _ = LabelEncoder.from_path(labels_path=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
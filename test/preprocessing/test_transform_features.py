@@ -12,8 +12,9 @@ from parameterized import parameterized
 import numpy as np
 from pandas.testing import assert_frame_equal
 
+from preprocessing.label_encoder import LabelEncoder
 from preprocessing.transform_features import KaggleFeatureTransformer, main
-from utils.data_models import ExecutionMode
+from utils.data_models import ExecutionMode, ValidationMode
 
 
 class KaggleFeatureTransformerTest(unittest.TestCase):
@@ -99,20 +100,69 @@ class KaggleFeatureTransformerTest(unittest.TestCase):
         actual = self.transformer.encode_categorical_features(labels=labels)
         assert_frame_equal(expected, actual)
 
-    @parameterized.expand(
-        [
-            (np.NaN, ["label", "label2"], -1),
-            ("not inside", ["random", "label"], 2),
-            ("male", ["male", "female", "diverse"], 0),
-        ]
-    )
-    def test_encode_based_on_list(self, value, labels, expected):
-        """Tests if labels are encoded correctly on inference."""
-        actual = KaggleFeatureTransformer.encode_based_on_list(
-            value=value,
-            label_values=labels,
+
+class KaggleFeatureTransformerInferenceTest(unittest.TestCase):
+    """Test case for transforming features in mode inference."""
+
+    def setUp(self) -> None:
+        """Sets up test prerequisites."""
+        self.labels = {
+            "Gender": ["diverse", "female", "male"],
+            "City": ["berlin", "cologne"],
+            "Seniority": ["junior", "mid", "senior"],
+            "Position": [
+                "data scientist",
+                "engineer",
+                "manager",
+                "software developer",
+            ],
+            "Company_Size": ["1-100", "101-1000"],
+            "Company_Type": ["consulting or agency", "product", "startup"],
+        }
+
+    def test_execute_with_label_encoder(self):
+        """Tests if a passed label encoder is used without reading labels."""
+        label_encoder = LabelEncoder(labels=self.labels)
+        with patch("preprocessing.label_encoder.read_data") as read_data_mock:
+            transformer = KaggleFeatureTransformer(
+                data=CLEANED_FEATURES,
+                mode=ExecutionMode.INFERENCE,
+                label_encoder=label_encoder,
+            )
+            actual = transformer.execute()
+            read_data_mock.assert_not_called()
+        self.assertIs(label_encoder, transformer.label_encoder)
+        assert_frame_equal(TRANSFORMED_FEATURES, actual)
+
+    def test_execute_compiled_validation(self):
+        """Tests if validating with the compiled schemas transforms like validating with pandera."""
+        transformer = KaggleFeatureTransformer(
+            data=CLEANED_FEATURES,
+            mode=ExecutionMode.INFERENCE,
+            label_encoder=LabelEncoder(labels=self.labels),
+            validation_mode=ValidationMode.COMPILED,
         )
-        self.assertEqual(expected, actual)
+        assert_frame_equal(TRANSFORMED_FEATURES, transformer.execute())
+
+    def test_execute_with_labels_path(self):
+        """Tests if labels are loaded from the labels path."""
+        with patch(
+            "preprocessing.label_encoder.read_data", return_value=self.labels
+        ) as read_data_mock:
+            transformer = KaggleFeatureTransformer(
+                data=CLEANED_FEATURES,
+                mode=ExecutionMode.INFERENCE,
+                labels_path="mocked.json",
+            )
+            read_data_mock.assert_called_once()
+        assert_frame_equal(TRANSFORMED_FEATURES, transformer.execute())
+
+    def test_missing_labels_raises(self):
+        """Tests if neither label encoder nor labels path raises an error."""
+        with self.assertRaises(ValueError):
+            _ = KaggleFeatureTransformer(
+                data=CLEANED_FEATURES, mode=ExecutionMode.INFERENCE
+            )
 
 
 class MainTest(unittest.TestCase):
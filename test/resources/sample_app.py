@@ -0,0 +1,24 @@
+"""Minimal app served by the pre-fork server in tests."""
+import os
+
+from fastapi import FastAPI
+
+
+app = FastAPI()
+
+# Process the app was imported in
+LOADED_IN = os.getpid()
+
+# Processes the preload hook was called in
+PRELOADED_IN = []
+
+
+def preload():
+    """Records the process the preload hook is called in."""
+    PRELOADED_IN.append(os.getpid())
+
+
+@app.get("/pid")
+def pid():
+    """Returns the process serving the request and the processes the app was imported and preloaded in."""
+    return {"pid": os.getpid(), "loaded_in": LOADED_IN, "preloaded_in": PRELOADED_IN}
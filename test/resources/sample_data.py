@@ -137,3 +137,76 @@ TRAIN_DATA = pd.DataFrame(
     },
     index=pd.Index([1, 3, 4]),
 )
+
+LABELS = {
+    "Gender": ["diverse", "female", "male"],
+    "City": ["berlin", "cologne", "munich"],
+    "Seniority": ["junior", "mid", "senior"],
+    "Position": [
+        "data scientist",
+        "devops engineer",
+        "machine learning engineer",
+        "manager",
+        "software developer",
+    ],
+    "Company_Size": ["1-100", "101-1000"],
+    "Company_Type": ["consulting or agency", "product", "startup"],
+}
+
+INFERENCE_REQUESTS = [
+    {
+        "Timestamp": datetime(2020, 1, 1),
+        "Age": 24,
+        "Gender": "male",
+        "City": "Berlin",
+        "Seniority": "Mid",
+        "Position": "Developer",
+        "Years_of_Experience": 8.0,
+        "Company_Size": "101-1000",
+        "Company_Type": "Product",
+    },
+    {
+        "Timestamp": datetime(2019, 12, 31, 23, 59),
+        "Age": 31,
+        "Gender": " F ",
+        "City": "München",
+        "Seniority": "Senior",
+        "Position": "Senior ML Engineer",
+        "Years_of_Experience": 7.5,
+        "Company_Size": "11-50",
+        "Company_Type": "Consulting",
+    },
+    {
+        "Timestamp": datetime(2018, 6, 15),
+        "Age": 22,
+        "Gender": "D",
+        "City": "  ",
+        "Seniority": "Entry Level",
+        "Position": "Java Developer",
+        "Years_of_Experience": 10.0,
+        "Company_Size": "",
+        "Company_Type": "Bank",
+    },
+    {
+        "Timestamp": datetime(2021, 3, 3),
+        "Age": 100,
+        "Gender": "female",
+        "City": "Amsterdam",
+        "Seniority": "",
+        "Position": "Lead Devops",
+        "Years_of_Experience": 0.1,
+        "Company_Size": "up to 10",
+        "Company_Type": "Startup",
+    },
+    {
+        "Timestamp": datetime(2020, 11, 30),
+        "Age": 18,
+        "Gender": "Male",
+        "City": "Cologne",
+        "Seniority": "Lead",
+        "Position": "IT Manager",
+        "Years_of_Experience": 1e-7,
+        "Company_Size": "1000+",
+        "Company_Type": "University",
+    },
+]
@@ -0,0 +1,86 @@
+"""Minimal stand-ins of the preprocessing and prediction services for tests of the remote orchestration."""
+import asyncio
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+
+from api.arrow import ArrowRoute, columnar_response
+from api.hot_swap import ModelVersionMiddleware
+from utils.request_models import (
+    ColumnarPreprocessedRequestInference,
+    ColumnarRequestInputInference,
+)
+
+
+# Delay in seconds of each request and number of requests still to answer with 503, per service
+STATE = {"delay_s": 0.0, "failures": 0, "requests": 0}
+
+preprocessing_app = FastAPI()
+preprocessing_app.router.route_class = ArrowRoute
+prediction_app = FastAPI()
+prediction_app.router.route_class = ArrowRoute
+prediction_app.add_middleware(ModelVersionMiddleware)
+
+
+async def _handle() -> None:
+    """Counts the request, waits for the delay and fails while failures are left."""
+    STATE["requests"] += 1
+    await asyncio.sleep(STATE["delay_s"])
+    if STATE["failures"] > 0:
+        STATE["failures"] -= 1
+        raise HTTPException(status_code=503, detail="Not ready.")
+
+
+@preprocessing_app.post("/preprocess")
+async def preprocess(user_request: ColumnarRequestInputInference, request: Request):
+    """Returns the year and age of the columns and zero codes for all other columns."""
+    await _handle()
+    codes = np.zeros(len(user_request), dtype=np.int64)
+    return columnar_response(
+        {
+            "Year": user_request.Timestamp.astype("datetime64[Y]").astype(np.int64)
+            + 1970,
+            "Age": user_request.Age,
+            "Gender": codes,
+            "City": codes,
+            "Seniority": codes,
+            "Position": codes,
+            "Years_of_Experience": user_request.Years_of_Experience.astype(np.float32),
+            "Company_Size": codes,
+            "Company_Type": codes,
+        },
+        request,
+    )
+
+
+@prediction_app.post("/predict")
+async def predict(user_request: ColumnarPreprocessedRequestInference, request: Request):
+    """Predicts 1000 per year of age and 100 per year of experience with the requested model of version 'stand-in'."""
+    await _handle()
+    request.state.model_id = request.headers.get("x-model-id", "default")
+    request.state.model_version = "stand-in"
+    return columnar_response(
+        {
+            "Salary_Yearly": user_request.Age * 1000.0
+            + user_request.Years_of_Experience * 100
+        },
+        request,
+    )
+
+
+@prediction_app.get("/batching")
+def batching():
+    """Returns empty batching statistics."""
+    return {"batch_size": {}}
+
+
+@prediction_app.get("/threads")
+def threads():
+    """Returns an unused thread budget."""
+    return {"budget": 1, "in_use": 0}
+
+
+@prediction_app.get("/models")
+def models():
+    """Returns the loaded stand-in model."""
+    return {"default": {"version": "stand-in", "bytes": 0}}
@@ -5,7 +5,9 @@ import unittest
 from pathlib import Path
 from parameterized import parameterized
 
+import numpy as np
 import pandas as pd
+from numpy.testing import assert_array_equal
 from pandas.testing import assert_frame_equal
 
 
@@ -72,6 +74,83 @@ class DataIOTest(unittest.TestCase):
         data_io.write_data(data=data, filepath=filepath.as_posix())
         self.assertTrue(filepath.is_file())
 
+    def test_write_and_read_forest(self):
+        """Tests if array files round-trip and are memory-mapped read-only."""
+        data = {
+            "metadata": {"n_features": 3, "names": ["a", "b"]},
+            "arrays": {
+                "int16": np.array([1, -2, 3], dtype=np.int16),
+                "float32": np.array([[0.1, 0.2], [0.3, 0.4]], dtype=np.float32),
+                "empty": np.array([], dtype=np.int32),
+                "children": np.arange(10, dtype=np.int64).reshape(2, 5).T,
+            },
+        }
+        filepath = Path(self.temp_dir, "sample.forest")
+        data_io.write_data(data=data, filepath=filepath.as_posix())
+        actual = data_io.read_data(filepath=filepath.as_posix())
+        self.assertDictEqual(data["metadata"], actual["metadata"])
+        for name, expected in data["arrays"].items():
+            self.assertEqual(expected.dtype, actual["arrays"][name].dtype)
+            assert_array_equal(expected, actual["arrays"][name])
+            self.assertFalse(actual["arrays"][name].flags.writeable)
+            self.assertEqual(0, actual["arrays"][name].ctypes.data % 64)
+        self.assertIsInstance(actual["arrays"]["int16"].base, np.memmap)
+
+    def test_read_forest_raises(self):
+        """Tests if reading a file which is no array file raises an error."""
+        filepath = Path(self.temp_dir, "invalid.forest")
+        filepath.write_bytes(b"not an array file")
+        with self.assertRaises(ValueError):
+            _ = data_io.read_data(filepath=filepath.as_posix())
+
+    @parameterized.expand(
+        [
+            ("parquet_row_groups", "data.parquet", None, [4, 4, 2]),
+            ("parquet_rows", "data.parquet", 3, [3, 3, 3, 1]),
+            ("csv_rows", "data.csv", 6, [6, 4]),
+        ]
+    )
+    def test_read_data_chunks(self, _, filename, chunk_rows, expected_sizes):
+        """Tests if chunks are read in order with a continuous index."""
+        data = pd.DataFrame({"number": np.arange(10), "text": list("abcdefghij")})
+        filepath = Path(self.temp_dir, filename).as_posix()
+        if filename.endswith(".parquet"):
+            data.to_parquet(filepath, index=False, row_group_size=4)
+        else:
+            data.to_csv(filepath, index=False)
+        chunks = list(data_io.read_data_chunks(filepath, chunk_rows=chunk_rows))
+        self.assertListEqual(expected_sizes, [len(chunk) for chunk in chunks])
+        assert_frame_equal(data, pd.concat(chunks))
+
+    @parameterized.expand([("csv_without_rows", "data.csv"), ("json", "data.json")])
+    def test_read_data_chunks_raises(self, _, filename):
+        """Tests if reading chunks raises for csv files without chunk size and unsupported files."""
+        with self.assertRaises(ValueError):
+            _ = list(data_io.read_data_chunks(Path(self.temp_dir, filename)))
+
+    def test_write_data_chunks(self):
+        """Tests if chunks are written in order as row groups of a parquet file."""
+        chunks = [
+            pd.DataFrame({"value": [1.0, 2.0]}, index=[0, 1]),
+            pd.DataFrame({"value": [3.0]}, index=[2]),
+        ]
+        filepath = Path(self.temp_dir, "chunks.parquet").as_posix()
+        rows = data_io.write_data_chunks(iter(chunks), filepath=filepath)
+        self.assertEqual(3, rows)
+        self.assertEqual(3, data_io.count_rows(filepath))
+        self.assertListEqual(
+            [2, 1],
+            [len(chunk) for chunk in data_io.read_data_chunks(filepath)],
+        )
+        assert_frame_equal(
+            pd.DataFrame({"value": [1.0, 2.0, 3.0]}), pd.read_parquet(filepath)
+        )
+
+    def test_write_data_chunks_raises(self):
+        """Tests if writing chunks to other files than parquet files raises."""
+        with self.assertRaises(ValueError):
+            data_io.write_data_chunks([], filepath=Path(self.temp_dir, "data.csv"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,219 @@
+"""Test cases for the compiled schemas."""
+import unittest
+from test.resources.sample_data import (
+    CLEANED_FEATURES,
+    CLEANED_TARGETS,
+    RAW_DATA_COMBINED,
+    TRANSFORMED_FEATURES,
+)
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from pandera.errors import SchemaError
+from parameterized import parameterized
+
+from utils.data_models import (
+    CleanedFeaturesSchema,
+    CleanedTargetsSchema,
+    CompiledSchema,
+    RawInputSchema,
+    TransformedFeaturesSchema,
+    ValidationMode,
+)
+
+
+def _with(data: pd.DataFrame, **columns) -> pd.DataFrame:
+    """Returns a copy of the data with replaced columns."""
+    return data.assign(**columns)
+
+
+def _move_to_end(data: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Returns a copy of the data with the column moved to the end."""
+    return data[[name for name in data.columns if name != column] + [column]]
+
+
+class SchemaMetadataTest(unittest.TestCase):
+    """Test case for the registry of schema metadata."""
+
+    def test_metadata(self):
+        """Tests if the metadata is derived once from the pandera schema."""
+        metadata = CleanedFeaturesSchema.metadata()
+        self.assertIs(metadata, CleanedFeaturesSchema.metadata())
+        self.assertIs(CleanedFeaturesSchema.to_schema(), metadata.schema)
+        self.assertTupleEqual(
+            tuple(CleanedFeaturesSchema.to_schema().columns), metadata.column_names
+        )
+        self.assertTupleEqual(
+            ("Gender", "City", "Seniority", "Position", "Company_Size", "Company_Type"),
+            CleanedFeaturesSchema.get_category_columns(),
+        )
+        self.assertTupleEqual(
+            ("Year", "Age", "Gender", "Years_of_Experience"),
+            CleanedFeaturesSchema.get_non_nullable_columns(),
+        )
+        self.assertEqual("float32", str(dict(metadata.dtypes)["Years_of_Experience"]))
+
+    def test_metadata_per_schema(self):
+        """Tests if each schema has its own metadata."""
+        self.assertTupleEqual(
+            ("Salary_Yearly",), CleanedTargetsSchema.get_column_names()
+        )
+        self.assertNotEqual(
+            RawInputSchema.get_column_names(), CleanedFeaturesSchema.get_column_names()
+        )
+
+
+class CompiledSchemaTest(unittest.TestCase):
+    """Test case for validating data with compiled schemas and pandera as reference."""
+
+    # pylint: disable=no-self-use
+
+    def assert_same_validation(self, schema, data):
+        """Asserts that the compiled schema returns the same data or raises the same error as pandera."""
+        try:
+            expected = schema.to_schema()(data)
+        except SchemaError as error:
+            with self.assertRaises(SchemaError) as context:
+                schema.validate_data(data, ValidationMode.COMPILED)
+            self.assertEqual(str(error), str(context.exception))
+            return
+        actual = schema.validate_data(data, ValidationMode.COMPILED)
+        assert_frame_equal(expected, actual)
+        self.assertListEqual(list(expected.index), list(actual.index))
+
+    @parameterized.expand(
+        [
+            ("raw", RawInputSchema, RAW_DATA_COMBINED),
+            (
+                "raw_without_target",
+                RawInputSchema,
+                RAW_DATA_COMBINED.drop(columns="Salary_Yearly"),
+            ),
+            (
+                "raw_numbers_as_strings",
+                RawInputSchema,
+                _with(RAW_DATA_COMBINED, Gender=[1, 2, np.NaN, 3, 4, 5]),
+            ),
+            (
+                "raw_timestamp_strings",
+                RawInputSchema,
+                _with(RAW_DATA_COMBINED, Timestamp="2020-01-01T10:00:00"),
+            ),
+            ("raw_extra_column", RawInputSchema, _with(RAW_DATA_COMBINED, Other=1)),
+            ("raw_empty", RawInputSchema, RAW_DATA_COMBINED.iloc[:0]),
+            ("cleaned", CleanedFeaturesSchema, CLEANED_FEATURES),
+            (
+                "cleaned_strings",
+                CleanedFeaturesSchema,
+                _with(
+                    CLEANED_FEATURES,
+                    Gender=["male", "female", "diverse", "female"],
+                    City=["berlin", "cologne", "berlin", "cologne"],
+                ),
+            ),
+            (
+                "cleaned_floats",
+                CleanedFeaturesSchema,
+                _with(CLEANED_FEATURES, Age=[24.0, 40.0, 34.0, 33.0]),
+            ),
+            (
+                "cleaned_null_city",
+                CleanedFeaturesSchema,
+                _with(CLEANED_FEATURES, City=[None, "a", "b", "c"]),
+            ),
+            ("transformed", TransformedFeaturesSchema, TRANSFORMED_FEATURES),
+            ("targets", CleanedTargetsSchema, CLEANED_TARGETS),
+        ]
+    )
+    def test_valid(self, _, schema, data):
+        """Tests if valid data is coerced like by pandera."""
+        self.assert_same_validation(schema, data)
+
+    @parameterized.expand(
+        [
+            ("missing_column", RawInputSchema, RAW_DATA_COMBINED.drop(columns="Age")),
+            ("invalid_float", RawInputSchema, _with(RAW_DATA_COMBINED, Age="old")),
+            (
+                "invalid_timestamp",
+                RawInputSchema,
+                _with(RAW_DATA_COMBINED, Timestamp="never"),
+            ),
+            (
+                "duplicated_index",
+                RawInputSchema,
+                RAW_DATA_COMBINED.set_index(pd.Index([0, 1, 1, 2, 3, 4])),
+            ),
+            ("unsorted_index", RawInputSchema, RAW_DATA_COMBINED.iloc[::-1]),
+            (
+                "string_index",
+                RawInputSchema,
+                RAW_DATA_COMBINED.set_index(pd.Index(list("abcdef"))),
+            ),
+            (
+                "null_gender",
+                CleanedFeaturesSchema,
+                _with(CLEANED_FEATURES, Gender=[None, "a", "b", "c"]),
+            ),
+            (
+                "null_age",
+                CleanedFeaturesSchema,
+                _with(CLEANED_FEATURES, Age=[np.NaN, 40, 34, 33]),
+            ),
+            (
+                "age_below_range",
+                CleanedFeaturesSchema,
+                _with(CLEANED_FEATURES, Age=[17, 40, 34, 33]),
+            ),
+            (
+                "age_above_range",
+                CleanedFeaturesSchema,
+                _with(CLEANED_FEATURES, Age=[24, 101, 34, 33]),
+            ),
+            (
+                "experience_above_age",
+                CleanedFeaturesSchema,
+                _with(CLEANED_FEATURES, Years_of_Experience=[7.0, 20.0, 10.0, 9.0]),
+            ),
+            (
+                "columns_out_of_order",
+                TransformedFeaturesSchema,
+                _move_to_end(TRANSFORMED_FEATURES, "Year"),
+            ),
+            (
+                "null_target",
+                CleanedTargetsSchema,
+                _with(CLEANED_TARGETS, Salary_Yearly=[np.NaN, 1.0, 2.0, 3.0]),
+            ),
+        ]
+    )
+    def test_invalid(self, _, schema, data):
+        """Tests if invalid data raises the same error as pandera."""
+        with self.assertRaises(SchemaError):
+            schema.to_schema()(data)
+        self.assert_same_validation(schema, data)
+
+    def test_experience_check_ignores_rows_with_nulls(self):
+        """Tests if the dataframe check skips rows with null values like pandera."""
+        data = _with(
+            CLEANED_FEATURES,
+            City=[None, "a", "b", "c"],
+            Years_of_Experience=[7.0, 20.0, 10.0, 9.0],
+        )
+        self.assert_same_validation(CleanedFeaturesSchema, data)
+
+    def test_input_not_modified(self):
+        """Tests if validating does not change the validated data."""
+        data = RAW_DATA_COMBINED.copy()
+        validated = RawInputSchema.validate_data(data, ValidationMode.COMPILED)
+        validated.iloc[0, 0] = "changed"
+        assert_frame_equal(RAW_DATA_COMBINED, data)
+
+    def test_compiled_once(self):
+        """Tests if schemas are compiled once."""
+        self.assertIs(RawInputSchema.compile(), RawInputSchema.compile())
+        self.assertIsInstance(RawInputSchema.compile(), CompiledSchema)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Test cases for the columnar request models."""
+import unittest
+from test.resources.sample_data import INFERENCE_REQUESTS
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from pandas.testing import assert_frame_equal
+from parameterized import parameterized
+from pydantic import ValidationError
+
+from utils.request_models import (
+    ColumnarPreprocessedRequestInference,
+    ColumnarRequestInputInference,
+    RequestInputInference,
+    _Column,
+)
+
+
+ROWS = jsonable_encoder(INFERENCE_REQUESTS)
+COLUMNS = {column: [row[column] for row in ROWS] for column in ROWS[0]}
+
+
+class ColumnarRequestInputInferenceTest(unittest.TestCase):
+    """Test case for validating requests with a list of values per column."""
+
+    # pylint: disable=no-self-use
+
+    def test_like_rows(self):
+        """Tests if the columns result in the same dataframe as the rows."""
+        expected = pd.DataFrame(
+            jsonable_encoder([RequestInputInference.parse_obj(row) for row in ROWS])
+        ).astype({"Timestamp": "datetime64[ns]", "Years_of_Experience": float})
+        columns = ColumnarRequestInputInference.parse_obj(COLUMNS)
+        self.assertEqual(len(ROWS), len(columns))
+        assert_frame_equal(expected, pd.DataFrame(dict(columns)), check_exact=True)
+
+    def test_empty(self):
+        """Tests if columns without values are valid."""
+        columns = ColumnarRequestInputInference.parse_obj(
+            {column: [] for column in COLUMNS}
+        )
+        self.assertEqual(0, len(columns))
+        self.assertEqual(0, len(pd.DataFrame(dict(columns))))
+
+    def test_timestamps_with_time_zone(self):
+        """Tests if timestamps with time zone are converted to UTC."""
+        columns = ColumnarRequestInputInference.parse_obj(
+            dict(
+                {column: values[:2] for column, values in COLUMNS.items()},
+                Timestamp=["2020-01-01T10:00:00+02:00", "2020-01-01T10:00:00"],
+            )
+        )
+        np.testing.assert_array_equal(
+            np.array(["2020-01-01T08:00:00", "2020-01-01T10:00:00"], "datetime64[ns]"),
+            columns.Timestamp,
+        )
+
+    def test_arrays(self):
+        """Tests if arrays, as read from Arrow bodies, are validated and arrays of the column type not copied."""
+        arrays = {column: np.array(values) for column, values in COLUMNS.items()}
+        arrays["Timestamp"] = pd.to_datetime(COLUMNS["Timestamp"]).to_numpy()
+        arrays["City"] = arrays["City"].astype(object)
+        columns = ColumnarRequestInputInference.parse_obj(arrays)
+        assert_frame_equal(
+            pd.DataFrame(dict(ColumnarRequestInputInference.parse_obj(COLUMNS))),
+            pd.DataFrame(dict(columns)),
+        )
+        self.assertIs(arrays["City"], columns.City)
+        self.assertIs(arrays["Years_of_Experience"], columns.Years_of_Experience)
+
+    @parameterized.expand(
+        [
+            ("not_a_list", {"Age": 24}, "Age"),
+            ("null_string", {"City": [None, "a", "b", "c", "d"]}, "City"),
+            ("string_as_integer", {"Age": ["24", "a", "22", "100", "18"]}, "Age"),
+            ("invalid_timestamp", {"Timestamp": ["never"] * 5}, "Timestamp"),
+            ("date_as_timestamp", {"Timestamp": ["2020-01-01"] * 5}, "Timestamp"),
+            ("different_lengths", {"Age": [24]}, "__root__"),
+        ]
+    )
+    def test_invalid(self, _, columns, location):
+        """Tests if invalid columns are reported by their name."""
+        with self.assertRaises(ValidationError) as context:
+            ColumnarRequestInputInference.parse_obj(dict(COLUMNS, **columns))
+        self.assertListEqual(
+            [(location,)], [error["loc"] for error in context.exception.errors()]
+        )
+
+    @parameterized.expand(
+        [
+            ("Age", [30, 30.7, "30", True, "a", None]),
+            ("Years_of_Experience", [5, 5.5, "5", "a", None]),
+            ("Gender", ["male", 1, 2.5, None]),
+            (
+                "Timestamp",
+                [
+                    "2020-01-01T10:00:00",
+                    "2020-01-01T10:00:00+02:00",
+                    "2020-01-01",
+                    1600000000,
+                    1600000000000,
+                    "1600000000",
+                    "never",
+                ],
+            ),
+        ]
+    )
+    def test_parity_with_rows(self, column, values):
+        """Tests if each value is accepted and coerced like the same value in a row."""
+        for value in values:
+            with self.subTest(value=value):
+                try:
+                    expected = getattr(
+                        RequestInputInference.parse_obj(
+                            dict(ROWS[0], **{column: value})
+                        ),
+                        column,
+                    )
+                except ValidationError:
+                    expected = None
+                columns = {
+                    name: column_values[:1] for name, column_values in COLUMNS.items()
+                }
+                try:
+                    actual = getattr(
+                        ColumnarRequestInputInference.parse_obj(
+                            dict(columns, **{column: [value]})
+                        ),
+                        column,
+                    )[0]
+                except ValidationError:
+                    actual = None
+                if column == "Timestamp" and expected is not None:
+                    # Columns hold timestamps in UTC without time zone
+                    expected = pd.to_datetime([expected], utc=True).tz_convert(None)[0]
+                self.assertEqual(expected, actual)
+
+    def test_column_without_conversion(self):
+        """Tests if the values of a column without conversion to an array are coerced value by value."""
+
+        class _BoolColumn(_Column):
+            item_type = bool
+
+        self.assertListEqual([True, False], _BoolColumn.validate(["true", 0]))
+        with self.assertRaises(ValueError):
+            _BoolColumn.validate(["maybe"])
+
+    def test_schema(self):
+        """Tests if the columns are documented as arrays of their type."""
+        properties = ColumnarPreprocessedRequestInference.schema()["properties"]
+        self.assertDictEqual(
+            {"title": "Age", "type": "array", "items": {"type": "integer"}},
+            properties["Age"],
+        )
+        self.assertDictEqual(
+            {"type": "number"}, properties["Years_of_Experience"]["items"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()